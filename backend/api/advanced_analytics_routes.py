@@ -4,18 +4,23 @@ Phase 7: Advanced Features - M7.3: Advanced Analytics & Insights
 """
 
 from flask import Blueprint, request, jsonify
-from models.database import db, Client, Trainer
+from models.database import db, Client, ClientChurnScore
 from utils.analytics_service import (
     predict_client_churn,
     forecast_revenue,
     benchmark_trainer_performance,
     get_predictive_insights
 )
+from utils.churn_scoring import get_predictions, to_prediction, DEFAULT_LOOKBACK_DAYS
+from utils.revenue_forecast import PERIODS, SEGMENTS, MAX_HORIZON, Z_SCORES
+from utils.trainer_benchmarks import trainer_benchmarks
+from utils.analytics_cache import analytics_cache
 from utils.logger import logger
 
 advanced_analytics_bp = Blueprint('advanced_analytics', __name__, url_prefix='/api/analytics/advanced')
 
 @advanced_analytics_bp.route('/churn-prediction/<int:client_id>', methods=['GET'])
+@analytics_cache.cached
 def get_churn_prediction(client_id):
     """Get churn prediction for a client"""
     try:
@@ -42,14 +47,11 @@ def get_batch_churn_predictions():
         return jsonify({'error': 'client_ids array is required'}), 400
     
     try:
-        predictions = []
-        for client_id in client_ids:
-            prediction = predict_client_churn(client_id)
-            if 'error' not in prediction:
-                predictions.append(prediction)
+        days_lookback = data.get('days_lookback', DEFAULT_LOOKBACK_DAYS)
+        predictions = list(get_predictions(client_ids, days_lookback).values())
         
         # Sort by churn probability (highest first)
-        predictions.sort(key=lambda x: x['churn_probability'], reverse=True)
+        predictions.sort(key=lambda x: (-x['churn_probability'], x['client_id']))
         
         return jsonify({
             'predictions': predictions,
@@ -61,17 +63,82 @@ def get_batch_churn_predictions():
         logger.error(f"Error getting batch churn predictions: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@advanced_analytics_bp.route('/churn-prediction/at-risk', methods=['GET'])
+@analytics_cache.cached
+def get_at_risk_clients():
+    """List scored clients by churn probability from the nightly snapshot"""
+    try:
+        risk_level = request.args.get('risk_level')
+        page = request.args.get('page', 1, type=int)
+        per_page = request.args.get('per_page', 50, type=int)
+        per_page = min(per_page, 500)
+        
+        query = db.session.query(ClientChurnScore, Client.name).join(
+            Client, Client.id == ClientChurnScore.client_id
+        )
+        if risk_level:
+            query = query.filter(ClientChurnScore.risk_level == risk_level)
+        else:
+            query = query.filter(ClientChurnScore.risk_level != 'low')
+        
+        scores = query.order_by(
+            ClientChurnScore.churn_probability.desc(), ClientChurnScore.client_id
+        ).paginate(page=page, per_page=per_page, error_out=False)
+        
+        clients = []
+        for score, name in scores.items:
+            prediction = to_prediction(score)
+            prediction['client_name'] = name
+            clients.append(prediction)
+        
+        return jsonify({
+            'clients': clients,
+            'pagination': {
+                'page': page,
+                'per_page': per_page,
+                'total': scores.total,
+                'pages': scores.pages
+            }
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error listing at-risk clients: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @advanced_analytics_bp.route('/revenue-forecast', methods=['GET'])
+@analytics_cache.cached
 def get_revenue_forecast():
-    """Get revenue forecast"""
+    """
+    Get revenue forecast
+    
+    Query parameters: months (periods ahead), period (month or week),
+    segment (all, membership_type, payment_type), segment_key,
+    confidence (0.8, 0.9, 0.95 or 0.99) and growth (scenario percent per
+    period).
+    """
     try:
+        period = request.args.get('period', 'month')
+        segment = request.args.get('segment', 'all')
+        confidence = request.args.get('confidence', 0.95, type=float)
+        growth = request.args.get('growth', 0.0, type=float)
+        
+        if period not in PERIODS:
+            return jsonify({'error': f"period must be one of: {', '.join(PERIODS)}"}), 400
+        if segment not in SEGMENTS:
+            return jsonify({'error': f"segment must be one of: {', '.join(SEGMENTS)}"}), 400
+        if confidence not in Z_SCORES:
+            return jsonify({'error': f"confidence must be one of: {', '.join(str(z) for z in Z_SCORES)}"}), 400
+        
         months = request.args.get('months', 6, type=int)
-        months = min(max(months, 1), 12)  # Limit to 1-12 months
+        months = min(max(months, 1), MAX_HORIZON[period])
         
-        forecast = forecast_revenue(months)
+        forecast = forecast_revenue(
+            months, period=period, segment=segment, segment_key=request.args.get('segment_key', ''),
+            confidence=confidence, growth=growth
+        )
         
         if 'error' in forecast:
-            return jsonify(forecast), 500
+            return jsonify(forecast), 404 if forecast['error'].startswith('No revenue history') else 500
         
         return jsonify(forecast), 200
         
@@ -80,10 +147,15 @@ def get_revenue_forecast():
         return jsonify({'error': str(e)}), 500
 
 @advanced_analytics_bp.route('/trainer-benchmark/<int:trainer_id>', methods=['GET'])
+@analytics_cache.cached
 def get_trainer_benchmark(trainer_id):
-    """Get trainer performance benchmark"""
+    """Get trainer performance benchmark (optional days=N for the last N days)"""
     try:
-        benchmark = benchmark_trainer_performance(trainer_id)
+        days = request.args.get('days', type=int)
+        if days is not None and days <= 0:
+            return jsonify({'error': 'days must be positive'}), 400
+        
+        benchmark = benchmark_trainer_performance(trainer_id, days)
         
         if 'error' in benchmark:
             return jsonify(benchmark), 404 if benchmark['error'] == 'Trainer not found' else 500
@@ -95,24 +167,21 @@ def get_trainer_benchmark(trainer_id):
         return jsonify({'error': str(e)}), 500
 
 @advanced_analytics_bp.route('/trainer-benchmark/all', methods=['GET'])
+@analytics_cache.cached
 def get_all_trainer_benchmarks():
-    """Get benchmarks for all trainers"""
+    """Get benchmarks for all trainers (optional days=N for the last N days)"""
     try:
-        trainers = Trainer.query.filter_by(active=True).all()
-        
-        benchmarks = []
-        for trainer in trainers:
-            benchmark = benchmark_trainer_performance(trainer.id)
-            if 'error' not in benchmark:
-                benchmarks.append(benchmark)
+        days = request.args.get('days', type=int)
+        if days is not None and days <= 0:
+            return jsonify({'error': 'days must be positive'}), 400
         
-        # Sort by performance score (highest first)
-        benchmarks.sort(key=lambda x: x['performance_score'], reverse=True)
+        benchmarks, population = trainer_benchmarks.all_benchmarks(days)
         
         return jsonify({
             'benchmarks': benchmarks,
             'total': len(benchmarks),
-            'average_score': round(sum(b['performance_score'] for b in benchmarks) / len(benchmarks), 1) if benchmarks else 0
+            'average_score': round(sum(b['performance_score'] for b in benchmarks) / len(benchmarks), 1) if benchmarks else 0,
+            'population': population.summary()
         }), 200
         
     except Exception as e:
@@ -120,6 +189,7 @@ def get_all_trainer_benchmarks():
         return jsonify({'error': str(e)}), 500
 
 @advanced_analytics_bp.route('/predictive-insights', methods=['GET'])
+@analytics_cache.cached
 def get_predictive_insights_route():
     """Get predictive insights across the platform"""
     try:
@@ -1,14 +1,24 @@
 from flask import Blueprint, request, jsonify
 from models.database import db, Client, Trainer, Session, Payment, Assignment, WorkoutLog
 from sqlalchemy import func, extract, case
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
+from utils.analytics_rollup import analytics_rollup
+from utils.analytics_cache import analytics_cache
+from utils.cohorts import cohort_matrix, ACTIVITY_SOURCES, MAX_COHORT_MONTHS
+from utils.data_export import parse_bound
+from utils.client_ltv import lifetime_value, DEFAULT_TOP, MAX_TOP, DEFAULT_BANDS, MAX_BANDS
 from utils.logger import logger
 
 analytics_bp = Blueprint('analytics', __name__, url_prefix='/api/analytics')
 
+def _use_rollups():
+    """Read from the daily rollups unless the request asks for ?source=raw"""
+    return analytics_rollup.use_rollups(request.args.get('source'))
+
 # Client Analytics
 
 @analytics_bp.route('/clients/retention', methods=['GET'])
+@analytics_cache.cached
 def get_client_retention():
     """Calculate client retention metrics"""
     try:
@@ -24,10 +34,15 @@ def get_client_retention():
         # Total clients (all time)
         total_clients = Client.query.count()
         
+        use_rollups = _use_rollups()
+        
         # New clients this month
-        new_this_month = Client.query.filter(
-            Client.created_at >= start_date_month
-        ).count()
+        if use_rollups:
+            new_this_month = int(analytics_rollup.totals(start_date_month)['new_clients'])
+        else:
+            new_this_month = Client.query.filter(
+                Client.created_at >= start_date_month
+            ).count()
         
         # Churned clients (inactive clients who were previously active)
         churned_clients = Client.query.filter(Client.status == 'inactive').count()
@@ -47,21 +62,32 @@ def get_client_retention():
         status_breakdown = {item[0]: item[1] for item in clients_by_status}
         
         # Client growth trend (monthly)
-        monthly_growth = db.session.query(
-            extract('year', Client.created_at).label('year'),
-            extract('month', Client.created_at).label('month'),
-            func.count(Client.id).label('count')
-        ).filter(
-            Client.created_at >= start_date_year
-        ).group_by('year', 'month').order_by('year', 'month').all()
-        
-        growth_trend = [
-            {
-                'month': f"{int(item[0])}-{int(item[1]):02d}",
-                'new_clients': item[2]
-            }
-            for item in monthly_growth
-        ]
+        if use_rollups:
+            monthly_totals = {}
+            for row in analytics_rollup.daily(['new_clients'], start_date_year):
+                if row['new_clients']:
+                    month = row['day'].strftime('%Y-%m')
+                    monthly_totals[month] = monthly_totals.get(month, 0) + int(row['new_clients'])
+            growth_trend = [
+                {'month': month, 'new_clients': count}
+                for month, count in sorted(monthly_totals.items())
+            ]
+        else:
+            monthly_growth = db.session.query(
+                extract('year', Client.created_at).label('year'),
+                extract('month', Client.created_at).label('month'),
+                func.count(Client.id).label('count')
+            ).filter(
+                Client.created_at >= start_date_year
+            ).group_by('year', 'month').order_by('year', 'month').all()
+            
+            growth_trend = [
+                {
+                    'month': f"{int(item[0])}-{int(item[1]):02d}",
+                    'new_clients': item[2]
+                }
+                for item in monthly_growth
+            ]
         
         return jsonify({
             'total_clients': total_clients,
@@ -78,6 +104,7 @@ def get_client_retention():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/clients/engagement', methods=['GET'])
+@analytics_cache.cached
 def get_client_engagement():
     """Calculate client engagement metrics"""
     try:
@@ -85,42 +112,55 @@ def get_client_engagement():
         end_date = datetime.utcnow()
         start_date_month = end_date - timedelta(days=30)
         
+        if _use_rollups():
+            month = analytics_rollup.totals(start_date_month)
+            scheduled_sessions = int(month['sessions_total'])
+            completed_sessions = int(month['sessions_completed'])
+            no_show_sessions = int(month['sessions_no_show'])
+            
+            # Completed sessions per client this month
+            client_activity = [
+                (client_id, int(metrics['sessions_completed']))
+                for client_id, metrics in analytics_rollup.grouped(
+                    'client', ['sessions_completed'], start_date_month
+                ).items()
+                if metrics['sessions_completed']
+            ]
+        else:
+            scheduled_sessions = Session.query.filter(
+                Session.session_date >= start_date_month
+            ).count()
+            completed_sessions = Session.query.filter(
+                Session.session_date >= start_date_month,
+                Session.status == 'completed'
+            ).count()
+            no_show_sessions = Session.query.filter(
+                Session.session_date >= start_date_month,
+                Session.status == 'no-show'
+            ).count()
+            
+            # Clients by activity level (based on sessions this month)
+            client_activity = db.session.query(
+                Session.client_id,
+                func.count(Session.id).label('session_count')
+            ).filter(
+                Session.session_date >= start_date_month,
+                Session.status == 'completed'
+            ).group_by(Session.client_id).all()
+        
         # Total sessions this month
-        total_sessions = Session.query.filter(
-            Session.session_date >= start_date_month,
-            Session.status == 'completed'
-        ).count()
+        total_sessions = completed_sessions
         
         # Average sessions per client
         active_clients = Client.query.filter(Client.status == 'active').count()
         avg_sessions_per_client = total_sessions / active_clients if active_clients > 0 else 0
         
         # Session attendance rate
-        scheduled_sessions = Session.query.filter(
-            Session.session_date >= start_date_month
-        ).count()
-        completed_sessions = Session.query.filter(
-            Session.session_date >= start_date_month,
-            Session.status == 'completed'
-        ).count()
         attendance_rate = (completed_sessions / scheduled_sessions * 100) if scheduled_sessions > 0 else 0
         
         # No-show rate
-        no_show_sessions = Session.query.filter(
-            Session.session_date >= start_date_month,
-            Session.status == 'no-show'
-        ).count()
         no_show_rate = (no_show_sessions / scheduled_sessions * 100) if scheduled_sessions > 0 else 0
         
-        # Clients by activity level (based on sessions this month)
-        client_activity = db.session.query(
-            Session.client_id,
-            func.count(Session.id).label('session_count')
-        ).filter(
-            Session.session_date >= start_date_month,
-            Session.status == 'completed'
-        ).group_by(Session.client_id).all()
-        
         highly_active = len([c for c in client_activity if c[1] >= 8])  # 2+ per week
         moderately_active = len([c for c in client_activity if 4 <= c[1] < 8])  # 1-2 per week
         low_active = len([c for c in client_activity if 0 < c[1] < 4])  # Less than weekly
@@ -149,202 +189,194 @@ def get_client_engagement():
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/clients/lifetime-value', methods=['GET'])
+@analytics_cache.cached
 def get_client_lifetime_value():
-    """Calculate client lifetime value (LTV)"""
+    """
+    Calculate client lifetime value (LTV)
+    
+    Query parameters: top (number of top clients, default 10, up to 100)
+    and bands (number of equal-sized LTV bands, default 4, up to 10).
+    """
     try:
-        # Get all clients with their payment totals
-        client_values = db.session.query(
-            Client.id,
-            Client.name,
-            Client.created_at,
-            Client.status,
-            func.coalesce(func.sum(Payment.amount), 0).label('total_paid')
-        ).outerjoin(
-            Payment, (Payment.client_id == Client.id) & (Payment.status == 'completed')
-        ).group_by(Client.id).all()
-        
-        # Calculate metrics
-        total_clients = len(client_values)
-        total_revenue = sum([float(c[4]) for c in client_values])
-        avg_ltv = total_revenue / total_clients if total_clients > 0 else 0
-        
-        # Calculate average client lifespan (in days)
-        # Only count active clients for lifespan calculation
-        active_clients_with_dates = [c for c in client_values if c[3] == 'active' and c[2]]
-        if active_clients_with_dates:
-            total_days = sum((datetime.utcnow() - c[2]).days for c in active_clients_with_dates)
-            avg_lifespan_days = total_days / len(active_clients_with_dates)
-        else:
-            avg_lifespan_days = 0
+        top = min(max(request.args.get('top', DEFAULT_TOP, type=int), 1), MAX_TOP)
+        band_count = min(max(request.args.get('bands', DEFAULT_BANDS, type=int), 1), MAX_BANDS)
         
-        # Top 10 clients by LTV
-        top_clients = sorted(client_values, key=lambda x: float(x[4]), reverse=True)[:10]
-        top_clients_list = [
-            {
-                'client_id': c[0],
-                'client_name': c[1],
-                'lifetime_value': float(c[4]),
-                'status': c[3],
-                'member_since': c[2].isoformat() if c[2] else None
-            }
-            for c in top_clients
-        ]
-        
-        # LTV by membership type - build mapping from client_id to membership and LTV
-        # First, get membership types for all clients
-        clients_with_membership = Client.query.all()
-        client_membership_map = {c.id: c.membership_type for c in clients_with_membership}
-        
-        # Group LTVs by membership type
-        client_ltv_by_membership = {}
-        for c in client_values:
-            # c = (id, name, created_at, status, total_paid)
-            client_id = c[0]
-            total_paid = float(c[4])
-            membership_type = client_membership_map.get(client_id) or 'None'
-            
-            if membership_type not in client_ltv_by_membership:
-                client_ltv_by_membership[membership_type] = []
-            client_ltv_by_membership[membership_type].append(total_paid)
-        
-        # Calculate averages
-        membership_breakdown = []
-        for membership_type, ltvs in client_ltv_by_membership.items():
-            membership_breakdown.append({
-                'membership_type': membership_type,
-                'client_count': len(ltvs),
-                'average_ltv': sum(ltvs) / len(ltvs) if ltvs else 0
-            })
-        
-        return jsonify({
-            'total_clients': total_clients,
-            'total_revenue': float(total_revenue),
-            'average_ltv': float(avg_ltv),
-            'avg_lifespan_days': round(avg_lifespan_days, 0),
-            'top_clients': top_clients_list,
-            'ltv_by_membership': membership_breakdown
-        }), 200
+        return jsonify(lifetime_value(top, band_count)), 200
     except Exception as e:
         logger.error(f"Error calculating client lifetime value: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/clients/cohort', methods=['GET'])
+@analytics_cache.cached
 def get_cohort_analysis():
-    """Perform cohort analysis on clients"""
+    """
+    Perform cohort analysis on clients
+    
+    Query parameters: months (cohorts of the last N closed months, default
+    12, up to 60) and activity (sessions or payments). Each cohort carries
+    its retention for every month since signup.
+    """
     try:
-        # Get cohort month from query params (default to last 12 months)
         months = request.args.get('months', 12, type=int)
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=months * 30)
-        
-        # Get clients grouped by signup month
-        cohorts = db.session.query(
-            extract('year', Client.created_at).label('year'),
-            extract('month', Client.created_at).label('month'),
-            func.count(Client.id).label('count')
-        ).filter(
-            Client.created_at >= start_date
-        ).group_by('year', 'month').order_by('year', 'month').all()
-        
-        cohort_data = []
-        for year, month, count in cohorts:
-            cohort_start = datetime(int(year), int(month), 1)
-            cohort_label = f"{int(year)}-{int(month):02d}"
-            
-            # Count active clients from this cohort
-            active_count = Client.query.filter(
-                extract('year', Client.created_at) == year,
-                extract('month', Client.created_at) == month,
-                Client.status == 'active'
-            ).count()
-            
-            retention = (active_count / count * 100) if count > 0 else 0
-            
-            cohort_data.append({
-                'cohort': cohort_label,
-                'initial_size': count,
-                'active_count': active_count,
-                'retention_rate': round(retention, 2)
-            })
+        months = min(max(months, 1), MAX_COHORT_MONTHS)
+        activity = request.args.get('activity', 'sessions')
+        if activity not in ACTIVITY_SOURCES:
+            return jsonify({'error': f"activity must be one of: {', '.join(ACTIVITY_SOURCES)}"}), 400
         
-        return jsonify({
-            'cohorts': cohort_data,
-            'analysis_period_months': months
-        }), 200
+        return jsonify(cohort_matrix(months, activity)), 200
     except Exception as e:
         logger.error(f"Error performing cohort analysis: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 # Trainer Performance Analytics
 
+# Sort keys accepted by the trainer list endpoints (mapped to SQL expressions below)
+TRAINER_SORT_FIELDS = (
+    'revenue_generated', 'sessions_completed', 'total_hours', 'active_clients',
+    'utilization_rate', 'avg_revenue_per_session', 'trainer_name'
+)
+
+def _parse_trainer_range(default_days=30):
+    """
+    Read start_date/end_date query parameters (ISO format)
+    
+    A date-only end_date covers the whole day, up to its last microsecond.
+    """
+    end_date = request.args.get('end_date')
+    end_date = parse_bound(end_date) if end_date else datetime.utcnow()
+    if not isinstance(end_date, datetime):
+        end_date = datetime.combine(end_date, time.max)
+    start_date = request.args.get('start_date')
+    if start_date:
+        start_date = parse_bound(start_date)
+        if not isinstance(start_date, datetime):
+            start_date = datetime.combine(start_date, time.min)
+    else:
+        start_date = end_date - timedelta(days=default_days)
+    return start_date, end_date
+
+def _trainer_metrics_query(start_date, end_date):
+    """
+    Per-trainer metrics for active trainers in a single statement
+    
+    Sessions, revenue and active clients are each aggregated once with
+    GROUP BY trainer and joined onto trainers, instead of issuing
+    separate count/sum queries for every trainer.
+    """
+    sessions = db.session.query(
+        Session.trainer_id.label('trainer_id'),
+        func.count(Session.id).label('sessions_completed'),
+        func.coalesce(func.sum(Session.duration), 0).label('total_minutes')
+    ).filter(
+        Session.session_date >= start_date,
+        Session.session_date <= end_date,
+        Session.status == 'completed'
+    ).group_by(Session.trainer_id).subquery()
+    
+    # Revenue is attributed through assignments, as before
+    revenue = db.session.query(
+        Assignment.trainer_id.label('trainer_id'),
+        func.sum(Payment.amount).label('revenue')
+    ).join(
+        Payment, Payment.client_id == Assignment.client_id
+    ).filter(
+        Payment.status == 'completed',
+        Payment.payment_date >= start_date,
+        Payment.payment_date <= end_date
+    ).group_by(Assignment.trainer_id).subquery()
+    
+    clients = db.session.query(
+        Assignment.trainer_id.label('trainer_id'),
+        func.count(Assignment.id).label('active_clients')
+    ).filter(
+        Assignment.status == 'active'
+    ).group_by(Assignment.trainer_id).subquery()
+    
+    sessions_completed = func.coalesce(sessions.c.sessions_completed, 0)
+    total_minutes = func.coalesce(sessions.c.total_minutes, 0)
+    revenue_total = func.coalesce(revenue.c.revenue, 0)
+    active_clients = func.coalesce(clients.c.active_clients, 0)
+    
+    query = db.session.query(
+        Trainer.id.label('trainer_id'),
+        Trainer.name.label('trainer_name'),
+        sessions_completed.label('sessions_completed'),
+        total_minutes.label('total_minutes'),
+        revenue_total.label('revenue'),
+        active_clients.label('active_clients')
+    ).outerjoin(
+        sessions, sessions.c.trainer_id == Trainer.id
+    ).outerjoin(
+        revenue, revenue.c.trainer_id == Trainer.id
+    ).outerjoin(
+        clients, clients.c.trainer_id == Trainer.id
+    ).filter(Trainer.active == True)
+    
+    sort_columns = {
+        'revenue_generated': revenue_total,
+        'sessions_completed': sessions_completed,
+        'total_hours': total_minutes,
+        'utilization_rate': total_minutes,
+        'active_clients': active_clients,
+        'avg_revenue_per_session': revenue_total / func.nullif(sessions_completed, 0),
+        'trainer_name': Trainer.name,
+    }
+    return query, sort_columns
+
+def _apply_trainer_sort(query, sort_columns, default='revenue_generated'):
+    """Apply sort_by/order query parameters (default None sorts by trainer id)"""
+    sort_by = request.args.get('sort_by', default)
+    if sort_by is None:
+        query = query.order_by(Trainer.id)
+    elif sort_by not in TRAINER_SORT_FIELDS:
+        raise ValueError(f"sort_by must be one of: {', '.join(TRAINER_SORT_FIELDS)}")
+    else:
+        order = request.args.get('order', 'asc' if sort_by == 'trainer_name' else 'desc')
+        column = sort_columns[sort_by]
+        column = column.asc() if order == 'asc' else column.desc()
+        # NULL averages (no sessions) go last either way; trainer id keeps ties stable
+        query = query.order_by(sort_columns[sort_by].is_(None), column, Trainer.id)
+    return query
+
 @analytics_bp.route('/trainers/performance', methods=['GET'])
+@analytics_cache.cached
 def get_trainer_performance():
-    """Get trainer performance metrics"""
+    """
+    Get trainer performance metrics
+    
+    Query params: start_date, end_date (ISO, default last 30 days),
+    sort_by (default revenue_generated), order (asc/desc), limit
+    """
     try:
-        # Get date range
-        end_date = datetime.utcnow()
-        start_date = request.args.get('start_date')
-        if start_date:
-            start_date = datetime.fromisoformat(start_date)
-        else:
-            start_date = end_date - timedelta(days=30)
-        
-        # Get all trainers with their metrics
-        trainers = Trainer.query.filter(Trainer.active == True).all()
+        start_date, end_date = _parse_trainer_range()
+        query, sort_columns = _trainer_metrics_query(start_date, end_date)
+        query = _apply_trainer_sort(query, sort_columns)
+        limit = request.args.get('limit', type=int)
+        if limit:
+            query = query.limit(limit)
+        rows = query.all()
+        
+        # Utilization rate (assuming 40 hours per week)
+        work_weeks = (end_date - start_date).days / 7
+        available_hours = work_weeks * 40
         
         performance_data = []
-        for trainer in trainers:
-            # Sessions count
-            sessions_count = Session.query.filter(
-                Session.trainer_id == trainer.id,
-                Session.session_date >= start_date,
-                Session.status == 'completed'
-            ).count()
-            
-            # Total hours
-            total_duration = db.session.query(func.sum(Session.duration)).filter(
-                Session.trainer_id == trainer.id,
-                Session.session_date >= start_date,
-                Session.status == 'completed'
-            ).scalar() or 0
-            total_hours = total_duration / 60
-            
-            # Revenue generated
-            revenue = db.session.query(func.sum(Payment.amount)).join(
-                Client, Payment.client_id == Client.id
-            ).join(
-                Assignment, Assignment.client_id == Client.id
-            ).filter(
-                Assignment.trainer_id == trainer.id,
-                Payment.status == 'completed',
-                Payment.payment_date >= start_date
-            ).scalar() or 0
-            
-            # Active clients
-            active_clients = Assignment.query.filter(
-                Assignment.trainer_id == trainer.id,
-                Assignment.status == 'active'
-            ).count()
-            
-            # Utilization rate (assuming 40 hours per week)
-            work_weeks = (end_date - start_date).days / 7
-            available_hours = work_weeks * 40
+        for row in rows:
+            total_hours = row.total_minutes / 60
+            revenue = float(row.revenue)
             utilization_rate = (total_hours / available_hours * 100) if available_hours > 0 else 0
             
             performance_data.append({
-                'trainer_id': trainer.id,
-                'trainer_name': trainer.name,
-                'sessions_completed': sessions_count,
+                'trainer_id': row.trainer_id,
+                'trainer_name': row.trainer_name,
+                'sessions_completed': row.sessions_completed,
                 'total_hours': round(total_hours, 2),
-                'revenue_generated': float(revenue),
-                'active_clients': active_clients,
+                'revenue_generated': revenue,
+                'active_clients': row.active_clients,
                 'utilization_rate': round(utilization_rate, 2),
-                'avg_revenue_per_session': round(float(revenue) / sessions_count, 2) if sessions_count > 0 else 0
+                'avg_revenue_per_session': round(revenue / row.sessions_completed, 2) if row.sessions_completed > 0 else 0
             })
         
-        # Sort by revenue
-        performance_data.sort(key=lambda x: x['revenue_generated'], reverse=True)
-        
         return jsonify({
             'trainers': performance_data,
             'date_range': {
@@ -352,11 +384,14 @@ def get_trainer_performance():
                 'end': end_date.isoformat()
             }
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error calculating trainer performance: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/trainers/<int:trainer_id>/performance', methods=['GET'])
+@analytics_cache.cached
 def get_single_trainer_performance(trainer_id):
     """Get detailed performance metrics for a specific trainer"""
     trainer = Trainer.query.get_or_404(trainer_id)
@@ -478,60 +513,51 @@ def get_single_trainer_performance(trainer_id):
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/trainers/comparison', methods=['GET'])
+@analytics_cache.cached
 def get_trainer_comparison():
-    """Compare performance metrics across all trainers"""
+    """
+    Compare performance metrics across all trainers
+    
+    Query params: start_date, end_date (ISO, default last 30 days),
+    sort_by, order (asc/desc), limit. Averages always cover all active trainers.
+    """
     try:
-        # Get date range
-        end_date = datetime.utcnow()
-        start_date_month = end_date - timedelta(days=30)
+        start_date, end_date = _parse_trainer_range()
+        query, sort_columns = _trainer_metrics_query(start_date, end_date)
         
-        # Get metrics for each trainer
-        trainers = Trainer.query.filter(Trainer.active == True).all()
+        rows = _apply_trainer_sort(query, sort_columns, default=None).all()
         
-        comparison_data = []
-        for trainer in trainers:
-            sessions = Session.query.filter(
-                Session.trainer_id == trainer.id,
-                Session.session_date >= start_date_month,
-                Session.status == 'completed'
-            ).count()
-            
-            clients = Assignment.query.filter(
-                Assignment.trainer_id == trainer.id,
-                Assignment.status == 'active'
-            ).count()
-            
-            revenue = db.session.query(func.sum(Payment.amount)).join(
-                Client, Payment.client_id == Client.id
-            ).join(
-                Assignment, Assignment.client_id == Client.id
-            ).filter(
-                Assignment.trainer_id == trainer.id,
-                Payment.status == 'completed',
-                Payment.payment_date >= start_date_month
-            ).scalar() or 0
-            
-            comparison_data.append({
-                'trainer_id': trainer.id,
-                'trainer_name': trainer.name,
-                'sessions': sessions,
-                'clients': clients,
-                'revenue': float(revenue)
-            })
+        comparison_data = [{
+            'trainer_id': row.trainer_id,
+            'trainer_name': row.trainer_name,
+            'sessions': row.sessions_completed,
+            'clients': row.active_clients,
+            'revenue': float(row.revenue)
+        } for row in rows]
         
-        # Calculate averages
+        # Averages cover every active trainer, so they are taken before limit
         avg_sessions = sum([t['sessions'] for t in comparison_data]) / len(comparison_data) if comparison_data else 0
         avg_clients = sum([t['clients'] for t in comparison_data]) / len(comparison_data) if comparison_data else 0
         avg_revenue = sum([t['revenue'] for t in comparison_data]) / len(comparison_data) if comparison_data else 0
         
+        limit = request.args.get('limit', type=int)
+        if limit:
+            comparison_data = comparison_data[:limit]
+        
         return jsonify({
             'trainers': comparison_data,
             'averages': {
                 'sessions': round(avg_sessions, 2),
                 'clients': round(avg_clients, 2),
                 'revenue': round(avg_revenue, 2)
+            },
+            'date_range': {
+                'start': start_date.isoformat(),
+                'end': end_date.isoformat()
             }
         }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Error comparing trainers: {str(e)}")
         return jsonify({'error': str(e)}), 500
@@ -539,6 +565,7 @@ def get_trainer_comparison():
 # Overall Dashboard Analytics
 
 @analytics_bp.route('/dashboard', methods=['GET'])
+@analytics_cache.cached
 def get_analytics_dashboard():
     """Get comprehensive analytics dashboard"""
     try:
@@ -550,27 +577,37 @@ def get_analytics_dashboard():
         # Client metrics
         total_clients = Client.query.count()
         active_clients = Client.query.filter(Client.status == 'active').count()
-        new_clients_month = Client.query.filter(Client.created_at >= start_date_month).count()
-        
-        # Revenue metrics
-        total_revenue = db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed'
-        ).scalar() or 0
         
-        revenue_month = db.session.query(func.sum(Payment.amount)).filter(
-            Payment.status == 'completed',
-            Payment.payment_date >= start_date_month
-        ).scalar() or 0
-        
-        # Session metrics
-        total_sessions = Session.query.filter(
-            Session.session_date >= start_date_month
-        ).count()
-        
-        completed_sessions = Session.query.filter(
-            Session.session_date >= start_date_month,
-            Session.status == 'completed'
-        ).count()
+        if _use_rollups():
+            all_time = analytics_rollup.totals()
+            month = analytics_rollup.totals(start_date_month)
+            new_clients_month = int(month['new_clients'])
+            total_revenue = all_time['revenue_completed']
+            revenue_month = month['revenue_completed']
+            total_sessions = int(month['sessions_total'])
+            completed_sessions = int(month['sessions_completed'])
+        else:
+            new_clients_month = Client.query.filter(Client.created_at >= start_date_month).count()
+            
+            # Revenue metrics
+            total_revenue = db.session.query(func.sum(Payment.amount)).filter(
+                Payment.status == 'completed'
+            ).scalar() or 0
+            
+            revenue_month = db.session.query(func.sum(Payment.amount)).filter(
+                Payment.status == 'completed',
+                Payment.payment_date >= start_date_month
+            ).scalar() or 0
+            
+            # Session metrics
+            total_sessions = Session.query.filter(
+                Session.session_date >= start_date_month
+            ).count()
+            
+            completed_sessions = Session.query.filter(
+                Session.session_date >= start_date_month,
+                Session.status == 'completed'
+            ).count()
         
         attendance_rate = (completed_sessions / total_sessions * 100) if total_sessions > 0 else 0
         
@@ -0,0 +1,120 @@
+"""
+Availability routes
+Open-slot search across trainers and trainer working hours
+"""
+
+from flask import Blueprint, request, jsonify
+from models.database import db, Trainer, TrainerWorkingHours
+from datetime import datetime, time, timedelta
+from utils.availability import availability_index, trainer_candidates, MAX_SEARCH_DAYS
+from utils.logger import logger
+
+availability_bp = Blueprint('availability', __name__, url_prefix='/api')
+
+@availability_bp.route('/availability', methods=['GET'])
+def search_availability():
+    """
+    Find open slots across trainers
+
+    Query parameters: start, end (ISO datetimes), duration (minutes,
+    default 60), step (minutes between offered starts), specialization,
+    location, trainer_ids (comma separated) and limit (slots per trainer).
+    """
+    try:
+        if not request.args.get('start') or not request.args.get('end'):
+            return jsonify({'error': 'start and end are required'}), 400
+
+        start = datetime.fromisoformat(request.args['start'])
+        end = datetime.fromisoformat(request.args['end'])
+        duration = request.args.get('duration', 60, type=int)
+        step = request.args.get('step', type=int)
+        limit = request.args.get('limit', type=int)
+        location = request.args.get('location')
+        trainer_ids = [int(value) for value in request.args.get('trainer_ids', '').split(',') if value.strip()]
+
+        if end <= start:
+            return jsonify({'error': 'end must be after start'}), 400
+        if end - start > timedelta(days=MAX_SEARCH_DAYS):
+            return jsonify({'error': f'Search at most {MAX_SEARCH_DAYS} days at a time'}), 400
+        if duration <= 0 or (step is not None and step <= 0):
+            return jsonify({'error': 'duration and step must be positive'}), 400
+        if step is not None and step % availability_index.slot_minutes:
+            return jsonify({
+                'error': f'step must be a multiple of {availability_index.slot_minutes} minutes'
+            }), 400
+
+        trainers = trainer_candidates(
+            specialization=request.args.get('specialization'),
+            location=location,
+            trainer_ids=trainer_ids
+        )
+        results = availability_index.search(
+            trainers, start, end, duration, step=step, location=location, limit=limit
+        )
+
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'duration': duration,
+            'slot_minutes': availability_index.slot_minutes,
+            'trainers_checked': len(trainers),
+            'trainers': results
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching availability: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@availability_bp.route('/trainers/<int:trainer_id>/working-hours', methods=['GET'])
+def get_working_hours(trainer_id):
+    """Get a trainer's weekly working hours"""
+    Trainer.query.get_or_404(trainer_id)
+    try:
+        hours = TrainerWorkingHours.query.filter_by(trainer_id=trainer_id).order_by(
+            TrainerWorkingHours.weekday, TrainerWorkingHours.start_time
+        ).all()
+        return jsonify([entry.to_dict() for entry in hours]), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@availability_bp.route('/trainers/<int:trainer_id>/working-hours', methods=['PUT'])
+def set_working_hours(trainer_id):
+    """
+    Replace a trainer's weekly working hours
+
+    Body: {"hours": [{"weekday": 0, "start_time": "09:00", "end_time": "17:00",
+    "location": "Main Gym"}, ...]}. An empty list falls back to the default hours.
+    """
+    Trainer.query.get_or_404(trainer_id)
+    try:
+        data = request.json or {}
+        entries = []
+        for item in data.get('hours', []):
+            weekday = int(item['weekday'])
+            start_time = time.fromisoformat(item['start_time'])
+            end_time = time.fromisoformat(item['end_time'])
+            if not 0 <= weekday <= 6:
+                return jsonify({'error': 'weekday must be between 0 (Monday) and 6'}), 400
+            if end_time != time(0, 0) and end_time <= start_time:
+                return jsonify({'error': 'end_time must be after start_time'}), 400
+            entries.append(TrainerWorkingHours(
+                trainer_id=trainer_id,
+                weekday=weekday,
+                start_time=start_time,
+                end_time=end_time,
+                location=item.get('location')
+            ))
+
+        for entry in TrainerWorkingHours.query.filter_by(trainer_id=trainer_id).all():
+            db.session.delete(entry)
+        db.session.add_all(entries)
+        db.session.commit()
+
+        return jsonify([entry.to_dict() for entry in entries]), 200
+    except (KeyError, ValueError) as e:
+        db.session.rollback()
+        return jsonify({'error': f'Invalid working hours: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,66 @@
+"""
+Export routes
+Streaming bulk export of raw sessions, payments, measurements, workout logs,
+SMS logs and email deliveries as CSV or NDJSON
+"""
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from datetime import datetime
+from utils.auth import require_auth, require_role
+from utils.data_export import EXPORTS, EXPORT_FORMATS, RENDERERS, export_columns, export_query, parse_bound
+from utils.logger import logger
+
+export_bp = Blueprint('exports', __name__, url_prefix='/api/exports')
+
+@export_bp.route('', methods=['GET'])
+@require_auth
+@require_role('admin')
+def list_exports():
+    """List the exportable datasets and their columns"""
+    return jsonify({
+        'datasets': [{'id': dataset, 'columns': export_columns(dataset)} for dataset in EXPORTS],
+        'formats': list(EXPORT_FORMATS)
+    }), 200
+
+@export_bp.route('/<dataset>', methods=['GET'])
+@require_auth
+@require_role('admin')
+def export_dataset(dataset):
+    """
+    Stream every row of a dataset, oldest first
+
+    Query parameters: format (csv or ndjson, default csv), start_date and
+    end_date (ISO, inclusive; a date without a time covers the whole day),
+    trainer_id and client_id. Payments, measurements and workout logs
+    filtered by trainer cover the trainer's assigned clients.
+    """
+    try:
+        if dataset not in EXPORTS:
+            return jsonify({'error': f"Unknown dataset. Available: {', '.join(EXPORTS)}"}), 404
+
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        start_date = request.args.get('start_date')
+        end_date = request.args.get('end_date')
+        rows = export_query(
+            dataset,
+            start=parse_bound(start_date) if start_date else None,
+            end=parse_bound(end_date) if end_date else None,
+            trainer_id=request.args.get('trainer_id', type=int),
+            client_id=request.args.get('client_id', type=int)
+        )
+
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"fitnesscrm-{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{extension}"
+        return Response(
+            stream_with_context(RENDERERS[export_format](rows, export_columns(dataset))),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting {dataset}: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,86 @@
+"""
+Monitoring routes
+Operational visibility into the running worker (admin only)
+"""
+
+from flask import Blueprint, request, jsonify
+from models.database import db
+from utils.auth import require_auth, require_role
+from utils.db_pool import pool_monitor
+from utils.query_instrumentation import query_instrumentation
+from utils.slow_query_log import slow_query_log
+from utils.analytics_cache import analytics_cache
+from utils.availability import availability_index
+from utils.logger import logger
+
+monitoring_bp = Blueprint('monitoring', __name__, url_prefix='/api/monitoring')
+
+@monitoring_bp.route('/db-pool', methods=['GET'])
+@require_auth
+@require_role('admin')
+def get_db_pool_stats():
+    """Get connection pool statistics for this worker (admin only)"""
+    try:
+        return jsonify(pool_monitor.get_stats(db.engine)), 200
+    except Exception as e:
+        logger.error(f"Error getting pool stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@monitoring_bp.route('/n-plus-one', methods=['GET'])
+@require_auth
+@require_role('admin')
+def get_n_plus_one_endpoints():
+    """Get endpoints flagged for repeated statement shapes (admin only)"""
+    try:
+        flagged = query_instrumentation.get_flagged_endpoints()
+        return jsonify({
+            'endpoints': flagged,
+            'total': len(flagged)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting N+1 report: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@monitoring_bp.route('/slow-queries', methods=['GET'])
+@require_auth
+@require_role('admin')
+def get_slow_queries():
+    """Get recorded slow queries with their plans, newest first (admin only)"""
+    try:
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        endpoint = request.args.get('endpoint')
+        min_ms = request.args.get('min_ms', type=float)
+        
+        entries = slow_query_log.get_entries(limit=limit, endpoint=endpoint, min_duration_ms=min_ms)
+        
+        return jsonify({
+            'enabled': slow_query_log.enabled,
+            'threshold_ms': round(slow_query_log.threshold * 1000, 2),
+            'queries': entries,
+            'total': len(entries)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error reading slow query log: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@monitoring_bp.route('/analytics-cache', methods=['GET'])
+@require_auth
+@require_role('admin')
+def get_analytics_cache_stats():
+    """Get analytics response cache statistics for this worker (admin only)"""
+    try:
+        return jsonify(analytics_cache.get_stats()), 200
+    except Exception as e:
+        logger.error(f"Error getting analytics cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@monitoring_bp.route('/availability-cache', methods=['GET'])
+@require_auth
+@require_role('admin')
+def get_availability_cache_stats():
+    """Get availability bitmap cache statistics for this worker (admin only)"""
+    try:
+        return jsonify(availability_index.get_stats()), 200
+    except Exception as e:
+        logger.error(f"Error getting availability cache stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
@@ -1,6 +1,18 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from models.database import db, Session, RecurringSession, Trainer, Client
 from datetime import datetime, timedelta, time
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import is_resource_modified
+from utils.booking_conflicts import (
+    find_conflicts, check_slots, parse_slot, lock_trainer_schedule, is_overlap_violation, MAX_BATCH_SLOTS
+)
+from utils.recurrence import (
+    RECURRENCE_PATTERNS, plan_occurrences, horizon_end, window_end, materialize, remove_future_sessions
+)
+from utils.ical_feed import feed_query, feed_version, feed_etag, feed_window_start, render_feed
+from utils.session_listing import (
+    parse_fields, decode_cursor, listing_query, row_to_dict, fetch_page, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+)
 from utils.email import send_session_confirmation
 from utils.automation import trigger_automation_rules
 
@@ -8,45 +20,48 @@ session_bp = Blueprint('sessions', __name__, url_prefix='/api')
 
 @session_bp.route('/sessions', methods=['GET'])
 def get_sessions():
-    """Get all sessions with optional filtering"""
+    """
+    Get sessions with optional filtering
+
+    Query parameters: trainer_id, client_id, status, start_date, end_date
+    and fields (comma separated projection, trainer_name and client_name
+    included). Passing limit or cursor returns one page in (session_date,
+    id) order with a next_cursor; without either the full list is
+    returned as before.
+    """
     try:
-        # Get query parameters
         trainer_id = request.args.get('trainer_id', type=int)
         client_id = request.args.get('client_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         status = request.args.get('status')
-        
-        # Build query
-        query = Session.query
-        
-        if trainer_id:
-            query = query.filter_by(trainer_id=trainer_id)
-        if client_id:
-            query = query.filter_by(client_id=client_id)
-        if status:
-            query = query.filter_by(status=status)
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(Session.session_date >= start_dt)
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(Session.session_date <= end_dt)
-        
-        # Order by session date
-        sessions = query.order_by(Session.session_date.asc()).all()
-        
-        # Enrich with trainer and client names
-        result = []
-        for session in sessions:
-            session_dict = session.to_dict()
-            trainer = Trainer.query.get(session.trainer_id)
-            client = Client.query.get(session.client_id)
-            session_dict['trainer_name'] = trainer.name if trainer else None
-            session_dict['client_name'] = client.name if client else None
-            result.append(session_dict)
-        
-        return jsonify(result), 200
+        cursor = request.args.get('cursor')
+        limit = request.args.get('limit', type=int)
+
+        fields = parse_fields(request.args.get('fields'))
+        query = listing_query(
+            fields,
+            trainer_id=trainer_id,
+            client_id=client_id,
+            status=status,
+            start=datetime.fromisoformat(start_date) if start_date else None,
+            end=datetime.fromisoformat(end_date) if end_date else None,
+            after=decode_cursor(cursor) if cursor else None
+        )
+
+        if cursor is None and limit is None:
+            return jsonify([row_to_dict(row, fields) for row in query]), 200
+
+        limit = min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+        items, next_cursor = fetch_page(query, fields, limit)
+        return jsonify({
+            'sessions': items,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None,
+            'limit': limit
+        }), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -84,33 +99,13 @@ def create_session():
         # Calculate end time
         end_time = session_date + timedelta(minutes=duration)
         
-        # Check for conflicts - handle cases where end_time column might not exist
-        # Use a subquery to calculate end_time for comparison
-        from sqlalchemy import func, case
-        conflict_query = Session.query.filter(
-            Session.trainer_id == data['trainer_id'],
-            Session.status != 'cancelled'
-        )
-        
-        # Calculate end_time for each session: session_date + (duration minutes)
-        # For PostgreSQL: session_date + (duration || ' minutes')::interval
-        # For SQLite: datetime(session_date, '+' || duration || ' minutes')
-        # We'll use a Python-side check for compatibility
-        potential_conflicts = conflict_query.filter(
-            Session.session_date < end_time
-        ).all()
-        
-        conflict = None
-        for sess in potential_conflicts:
-            sess_end_time = sess.get_end_time() if hasattr(sess, 'get_end_time') else (
-                sess.end_time if sess.end_time else (sess.session_date + timedelta(minutes=sess.duration or 60))
-            )
-            if sess_end_time and sess_end_time > session_date:
-                conflict = sess
-                break
-        
-        if conflict:
-            return jsonify({'error': 'Session conflicts with existing booking', 'conflict': conflict.to_dict()}), 409
+        # Check for conflicts in the overlapping window only, holding the
+        # trainer's schedule until this booking is committed
+        lock_trainer_schedule(data['trainer_id'])
+        conflicts = find_conflicts(data['trainer_id'], session_date, end_time)
+        if conflicts:
+            db.session.rollback()
+            return jsonify({'error': 'Session conflicts with existing booking', 'conflict': conflicts[0].to_dict()}), 409
         
         # Create new session
         session = Session(
@@ -126,7 +121,18 @@ def create_session():
         )
         
         db.session.add(session)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            # A concurrent booking won the race (exclusion constraint on PostgreSQL)
+            db.session.rollback()
+            if not is_overlap_violation(e):
+                raise
+            conflicts = find_conflicts(data['trainer_id'], session_date, end_time)
+            return jsonify({
+                'error': 'Session conflicts with existing booking',
+                'conflict': conflicts[0].to_dict() if conflicts else None
+            }), 409
         
         # Trigger automation rules for session_created event
         try:
@@ -162,12 +168,47 @@ def create_session():
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@session_bp.route('/sessions/conflicts', methods=['POST'])
+def check_session_conflicts():
+    """
+    Check many candidate slots for a trainer in one call
+    
+    Body: {"trainer_id": 1, "slots": [{"session_date": "...", "duration": 60}, ...],
+           "exclude_session_id": optional id of a session being moved}
+    """
+    try:
+        data = request.get_json() or {}
+        trainer_id = data.get('trainer_id')
+        slots = data.get('slots') or []
+        
+        if not trainer_id or not slots:
+            return jsonify({'error': 'trainer_id and slots are required'}), 400
+        if len(slots) > MAX_BATCH_SLOTS:
+            return jsonify({'error': f'At most {MAX_BATCH_SLOTS} slots per request'}), 400
+        
+        try:
+            parsed = [parse_slot(slot) for slot in slots]
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': f'Invalid slot: {str(e)}'}), 400
+        
+        results = check_slots(trainer_id, parsed, exclude_session_id=data.get('exclude_session_id'))
+        
+        return jsonify({
+            'trainer_id': trainer_id,
+            'slots': results,
+            'available': sum(1 for result in results if result['available']),
+            'total': len(results)
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @session_bp.route('/sessions/<int:id>', methods=['PUT'])
 def update_session(id):
     """Update a session"""
     try:
         session = Session.query.get_or_404(id)
         data = request.json
+        was_cancelled = session.status == 'cancelled'
         
         # Update fields
         if 'session_date' in data:
@@ -185,7 +226,23 @@ def update_session(id):
         if 'status' in data:
             session.status = data['status']
         
-        db.session.commit()
+        # Moving a session (or restoring a cancelled one) must not double book
+        rescheduled = 'session_date' in data or 'duration' in data or was_cancelled
+        if rescheduled and session.status != 'cancelled':
+            lock_trainer_schedule(session.trainer_id)
+            conflicts = find_conflicts(session.trainer_id, session.session_date, session.get_end_time(),
+                                       exclude_session_id=session.id)
+            if conflicts:
+                db.session.rollback()
+                return jsonify({'error': 'Session conflicts with existing booking', 'conflict': conflicts[0].to_dict()}), 409
+        
+        try:
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_overlap_violation(e):
+                raise
+            return jsonify({'error': 'Session conflicts with existing booking'}), 409
         
         return jsonify(session.to_dict()), 200
     except Exception as e:
@@ -240,10 +297,14 @@ def create_recurring_session():
         if not all(k in data for k in ['trainer_id', 'client_id', 'start_date', 'start_time', 'recurrence_pattern']):
             return jsonify({'error': 'Missing required fields'}), 400
         
+        if data['recurrence_pattern'] not in RECURRENCE_PATTERNS:
+            return jsonify({'error': f"recurrence_pattern must be one of {', '.join(RECURRENCE_PATTERNS)}"}), 400
+        
         # Parse dates
         start_date = datetime.fromisoformat(data['start_date'])
         end_date = datetime.fromisoformat(data['end_date']) if data.get('end_date') else None
         start_time_obj = datetime.fromisoformat(data['start_time']).time()
+        dry_run = bool(data.get('dry_run')) or request.args.get('dry_run', 'false').lower() == 'true'
         
         # Create recurring session template
         recurring_session = RecurringSession(
@@ -261,87 +322,102 @@ def create_recurring_session():
             active=True
         )
         
+        # Sessions are created up to the rolling horizon; the nightly run extends them
+        until = horizon_end()
+        
+        if dry_run:
+            # Preview only: nothing is written
+            slots, conflicts = plan_occurrences(recurring_session, start_date, window_end(recurring_session, until))
+            return jsonify({
+                'dry_run': True,
+                'sessions': [{'session_date': start.isoformat(), 'end_time': end.isoformat()} for start, end in slots],
+                'sessions_to_create': len(slots),
+                'conflicts': conflicts
+            }), 200
+        
         db.session.add(recurring_session)
         db.session.flush()  # Get the ID
         
-        # Generate sessions for the next 3 months or until end_date
-        max_date = end_date if end_date else start_date + timedelta(days=90)
-        sessions_created = generate_recurring_sessions(recurring_session, start_date, max_date)
+        sessions_created, conflicts = materialize(recurring_session, until)
         
         db.session.commit()
         
         return jsonify({
             'recurring_session': recurring_session.to_dict(),
-            'sessions_created': sessions_created
+            'sessions_created': sessions_created,
+            'conflicts': conflicts
         }), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
-def generate_recurring_sessions(recurring_session, start_date, end_date):
-    """Generate individual sessions from a recurring session template"""
-    sessions_created = 0
-    current_date = start_date
-    duration = recurring_session.duration
+@session_bp.route('/recurring-sessions/<int:id>', methods=['PUT'])
+def update_recurring_session(id):
+    """
+    Update a recurring session template
     
-    while current_date <= end_date:
-        should_create = False
-        
-        # Check if we should create a session on this date based on recurrence pattern
-        if recurring_session.recurrence_pattern == 'daily':
-            should_create = True
-        elif recurring_session.recurrence_pattern == 'weekly':
-            if recurring_session.recurrence_days and current_date.weekday() in recurring_session.recurrence_days:
-                should_create = True
-        elif recurring_session.recurrence_pattern == 'biweekly':
-            weeks_diff = (current_date - start_date).days // 7
-            if weeks_diff % 2 == 0 and recurring_session.recurrence_days and current_date.weekday() in recurring_session.recurrence_days:
-                should_create = True
-        elif recurring_session.recurrence_pattern == 'monthly':
-            if current_date.day == start_date.day:
-                should_create = True
-        
-        if should_create:
-            session_datetime = datetime.combine(current_date.date(), recurring_session.start_time)
-            end_time = session_datetime + timedelta(minutes=duration)
-            
-            # Check for conflicts before creating
-            # Check for conflicts - handle cases where end_time column might not exist
-            potential_conflicts = Session.query.filter(
-                Session.trainer_id == recurring_session.trainer_id,
-                Session.status != 'cancelled',
-                Session.session_date < end_time
+    Changes apply only to sessions that haven't happened yet: schedule
+    changes replace the template's future scheduled sessions, detail
+    changes are copied onto them, and deactivating removes them. Past
+    sessions are never touched.
+    """
+    try:
+        recurring_session = RecurringSession.query.get_or_404(id)
+        data = request.json or {}
+        now = datetime.utcnow()
+        
+        if 'recurrence_pattern' in data and data['recurrence_pattern'] not in RECURRENCE_PATTERNS:
+            return jsonify({'error': f"recurrence_pattern must be one of {', '.join(RECURRENCE_PATTERNS)}"}), 400
+        
+        schedule = {}
+        if 'start_time' in data:
+            schedule['start_time'] = datetime.fromisoformat(data['start_time']).time()
+        if 'end_date' in data:
+            schedule['end_date'] = datetime.fromisoformat(data['end_date']) if data['end_date'] else None
+        for field in ('duration', 'recurrence_pattern', 'recurrence_days'):
+            if field in data:
+                schedule[field] = data[field]
+        details = {field: data[field] for field in ('session_type', 'location', 'notes') if field in data}
+        
+        was_active = recurring_session.active
+        for field, value in {**schedule, **details}.items():
+            setattr(recurring_session, field, value)
+        if 'active' in data:
+            recurring_session.active = bool(data['active'])
+        
+        sessions_removed = sessions_created = sessions_updated = 0
+        conflicts = []
+        lock_trainer_schedule(recurring_session.trainer_id)
+        
+        if not recurring_session.active:
+            if was_active:
+                sessions_removed = remove_future_sessions(recurring_session, now)
+        elif schedule or not was_active:
+            sessions_removed = remove_future_sessions(recurring_session, now)
+            sessions_created, conflicts = materialize(recurring_session, horizon_end(now), not_before=now)
+        elif details:
+            future_sessions = Session.query.filter(
+                Session.recurring_session_id == id,
+                Session.session_date >= now,
+                Session.status == 'scheduled'
             ).all()
-            
-            conflict = None
-            for sess in potential_conflicts:
-                sess_end_time = sess.get_end_time() if hasattr(sess, 'get_end_time') else (
-                    sess.end_time if sess.end_time else (sess.session_date + timedelta(minutes=sess.duration or 60))
-                )
-                if sess_end_time and sess_end_time > session_datetime:
-                    conflict = sess
-                    break
-            
-            if not conflict:
-                session = Session(
-                    trainer_id=recurring_session.trainer_id,
-                    client_id=recurring_session.client_id,
-                    session_date=session_datetime,
-                    end_time=end_time,
-                    duration=duration,
-                    session_type=recurring_session.session_type,
-                    location=recurring_session.location,
-                    notes=recurring_session.notes,
-                    status='scheduled',
-                    recurring_session_id=recurring_session.id
-                )
-                db.session.add(session)
-                sessions_created += 1
+            for session in future_sessions:
+                for field, value in details.items():
+                    setattr(session, field, value)
+            sessions_updated = len(future_sessions)
         
-        # Move to next day
-        current_date += timedelta(days=1)
-    
-    return sessions_created
+        db.session.commit()
+        
+        return jsonify({
+            'recurring_session': recurring_session.to_dict(),
+            'sessions_created': sessions_created,
+            'sessions_removed': sessions_removed,
+            'sessions_updated': sessions_updated,
+            'conflicts': conflicts
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
 
 @session_bp.route('/recurring-sessions/<int:id>', methods=['DELETE'])
 def delete_recurring_session(id):
@@ -375,87 +451,14 @@ def export_sessions_ical():
         client_id = request.args.get('client_id', type=int)
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        start_dt = datetime.fromisoformat(start_date) if start_date else None
+        end_dt = datetime.fromisoformat(end_date) if end_date else None
         
-        # Build query
-        query = Session.query
+        rows = feed_query(trainer_id=trainer_id, client_id=client_id, start=start_dt, end=end_dt)
         
-        if trainer_id:
-            query = query.filter_by(trainer_id=trainer_id)
-        if client_id:
-            query = query.filter_by(client_id=client_id)
-        if start_date:
-            start_dt = datetime.fromisoformat(start_date)
-            query = query.filter(Session.session_date >= start_dt)
-        if end_date:
-            end_dt = datetime.fromisoformat(end_date)
-            query = query.filter(Session.session_date <= end_dt)
-        
-        sessions = query.all()
-        
-        # Generate iCal content
-        ical_lines = [
-            'BEGIN:VCALENDAR',
-            'VERSION:2.0',
-            'PRODID:-//FitnessCRM//Session Calendar//EN',
-            'CALSCALE:GREGORIAN',
-            'METHOD:PUBLISH',
-            'X-WR-CALNAME:FitnessCRM Sessions',
-            'X-WR-TIMEZONE:UTC'
-        ]
-        
-        for session in sessions:
-            trainer = Trainer.query.get(session.trainer_id)
-            client = Client.query.get(session.client_id)
-            
-            # Format dates for iCal (YYYYMMDDTHHMMSSZ)
-            dtstart = session.session_date.strftime('%Y%m%dT%H%M%SZ')
-            session_end_time = session.get_end_time() if hasattr(session, 'get_end_time') else (
-                session.end_time if session.end_time else (session.session_date + timedelta(minutes=session.duration or 60))
-            )
-            dtend = session_end_time.strftime('%Y%m%dT%H%M%SZ') if session_end_time else (
-                (session.session_date + timedelta(minutes=session.duration or 60)).strftime('%Y%m%dT%H%M%SZ')
-            )
-            dtstamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-            
-            # Create unique ID
-            uid = f'session-{session.id}@fitnesscrm.com'
-            
-            # Build summary
-            summary = f'{session.session_type or "Training"}: {trainer.name if trainer else "Trainer"} - {client.name if client else "Client"}'
-            
-            # Build description
-            description_parts = []
-            if session.notes:
-                description_parts.append(f'Notes: {session.notes}')
-            description_parts.append(f'Duration: {session.duration} minutes')
-            description_parts.append(f'Status: {session.status}')
-            description = '\\n'.join(description_parts)
-            
-            # Build location
-            location = session.location or 'TBD'
-            
-            # Add event
-            ical_lines.extend([
-                'BEGIN:VEVENT',
-                f'UID:{uid}',
-                f'DTSTAMP:{dtstamp}',
-                f'DTSTART:{dtstart}',
-                f'DTEND:{dtend}',
-                f'SUMMARY:{summary}',
-                f'DESCRIPTION:{description}',
-                f'LOCATION:{location}',
-                f'STATUS:{session.status.upper()}',
-                'END:VEVENT'
-            ])
-        
-        ical_lines.append('END:VCALENDAR')
-        
-        ical_content = '\r\n'.join(ical_lines)
-        
-        # Return as downloadable file
-        from flask import Response
+        # Stream as a downloadable file
         return Response(
-            ical_content,
+            stream_with_context(render_feed(rows)),
             mimetype='text/calendar',
             headers={
                 'Content-Disposition': 'attachment; filename=fitnesscrm-sessions.ics'
@@ -463,3 +466,50 @@ def export_sessions_ical():
         )
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+def _calendar_feed(scope, calendar_name, trainer_id=None, client_id=None):
+    """
+    Serve a subscribable iCal feed with ETag/Last-Modified revalidation
+    
+    The feed version is checked before any session row is read; unchanged
+    calendars get a 304.
+    """
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    start_dt = datetime.fromisoformat(start_date) if start_date else feed_window_start()
+    end_dt = datetime.fromisoformat(end_date) if end_date else None
+    
+    last_modified, count = feed_version(trainer_id=trainer_id, client_id=client_id)
+    # The calendar name is part of the tag so renames reach subscribers
+    etag = feed_etag(f'{scope}|{calendar_name}', last_modified, count, start_dt, end_dt)
+    
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        rows = feed_query(trainer_id=trainer_id, client_id=client_id, start=start_dt, end=end_dt)
+        response = Response(stream_with_context(render_feed(rows, calendar_name)), mimetype='text/calendar')
+    
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    # Calendar apps may keep a copy but must revalidate it
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@session_bp.route('/trainers/<int:trainer_id>/calendar.ics', methods=['GET'])
+def trainer_calendar_feed(trainer_id):
+    """Subscribable iCal feed of a trainer's sessions"""
+    trainer = Trainer.query.get_or_404(trainer_id)
+    try:
+        return _calendar_feed(f'trainer:{trainer_id}', f'FitnessCRM - {trainer.name}', trainer_id=trainer_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@session_bp.route('/clients/<int:client_id>/calendar.ics', methods=['GET'])
+def client_calendar_feed(client_id):
+    """Subscribable iCal feed of a client's sessions"""
+    client = Client.query.get_or_404(client_id)
+    try:
+        return _calendar_feed(f'client:{client_id}', f'FitnessCRM - {client.name}', client_id=client_id)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -7,6 +7,16 @@ from flask import Flask
 from flask_cors import CORS
 from models.database import db
 from bootstrap import bootstrap_application
+from config.settings import config as config_profiles, get_engine_options
+from utils.db_pool import pool_monitor
+from utils.query_instrumentation import query_instrumentation
+from utils.metrics import request_metrics
+from utils.slow_query_log import slow_query_log
+from utils.analytics_rollup import analytics_rollup
+from utils.analytics_cache import analytics_cache
+from utils.availability import availability_index
+from utils.trainer_benchmarks import trainer_benchmarks
+from utils.report_jobs import report_jobs
 
 def create_app(config=None):
     """
@@ -20,6 +30,11 @@ def create_app(config=None):
     """
     app = Flask(__name__)
     
+    # Load configuration profile (development, testing, production); DEBUG is
+    # only switched on when the development profile is chosen explicitly
+    config_name = os.environ.get('FLASK_ENV', 'production')
+    app.config.from_object(config_profiles.get(config_name, config_profiles['production']))
+    
     # Load configuration
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key'),
@@ -39,6 +54,10 @@ def create_app(config=None):
     if config:
         app.config.from_mapping(config)
     
+    # Connection pool settings (explicit SQLALCHEMY_ENGINE_OPTIONS take precedence)
+    if 'SQLALCHEMY_ENGINE_OPTIONS' not in app.config:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = get_engine_options(app.config)
+    
     # Configure CORS
     cors_origins = os.environ.get('CORS_ORIGINS', '*')
     CORS(app, 
@@ -46,13 +65,35 @@ def create_app(config=None):
          allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
          supports_credentials=False,
-         expose_headers=["Content-Type", "Authorization"],
+         expose_headers=["Content-Type", "Authorization", "X-Query-Count", "X-Query-Time-Ms", "X-Query-Max-Repeat", "X-Cache"],
          max_age=3600
     )
     
     # Initialize database
     db.init_app(app)
     
+    # Track connection pool usage and per-request SQL for this worker
+    with app.app_context():
+        pool_monitor.attach(db.engine)
+        query_instrumentation.init_app(app, db.engine)
+        slow_query_log.init_app(app, db.engine)
+    
+    # Keep daily analytics rollups in step with ORM writes
+    analytics_rollup.init_app(app)
+    analytics_cache.init_app(app)
+    
+    # Trainer-day availability bitmaps, dropped when bookings change
+    availability_index.init_app(app)
+    
+    # Trainer benchmark populations, computed once per period
+    trainer_benchmarks.init_app(app)
+    
+    # Background report jobs and their stored results
+    report_jobs.init_app(app)
+    
+    # Prometheus request metrics and /metrics endpoint
+    request_metrics.init_app(app)
+    
     # Bootstrap the EspoCRM-inspired architecture
     with app.app_context():
         bootstrap_application()
@@ -83,7 +124,7 @@ def register_blueprints(app):
     from api.routes import api_bp
     from api.entity_routes import entity_api_bp
     from api.auth_routes import auth_bp
-    from api.session_routes import sessions_bp
+    from api.session_routes import session_bp
     from api.workout_routes import workout_bp
     from api.exercise_routes import exercise_bp
     from api.goal_routes import goal_bp
@@ -104,8 +145,11 @@ def register_blueprints(app):
     from api.sms_routes import sms_bp
     from api.stripe_routes import stripe_bp
     from api.exercisedb_routes import exercisedb_bp
-    from api.public_api_v2 import public_api_v2_bp
+    from api.public_api_v2 import public_api_v2
     from api.audit_routes import audit_bp
+    from api.monitoring_routes import monitoring_bp
+    from api.availability_routes import availability_bp
+    from api.export_routes import export_bp
     
     # Register core routes
     app.register_blueprint(api_bp)
@@ -113,7 +157,8 @@ def register_blueprints(app):
     
     # Register feature blueprints
     app.register_blueprint(auth_bp)
-    app.register_blueprint(sessions_bp)
+    app.register_blueprint(session_bp)
+    app.register_blueprint(availability_bp)
     app.register_blueprint(workout_bp)
     app.register_blueprint(exercise_bp)
     app.register_blueprint(goal_bp)
@@ -126,6 +171,7 @@ def register_blueprints(app):
     app.register_blueprint(settings_bp)
     app.register_blueprint(activity_bp)
     app.register_blueprint(report_bp)
+    app.register_blueprint(export_bp)
     app.register_blueprint(advanced_analytics_bp)
     app.register_blueprint(progress_photo_bp)
     app.register_blueprint(ai_bp)
@@ -134,8 +180,9 @@ def register_blueprints(app):
     app.register_blueprint(sms_bp)
     app.register_blueprint(stripe_bp)
     app.register_blueprint(exercisedb_bp)
-    app.register_blueprint(public_api_v2_bp)
+    app.register_blueprint(public_api_v2)
     app.register_blueprint(audit_bp)
+    app.register_blueprint(monitoring_bp)
 
 
 if __name__ == '__main__':
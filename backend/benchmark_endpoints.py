@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Endpoint benchmark suite for the hot API paths
+
+Boots create_app() against a dataset (normally one built with
+generate_dataset.py) and drives each scenario through the Flask test
+client, recording latency percentiles, SQL query counts and peak Python
+memory. Results are written as JSON so runs can be compared between
+commits, and the run fails when the regression budget is exceeded.
+
+Usage:
+    # Against the database in DATABASE_URL
+    python benchmark_endpoints.py --output bench.json
+
+    # Build a throwaway SQLite dataset first
+    python benchmark_endpoints.py --generate small --output bench.json
+
+    # Compare with an earlier run and enforce benchmark_budget.json
+    python benchmark_endpoints.py --baseline bench-main.json --output bench.json
+
+Exit status is 1 if any scenario fails or breaks its budget.
+"""
+
+from datetime import datetime, timedelta
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_budget.json')
+
+
+def build_scenarios(context):
+    """
+    Hot API paths as (name, method, path, json_body) tuples
+
+    Args:
+        context: Dataset facts (busiest trainer/client, reference date)
+    """
+    day = context['reference_date']
+    week_start = (day - timedelta(days=7)).isoformat()
+    month_start = (day - timedelta(days=30)).isoformat()
+    end = day.isoformat()
+    trainer_id = context['trainer_id']
+    client_id = context['client_id']
+
+    return [
+        ('sessions.trainer_calendar', 'GET',
+         f'/api/sessions?trainer_id={trainer_id}&start_date={month_start}&end_date={end}', None),
+        ('sessions.week', 'GET', f'/api/sessions?start_date={week_start}&end_date={end}', None),
+        ('sessions.client_history', 'GET', f'/api/sessions?client_id={client_id}', None),
+        ('analytics.dashboard', 'GET', '/api/analytics/dashboard', None),
+        ('analytics.trainer_performance', 'GET', '/api/analytics/trainers/performance', None),
+        ('reports.custom', 'POST', '/api/reports/custom', {
+            'name': 'Benchmark',
+            'metrics': ['total_revenue', 'payment_count', 'active_clients', 'new_clients',
+                        'total_sessions', 'completed_sessions', 'attendance_rate',
+                        'revenue_by_type', 'sessions_by_type', 'trainer_performance'],
+            'start_date': month_start,
+            'end_date': end,
+        }),
+        ('messages.trainer_threads', 'GET', f'/api/messages/threads?user_type=trainer&user_id={trainer_id}', None),
+        ('exercises.list', 'GET', '/api/exercises', None),
+        ('v2.sessions', 'GET', f'/api/v2/sessions?trainer_id={trainer_id}', None),
+    ]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def get_dataset_context(db):
+    """Pick representative ids and the reference date from the loaded data"""
+    from models.database import Client, Session, Trainer
+    from sqlalchemy import func
+
+    counts = {
+        'trainers': Trainer.query.count(),
+        'clients': Client.query.count(),
+        'sessions': Session.query.count(),
+    }
+    busiest_trainer = db.session.query(Session.trainer_id).group_by(Session.trainer_id) \
+        .order_by(func.count(Session.id).desc()).limit(1).scalar()
+    busiest_client = db.session.query(Session.client_id).group_by(Session.client_id) \
+        .order_by(func.count(Session.id).desc()).limit(1).scalar()
+    last_completed = db.session.query(func.max(Session.session_date)) \
+        .filter(Session.status == 'completed').scalar()
+    db.session.remove()
+
+    return {
+        'counts': counts,
+        'trainer_id': busiest_trainer or 1,
+        'client_id': busiest_client or 1,
+        'reference_date': (last_completed or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0),
+    }
+
+
+def run_scenario(client, headers, method, path, body, iterations, warmup):
+    """Time one scenario; returns a result dict"""
+    from utils.query_instrumentation import capture_queries
+
+    def call():
+        return client.open(path, method=method, json=body, headers=headers)
+
+    for _ in range(warmup):
+        call()
+
+    # Latency pass (no tracing overhead)
+    timings = []
+    status = None
+    response_bytes = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = call()
+        timings.append((time.perf_counter() - started) * 1000)
+        status = response.status_code
+        response_bytes = len(response.get_data())
+
+    # One traced request for query count and peak memory
+    tracemalloc.start()
+    with capture_queries() as stats:
+        response = call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'method': method,
+        'path': path,
+        'status': status,
+        'iterations': iterations,
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'max_ms': round(max(timings), 2),
+        'queries': stats.count,
+        'db_ms': stats.total_time_ms,
+        'max_repeat': stats.max_repeat,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'response_bytes': response_bytes,
+    }
+
+
+def check_budget(results, budget, baseline=None):
+    """
+    Compare results with the budget (and a baseline run, if given)
+
+    Budget format:
+        {
+            "default": {"p95_regression_pct": 25, "query_regression": 0},
+            "endpoints": {"analytics.dashboard": {"p95_ms": 500, "max_queries": 30}}
+        }
+
+    Returns:
+        List of human readable violations
+    """
+    violations = []
+    defaults = budget.get('default', {})
+    baseline_results = (baseline or {}).get('results', {})
+
+    for name, result in results.items():
+        limits = dict(defaults)
+        limits.update(budget.get('endpoints', {}).get(name, {}))
+
+        # A 4xx (bad auth, missing fixture row) times an error page, not the endpoint
+        if result.get('status') is None or result['status'] >= 400:
+            violations.append(f"{name}: request failed with status {result.get('status')}")
+            continue
+
+        if 'p95_ms' in limits and result['p95_ms'] > limits['p95_ms']:
+            violations.append(f"{name}: p95 {result['p95_ms']}ms exceeds budget {limits['p95_ms']}ms")
+        if 'max_queries' in limits and result['queries'] > limits['max_queries']:
+            violations.append(f"{name}: {result['queries']} queries exceeds budget {limits['max_queries']}")
+        if 'peak_memory_kb' in limits and result['peak_memory_kb'] > limits['peak_memory_kb']:
+            violations.append(
+                f"{name}: peak memory {result['peak_memory_kb']}KB exceeds budget {limits['peak_memory_kb']}KB"
+            )
+
+        previous = baseline_results.get(name)
+        if previous:
+            if 'p95_regression_pct' in limits and previous.get('p95_ms'):
+                allowed = previous['p95_ms'] * (1 + limits['p95_regression_pct'] / 100.0)
+                if result['p95_ms'] > allowed:
+                    violations.append(
+                        f"{name}: p95 {result['p95_ms']}ms regressed from {previous['p95_ms']}ms "
+                        f"(allowed {limits['p95_regression_pct']}%)"
+                    )
+            if 'query_regression' in limits and previous.get('queries') is not None:
+                if result['queries'] > previous['queries'] + limits['query_regression']:
+                    violations.append(
+                        f"{name}: {result['queries']} queries, baseline had {previous['queries']}"
+                    )
+
+    return violations
+
+
+def get_git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def generate_temp_dataset(scale, seed):
+    """Build a throwaway SQLite dataset and point DATABASE_URL at it"""
+    from generate_dataset import generate_dataset, parse_args
+
+    path = os.path.join(tempfile.mkdtemp(prefix='fitnesscrm-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ.setdefault('FLASK_ENV', 'development')
+    print(f"Generating '{scale}' dataset into {path}...")
+    if not generate_dataset(parse_args(['--scale', scale, '--seed', str(seed), '--reset'])):
+        raise SystemExit(1)
+
+
+def run_benchmarks(args):
+    """Run every scenario and return the results document"""
+    if args.generate:
+        generate_temp_dataset(args.generate, args.seed)
+
+    from app_factory import create_app
+    from models.database import db
+    from utils.auth import generate_token
+    from utils.query_instrumentation import query_instrumentation
+    from api import public_api_v2 as v2
+
+    # Keep request logging and N+1 flags out of the measurements, and time the
+    # endpoints rather than the analytics cache the warmup requests would fill
+    app = create_app({'SQL_INSTRUMENTATION': False, 'ANALYTICS_CACHE': False})
+    client = app.test_client()
+    headers = {'Authorization': f"Bearer {generate_token(1, 'benchmark@fitnesscrm.com', 'admin')}"}
+
+    with app.app_context():
+        query_instrumentation.attach_engine(db.engine)
+        context = get_dataset_context(db)
+
+    # The v2 API needs a key; its hourly rate limit is lifted for the run
+    registered = client.post('/api/v2/clients/register', json={'name': 'benchmark', 'email': 'benchmark@fitnesscrm.com'})
+    headers['X-API-Key'] = registered.get_json()['api_key']
+
+    results = {}
+    for name, method, path, body in build_scenarios(context):
+        if args.only and not any(name.startswith(prefix) for prefix in args.only):
+            continue
+        v2._rate_limits.clear()
+        try:
+            result = run_scenario(client, headers, method, path, body, args.iterations, args.warmup)
+        except Exception as e:
+            result = {'method': method, 'path': path, 'status': None, 'error': str(e)}
+        results[name] = result
+        if 'error' in result:
+            print(f"  ✗ {name}: {result['error']}")
+        else:
+            print(f"  {'✓' if result['status'] < 400 else '✗'} {name:<32} p50 {result['p50_ms']:>9.2f}ms  "
+                  f"p95 {result['p95_ms']:>9.2f}ms  queries {result['queries']:>5}  "
+                  f"peak {result['peak_memory_kb']:>9.1f}KB  [{result['status']}]")
+
+    return {
+        'commit': get_git_commit(),
+        'recorded_at': datetime.utcnow().isoformat(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'python': platform.python_version(),
+        'dataset': context['counts'],
+        'iterations': args.iterations,
+        'results': results,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the hot FitnessCRM API endpoints')
+    parser.add_argument('--iterations', type=int, default=20, help='Timed requests per scenario')
+    parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per scenario')
+    parser.add_argument('--output', help='Write results JSON to this file')
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--budget', default=DEFAULT_BUDGET_PATH, help='Regression budget JSON')
+    parser.add_argument('--generate', choices=['small', 'medium', 'large'],
+                        help='Generate a temporary SQLite dataset of this scale first')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for --generate')
+    parser.add_argument('--only', nargs='*', help='Only run scenarios starting with these names')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args)
+
+    if args.output:
+        with open(args.output, 'w') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        print(f"\n✓ Results written to {args.output}")
+
+    budget = {}
+    if args.budget and os.path.exists(args.budget):
+        with open(args.budget) as fh:
+            budget = json.load(fh)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+
+    violations = check_budget(report['results'], budget, baseline)
+    if violations:
+        print("\n✗ Benchmark budget exceeded:")
+        for violation in violations:
+            print(f"  - {violation}")
+        return False
+
+    print("\n✓ All scenarios within budget")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -3,6 +3,21 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_int(name, default):
+    """Read an integer from the environment, falling back to default"""
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(name, default):
+    """Read a boolean flag from the environment, falling back to default"""
+    value = os.getenv(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('true', '1', 'yes')
+
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -11,24 +26,114 @@ class Config:
         'DATABASE_URL',
         'postgresql://localhost/fitnesscrm'
     )
-    
+
     # Fix for Railway/Heroku postgres URLs
     if SQLALCHEMY_DATABASE_URI and SQLALCHEMY_DATABASE_URI.startswith('postgres://'):
         SQLALCHEMY_DATABASE_URI = SQLALCHEMY_DATABASE_URI.replace('postgres://', 'postgresql://', 1)
 
+    # Connection pool (applies per gunicorn worker process)
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = _env_int('DB_POOL_TIMEOUT', 30)  # seconds to wait for a connection
+    DB_POOL_RECYCLE = _env_int('DB_POOL_RECYCLE', 1800)  # seconds before a connection is replaced
+    DB_POOL_PRE_PING = _env_bool('DB_POOL_PRE_PING', True)
+
+    # Per-request SQL instrumentation (X-Query-* headers, N+1 detection)
+    SQL_INSTRUMENTATION = _env_bool('SQL_INSTRUMENTATION', True)
+    SQL_REPEAT_THRESHOLD = _env_int('SQL_REPEAT_THRESHOLD', 10)  # same statement shape per request
+
+    # Slow query log with EXPLAIN capture (opt-in)
+    SLOW_QUERY_LOG = _env_bool('SLOW_QUERY_LOG', False)
+    SLOW_QUERY_THRESHOLD_MS = _env_int('SLOW_QUERY_THRESHOLD_MS', 200)
+    SLOW_QUERY_EXPLAIN = _env_bool('SLOW_QUERY_EXPLAIN', True)
+    SLOW_QUERY_LOG_PATH = os.getenv('SLOW_QUERY_LOG_PATH', 'logs/slow_queries.jsonl')
+    SLOW_QUERY_LOG_MAX_BYTES = _env_int('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024)
+    SLOW_QUERY_LOG_BACKUPS = _env_int('SLOW_QUERY_LOG_BACKUPS', 3)
+
+    # Daily analytics rollups (maintained on write, read once rebuilt)
+    ANALYTICS_ROLLUPS = _env_bool('ANALYTICS_ROLLUPS', True)
+
+    # Analytics response cache (per worker, dropped on relevant commits)
+    ANALYTICS_CACHE = _env_bool('ANALYTICS_CACHE', True)
+    ANALYTICS_CACHE_TTL = _env_int('ANALYTICS_CACHE_TTL', 60)  # seconds
+    ANALYTICS_CACHE_MAX_ENTRIES = _env_int('ANALYTICS_CACHE_MAX_ENTRIES', 256)
+
+    # Recurring sessions are materialised this many days ahead (extended nightly)
+    RECURRING_HORIZON_DAYS = _env_int('RECURRING_HORIZON_DAYS', 56)
+
+    # Availability search (per-worker bitmaps per trainer-day, dropped on booking)
+    AVAILABILITY_SLOT_MINUTES = _env_int('AVAILABILITY_SLOT_MINUTES', 15)
+    AVAILABILITY_DEFAULT_HOURS = os.getenv('AVAILABILITY_DEFAULT_HOURS', '06:00-21:00')  # trainers without hours
+    AVAILABILITY_CACHE_TTL = _env_int('AVAILABILITY_CACHE_TTL', 300)  # seconds
+    AVAILABILITY_CACHE_MAX_ENTRIES = _env_int('AVAILABILITY_CACHE_MAX_ENTRIES', 50000)
+
+    # Trainer benchmark populations (per worker, recomputed after the TTL)
+    TRAINER_BENCHMARK_TTL = _env_int('TRAINER_BENCHMARK_TTL', 900)  # seconds
+
+    # Custom report query groups run concurrently, one pooled connection each (1 = sequential)
+    REPORT_QUERY_WORKERS = _env_int('REPORT_QUERY_WORKERS', 4)
+
+    # Background report jobs (per-worker thread pool, 0 = run inside the submitting request)
+    REPORT_JOB_WORKERS = _env_int('REPORT_JOB_WORKERS', 2)
+    REPORT_RESULT_TTL = _env_int('REPORT_RESULT_TTL', 900)  # seconds identical reports reuse a result
+    REPORT_JOB_TIMEOUT = _env_int('REPORT_JOB_TIMEOUT', 600)  # seconds before a pending job is presumed dead
+    REPORT_JOB_MAX_WAIT = _env_int('REPORT_JOB_MAX_WAIT', 25)  # longest long-poll, below the gunicorn timeout
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
-    SQLALCHEMY_ECHO = True
+    SQLALCHEMY_ECHO = _env_bool('SQLALCHEMY_ECHO', False)
+
+class TestingConfig(Config):
+    """Testing configuration"""
+    TESTING = True
+    ANALYTICS_CACHE = _env_bool('ANALYTICS_CACHE', False)
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 2)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 2)
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
+    DB_POOL_SIZE = _env_int('DB_POOL_SIZE', 10)
+    DB_MAX_OVERFLOW = _env_int('DB_MAX_OVERFLOW', 20)
 
 # Configuration dictionary
 config = {
     'development': DevelopmentConfig,
+    'testing': TestingConfig,
     'production': ProductionConfig,
     'default': DevelopmentConfig
 }
+
+
+def get_engine_options(app_config):
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS from the DB_POOL_* settings.
+
+    SQLite does not use a network connection pool, so only pre-ping and
+    recycle are passed through for it.
+
+    Args:
+        app_config: Flask config mapping (or any dict with the DB_POOL_* keys)
+
+    Returns:
+        Dict suitable for SQLALCHEMY_ENGINE_OPTIONS
+    """
+    options = {
+        'pool_pre_ping': app_config.get('DB_POOL_PRE_PING', Config.DB_POOL_PRE_PING),
+        'pool_recycle': app_config.get('DB_POOL_RECYCLE', Config.DB_POOL_RECYCLE),
+    }
+
+    database_uri = app_config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if database_uri.startswith('sqlite'):
+        return options
+
+    from utils.db_pool import InstrumentedQueuePool
+    options.update({
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': app_config.get('DB_POOL_SIZE', Config.DB_POOL_SIZE),
+        'max_overflow': app_config.get('DB_MAX_OVERFLOW', Config.DB_MAX_OVERFLOW),
+        'pool_timeout': app_config.get('DB_POOL_TIMEOUT', Config.DB_POOL_TIMEOUT),
+    })
+    return options
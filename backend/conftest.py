@@ -4,8 +4,10 @@ Pytest configuration and fixtures for FitnessCRM backend tests.
 
 import os
 import pytest
-from app import create_app
+from flask import Flask
+from app_factory import create_app
 from models.database import db
+from utils.query_instrumentation import query_instrumentation
 
 
 @pytest.fixture(scope='session')
@@ -74,6 +76,40 @@ def runner(app):
     return app.test_cli_runner()
 
 
+@pytest.fixture
+def sqlite_app(tmp_path):
+    """
+    Factory for a bare Flask app on a fresh SQLite file, for unit tests that
+    don't need PostgreSQL.
+
+    Call it with the blueprints to register and any config overrides. The
+    returned app has an application context pushed, its tables created and
+    its engine instrumented, so tests can count statements with
+    capture_queries().
+    """
+    contexts = []
+
+    def make_app(*blueprints, **config):
+        app = Flask(__name__)
+        app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'crm.db'}", **config)
+        db.init_app(app)
+        for blueprint in blueprints:
+            app.register_blueprint(blueprint)
+
+        context = app.app_context()
+        context.push()
+        contexts.append(context)
+        db.create_all()
+        query_instrumentation.attach_engine(db.engine)
+        return app
+
+    yield make_app
+
+    for context in reversed(contexts):
+        db.session.remove()
+        context.pop()
+
+
 # Sample data fixtures
 @pytest.fixture
 def sample_trainer():
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Fit or roll forward the revenue forecasting models
+
+Brings every segment's monthly and weekly model (overall, per membership
+type and per payment type) up to the last closed period. Models whose
+history changed (late or refunded payments) or that now have two seasons
+of data are refitted; the rest only roll their state forward. Forecast
+requests never refit, so run it nightly:
+
+    45 3 * * * cd /path/to/FitnessCRM/backend && python fit_revenue_forecasts.py
+
+Usage:
+    python fit_revenue_forecasts.py
+    python fit_revenue_forecasts.py --period month
+
+It is safe to re-run.
+"""
+
+from app_factory import create_app
+from utils.revenue_forecast import refresh_models, PERIODS
+import argparse
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Fit or roll forward the revenue forecasting models')
+    parser.add_argument('--period', choices=PERIODS, help='Only refresh monthly or weekly models')
+    return parser.parse_args(argv)
+
+
+def run(period=None):
+    """Run the refresh"""
+    app = create_app()
+
+    with app.app_context():
+        periods = (period,) if period else PERIODS
+        print(f"Refreshing {', '.join(periods)} revenue forecasting models...")
+        try:
+            started = time.perf_counter()
+            stats = refresh_models(periods)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"✗ Error refreshing revenue forecasting models: {e}")
+            return False
+
+        print(f"✓ {stats['fitted']} fitted, {stats['rolled_forward']} rolled forward, "
+              f"{stats['current']} already current in {elapsed:.2f}s")
+        return True
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    success = run(args.period)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,627 @@
+#!/usr/bin/env python3
+"""
+Synthetic dataset generator for load tests and benchmarks
+
+Populates trainers, clients, assignments, sessions, payments, measurements,
+message threads, email campaigns and automation logs with realistic
+distributions, using bulk inserts. Output is deterministic for a given
+--seed, scale and --end-date, so benchmark runs can be reproduced exactly.
+
+Usage:
+    python generate_dataset.py --scale small --reset
+    python generate_dataset.py --scale large --seed 7 --end-date 2026-01-01 --reset
+    python generate_dataset.py --clients 5000 --trainers 50 --sessions 200000
+
+Scales:
+    small   20 trainers,    1k clients,   50k sessions
+    medium  200 trainers,   20k clients,  1M sessions
+    large   1k trainers,    100k clients, 5M sessions
+
+Works against whatever DATABASE_URL points to (PostgreSQL or SQLite).
+Never run this against production data.
+"""
+
+from models.database import (
+    db, Trainer, Client, Assignment, Session, Payment, Measurement,
+    MessageThread, Message, EmailCampaign, CampaignRecipient,
+    AutomationRule, AutomationLog,
+)
+from sqlalchemy import func, select, text
+from datetime import datetime, timedelta
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+import time
+
+SCALES = {
+    'small': {'trainers': 20, 'clients': 1000, 'sessions': 50000},
+    'medium': {'trainers': 200, 'clients': 20000, 'sessions': 1000000},
+    'large': {'trainers': 1000, 'clients': 100000, 'sessions': 5000000},
+}
+
+# Trainers per gym location
+TRAINERS_PER_GYM = 25
+
+SPECIALIZATIONS = [
+    'Strength Training', 'Cardio, HIIT', 'Yoga, Flexibility', 'Weight Loss',
+    'Powerlifting', 'Rehabilitation', 'CrossFit', 'Sports Performance', 'Pilates',
+]
+CERTIFICATIONS = ['NASM-CPT', 'ACE-CPT', 'ACSM-CPT', 'CSCS', 'ISSA-CPT', 'RYT-500']
+FIRST_NAMES = [
+    'Emma', 'James', 'Olivia', 'Liam', 'Ava', 'Noah', 'Mia', 'Lucas', 'Sophia', 'Mason',
+    'Isabella', 'Ethan', 'Amelia', 'Logan', 'Harper', 'Aiden', 'Ella', 'Jackson', 'Chloe', 'Mateo',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Martinez',
+    'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Chen', 'Nguyen', 'Patel',
+]
+GOALS = ['Weight loss', 'Muscle gain', 'Endurance', 'Flexibility', 'General fitness', 'Rehabilitation']
+SESSION_TYPES = ['personal', 'personal', 'personal', 'group', 'online']
+DURATIONS = [30, 45, 60, 60, 60, 60, 90]
+
+# (value, weight) pairs
+CLIENT_STATUSES = [('active', 70), ('inactive', 20), ('pending', 10)]
+MEMBERSHIPS = [('monthly', 60), ('quarterly', 25), ('annual', 15)]
+MEMBERSHIP_BILLING = {'monthly': (1, 99.0), 'quarterly': (3, 270.0), 'annual': (12, 999.0)}
+PAYMENT_STATUSES = [('completed', 92), ('failed', 4), ('refunded', 2), ('pending', 2)]
+PAYMENT_METHODS = [('credit_card', 70), ('stripe', 20), ('cash', 6), ('check', 4)]
+PAST_SESSION_STATUSES = [('completed', 82), ('cancelled', 10), ('no-show', 5), ('scheduled', 3)]
+FUTURE_SESSION_STATUSES = [('scheduled', 92), ('cancelled', 8)]
+RECIPIENT_STATUSES = [('delivered', 55), ('opened', 25), ('clicked', 8), ('bounced', 4), ('failed', 3), ('sent', 5)]
+
+
+def _weighted(rng, pairs):
+    values, weights = zip(*pairs)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class DatasetGenerator:
+    """Generates and bulk inserts a synthetic dataset on one connection"""
+
+    def __init__(self, conn, trainers, clients, sessions, seed=42, months=36,
+                 end_date=None, batch_size=5000, verbose=True):
+        """
+        Args:
+            conn: SQLAlchemy connection (committed by the caller)
+            trainers: Number of trainers
+            clients: Number of clients
+            sessions: Approximate total number of sessions
+            seed: Random seed; same seed and arguments give the same data
+            months: History length in months before end_date
+            end_date: Last day of history (sessions are also scheduled 30 days past it)
+            batch_size: Rows per bulk insert
+        """
+        self.conn = conn
+        self.num_trainers = trainers
+        self.num_clients = clients
+        self.num_sessions = sessions
+        self.seed = seed
+        self.end_date = end_date or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.start_date = self.end_date - timedelta(days=30 * months)
+        self.horizon = self.end_date + timedelta(days=30)
+        self.batch_size = batch_size
+        self.verbose = verbose
+        self.counts = {}
+
+        # Per-client state shared between tables
+        self.client_start = []
+        self.client_end = []
+        self.client_trainer = []
+        self.client_email = []
+        self.client_membership = []
+        self.client_activity = []
+        self.trainer_gym = []
+        self.trainer_cum_weights = []
+
+    def _rng(self, table):
+        # Independent stream per table so changing one table's volume doesn't reshuffle the others
+        return random.Random(f'{self.seed}:{table}')
+
+    def _insert(self, table, rows):
+        """Bulk insert rows (an iterable of dicts) in batches"""
+        started = time.perf_counter()
+        total = 0
+        for batch in _batched(rows, self.batch_size):
+            self.conn.execute(table.insert(), batch)
+            total += len(batch)
+        elapsed = time.perf_counter() - started
+        self.counts[table.name] = self.counts.get(table.name, 0) + total
+        if self.verbose:
+            rate = total / elapsed if elapsed > 0 else total
+            print(f"  ✓ {table.name}: {total:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+    def generate(self):
+        """Generate every table in dependency order"""
+        self.generate_trainers()
+        self.generate_clients()
+        self.generate_assignments()
+        self.generate_sessions()
+        self.generate_payments()
+        self.generate_measurements()
+        self.generate_messages()
+        self.generate_campaigns()
+        self.generate_automation_logs()
+        return self.counts
+
+    def generate_trainers(self):
+        rng = self._rng('trainers')
+        # Popularity follows a long tail: a few trainers carry many clients
+        weights = [1.0 / (rank + 1) ** 0.6 for rank in range(self.num_trainers)]
+        rng.shuffle(weights)
+        self.trainer_cum_weights = list(itertools.accumulate(weights))
+        self.trainer_gym = [i // TRAINERS_PER_GYM + 1 for i in range(self.num_trainers)]
+
+        def rows():
+            for i in range(self.num_trainers):
+                created = self.start_date - timedelta(days=rng.randint(0, 365))
+                yield {
+                    'id': i + 1,
+                    'name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    'email': f'trainer{i + 1}@gym{self.trainer_gym[i]}.example.com',
+                    'phone': f'+1555{rng.randint(1000000, 9999999)}',
+                    'specialization': rng.choice(SPECIALIZATIONS),
+                    'certification': rng.choice(CERTIFICATIONS),
+                    'experience': rng.randint(1, 20),
+                    'bio': None,
+                    'hourly_rate': round(max(30.0, rng.gauss(65, 20)), 2),
+                    'active': rng.random() < 0.95,
+                    'created_at': created,
+                    'updated_at': created,
+                    'deleted_at': None,
+                }
+
+        self._insert(Trainer.__table__, rows())
+
+    def _pick_trainer(self, rng):
+        return bisect.bisect_left(self.trainer_cum_weights, rng.random() * self.trainer_cum_weights[-1])
+
+    def generate_clients(self):
+        rng = self._rng('clients')
+        span_days = (self.end_date - self.start_date).days
+
+        def rows():
+            for i in range(self.num_clients):
+                # sqrt skews sign-ups towards recent months (a growing business)
+                start = self.start_date + timedelta(days=int(span_days * math.sqrt(rng.random())))
+                status = _weighted(rng, CLIENT_STATUSES)
+                membership = _weighted(rng, MEMBERSHIPS)
+                if status == 'inactive':
+                    # Churned clients stop training somewhere between sign-up and today
+                    end = start + timedelta(days=int((self.end_date - start).days * rng.random()))
+                elif status == 'pending':
+                    end = start
+                else:
+                    end = self.horizon
+
+                self.client_start.append(start)
+                self.client_end.append(end)
+                self.client_trainer.append(self._pick_trainer(rng))
+                self.client_membership.append(membership)
+                self.client_activity.append(rng.lognormvariate(0, 0.75))
+
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                email = f'{first.lower()}.{last.lower()}.{i + 1}@example.com'
+                self.client_email.append(email)
+                yield {
+                    'id': i + 1,
+                    'name': f'{first} {last}',
+                    'email': email,
+                    'phone': f'+1555{rng.randint(1000000, 9999999)}',
+                    'age': rng.randint(18, 70),
+                    'goals': rng.choice(GOALS),
+                    'medical_conditions': None,
+                    'emergency_contact': None,
+                    'emergency_phone': None,
+                    'status': status,
+                    'membership_type': membership,
+                    'start_date': start,
+                    'created_at': start,
+                    'updated_at': end if end < self.end_date else start,
+                    'deleted_at': None,
+                }
+
+        self._insert(Client.__table__, rows())
+
+    def generate_assignments(self):
+        def rows():
+            for i in range(self.num_clients):
+                yield {
+                    'id': i + 1,
+                    'trainer_id': self.client_trainer[i] + 1,
+                    'client_id': i + 1,
+                    'notes': None,
+                    'status': 'active' if self.client_end[i] > self.end_date else 'completed',
+                    'created_at': self.client_start[i],
+                    'updated_at': self.client_start[i],
+                    'deleted_at': None,
+                }
+
+        self._insert(Assignment.__table__, rows())
+
+    def generate_sessions(self):
+        rng = self._rng('sessions')
+        # Sessions are shared out by client activity and the length of their membership
+        spans = [max((self.client_end[i] - self.client_start[i]).days, 0) for i in range(self.num_clients)]
+        weights = [self.client_activity[i] * spans[i] for i in range(self.num_clients)]
+        total_weight = sum(weights) or 1.0
+
+        def rows():
+            session_id = 0
+            for i in range(self.num_clients):
+                count = int(round(self.num_sessions * weights[i] / total_weight))
+                if count == 0:
+                    continue
+                trainer = self.client_trainer[i]
+                for _ in range(count):
+                    # Mostly the assigned trainer, occasionally a colleague covers
+                    t = trainer if rng.random() < 0.85 else self._pick_trainer(rng)
+                    day = self.client_start[i] + timedelta(days=rng.randint(0, spans[i]))
+                    start = day.replace(hour=rng.randint(6, 20), minute=rng.choice((0, 30)))
+                    duration = rng.choice(DURATIONS)
+                    statuses = PAST_SESSION_STATUSES if start < self.end_date else FUTURE_SESSION_STATUSES
+                    created = start - timedelta(days=rng.randint(1, 21))
+                    session_id += 1
+                    yield {
+                        'id': session_id,
+                        'trainer_id': t + 1,
+                        'client_id': i + 1,
+                        'session_date': start,
+                        'end_time': start + timedelta(minutes=duration),
+                        'duration': duration,
+                        'session_type': rng.choice(SESSION_TYPES),
+                        'location': f'Gym {self.trainer_gym[t]}',
+                        'notes': None,
+                        'status': _weighted(rng, statuses),
+                        'recurring_session_id': None,
+                        'created_at': created,
+                        'updated_at': created,
+                        'deleted_at': None,
+                    }
+
+        self._insert(Session.__table__, rows())
+
+    def generate_payments(self):
+        rng = self._rng('payments')
+
+        def rows():
+            payment_id = 0
+            for i in range(self.num_clients):
+                months, amount = MEMBERSHIP_BILLING[self.client_membership[i]]
+                end = min(self.client_end[i], self.end_date)
+                due = self.client_start[i]
+                while due < end:
+                    payment_id += 1
+                    paid = due + timedelta(hours=rng.randint(0, 72))
+                    yield {
+                        'id': payment_id,
+                        'client_id': i + 1,
+                        'amount': amount,
+                        'payment_date': paid,
+                        'payment_method': _weighted(rng, PAYMENT_METHODS),
+                        'payment_type': 'membership',
+                        'status': _weighted(rng, PAYMENT_STATUSES),
+                        'transaction_id': f'txn_{self.seed}_{payment_id}',
+                        'stripe_payment_intent_id': None,
+                        'stripe_charge_id': None,
+                        'stripe_customer_id': None,
+                        'notes': None,
+                        'created_at': paid,
+                    }
+                    due += timedelta(days=30 * months)
+
+        self._insert(Payment.__table__, rows())
+
+    def generate_measurements(self):
+        rng = self._rng('measurements')
+        columns = [c.name for c in Measurement.__table__.columns]
+
+        def rows():
+            measurement_id = 0
+            for i in range(self.num_clients):
+                # Roughly monthly check-ins for clients who log them at all
+                if rng.random() < 0.3:
+                    continue
+                weight = rng.gauss(82, 15)
+                height_m = rng.gauss(1.72, 0.09)
+                when = self.client_start[i]
+                end = min(self.client_end[i], self.end_date)
+                while when < end:
+                    measurement_id += 1
+                    weight = max(45.0, weight + rng.gauss(-0.4, 0.8))
+                    row = dict.fromkeys(columns)
+                    row.update({
+                        'id': measurement_id,
+                        'client_id': i + 1,
+                        'measurement_date': when,
+                        'weight': round(weight, 1),
+                        'weight_unit': 'kg',
+                        'body_fat_percentage': round(max(6.0, rng.gauss(26, 6)), 1),
+                        'bmi': round(weight / (height_m * height_m), 1),
+                        'waist': round(weight * 1.05 + rng.gauss(0, 3), 1),
+                        'measurement_unit': 'cm',
+                        'resting_heart_rate': rng.randint(50, 85),
+                        'created_at': when,
+                        'updated_at': when,
+                    })
+                    yield row
+                    when += timedelta(days=rng.randint(21, 45))
+
+        self._insert(Measurement.__table__, rows())
+
+    def generate_messages(self):
+        rng = self._rng('messages')
+        threads = []
+
+        def thread_rows():
+            for i in range(self.num_clients):
+                if rng.random() >= 0.4:
+                    continue
+                thread_id = len(threads) + 1
+                opened = self.client_start[i] + timedelta(days=rng.randint(0, 14))
+                count = min(int(rng.expovariate(1 / 10)) + 1, 200)
+                threads.append((thread_id, i, opened, count))
+                last_by = rng.choice(('trainer', 'client'))
+                last_at = opened + timedelta(hours=6 * count)
+                yield {
+                    'id': thread_id,
+                    'trainer_id': self.client_trainer[i] + 1,
+                    'client_id': i + 1,
+                    'subject': rng.choice(GOALS),
+                    'last_message_at': last_at,
+                    'last_message_by': last_by,
+                    'trainer_unread_count': rng.randint(0, 3) if last_by == 'client' else 0,
+                    'client_unread_count': rng.randint(0, 3) if last_by == 'trainer' else 0,
+                    'archived_by_trainer': rng.random() < 0.2,
+                    'archived_by_client': rng.random() < 0.1,
+                    'created_at': opened,
+                    'updated_at': last_at,
+                }
+
+        def message_rows():
+            message_id = 0
+            for thread_id, i, opened, count in threads:
+                for n in range(count):
+                    message_id += 1
+                    sender_type = 'trainer' if n % 2 == 0 else 'client'
+                    yield {
+                        'id': message_id,
+                        'thread_id': thread_id,
+                        'sender_type': sender_type,
+                        'sender_id': self.client_trainer[i] + 1 if sender_type == 'trainer' else i + 1,
+                        'content': f'Message {n + 1} about {rng.choice(GOALS).lower()}',
+                        'read': n < count - 1 or rng.random() < 0.5,
+                        'read_at': None,
+                        'deleted_by_sender': False,
+                        'created_at': opened + timedelta(hours=6 * (n + 1)),
+                    }
+
+        self._insert(MessageThread.__table__, thread_rows())
+        self._insert(Message.__table__, message_rows())
+
+    def generate_campaigns(self):
+        rng = self._rng('campaigns')
+        num_campaigns = max(1, self.num_clients // 2000)
+        columns = [c.name for c in EmailCampaign.__table__.columns]
+        campaigns = []
+
+        def campaign_rows():
+            span_days = (self.end_date - self.start_date).days
+            for n in range(num_campaigns):
+                sent = self.start_date + timedelta(days=rng.randint(0, span_days))
+                # Each campaign targets a random slice of the client base
+                recipients = rng.sample(range(self.num_clients), int(self.num_clients * rng.uniform(0.05, 0.3)))
+                campaigns.append((n + 1, sent, recipients))
+                row = dict.fromkeys(columns)
+                row.update({
+                    'id': n + 1,
+                    'name': f'Campaign {n + 1}',
+                    'subject': f'News from the gym #{n + 1}',
+                    'html_body': '<p>Hello {{client_name}}</p>',
+                    'segment_type': 'specific_ids',
+                    'ab_test_enabled': False,
+                    'ab_test_split_percentage': 50,
+                    'send_immediately': False,
+                    'status': 'sent',
+                    'sent_at': sent,
+                    'completed_at': sent + timedelta(hours=1),
+                    'total_recipients': len(recipients),
+                    'emails_sent': len(recipients),
+                    'emails_delivered': 0,
+                    'emails_opened': 0,
+                    'emails_clicked': 0,
+                    'emails_bounced': 0,
+                    'emails_failed': 0,
+                    'created_at': sent - timedelta(days=2),
+                    'updated_at': sent,
+                })
+                yield row
+
+        def recipient_rows():
+            recipient_columns = [c.name for c in CampaignRecipient.__table__.columns]
+            recipient_id = 0
+            for campaign_id, sent, recipients in campaigns:
+                for i in recipients:
+                    recipient_id += 1
+                    status = _weighted(rng, RECIPIENT_STATUSES)
+                    row = dict.fromkeys(recipient_columns)
+                    row.update({
+                        'id': recipient_id,
+                        'campaign_id': campaign_id,
+                        'email': self.client_email[i],
+                        'recipient_type': 'client',
+                        'recipient_id': i + 1,
+                        'status': status,
+                        'sent_at': sent,
+                        'delivered_at': sent if status in ('delivered', 'opened', 'clicked') else None,
+                        'opened_at': sent + timedelta(hours=2) if status in ('opened', 'clicked') else None,
+                        'clicked_at': sent + timedelta(hours=3) if status == 'clicked' else None,
+                        'open_count': 1 if status in ('opened', 'clicked') else 0,
+                        'click_count': 1 if status == 'clicked' else 0,
+                        'created_at': sent,
+                    })
+                    yield row
+
+        self._insert(EmailCampaign.__table__, campaign_rows())
+        self._insert(CampaignRecipient.__table__, recipient_rows())
+
+    def generate_automation_logs(self):
+        rng = self._rng('automation')
+        rules = [
+            ('Session reminder', 'session_reminder', 'session_created', 'email'),
+            ('Payment reminder', 'payment_reminder', 'payment_due', 'email'),
+            ('Birthday greeting', 'birthday', 'birthday', 'sms'),
+            ('Re-engagement', 're_engagement', 'inactivity', 'both'),
+        ]
+        rule_columns = [c.name for c in AutomationRule.__table__.columns]
+
+        def rule_rows():
+            for n, (name, rule_type, trigger, action) in enumerate(rules):
+                row = dict.fromkeys(rule_columns)
+                row.update({
+                    'id': n + 1,
+                    'name': name,
+                    'rule_type': rule_type,
+                    'trigger_event': trigger,
+                    'action_type': action,
+                    'target_audience': 'clients',
+                    'enabled': True,
+                    'timezone': 'UTC',
+                    'run_count': 0,
+                    'success_count': 0,
+                    'failure_count': 0,
+                    'created_at': self.start_date,
+                    'updated_at': self.start_date,
+                })
+                yield row
+
+        def log_rows():
+            log_id = 0
+            day = self.start_date
+            # Every rule runs daily; recipients grow with the client base
+            while day < self.end_date:
+                progress = (day - self.start_date).days / max((self.end_date - self.start_date).days, 1)
+                for rule_id in range(1, len(rules) + 1):
+                    log_id += 1
+                    recipients = int(rng.expovariate(1 / max(1.0, self.num_clients * progress * 0.01)))
+                    failed = int(recipients * rng.uniform(0, 0.05))
+                    status = 'success' if recipients else 'skipped'
+                    yield {
+                        'id': log_id,
+                        'rule_id': rule_id,
+                        'executed_at': day + timedelta(hours=8),
+                        'status': status,
+                        'error_message': None,
+                        'action_type': rules[rule_id - 1][3],
+                        'recipients_count': recipients,
+                        'sent_count': recipients - failed,
+                        'failed_count': failed,
+                        'trigger_context': None,
+                        'created_at': day + timedelta(hours=8),
+                    }
+                day += timedelta(days=1)
+
+        self._insert(AutomationRule.__table__, rule_rows())
+        self._insert(AutomationLog.__table__, log_rows())
+
+
+def reset_sequences(conn, tables):
+    """Move PostgreSQL id sequences past the explicitly inserted ids"""
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in tables:
+        conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        ))
+
+
+def generate_dataset(args):
+    """Generate the dataset into the configured database"""
+    from app_factory import create_app
+    from utils.analytics_rollup import analytics_rollup
+
+    if os.getenv('FLASK_ENV', 'production') == 'production':
+        print("✗ ERROR: Cannot generate synthetic data in production environment!")
+        print("  Set FLASK_ENV=development to generate data for testing only.")
+        return False
+
+    sizes = dict(SCALES[args.scale])
+    for key in ('trainers', 'clients', 'sessions'):
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d') if args.end_date else None
+
+    # Per-statement instrumentation would only slow the bulk load down
+    app = create_app({'SQL_INSTRUMENTATION': False})
+
+    with app.app_context():
+        if args.reset:
+            print("Dropping and recreating all tables...")
+            db.drop_all()
+        db.create_all()
+
+        with db.engine.connect() as conn:
+            if conn.execute(select(func.count()).select_from(Client.__table__)).scalar():
+                print("✗ Database already contains clients. Use --reset to replace them.")
+                return False
+
+            generator = DatasetGenerator(
+                conn,
+                seed=args.seed,
+                months=args.months,
+                end_date=end_date,
+                batch_size=args.batch_size,
+                **sizes,
+            )
+            print(f"Generating {sizes['trainers']:,} trainers, {sizes['clients']:,} clients, "
+                  f"~{sizes['sessions']:,} sessions (seed {args.seed}, end date "
+                  f"{generator.end_date.date().isoformat()})")
+
+            started = time.perf_counter()
+            counts = generator.generate()
+            reset_sequences(conn, counts.keys())
+            conn.commit()
+
+        # Bulk inserts bypass the ORM, so build the analytics rollups from scratch
+        rollup_rows = analytics_rollup.rebuild()
+        print(f"✓ Rebuilt {rollup_rows:,} analytics rollup rows")
+
+        if db.engine.dialect.name == 'postgresql':
+            with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+                conn.execute(text('ANALYZE'))
+
+        print(f"\n✓ Generated {sum(counts.values()):,} rows in {time.perf_counter() - started:.1f}s")
+        return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic FitnessCRM dataset')
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Preset dataset size')
+    parser.add_argument('--trainers', type=int, help='Override number of trainers')
+    parser.add_argument('--clients', type=int, help='Override number of clients')
+    parser.add_argument('--sessions', type=int, help='Override approximate number of sessions')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default 42)')
+    parser.add_argument('--months', type=int, default=36, help='Months of history (default 36)')
+    parser.add_argument('--end-date', help='Last day of history, YYYY-MM-DD (default today)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+    parser.add_argument('--reset', action='store_true', help='Drop and recreate all tables first')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    success = generate_dataset(parse_args())
+    sys.exit(0 if success else 1)
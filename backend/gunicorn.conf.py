@@ -0,0 +1,13 @@
+"""
+Gunicorn configuration for FitnessCRM
+Loaded automatically by gunicorn from the working directory.
+"""
+
+import os
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live Prometheus gauges from the multiprocess store"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from utils.metrics import mark_process_dead
+        mark_process_dead(worker.pid)
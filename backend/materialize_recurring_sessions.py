@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Extend recurring sessions to the rolling horizon
+
+Creates the sessions of every active RecurringSession template up to
+RECURRING_HORIZON_DAYS ahead, starting from each template's
+materialized_until high-water mark, so only new occurrences are expanded.
+Occurrences that clash with existing bookings are skipped. Run it nightly:
+
+    0 3 * * * cd /path/to/FitnessCRM/backend && python materialize_recurring_sessions.py
+
+Usage:
+    python materialize_recurring_sessions.py
+    python materialize_recurring_sessions.py --horizon-days 90
+
+It is safe to re-run.
+"""
+
+from app_factory import create_app
+from utils.recurrence import horizon_end, materialize_pending
+import argparse
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Extend recurring sessions to the rolling horizon')
+    parser.add_argument('--horizon-days', type=int, help='Days ahead to materialise (default: RECURRING_HORIZON_DAYS)')
+    return parser.parse_args(argv)
+
+
+def run(horizon_days=None):
+    """Run the materialiser"""
+    app = create_app()
+
+    with app.app_context():
+        until = horizon_end(days=horizon_days)
+        print(f"Materialising recurring sessions up to {until.date()}...")
+        try:
+            started = time.perf_counter()
+            stats = materialize_pending(until)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"✗ Error materialising recurring sessions: {e}")
+            return False
+
+        print(f"✓ {stats['sessions_created']} sessions for {stats['templates']} templates in {elapsed:.2f}s")
+        if stats['conflicts']:
+            print(f"! {stats['conflicts']} occurrences skipped because of booking conflicts")
+        if stats['failed']:
+            print(f"✗ {stats['failed']} templates failed (see the application log)")
+            return False
+        return True
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    success = run(args.horizon_days)
+    sys.exit(0 if success else 1)
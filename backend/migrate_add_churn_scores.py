@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script for client churn scores
+
+Creates the client_churn_scores snapshot filled by score_client_churn.py.
+Until the first scoring run the churn APIs score clients on request.
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db, ClientChurnScore
+from sqlalchemy import inspect
+import sys
+
+
+def create_churn_scores_table():
+    """Create client_churn_scores if it is missing"""
+    if inspect(db.engine).has_table(ClientChurnScore.__tablename__):
+        print("! Table client_churn_scores already exists")
+        return True
+
+    try:
+        ClientChurnScore.__table__.create(db.engine)
+        print("✓ Created table client_churn_scores")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating client_churn_scores: {e}")
+        return False
+
+
+def migrate():
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing client churn scores...")
+        if not create_churn_scores_table():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script for revenue forecasting models
+
+Creates the revenue_forecast_models table. Models are fitted on the first
+forecast request for a segment, or by fit_revenue_forecasts.py.
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db, RevenueForecastModel
+from sqlalchemy import inspect
+import sys
+
+
+def create_forecast_models_table():
+    """Create revenue_forecast_models if it is missing"""
+    if inspect(db.engine).has_table(RevenueForecastModel.__tablename__):
+        print("! Table revenue_forecast_models already exists")
+        return True
+
+    try:
+        RevenueForecastModel.__table__.create(db.engine)
+        print("✓ Created table revenue_forecast_models")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating revenue_forecast_models: {e}")
+        return False
+
+
+def migrate():
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing revenue forecasting models...")
+        if not create_forecast_models_table():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Database migration script to add composite indexes for hot query shapes
+
+Creates every index declared in the models' __table_args__ that is missing
+from the database (session conflict checks, calendar ranges, analytics
+scans, inbox listings, campaign progress). On PostgreSQL indexes are built
+CONCURRENTLY so writes are not blocked while they build.
+
+Usage:
+    python migrate_add_indexes.py              # create missing indexes
+    python migrate_add_indexes.py --benchmark  # also show plans/timings before and after
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db
+from sqlalchemy import inspect, text
+from datetime import datetime, timedelta
+import statistics
+import sys
+import time
+
+# Representative statements for the benchmark: (label, SQL, parameters)
+_now = datetime.utcnow()
+HOT_QUERIES = [
+    ('session conflict check', """
+        SELECT * FROM sessions
+        WHERE trainer_id = :trainer_id AND status != 'cancelled' AND session_date < :end
+        AND session_date >= :start
+    """, {'trainer_id': 1, 'start': _now - timedelta(days=1), 'end': _now + timedelta(days=1)}),
+    ('client calendar range', """
+        SELECT * FROM sessions
+        WHERE client_id = :client_id AND session_date BETWEEN :start AND :end
+        ORDER BY session_date
+    """, {'client_id': 1, 'start': _now - timedelta(days=30), 'end': _now + timedelta(days=30)}),
+    ('completed sessions in period', """
+        SELECT count(*) FROM sessions
+        WHERE status = 'completed' AND session_date >= :start
+    """, {'start': _now - timedelta(days=30)}),
+    ('revenue in period', """
+        SELECT coalesce(sum(amount), 0) FROM payments
+        WHERE status = 'completed' AND payment_date >= :start
+    """, {'start': _now - timedelta(days=30)}),
+    ('client payment history', """
+        SELECT * FROM payments WHERE client_id = :client_id AND status = 'completed'
+    """, {'client_id': 1}),
+    ('trainer inbox', """
+        SELECT * FROM message_threads
+        WHERE trainer_id = :trainer_id AND archived_by_trainer = false
+        ORDER BY last_message_at DESC
+    """, {'trainer_id': 1}),
+    ('campaign progress', """
+        SELECT status, count(*) FROM campaign_recipients
+        WHERE campaign_id = :campaign_id GROUP BY status
+    """, {'campaign_id': 1}),
+]
+
+BENCHMARK_RUNS = 20
+
+
+def get_declared_indexes():
+    """Get (table, index) pairs declared on the models"""
+    declared = []
+    for table in db.metadata.sorted_tables:
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            declared.append((table, index))
+    return declared
+
+
+def get_missing_indexes():
+    """Get declared indexes that don't exist in the database yet"""
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for table, index in get_declared_indexes():
+        if table.name not in existing_tables:
+            continue
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        if index.name not in existing:
+            missing.append((table, index))
+    return missing
+
+
+def create_index(table, index):
+    """Create a single index"""
+    is_postgres = db.engine.dialect.name == 'postgresql'
+    columns = ', '.join(column.name for column in index.columns)
+    unique = 'UNIQUE ' if index.unique else ''
+    concurrently = 'CONCURRENTLY ' if is_postgres else ''
+    statement = f"CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON {table.name} ({columns})"
+
+    try:
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(statement))
+        print(f"✓ Created index {index.name} on {table.name} ({columns})")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating index {index.name}: {e}")
+        return False
+
+
+def analyze_tables(tables):
+    """Refresh planner statistics so new indexes are considered"""
+    try:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            for table in tables:
+                conn.execute(text(f"ANALYZE {table}"))
+    except Exception as e:
+        print(f"! Could not analyze tables: {e}")
+
+
+def explain_query(sql, params):
+    """Get the plan and median execution time for a statement"""
+    is_postgres = db.engine.dialect.name == 'postgresql'
+    explain = 'EXPLAIN (ANALYZE, BUFFERS)' if is_postgres else 'EXPLAIN QUERY PLAN'
+
+    with db.engine.connect() as conn:
+        try:
+            rows = conn.execute(text(f"{explain} {sql}"), params).fetchall()
+        except Exception as e:
+            conn.rollback()
+            return [f"(plan unavailable: {e})"], None
+
+        timings = []
+        for _ in range(BENCHMARK_RUNS):
+            start = time.perf_counter()
+            conn.execute(text(sql), params).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+
+    plan = [' | '.join(str(col) for col in row) if len(row) > 1 else str(row[0]) for row in rows]
+    return plan, statistics.median(timings)
+
+
+def run_benchmark():
+    """Capture plans and timings for all hot queries"""
+    return {label: explain_query(sql, params) for label, sql, params in HOT_QUERIES}
+
+
+def print_benchmark(before, after):
+    """Print plans and timings side by side"""
+    for label, _, _ in HOT_QUERIES:
+        print(f"\n=== {label} ===")
+        for title, results in (('before', before), ('after', after)):
+            if results is None:
+                continue
+            plan, median_ms = results[label]
+            timing = f"{median_ms:.2f}ms median of {BENCHMARK_RUNS}" if median_ms is not None else "n/a"
+            print(f"--- {title} ({timing})")
+            for line in plan:
+                print(f"    {line}")
+
+
+def migrate(benchmark=False):
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Checking for missing indexes...")
+        missing = get_missing_indexes()
+
+        before = run_benchmark() if benchmark else None
+
+        if not missing:
+            print("! All declared indexes already exist")
+            print("! Migration not needed or already completed")
+        else:
+            print(f"\nCreating {len(missing)} indexes...")
+            results = [create_index(table, index) for table, index in missing]
+            if not all(results):
+                return False
+            analyze_tables(sorted({table.name for table, _ in missing}))
+
+        if benchmark:
+            print_benchmark(before if missing else None, run_benchmark())
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate(benchmark='--benchmark' in sys.argv)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script for background report jobs
+
+Creates the report_jobs table, which holds submitted report specs, their
+status and their stored results.
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db, ReportJob
+from sqlalchemy import inspect
+import sys
+
+
+def create_report_jobs_table():
+    """Create report_jobs if it is missing"""
+    if inspect(db.engine).has_table(ReportJob.__tablename__):
+        print("! Table report_jobs already exists")
+        return True
+
+    try:
+        ReportJob.__table__.create(db.engine)
+        print("✓ Created table report_jobs")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating report_jobs: {e}")
+        return False
+
+
+def migrate():
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing report jobs...")
+        if not create_report_jobs_table():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Database migration script for trainer working hours
+
+Creates the trainer_working_hours table read by the availability search.
+Until a trainer has working hours, AVAILABILITY_DEFAULT_HOURS apply.
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db, TrainerWorkingHours
+from sqlalchemy import inspect
+import sys
+
+
+def create_working_hours_table():
+    """Create trainer_working_hours if it is missing"""
+    if inspect(db.engine).has_table(TrainerWorkingHours.__tablename__):
+        print("! Table trainer_working_hours already exists")
+        return True
+
+    try:
+        TrainerWorkingHours.__table__.create(db.engine)
+        print("✓ Created table trainer_working_hours")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating trainer_working_hours: {e}")
+        return False
+
+
+def migrate():
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing trainer working hours...")
+        if not create_working_hours_table():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
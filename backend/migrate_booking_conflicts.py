@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Database migration script for the booking conflict engine
+
+Fills in end_time for sessions that were stored without one, creates the
+ix_sessions_trainer_end index used by conflict checks and, on PostgreSQL
+with --exclusion-constraint, adds an exclusion constraint so overlapping
+non-cancelled sessions for a trainer are rejected by the database itself.
+
+Usage:
+    python migrate_booking_conflicts.py
+    python migrate_booking_conflicts.py --exclusion-constraint
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db
+from sqlalchemy import inspect, text
+from utils.booking_conflicts import OVERLAP_CONSTRAINT
+import sys
+
+
+def backfill_end_times():
+    """Set end_time = session_date + duration where it is missing"""
+    if db.engine.dialect.name == 'postgresql':
+        statement = """
+            UPDATE sessions
+            SET end_time = session_date + make_interval(mins => duration)
+            WHERE end_time IS NULL AND duration IS NOT NULL AND duration > 0
+        """
+    else:
+        statement = """
+            UPDATE sessions
+            SET end_time = datetime(session_date, '+' || duration || ' minutes')
+            WHERE end_time IS NULL AND duration IS NOT NULL AND duration > 0
+        """
+    try:
+        result = db.session.execute(text(statement))
+        db.session.commit()
+        print(f"✓ Filled in end_time for {result.rowcount} sessions")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"✗ Error filling in end_time: {e}")
+        return False
+
+
+def create_end_time_index():
+    """Create ix_sessions_trainer_end if it is missing"""
+    existing = {ix['name'] for ix in inspect(db.engine).get_indexes('sessions')}
+    if 'ix_sessions_trainer_end' in existing:
+        print("! Index ix_sessions_trainer_end already exists")
+        return True
+
+    concurrently = 'CONCURRENTLY ' if db.engine.dialect.name == 'postgresql' else ''
+    try:
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS ix_sessions_trainer_end ON sessions (trainer_id, end_time)"
+            ))
+        print("✓ Created index ix_sessions_trainer_end on sessions (trainer_id, end_time)")
+        return True
+    except Exception as e:
+        print(f"✗ Error creating index ix_sessions_trainer_end: {e}")
+        return False
+
+
+def find_existing_overlaps(limit=20):
+    """List overlapping non-cancelled session pairs that would block the constraint"""
+    return db.session.execute(text("""
+        SELECT a.trainer_id, a.id, b.id
+        FROM sessions a
+        JOIN sessions b ON a.trainer_id = b.trainer_id AND a.id < b.id
+        WHERE a.status != 'cancelled' AND b.status != 'cancelled'
+          AND a.end_time IS NOT NULL AND b.end_time IS NOT NULL
+          AND a.session_date < b.end_time AND b.session_date < a.end_time
+        LIMIT :limit
+    """), {'limit': limit}).fetchall()
+
+
+def add_exclusion_constraint():
+    """Add the PostgreSQL exclusion constraint on trainer and time range"""
+    if db.engine.dialect.name != 'postgresql':
+        print("! Exclusion constraints need PostgreSQL; relying on row locks instead")
+        return True
+
+    exists = db.session.execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name"), {'name': OVERLAP_CONSTRAINT}
+    ).first()
+    if exists:
+        print(f"! Constraint {OVERLAP_CONSTRAINT} already exists")
+        return True
+
+    overlaps = find_existing_overlaps()
+    if overlaps:
+        print(f"✗ Existing overlapping sessions must be resolved first (showing up to {len(overlaps)}):")
+        for trainer_id, first_id, second_id in overlaps:
+            print(f"  - trainer {trainer_id}: sessions {first_id} and {second_id}")
+        return False
+
+    try:
+        db.session.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+        db.session.execute(text(f"""
+            ALTER TABLE sessions ADD CONSTRAINT {OVERLAP_CONSTRAINT}
+            EXCLUDE USING gist (trainer_id WITH =, tsrange(session_date, end_time) WITH &&)
+            WHERE (status != 'cancelled' AND end_time IS NOT NULL)
+        """))
+        db.session.commit()
+        print(f"✓ Added exclusion constraint {OVERLAP_CONSTRAINT}")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"✗ Error adding exclusion constraint: {e}")
+        return False
+
+
+def migrate(exclusion_constraint=False):
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing sessions for conflict checks...")
+        if not backfill_end_times() or not create_end_time_index():
+            return False
+
+        if exclusion_constraint and not add_exclusion_constraint():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate(exclusion_constraint='--exclusion-constraint' in sys.argv)
+    sys.exit(0 if success else 1)
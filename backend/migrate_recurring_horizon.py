@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Database migration script for rolling-horizon recurring sessions
+
+Adds the recurring_sessions.materialized_until high-water mark and sets it
+for existing templates to where they were generated up to when they were
+created (their end_date, or 90 days after their start), so the nightly
+materialiser carries on from there without duplicating sessions.
+
+Run this script once to update existing databases. It is safe to re-run.
+"""
+
+from app_factory import create_app
+from models.database import db
+from sqlalchemy import inspect, text
+import sys
+
+
+def add_materialized_until_column():
+    """Add recurring_sessions.materialized_until if it is missing"""
+    columns = {column['name'] for column in inspect(db.engine).get_columns('recurring_sessions')}
+    if 'materialized_until' in columns:
+        print("! Column materialized_until already exists")
+        return True
+
+    column_type = 'TIMESTAMP' if db.engine.dialect.name == 'postgresql' else 'DATETIME'
+    try:
+        db.session.execute(text(f"ALTER TABLE recurring_sessions ADD COLUMN materialized_until {column_type}"))
+        db.session.commit()
+        print("✓ Added materialized_until column to recurring_sessions")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"✗ Error adding materialized_until column: {e}")
+        return False
+
+
+def backfill_materialized_until():
+    """Set the mark for templates generated with the old 90 day window"""
+    if db.engine.dialect.name == 'postgresql':
+        generated_until = "COALESCE(end_date, start_date + INTERVAL '90 days')"
+    else:
+        generated_until = "COALESCE(end_date, datetime(start_date, '+90 days'))"
+    try:
+        result = db.session.execute(text(f"""
+            UPDATE recurring_sessions
+            SET materialized_until = {generated_until}
+            WHERE materialized_until IS NULL
+        """))
+        db.session.commit()
+        print(f"✓ Set materialized_until for {result.rowcount} recurring sessions")
+        return True
+    except Exception as e:
+        db.session.rollback()
+        print(f"✗ Error setting materialized_until: {e}")
+        return False
+
+
+def migrate():
+    """Run the migration"""
+    app = create_app()
+
+    with app.app_context():
+        print("Preparing recurring sessions for rolling-horizon materialisation...")
+        if not add_materialized_until_column() or not backfill_materialized_until():
+            return False
+
+        print("\n✓ Migration completed successfully!")
+        return True
+
+if __name__ == '__main__':
+    success = migrate()
+    sys.exit(0 if success else 1)
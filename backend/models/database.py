@@ -131,6 +131,10 @@ class Client(db.Model, BaseEntity):
 class Assignment(db.Model, BaseEntity):
     """Assignment model - links trainers and clients with EspoCRM-inspired structure"""
     __tablename__ = 'assignments'
+    __table_args__ = (
+        db.Index('ix_assignments_trainer_status', 'trainer_id', 'status'),
+        db.Index('ix_assignments_client_status', 'client_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     trainer_id = db.Column(db.Integer, db.ForeignKey('trainers.id'), nullable=False)
@@ -172,6 +176,16 @@ class Assignment(db.Model, BaseEntity):
 class Session(db.Model, BaseEntity):
     """Training session model with EspoCRM-inspired structure"""
     __tablename__ = 'sessions'
+    __table_args__ = (
+        db.Index('ix_sessions_date_id', 'session_date', 'id'),  # session list keyset pages
+        db.Index('ix_sessions_trainer_date', 'trainer_id', 'session_date'),
+        db.Index('ix_sessions_trainer_end', 'trainer_id', 'end_time'),  # booking conflict window
+        db.Index('ix_sessions_client_date', 'client_id', 'session_date'),
+        db.Index('ix_sessions_status_date', 'status', 'session_date'),
+        db.Index('ix_sessions_recurring', 'recurring_session_id'),
+        db.Index('ix_sessions_trainer_updated', 'trainer_id', 'updated_at'),  # iCal feed versions
+        db.Index('ix_sessions_client_updated', 'client_id', 'updated_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     trainer_id = db.Column(db.Integer, db.ForeignKey('trainers.id'), nullable=False)
@@ -249,6 +263,7 @@ class RecurringSession(db.Model):
     recurrence_days = db.Column(db.JSON)  # Days of week [0-6] for weekly patterns
     notes = db.Column(db.Text)
     active = db.Column(db.Boolean, default=True)
+    materialized_until = db.Column(db.DateTime)  # Sessions exist for occurrences up to here
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -272,10 +287,40 @@ class RecurringSession(db.Model):
             'recurrence_days': self.recurrence_days,
             'notes': self.notes,
             'active': self.active,
+            'materialized_until': self.materialized_until.isoformat() if self.materialized_until else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
+class TrainerWorkingHours(db.Model):
+    """Weekly working hours of a trainer, used for availability search"""
+    __tablename__ = 'trainer_working_hours'
+    __table_args__ = (
+        db.Index('ix_trainer_working_hours_trainer', 'trainer_id', 'weekday'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    trainer_id = db.Column(db.Integer, db.ForeignKey('trainers.id'), nullable=False)
+    weekday = db.Column(db.Integer, nullable=False)  # 0 = Monday
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    location = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    trainer = db.relationship('Trainer', backref=db.backref('working_hours', cascade='all, delete-orphan'))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'trainer_id': self.trainer_id,
+            'weekday': self.weekday,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'location': self.location,
+        }
+
 class ProgressRecord(db.Model):
     """Client progress tracking model"""
     __tablename__ = 'progress_records'
@@ -306,6 +351,10 @@ class ProgressRecord(db.Model):
 class Payment(db.Model):
     """Payment tracking model"""
     __tablename__ = 'payments'
+    __table_args__ = (
+        db.Index('ix_payments_status_date', 'status', 'payment_date'),
+        db.Index('ix_payments_client_status', 'client_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -475,6 +524,9 @@ class ActivityLog(db.Model):
 class Measurement(db.Model):
     """Client measurement tracking model"""
     __tablename__ = 'measurements'
+    __table_args__ = (
+        db.Index('ix_measurements_client_date', 'client_id', 'measurement_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -743,6 +795,9 @@ class ClientWorkout(db.Model):
 class WorkoutLog(db.Model):
     """Client workout completion logs"""
     __tablename__ = 'workout_logs'
+    __table_args__ = (
+        db.Index('ix_workout_logs_client_date', 'client_id', 'completed_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     client_id = db.Column(db.Integer, db.ForeignKey('clients.id'), nullable=False)
@@ -906,6 +961,10 @@ class GoalMilestone(db.Model):
 class MessageThread(db.Model):
     """Message thread/conversation between trainer and client"""
     __tablename__ = 'message_threads'
+    __table_args__ = (
+        db.Index('ix_message_threads_trainer_inbox', 'trainer_id', 'archived_by_trainer', 'last_message_at'),
+        db.Index('ix_message_threads_client_inbox', 'client_id', 'archived_by_client', 'last_message_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     trainer_id = db.Column(db.Integer, db.ForeignKey('trainers.id'), nullable=False)
@@ -956,6 +1015,9 @@ class MessageThread(db.Model):
 class Message(db.Model):
     """Individual message in a thread"""
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_thread_created', 'thread_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     thread_id = db.Column(db.Integer, db.ForeignKey('message_threads.id'), nullable=False)
@@ -1292,6 +1354,9 @@ class EmailCampaign(db.Model):
 class CampaignRecipient(db.Model):
     """Individual recipient in an email campaign"""
     __tablename__ = 'campaign_recipients'
+    __table_args__ = (
+        db.Index('ix_campaign_recipients_campaign_status', 'campaign_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     campaign_id = db.Column(db.Integer, db.ForeignKey('email_campaigns.id'), nullable=False)
@@ -1446,4 +1511,201 @@ class AutomationLog(db.Model):
             'failed_count': self.failed_count,
             'trigger_context': self.trigger_context,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-        }
\ No newline at end of file
+        }
+class AnalyticsDailyRollup(db.Model):
+    """
+    Daily analytics facts, maintained incrementally from sessions, payments and clients
+    
+    One row per day and scope: 'all' (whole business), 'trainer' and 'client'
+    (scope_key is the id), 'session_type' and 'payment_type' (scope_key is
+    the type). Status breakdowns are columns so a day/scope is a single row.
+    """
+    __tablename__ = 'analytics_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('day', 'scope', 'scope_key', name='uq_analytics_daily_rollups_day_scope'),
+        db.Index('ix_analytics_daily_rollups_scope_day', 'scope', 'scope_key', 'day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    scope = db.Column(db.String(20), nullable=False)  # all, trainer, client, session_type, payment_type, meta
+    scope_key = db.Column(db.String(100), nullable=False, default='')
+    
+    # Sessions by status (dated by session_date)
+    sessions_total = db.Column(db.Integer, nullable=False, default=0)
+    sessions_scheduled = db.Column(db.Integer, nullable=False, default=0)
+    sessions_completed = db.Column(db.Integer, nullable=False, default=0)
+    sessions_cancelled = db.Column(db.Integer, nullable=False, default=0)
+    sessions_no_show = db.Column(db.Integer, nullable=False, default=0)
+    completed_minutes = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Payments by status (dated by payment_date)
+    payments_completed = db.Column(db.Integer, nullable=False, default=0)
+    payments_pending = db.Column(db.Integer, nullable=False, default=0)
+    payments_refunded = db.Column(db.Integer, nullable=False, default=0)
+    payments_failed = db.Column(db.Integer, nullable=False, default=0)
+    revenue_completed = db.Column(db.Float, nullable=False, default=0)
+    revenue_pending = db.Column(db.Float, nullable=False, default=0)
+    revenue_refunded = db.Column(db.Float, nullable=False, default=0)
+    revenue_failed = db.Column(db.Float, nullable=False, default=0)
+    
+    # Client lifecycle
+    new_clients = db.Column(db.Integer, nullable=False, default=0)
+    churned_clients = db.Column(db.Integer, nullable=False, default=0)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'scope': self.scope,
+            'scope_key': self.scope_key,
+            'sessions_total': self.sessions_total,
+            'sessions_scheduled': self.sessions_scheduled,
+            'sessions_completed': self.sessions_completed,
+            'sessions_cancelled': self.sessions_cancelled,
+            'sessions_no_show': self.sessions_no_show,
+            'completed_minutes': self.completed_minutes,
+            'payments_completed': self.payments_completed,
+            'payments_pending': self.payments_pending,
+            'payments_refunded': self.payments_refunded,
+            'payments_failed': self.payments_failed,
+            'revenue_completed': self.revenue_completed,
+            'revenue_pending': self.revenue_pending,
+            'revenue_refunded': self.revenue_refunded,
+            'revenue_failed': self.revenue_failed,
+            'new_clients': self.new_clients,
+            'churned_clients': self.churned_clients,
+        }
+
+class ClientChurnScore(db.Model):
+    """
+    Latest churn score per client, replaced in full by each scoring run
+
+    Features are counts over the run's lookback window; the risk lists and
+    per-client predictions read these rows instead of scoring on request.
+    """
+    __tablename__ = 'client_churn_scores'
+    __table_args__ = (
+        db.Index('ix_client_churn_scores_probability', 'churn_probability'),
+    )
+    
+    client_id = db.Column(db.Integer, db.ForeignKey('clients.id', ondelete='CASCADE'), primary_key=True)
+    scored_at = db.Column(db.DateTime, nullable=False)
+    days_lookback = db.Column(db.Integer, nullable=False)
+    session_count = db.Column(db.Integer, nullable=False, default=0)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    session_frequency = db.Column(db.Float, nullable=False, default=0)  # sessions per week
+    payment_frequency = db.Column(db.Float, nullable=False, default=0)  # payments per month
+    churn_probability = db.Column(db.Float, nullable=False)
+    risk_level = db.Column(db.String(10), nullable=False)  # low, medium, high
+    
+    def to_dict(self):
+        return {
+            'client_id': self.client_id,
+            'churn_probability': self.churn_probability,
+            'risk_level': self.risk_level,
+            'session_frequency': self.session_frequency,
+            'payment_frequency': self.payment_frequency,
+            'session_count': self.session_count,
+            'payment_count': self.payment_count,
+            'days_lookback': self.days_lookback,
+            'scored_at': self.scored_at.isoformat() if self.scored_at else None,
+        }
+
+class RevenueForecastModel(db.Model):
+    """
+    Fitted revenue forecasting model per segment and period
+
+    One row per (segment, segment_key, period): 'all', 'membership_type' or
+    'payment_type' revenue by 'month' or 'week'. The smoothing parameters
+    are fitted on a full refit; the state (level, trend, seasonal) is rolled
+    forward as periods close, so forecasts never refit on request.
+    """
+    __tablename__ = 'revenue_forecast_models'
+    __table_args__ = (
+        db.UniqueConstraint('segment', 'segment_key', 'period', name='uq_revenue_forecast_models_segment_period'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    segment = db.Column(db.String(30), nullable=False)  # all, membership_type, payment_type
+    segment_key = db.Column(db.String(100), nullable=False, default='')
+    period = db.Column(db.String(10), nullable=False)  # month, week
+    method = db.Column(db.String(20), nullable=False)  # holt_winters, holt, mean
+    
+    # Smoothing parameters (fitted) and state after trained_through
+    alpha = db.Column(db.Float, nullable=False)
+    beta = db.Column(db.Float, nullable=False, default=0)
+    gamma = db.Column(db.Float, nullable=False, default=0)
+    level = db.Column(db.Float, nullable=False)
+    trend = db.Column(db.Float, nullable=False, default=0)
+    seasonal = db.Column(db.JSON)  # season_length offsets, indexed by observation number
+    season_length = db.Column(db.Integer, nullable=False)
+    
+    # Training history
+    observations = db.Column(db.Integer, nullable=False)
+    sse = db.Column(db.Float, nullable=False, default=0)  # one-step-ahead squared errors
+    first_period = db.Column(db.Date, nullable=False)
+    trained_through = db.Column(db.Date, nullable=False)  # start of the last closed period used
+    history_total = db.Column(db.Float, nullable=False, default=0)  # revenue up to trained_through
+    fitted_at = db.Column(db.DateTime, nullable=False)  # last full refit
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'segment': self.segment,
+            'segment_key': self.segment_key,
+            'period': self.period,
+            'method': self.method,
+            'alpha': self.alpha,
+            'beta': self.beta,
+            'gamma': self.gamma,
+            'season_length': self.season_length,
+            'observations': self.observations,
+            'first_period': self.first_period.isoformat() if self.first_period else None,
+            'trained_through': self.trained_through.isoformat() if self.trained_through else None,
+            'fitted_at': self.fitted_at.isoformat() if self.fitted_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class ReportJob(db.Model):
+    """
+    Asynchronous custom report run and its stored result
+
+    Jobs are keyed by a hash of the report spec: a completed job is served
+    to identical specs until expires_at, and a queued or running one is
+    shared rather than started twice. Rows live in the database so any
+    worker can answer a poll.
+    """
+    __tablename__ = 'report_jobs'
+    __table_args__ = (
+        db.Index('ix_report_jobs_spec_hash_status', 'spec_hash', 'status'),
+        db.Index('ix_report_jobs_expires_at', 'expires_at'),
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    spec_hash = db.Column(db.String(64), nullable=False)
+    spec = db.Column(db.JSON, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime)  # result (or failure) is dropped after this
+    
+    def to_dict(self, include_result=True):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'spec': self.spec,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
+        }
+        if include_result and self.status == 'completed':
+            data['result'] = self.result
+        return data
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Backfill or rebuild the daily analytics rollups
+
+Recomputes analytics_daily_rollups from sessions, payments and clients with
+set-based INSERT ... SELECT statements. Run it once after deploying, and
+again after imports or other writes that bypass the ORM. Until the first
+rebuild the analytics endpoints keep reading the raw tables.
+
+Usage:
+    python rebuild_analytics_rollups.py                                    # all history
+    python rebuild_analytics_rollups.py --start 2026-01-01 --end 2026-01-31
+
+It is safe to re-run.
+"""
+
+from app_factory import create_app
+from utils.analytics_rollup import analytics_rollup
+from datetime import date
+import argparse
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Rebuild the daily analytics rollups')
+    parser.add_argument('--start', type=date.fromisoformat, help='First day to rebuild (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, help='Last day to rebuild (YYYY-MM-DD)')
+    return parser.parse_args(argv)
+
+
+def rebuild(start=None, end=None):
+    """Run the rebuild"""
+    app = create_app()
+
+    with app.app_context():
+        scope = f"{start or 'beginning'} to {end or 'today'}"
+        print(f"Rebuilding analytics rollups ({scope})...")
+        try:
+            started = time.perf_counter()
+            rows = analytics_rollup.rebuild(start, end)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"✗ Error rebuilding analytics rollups: {e}")
+            return False
+
+        print(f"✓ {rows} rollup rows in {elapsed:.2f}s")
+        return True
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    success = rebuild(args.start, args.end)
+    sys.exit(0 if success else 1)
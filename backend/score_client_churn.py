@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Score churn risk for every active client
+
+Replaces the client_churn_scores snapshot read by the churn prediction
+APIs. Features come from two grouped queries over sessions and payments,
+so a run costs the same number of queries for 100 or 100k clients. Run it
+nightly:
+
+    30 3 * * * cd /path/to/FitnessCRM/backend && python score_client_churn.py
+
+Usage:
+    python score_client_churn.py
+    python score_client_churn.py --days-lookback 60
+
+It is safe to re-run.
+"""
+
+from app_factory import create_app
+from utils.churn_scoring import refresh_snapshot, DEFAULT_LOOKBACK_DAYS
+import argparse
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Score churn risk for every active client')
+    parser.add_argument('--days-lookback', type=int, default=DEFAULT_LOOKBACK_DAYS,
+                        help=f'Days of activity to score (default: {DEFAULT_LOOKBACK_DAYS})')
+    return parser.parse_args(argv)
+
+
+def run(days_lookback=DEFAULT_LOOKBACK_DAYS):
+    """Run the scoring"""
+    app = create_app()
+
+    with app.app_context():
+        print(f"Scoring churn over the last {days_lookback} days...")
+        try:
+            started = time.perf_counter()
+            stats = refresh_snapshot(days_lookback)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f"✗ Error scoring churn: {e}")
+            return False
+
+        print(f"✓ {stats['clients']} clients scored in {elapsed:.2f}s "
+              f"({stats['high']} high, {stats['medium']} medium, {stats['low']} low risk)")
+        return True
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    success = run(args.days_lookback)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,91 @@
+"""
+Unit tests for the analytics response cache.
+"""
+
+import threading
+import time
+import pytest
+from flask import jsonify, request
+from models.database import db, Client
+from utils.analytics_cache import analytics_cache
+
+
+@pytest.fixture
+def cache_app(sqlite_app):
+    """Flask app with cached views that count how often they run."""
+    app = sqlite_app(ANALYTICS_CACHE=True, ANALYTICS_CACHE_TTL=60)
+    analytics_cache.init_app(app)
+    analytics_cache.reset_stats()
+    app.calls = 0
+
+    @app.route('/summary')
+    @analytics_cache.cached
+    def summary():
+        app.calls += 1
+        time.sleep(float(request.args.get('delay', 0)))
+        return jsonify({'clients': Client.query.count()}), 200
+
+    @app.route('/broken')
+    @analytics_cache.cached
+    def broken():
+        app.calls += 1
+        return jsonify({'error': 'boom'}), 500
+
+    return app
+
+
+class TestAnalyticsCache:
+    """Test caching, invalidation and coalescing."""
+
+    @pytest.mark.unit
+    def test_repeat_request_served_from_cache(self, cache_app):
+        """Test identical requests (in any argument order) compute once."""
+        client = cache_app.test_client()
+        first = client.get('/summary?a=1&b=2')
+        second = client.get('/summary?b=2&a=1')
+
+        assert first.headers['X-Cache'] == 'MISS'
+        assert second.headers['X-Cache'] == 'HIT'
+        assert second.get_json() == first.get_json()
+        assert cache_app.calls == 1
+
+    @pytest.mark.unit
+    def test_commit_invalidates(self, cache_app):
+        """Test committing a client drops cached responses."""
+        client = cache_app.test_client()
+        assert client.get('/summary').get_json() == {'clients': 0}
+
+        db.session.add(Client(name='Ana', email='ana@example.com'))
+        db.session.commit()
+
+        response = client.get('/summary')
+        assert response.headers['X-Cache'] == 'MISS'
+        assert response.get_json() == {'clients': 1}
+        assert analytics_cache.get_stats()['invalidations'] == 1
+
+    @pytest.mark.unit
+    def test_errors_not_cached(self, cache_app):
+        """Test failed responses are computed again."""
+        client = cache_app.test_client()
+        client.get('/broken')
+        client.get('/broken')
+        assert cache_app.calls == 2
+
+    @pytest.mark.unit
+    def test_concurrent_requests_coalesced(self, cache_app):
+        """Test simultaneous identical requests share one computation."""
+        statuses = []
+
+        def fetch():
+            with cache_app.app_context():
+                statuses.append(cache_app.test_client().get('/summary?delay=0.2').status_code)
+
+        threads = [threading.Thread(target=fetch) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert statuses == [200] * 5
+        assert cache_app.calls == 1
+        assert analytics_cache.get_stats()['coalesced'] == 4
@@ -0,0 +1,170 @@
+"""
+Unit tests for the daily analytics rollups.
+"""
+
+import pytest
+from datetime import datetime, date
+from sqlalchemy import insert
+from models.database import db, AnalyticsDailyRollup, Client, Trainer, Session, Payment
+from utils.analytics_rollup import (
+    analytics_rollup, session_contributions, payment_contributions, METRIC_COLUMNS
+)
+
+
+@pytest.fixture
+def rollup_app(sqlite_app):
+    """Flask app on a SQLite file with rollups tracking ORM writes."""
+    app = sqlite_app(ANALYTICS_ROLLUPS=True)
+    analytics_rollup.init_app(app)
+    analytics_rollup._ready = False
+    analytics_rollup._ready_checked_at = 0.0
+    analytics_rollup._table_exists = False
+    return app
+
+
+def snapshot():
+    """Non-zero rollup rows keyed by (day, scope, scope_key), churn excluded."""
+    rows = {}
+    for row in AnalyticsDailyRollup.query.filter(AnalyticsDailyRollup.scope != 'meta').all():
+        metrics = {m: round(getattr(row, m), 2) for m in METRIC_COLUMNS if m != 'churned_clients'}
+        if any(metrics.values()):
+            rows[(str(row.day), row.scope, row.scope_key)] = metrics
+    return rows
+
+
+class TestContributions:
+    """Test the per-row rollup contributions."""
+
+    @pytest.mark.unit
+    def test_completed_session(self):
+        """Test a completed session counts in every scope with its minutes."""
+        contributions = session_contributions({
+            'session_date': datetime(2026, 3, 4, 9, 30), 'status': 'completed', 'duration': 45,
+            'trainer_id': 2, 'client_id': 7, 'session_type': None,
+        })
+        assert [(c[1], c[2]) for c in contributions] == [
+            ('all', ''), ('trainer', '2'), ('client', '7'), ('session_type', '')
+        ]
+        assert contributions[0][0] == date(2026, 3, 4)
+        assert contributions[0][3] == {'sessions_total': 1, 'sessions_completed': 1, 'completed_minutes': 45}
+
+    @pytest.mark.unit
+    def test_unknown_payment_status_ignored(self):
+        """Test payments outside the tracked statuses contribute nothing."""
+        assert payment_contributions({
+            'payment_date': datetime(2026, 3, 4), 'status': 'disputed', 'amount': 10,
+            'client_id': 1, 'payment_type': 'card',
+        }) == []
+
+
+class TestRollupMaintenance:
+    """Test incremental maintenance against a full rebuild."""
+
+    @pytest.mark.unit
+    def test_raw_source_bypasses_rollups(self, rollup_app):
+        """Test rollups are used once built, unless raw is requested."""
+        assert analytics_rollup.use_rollups() is False
+        analytics_rollup.rebuild()
+        assert analytics_rollup.use_rollups() is True
+        assert analytics_rollup.use_rollups('raw') is False
+
+    @pytest.mark.unit
+    def test_writes_kept_while_readiness_stale(self, rollup_app):
+        """Test writes are maintained while a worker still caches rollups as unbuilt."""
+        assert analytics_rollup.is_ready() is False
+        analytics_rollup.rebuild()
+        # Another worker ran the rebuild; this one hasn't re-checked yet
+        analytics_rollup._ready = False
+
+        client = Client(name='Ana', email='ana@example.com', created_at=datetime(2026, 1, 1))
+        db.session.add(client)
+        db.session.commit()
+        assert analytics_rollup.is_ready() is False
+
+        incremental = snapshot()
+        assert incremental[('2026-01-01', 'all', '')]['new_clients'] == 1
+        analytics_rollup.rebuild()
+        assert snapshot() == incremental
+
+    @pytest.mark.unit
+    def test_incremental_matches_rebuild(self, rollup_app):
+        """Test inserts, updates and deletes keep rollups equal to a rebuild."""
+        analytics_rollup.rebuild()
+
+        trainer = Trainer(name='Sam', email='sam@example.com')
+        clients = [
+            Client(name=f'Client {i}', email=f'c{i}@example.com', created_at=datetime(2026, 1, i + 1))
+            for i in range(3)
+        ]
+        db.session.add_all([trainer] + clients)
+        db.session.flush()
+        sessions = [
+            Session(trainer_id=trainer.id, client_id=clients[i % 3].id, session_date=datetime(2026, 2, 1 + i, 10),
+                    duration=60, status='scheduled', session_type='personal')
+            for i in range(6)
+        ]
+        payments = [
+            Payment(client_id=clients[i % 3].id, amount=50.0 + i, payment_date=datetime(2026, 2, 1 + i),
+                    status='completed', payment_type='card')
+            for i in range(4)
+        ]
+        db.session.add_all(sessions + payments)
+        db.session.commit()
+
+        # Updates after commit, when the instances have been expired
+        sessions[0].status = 'completed'
+        sessions[1].status = 'no-show'
+        sessions[2].session_date = datetime(2026, 3, 15, 8)
+        sessions[3].session_type = None
+        payments[0].amount = 80.0
+        payments[1].status = 'refunded'
+        db.session.delete(payments[2])
+        db.session.delete(sessions[5])
+        db.session.commit()
+
+        incremental = snapshot()
+        assert incremental[('2026-02-01', 'all', '')]['sessions_completed'] == 1
+        assert incremental[('2026-02-01', 'all', '')]['revenue_completed'] == 80.0
+
+        analytics_rollup.rebuild()
+        assert snapshot() == incremental
+
+    @pytest.mark.unit
+    def test_range_totals(self, rollup_app):
+        """Test totals cover whole days and include the end day."""
+        client = Client(name='Ana', email='ana@example.com', created_at=datetime(2026, 1, 1))
+        db.session.add(client)
+        db.session.flush()
+        db.session.add_all([
+            Payment(client_id=client.id, amount=20.0, payment_date=datetime(2026, 5, day, 18), status='completed')
+            for day in (1, 2, 3)
+        ])
+        db.session.commit()
+        analytics_rollup.rebuild()
+
+        totals = analytics_rollup.totals(datetime(2026, 5, 2, 12), datetime(2026, 5, 3))
+        assert totals['payments_completed'] == 2
+        assert totals['revenue_completed'] == 40.0
+        assert analytics_rollup.totals()['new_clients'] == 1
+
+    @pytest.mark.unit
+    def test_bulk_insert_and_delete_tracked(self, rollup_app):
+        """Test ORM bulk inserts and query deletes keep rollups equal to a rebuild."""
+        analytics_rollup.rebuild()
+        trainer = Trainer(name='Sam', email='sam@example.com')
+        client = Client(name='Ana', email='ana@example.com', created_at=datetime(2026, 1, 1))
+        db.session.add_all([trainer, client])
+        db.session.commit()
+
+        db.session.execute(insert(Session), [
+            {'trainer_id': trainer.id, 'client_id': client.id, 'session_date': datetime(2026, 4, day, 9),
+             'duration': 60}
+            for day in range(1, 11)
+        ])
+        Session.query.filter(Session.session_date >= datetime(2026, 4, 8)).delete()
+        db.session.commit()
+
+        incremental = snapshot()
+        assert incremental[('2026-04-01', 'all', '')]['sessions_scheduled'] == 1
+        analytics_rollup.rebuild()
+        assert snapshot() == incremental
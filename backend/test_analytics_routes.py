@@ -4,7 +4,8 @@ Unit tests for analytics API routes.
 
 import pytest
 from datetime import datetime
-from models.database import Client, Trainer, Session, Payment, Assignment
+from models.database import db, Client, Trainer, Session, Payment, Assignment
+from api.analytics_routes import analytics_bp
 
 
 class TestAnalyticsRoutes:
@@ -48,6 +49,54 @@ class TestAnalyticsRoutes:
         # Should return list of trainer performance data
         assert isinstance(data, list) or 'trainers' in data
     
+    @pytest.mark.api
+    def test_get_trainer_performance_sorted_and_limited(self, client):
+        """Test trainer performance accepts sort_by, order, limit and end_date."""
+        response = client.get(
+            '/api/analytics/trainers/performance'
+            '?sort_by=sessions_completed&order=asc&limit=1&end_date=2030-01-01T00:00:00'
+        )
+        assert response.status_code == 200
+        data = response.get_json()
+        
+        assert len(data['trainers']) <= 1
+        assert data['date_range']['end'] == '2030-01-01T00:00:00'
+    
+    @pytest.mark.api
+    def test_get_trainer_performance_invalid_sort(self, client):
+        """Test an unknown sort_by is rejected."""
+        response = client.get('/api/analytics/trainers/performance?sort_by=unknown')
+        assert response.status_code == 400
+    
+    @pytest.mark.unit
+    def test_date_only_end_covers_whole_day(self, sqlite_app):
+        """Test a date-only end_date includes sessions later on that day."""
+        client = sqlite_app(analytics_bp).test_client()
+        trainer = Trainer(name='Sam', email='sam@example.com', active=True)
+        member = Client(name='Ana', email='ana@example.com')
+        db.session.add_all([trainer, member])
+        db.session.flush()
+        db.session.add(Session(trainer_id=trainer.id, client_id=member.id, session_date=datetime(2026, 5, 3, 15),
+                               duration=60, status='completed'))
+        db.session.commit()
+
+        query = '?start_date=2026-05-01&end_date=2026-05-03'
+        performance = client.get('/api/analytics/trainers/performance' + query).get_json()
+        comparison = client.get('/api/analytics/trainers/comparison' + query).get_json()
+        assert performance['trainers'][0]['sessions_completed'] == 1
+        assert comparison['trainers'][0]['sessions'] == 1
+        assert performance['date_range']['end'].startswith('2026-05-03T23:59:59')
+    
+    @pytest.mark.api
+    def test_get_trainer_comparison(self, client):
+        """Test GET /api/analytics/trainers/comparison returns trainers and averages."""
+        response = client.get('/api/analytics/trainers/comparison?limit=5')
+        assert response.status_code == 200
+        data = response.get_json()
+        
+        assert 'trainers' in data
+        assert set(data['averages']) == {'sessions', 'clients', 'revenue'}
+    
     @pytest.mark.api
     def test_get_trainer_performance_by_id(self, client, db_session, sample_trainer):
         """Test GET /api/analytics/trainers/performance/<id> returns specific trainer metrics."""
@@ -0,0 +1,112 @@
+"""
+Unit tests for the trainer availability engine.
+"""
+
+import pytest
+from datetime import datetime, time, timedelta
+from models.database import db, Client, Trainer, Session, TrainerWorkingHours
+from api.availability_routes import availability_bp
+from utils.availability import availability_index, trainer_candidates
+from utils.query_instrumentation import capture_queries
+
+# Tuesday
+DAY = datetime(2026, 10, 20)
+
+
+@pytest.fixture
+def availability_app(sqlite_app):
+    """Flask app on a SQLite file with two trainers and the availability cache."""
+    app = sqlite_app(availability_bp, AVAILABILITY_SLOT_MINUTES=15, AVAILABILITY_DEFAULT_HOURS='06:00-21:00')
+    availability_index.init_app(app)
+    gym = Trainer(name='Sam', email='sam@example.com', specialization='Strength')
+    anyhours = Trainer(name='Kim', email='kim@example.com', specialization='Yoga')
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add_all([gym, anyhours, client])
+    db.session.flush()
+    db.session.add_all([
+        TrainerWorkingHours(trainer_id=gym.id, weekday=1, start_time=time(17, 0), end_time=time(21, 0),
+                            location='Main Gym'),
+        Session(trainer_id=gym.id, client_id=client.id, session_date=DAY + timedelta(hours=18),
+                end_time=DAY + timedelta(hours=18, minutes=30), duration=30),
+        Session(trainer_id=anyhours.id, client_id=client.id, session_date=DAY + timedelta(hours=18),
+                duration=60, status='cancelled'),
+    ])
+    db.session.commit()
+    app.ids = {'gym': gym.id, 'anyhours': anyhours.id, 'client': client.id}
+    return app
+
+
+def _starts(results, trainer_id):
+    for result in results:
+        if result['trainer_id'] == trainer_id:
+            return [slot['start'][11:16] for slot in result['slots']]
+    return []
+
+
+def _search(**kwargs):
+    options = {'step': 30, **kwargs}
+    return availability_index.search(trainer_candidates(), DAY + timedelta(hours=18), DAY + timedelta(hours=20),
+                                     options.pop('duration', 60), **options)
+
+
+class TestSearch:
+    """Test open-slot search."""
+
+    @pytest.mark.unit
+    def test_working_hours_and_bookings(self, availability_app):
+        """Test slots fit working hours, skip bookings and ignore cancelled sessions."""
+        results = _search()
+        ids = availability_app.ids
+
+        assert _starts(results, ids['gym']) == ['18:30', '19:00']
+        assert results[0]['slots'][0]['location'] == 'Main Gym'
+        assert _starts(results, ids['anyhours']) == ['18:00', '18:30', '19:00']
+
+    @pytest.mark.unit
+    def test_filters(self, availability_app):
+        """Test location and specialization filters narrow the trainers."""
+        ids = availability_app.ids
+        assert [t[0] for t in trainer_candidates(location='main gym')] == [ids['gym']]
+        assert [t[0] for t in trainer_candidates(specialization='yog')] == [ids['anyhours']]
+        assert _search(location='Main Gym', limit=1)[0]['slots'][0]['start'] == '2026-10-20T18:30:00'
+
+    @pytest.mark.unit
+    def test_overnight_booking_blocks_next_day(self, availability_app):
+        """Test a booking spanning midnight takes slots on both days."""
+        ids = availability_app.ids
+        db.session.add(Session(trainer_id=ids['anyhours'], client_id=ids['client'],
+                               session_date=DAY - timedelta(hours=1), duration=8 * 60))
+        db.session.commit()
+        results = availability_index.search(trainer_candidates(trainer_ids=[ids['anyhours']]),
+                                            DAY, DAY + timedelta(hours=9), 60)
+        assert _starts(results, ids['anyhours'])[0] == '07:00'
+
+    @pytest.mark.unit
+    def test_step_must_fit_slot_size(self, availability_app):
+        """Test the route rejects a step that isn't a whole number of slots."""
+        client = availability_app.test_client()
+        url = '/api/availability?start=2026-10-20T18:00:00&end=2026-10-20T20:00:00&step='
+        assert client.get(url + '20').status_code == 400
+        assert client.get(url + '30').status_code == 200
+
+
+class TestCache:
+    """Test per trainer-day caching and invalidation."""
+
+    @pytest.mark.unit
+    def test_cached_until_booking(self, availability_app):
+        """Test repeat searches skip the database until a booking lands on the day."""
+        ids = availability_app.ids
+        trainers = trainer_candidates()
+        _search()
+
+        with capture_queries() as stats:
+            availability_index.search(trainers, DAY + timedelta(hours=18), DAY + timedelta(hours=20), 60)
+        assert stats.count == 0
+
+        db.session.add(Session(trainer_id=ids['anyhours'], client_id=ids['client'],
+                               session_date=DAY + timedelta(hours=19), duration=60))
+        db.session.commit()
+        assert (ids['gym'], DAY.date()) in availability_index._entries
+        assert (ids['anyhours'], DAY.date()) not in availability_index._entries
+        assert _starts(_search(), ids['anyhours']) == ['18:00']
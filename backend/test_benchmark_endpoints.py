@@ -0,0 +1,51 @@
+"""
+Unit tests for the endpoint benchmark budget checks.
+"""
+
+import pytest
+from benchmark_endpoints import check_budget, percentile
+
+
+def _result(p95_ms=10.0, queries=5, status=200):
+    return {'status': status, 'p95_ms': p95_ms, 'queries': queries, 'peak_memory_kb': 100.0}
+
+
+class TestPercentile:
+    """Test nearest-rank percentiles."""
+
+    @pytest.mark.unit
+    def test_percentiles(self):
+        """Test p50 and p95 of a known series."""
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile([7.0], 99) == 7.0
+
+
+class TestBudget:
+    """Test regression budget enforcement."""
+
+    @pytest.mark.unit
+    def test_absolute_limits(self):
+        """Test per-endpoint absolute limits are enforced."""
+        budget = {'endpoints': {'analytics.dashboard': {'p95_ms': 50, 'max_queries': 10}}}
+        violations = check_budget({'analytics.dashboard': _result(p95_ms=80, queries=12)}, budget)
+        assert len(violations) == 2
+
+    @pytest.mark.unit
+    def test_regression_against_baseline(self):
+        """Test relative regressions against a baseline run."""
+        budget = {'default': {'p95_regression_pct': 25, 'query_regression': 0}}
+        baseline = {'results': {'sessions.week': _result(p95_ms=100, queries=5)}}
+
+        assert check_budget({'sessions.week': _result(p95_ms=120, queries=5)}, budget, baseline) == []
+        violations = check_budget({'sessions.week': _result(p95_ms=130, queries=6)}, budget, baseline)
+        assert len(violations) == 2
+
+    @pytest.mark.unit
+    def test_error_responses_fail(self):
+        """Test failing requests are reported, client errors included."""
+        assert check_budget({'reports.custom': _result(status=500)}, {}) != []
+        assert check_budget({'v2.sessions': _result(status=401)}, {}) != []
+        assert check_budget({'sessions.client_history': _result(status=404)}, {}) != []
+        assert check_budget({'exercises.list': _result(status=304)}, {}) == []
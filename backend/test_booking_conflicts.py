@@ -0,0 +1,139 @@
+"""
+Unit tests for the booking conflict engine.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models.database import db, Client, Trainer, Session
+from utils.booking_conflicts import BusyCalendar, find_conflicts, check_slots, parse_slot, overlap_query
+from utils.query_instrumentation import capture_queries
+
+DAY = datetime(2026, 3, 2)
+
+
+@pytest.fixture
+def booking_app(sqlite_app):
+    """Flask app on a SQLite file with one trainer's calendar."""
+    app = sqlite_app()
+    trainer = Trainer(name='Sam', email='sam@example.com')
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add_all([trainer, client])
+    db.session.flush()
+
+    def book(hour, minutes=60, status='scheduled', store_end=True):
+        start = DAY + timedelta(hours=hour)
+        session = Session(trainer_id=trainer.id, client_id=client.id, session_date=start, duration=minutes,
+                          end_time=start + timedelta(minutes=minutes) if store_end else None, status=status)
+        db.session.add(session)
+        return session
+
+    app.sessions = {
+        'nine': book(9),
+        'eleven_cancelled': book(11, status='cancelled'),
+        'legacy_two': book(14, minutes=90, store_end=False),
+        'history': Session(trainer_id=trainer.id, client_id=client.id, session_date=DAY - timedelta(days=400),
+                           duration=60, end_time=DAY - timedelta(days=400) + timedelta(hours=1)),
+    }
+    db.session.add(app.sessions['history'])
+    db.session.commit()
+    app.trainer_id = trainer.id
+    return app
+
+
+def _slot(hour, minutes=60):
+    start = DAY + timedelta(hours=hour)
+    return start, start + timedelta(minutes=minutes)
+
+
+class TestFindConflicts:
+    """Test single-slot conflict checks."""
+
+    @pytest.mark.unit
+    def test_overlap_found(self, booking_app):
+        """Test a slot overlapping a booking conflicts with it."""
+        conflicts = find_conflicts(booking_app.trainer_id, *_slot(9.5))
+        assert [s.id for s in conflicts] == [booking_app.sessions['nine'].id]
+
+    @pytest.mark.unit
+    def test_back_to_back_and_cancelled_allowed(self, booking_app):
+        """Test adjacent slots and cancelled sessions don't conflict."""
+        assert find_conflicts(booking_app.trainer_id, *_slot(10)) == []
+        assert find_conflicts(booking_app.trainer_id, *_slot(11)) == []
+
+    @pytest.mark.unit
+    def test_legacy_rows_without_end_time(self, booking_app):
+        """Test sessions stored without end_time use their duration."""
+        conflicts = find_conflicts(booking_app.trainer_id, *_slot(15))
+        assert [s.id for s in conflicts] == [booking_app.sessions['legacy_two'].id]
+        assert find_conflicts(booking_app.trainer_id, *_slot(15.5)) == []
+
+    @pytest.mark.unit
+    def test_query_bounded_by_indexes(self, booking_app):
+        """Test both branches of the conflict query use a bounded index range."""
+        query = overlap_query(booking_app.trainer_id, *_slot(9))
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = [str(row[-1]) for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+
+        assert any('ix_sessions_trainer_end (trainer_id=? AND end_time>? AND end_time<?)' in line for line in plan)
+        assert any('ix_sessions_trainer_date (trainer_id=? AND session_date>? AND session_date<?)' in line
+                   for line in plan)
+
+    @pytest.mark.unit
+    def test_rescheduled_session_ignores_itself(self, booking_app):
+        """Test a session being moved doesn't conflict with itself."""
+        nine = booking_app.sessions['nine']
+        assert find_conflicts(booking_app.trainer_id, *_slot(9.5), exclude_session_id=nine.id) == []
+
+
+class TestCheckSlots:
+    """Test batch slot validation."""
+
+    @pytest.mark.unit
+    def test_batch_results(self, booking_app):
+        """Test each slot is checked against bookings and the rest of the batch."""
+        results = check_slots(booking_app.trainer_id, [_slot(8.5), _slot(12), _slot(12.5), _slot(17)])
+
+        assert [r['available'] for r in results] == [False, False, False, True]
+        assert results[0]['conflicts'] == [booking_app.sessions['nine'].id]
+        assert results[1]['overlapping_slots'] == [2]
+        assert results[2]['overlapping_slots'] == [1]
+
+    @pytest.mark.unit
+    def test_single_query(self, booking_app):
+        """Test the batch loads the calendar once."""
+        with capture_queries() as stats:
+            check_slots(booking_app.trainer_id, [_slot(hour) for hour in range(6, 20)])
+        assert stats.count == 1
+
+
+class TestBusyCalendar:
+    """Test interval lookups."""
+
+    @pytest.mark.unit
+    def test_long_interval_found_behind_short_ones(self):
+        """Test a long booking is found even when shorter ones start after it."""
+        class Booking:
+            def __init__(self, id, start, minutes):
+                self.id = id
+                self.session_date = start
+                self.end_time = start + timedelta(minutes=minutes)
+
+            def get_end_time(self):
+                return self.end_time
+
+        calendar = BusyCalendar([
+            Booking(1, DAY, 8 * 60),
+            Booking(2, DAY + timedelta(hours=1), 30),
+            Booking(3, DAY + timedelta(hours=2), 30),
+        ])
+        assert calendar.overlapping(*_slot(5)) == [1]
+        assert calendar.overlapping(*_slot(8)) == []
+
+    @pytest.mark.unit
+    def test_parse_slot(self):
+        """Test slots accept a duration or an explicit end."""
+        assert parse_slot({'session_date': '2026-03-02T09:00:00', 'duration': 45}) == _slot(9, 45)
+        assert parse_slot({'start': '2026-03-02T09:00:00', 'end': '2026-03-02T10:00:00'}) == _slot(9)
+        with pytest.raises(ValueError):
+            parse_slot({'start': '2026-03-02T09:00:00', 'end': '2026-03-02T08:00:00'})
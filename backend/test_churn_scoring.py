@@ -0,0 +1,111 @@
+"""
+Unit tests for batch churn scoring.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from models.database import db, Client, Trainer, Session, Payment, ClientChurnScore
+from api.advanced_analytics_routes import advanced_analytics_bp
+from utils.churn_scoring import score, score_clients, refresh_snapshot, get_predictions
+from utils.analytics_service import get_predictive_insights
+from utils.query_instrumentation import capture_queries
+
+NOW = datetime(2026, 10, 17, 12, 0)
+
+
+@pytest.fixture
+def churn_app(sqlite_app):
+    """Flask app on a SQLite file with a regular, a lapsed and an inactive client."""
+    app = sqlite_app(advanced_analytics_bp)
+    trainer = Trainer(name='Sam', email='sam@example.com')
+    regular = Client(name='Ana', email='ana@example.com', status='active')
+    lapsed = Client(name='Bo', email='bo@example.com', status='active')
+    inactive = Client(name='Cy', email='cy@example.com', status='inactive')
+    db.session.add_all([trainer, regular, lapsed, inactive])
+    db.session.flush()
+    # Twice a week and paying monthly for 90 days
+    for week in range(13):
+        for day in (1, 4):
+            db.session.add(Session(trainer_id=trainer.id, client_id=regular.id,
+                                   session_date=NOW - timedelta(weeks=week, days=day)))
+    for month in range(3):
+        db.session.add(Payment(client_id=regular.id, amount=100, status='completed',
+                               payment_date=NOW - timedelta(days=30 * month + 1)))
+    # Only cancelled, future and long-past activity
+    db.session.add_all([
+        Session(trainer_id=trainer.id, client_id=lapsed.id, session_date=NOW - timedelta(days=3), status='cancelled'),
+        Session(trainer_id=trainer.id, client_id=lapsed.id, session_date=NOW + timedelta(days=3)),
+        Payment(client_id=lapsed.id, amount=100, status='completed', payment_date=NOW - timedelta(days=200)),
+    ])
+    db.session.commit()
+    app.ids = {'regular': regular.id, 'lapsed': lapsed.id, 'inactive': inactive.id}
+    return app
+
+
+class TestScore:
+    """Test the vectorised scoring rule."""
+
+    @pytest.mark.unit
+    def test_thresholds(self):
+        """Test frequencies map to the step probabilities and risk levels."""
+        scores = score([0, 10, 26], [0, 2, 3], days_lookback=90)
+        assert scores['churn_probability'].tolist() == [0.7, 0.35, 0.0]
+        assert scores['risk_level'].tolist() == ['high', 'medium', 'low']
+
+
+class TestScoreClients:
+    """Test feature collection and the snapshot."""
+
+    @pytest.mark.unit
+    def test_features_from_two_grouped_queries(self, churn_app):
+        """Test active clients are scored deterministically in two statements."""
+        ids = churn_app.ids
+        with capture_queries() as stats:
+            rows = {row['client_id']: row for row in score_clients(now=NOW)}
+        assert stats.count == 2
+
+        assert set(rows) == {ids['regular'], ids['lapsed']}
+        assert rows[ids['regular']]['session_count'] == 26
+        assert rows[ids['regular']]['payment_count'] == 3
+        assert rows[ids['regular']]['risk_level'] == 'low'
+        assert rows[ids['lapsed']]['session_count'] == 0
+        assert rows[ids['lapsed']]['churn_probability'] == 0.7
+        assert score_clients(now=NOW) == list(rows.values())
+
+    @pytest.mark.unit
+    def test_snapshot_replaced_and_read(self, churn_app):
+        """Test a refresh replaces the snapshot and predictions read from it."""
+        ids = churn_app.ids
+        assert refresh_snapshot(now=NOW) == {'clients': 2, 'high': 1, 'medium': 0, 'low': 1}
+        assert refresh_snapshot(now=NOW)['clients'] == ClientChurnScore.query.count() == 2
+
+        predictions = get_predictions([ids['lapsed'], ids['inactive'], 999])
+        assert predictions[ids['lapsed']]['source'] == 'snapshot'
+        assert predictions[ids['lapsed']]['factors'] == ['Low session attendance', 'Irregular payments']
+        assert predictions[ids['inactive']]['source'] == 'live'
+        assert 999 not in predictions
+
+    @pytest.mark.unit
+    def test_at_risk_list(self, churn_app):
+        """Test the at-risk endpoint lists snapshot rows by probability."""
+        refresh_snapshot(now=NOW)
+        response = churn_app.test_client().get('/api/analytics/advanced/churn-prediction/at-risk')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert [client['client_name'] for client in data['clients']] == ['Bo']
+        assert data['pagination']['total'] == 1
+
+    @pytest.mark.unit
+    def test_insights_use_snapshot_for_matching_lookback(self, churn_app):
+        """Test predictive insights only read a snapshot scored over the requested lookback."""
+        refresh_snapshot(now=NOW)
+        ClientChurnScore.query.filter_by(client_id=churn_app.ids['regular']).update(
+            {'risk_level': 'high', 'churn_probability': 0.99}
+        )
+        db.session.commit()
+
+        snapshot = get_predictive_insights(days_lookback=90)['insights']['at_risk_clients']
+        assert [client['client_name'] for client in snapshot] == ['Ana', 'Bo']
+        live = get_predictive_insights(days_lookback=30)['insights']['at_risk_clients']
+        assert 'Ana' not in [client['client_name'] for client in live]
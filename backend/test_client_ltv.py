@@ -0,0 +1,71 @@
+"""
+Unit tests for client lifetime value.
+"""
+
+import pytest
+from datetime import datetime
+from models.database import db, Client, Payment
+from api.analytics_routes import analytics_bp
+from utils.client_ltv import lifetime_value
+from utils.query_instrumentation import capture_queries
+
+NOW = datetime(2026, 3, 1)
+
+
+@pytest.fixture
+def ltv_app(sqlite_app):
+    """Flask app on a SQLite file with eight clients paying 0 to 700."""
+    app = sqlite_app(analytics_bp)
+    clients = [
+        Client(name=f'Client {i}', email=f'c{i}@example.com',
+               membership_type='annual' if i % 2 else None,
+               status='active' if i < 2 else 'inactive',
+               created_at=datetime(2026, 1, 30) if i == 0 else datetime(2026, 2, 19))
+        for i in range(8)
+    ]
+    db.session.add_all(clients)
+    db.session.flush()
+    for i, client in enumerate(clients):
+        if i:
+            db.session.add(Payment(client_id=client.id, amount=50 * i, payment_date=NOW, status='completed'))
+            db.session.add(Payment(client_id=client.id, amount=50 * i, payment_date=NOW, status='completed'))
+    db.session.add(Payment(client_id=clients[0].id, amount=1000, payment_date=NOW, status='failed'))
+    db.session.commit()
+    return app
+
+
+class TestLifetimeValue:
+    """Test the LTV aggregates."""
+
+    @pytest.mark.unit
+    def test_aggregates_in_sql(self, ltv_app):
+        """Test every metric comes from four queries without loading clients."""
+        with capture_queries() as stats:
+            ltv = lifetime_value(top=3, band_count=4, now=NOW)
+        assert stats.count == 4
+
+        assert ltv['total_clients'] == 8
+        assert ltv['total_revenue'] == 2800.0
+        assert ltv['average_ltv'] == 350.0
+        assert ltv['avg_lifespan_days'] == 20
+        assert ltv['ltv_percentiles'] == {'p25': 100.0, 'p50': 300.0, 'p75': 500.0, 'p90': 700.0}
+
+    @pytest.mark.unit
+    def test_top_bands_and_membership(self, ltv_app):
+        """Test top clients, quartile bands and per-membership averages."""
+        ltv = lifetime_value(top=3, band_count=4, now=NOW)
+        assert [c['lifetime_value'] for c in ltv['top_clients']] == [700.0, 600.0, 500.0]
+        assert [(b['client_count'], b['min_ltv'], b['max_ltv']) for b in ltv['ltv_bands']] == [
+            (2, 0.0, 100.0), (2, 200.0, 300.0), (2, 400.0, 500.0), (2, 600.0, 700.0)
+        ]
+        assert ltv['ltv_by_membership'] == [
+            {'membership_type': 'None', 'client_count': 4, 'average_ltv': 300.0},
+            {'membership_type': 'annual', 'client_count': 4, 'average_ltv': 400.0},
+        ]
+
+    @pytest.mark.unit
+    def test_route(self, ltv_app):
+        """Test the endpoint clamps top and bands."""
+        data = ltv_app.test_client().get('/api/analytics/clients/lifetime-value?top=0&bands=50').get_json()
+        assert len(data['top_clients']) == 1
+        assert len(data['ltv_bands']) == 8
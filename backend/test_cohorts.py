@@ -0,0 +1,96 @@
+"""
+Unit tests for the cohort retention matrix.
+"""
+
+import pytest
+from datetime import datetime
+from models.database import db, Client, Trainer, Session, Payment
+from api.analytics_routes import analytics_bp
+from utils.cohorts import build_matrix, cohort_matrix, clear_cache
+from utils.query_instrumentation import capture_queries
+
+NOW = datetime(2026, 4, 10)
+
+
+@pytest.fixture
+def cohort_app(sqlite_app):
+    """Flask app on a SQLite file with January and February cohorts."""
+    app = sqlite_app(analytics_bp)
+    clear_cache()
+    trainer = Trainer(name='Sam', email='sam@example.com')
+    jan = [Client(name=f'Jan {i}', email=f'jan{i}@example.com', created_at=datetime(2026, 1, 5 + i))
+           for i in range(4)]
+    feb = [Client(name='Feb', email='feb@example.com', created_at=datetime(2026, 2, 2), status='inactive')]
+    db.session.add_all([trainer] + jan + feb)
+    db.session.flush()
+
+    def visit(client, month, day=15, status='completed'):
+        db.session.add(Session(trainer_id=trainer.id, client_id=client.id,
+                               session_date=datetime(2026, month, day), status=status))
+
+    # Every January client trains in January; two come back in February, one in March
+    for client in jan:
+        visit(client, 1, day=20)
+    visit(jan[0], 2)
+    visit(jan[0], 2, day=16)
+    visit(jan[1], 2)
+    visit(jan[0], 3)
+    visit(jan[2], 3, status='cancelled')
+    # The current month is still open and is not counted
+    visit(jan[3], 4, day=1)
+    visit(feb[0], 2)
+    db.session.add(Payment(client_id=jan[3].id, amount=50, payment_date=datetime(2026, 3, 1)))
+    db.session.commit()
+    return app
+
+
+class TestCohortMatrix:
+    """Test the retention matrix."""
+
+    @pytest.mark.unit
+    def test_matrix(self, cohort_app):
+        """Test retention per month since signup from two queries."""
+        with capture_queries() as stats:
+            matrix = build_matrix(months=3, now=NOW)
+        assert stats.count == 2
+
+        assert matrix['through_month'] == '2026-03'
+        jan, feb = matrix['cohorts']
+        assert jan['cohort'] == '2026-01' and jan['initial_size'] == 4
+        assert jan['active_by_month'] == [4, 2, 1]
+        assert jan['retention_by_month'] == [100.0, 50.0, 25.0]
+        assert feb['active_by_month'] == [1, 0]
+        assert feb['active_count'] == 0 and feb['retention_rate'] == 0.0
+
+    @pytest.mark.unit
+    def test_payment_activity(self, cohort_app):
+        """Test payments can drive retention instead of sessions."""
+        jan = build_matrix(months=3, activity='payments', now=NOW)['cohorts'][0]
+        assert jan['active_by_month'] == [0, 0, 1]
+
+    @pytest.mark.unit
+    def test_cached_per_month_close(self, cohort_app):
+        """Test a matrix is reused within the month and rebuilt after it closes."""
+        first = cohort_matrix(months=3, now=NOW)
+        with capture_queries() as stats:
+            assert cohort_matrix(months=3, now=NOW.replace(day=28)) == first
+        assert stats.count == 1
+        assert cohort_matrix(months=3, now=datetime(2026, 5, 1))['through_month'] == '2026-04'
+
+    @pytest.mark.unit
+    def test_cached_matrix_follows_current_status(self, cohort_app):
+        """Test active counts reflect status changes made after the matrix was cached."""
+        cohort_matrix(months=3, now=NOW)
+        Client.query.filter_by(email='jan0@example.com').update({'status': 'inactive'})
+        db.session.commit()
+
+        jan = cohort_matrix(months=3, now=NOW)['cohorts'][0]
+        assert jan['active_count'] == 3 and jan['retention_rate'] == 75.0
+        assert jan['active_by_month'] == [4, 2, 1]
+
+    @pytest.mark.unit
+    def test_route(self, cohort_app):
+        """Test the endpoint validates the activity source."""
+        client = cohort_app.test_client()
+        assert client.get('/api/analytics/clients/cohort?months=36').status_code == 200
+        assert client.get('/api/analytics/clients/cohort?activity=logins').status_code == 400
@@ -0,0 +1,119 @@
+"""
+Unit tests for streaming bulk exports.
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import datetime
+from models.database import (
+    db, Assignment, CampaignRecipient, Client, EmailCampaign, Payment, Session, Trainer
+)
+from api.export_routes import export_bp
+from utils import data_export
+from utils.auth import generate_token
+from utils.query_instrumentation import capture_queries
+
+ADMIN = {'Authorization': f"Bearer {generate_token(1, 'admin@example.com', 'admin')}"}
+
+
+@pytest.fixture
+def export_app(sqlite_app):
+    """Flask app on a SQLite file with two trainers' sessions, payments and campaign mail."""
+    app = sqlite_app(export_bp)
+    sam = Trainer(name='Sam', email='sam@example.com')
+    kim = Trainer(name='Kim', email='kim@example.com')
+    ana = Client(name='Ana', email='ana@example.com')
+    bo = Client(name='Bo', email='bo@example.com')
+    campaign = EmailCampaign(name='Spring', subject='Hi', html_body='<p>Hello</p>', segment_type='all_clients')
+    db.session.add_all([sam, kim, ana, bo, campaign])
+    db.session.flush()
+    db.session.add(Assignment(trainer_id=sam.id, client_id=ana.id))
+    for day in (3, 1, 2):
+        db.session.add(Session(trainer_id=sam.id, client_id=ana.id, session_date=datetime(2026, 3, day, 9)))
+    db.session.add(Session(trainer_id=kim.id, client_id=bo.id, session_date=datetime(2026, 3, 1, 10)))
+    db.session.add_all([
+        Payment(client_id=ana.id, amount=80.5, payment_date=datetime(2024, 1, 5)),
+        Payment(client_id=bo.id, amount=20, payment_date=datetime(2025, 6, 1)),
+        CampaignRecipient(campaign_id=campaign.id, email='ana@example.com', recipient_type='client',
+                          recipient_id=ana.id, status='sent'),
+        CampaignRecipient(campaign_id=campaign.id, email='sam@example.com', recipient_type='trainer',
+                          recipient_id=sam.id, status='sent'),
+    ])
+    db.session.commit()
+    app.ids = {'sam': sam.id, 'ana': ana.id}
+    return app
+
+
+class TestExports:
+    """Test dataset streaming."""
+
+    @pytest.mark.unit
+    def test_sessions_csv(self, export_app):
+        """Test a filtered CSV export is ordered by date with names joined."""
+        client = export_app.test_client()
+        response = client.get(f"/api/exports/sessions?trainer_id={export_app.ids['sam']}"
+                              "&start_date=2026-03-02T00:00:00", headers=ADMIN)
+        assert response.status_code == 200 and response.mimetype == 'text/csv'
+        assert response.is_streamed
+
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        assert [row['session_date'] for row in rows] == ['2026-03-02T09:00:00', '2026-03-03T09:00:00']
+        assert rows[0]['trainer_name'] == 'Sam' and rows[0]['client_name'] == 'Ana'
+        assert rows[0]['notes'] == ''
+
+    @pytest.mark.unit
+    def test_payments_ndjson_by_trainer(self, export_app):
+        """Test payments filter by the trainer's assigned clients in one query."""
+        client = export_app.test_client()
+        with capture_queries() as stats:
+            response = client.get(f"/api/exports/payments?format=ndjson&trainer_id={export_app.ids['sam']}",
+                                  headers=ADMIN)
+            lines = response.get_data(as_text=True).splitlines()
+        assert len([shape for shape in stats.fingerprints if 'FROM payments' in shape]) == 1
+
+        records = [json.loads(line) for line in lines]
+        assert records == [{**records[0], 'amount': 80.5, 'client_name': 'Ana', 'payment_date': '2024-01-05T00:00:00'}]
+
+    @pytest.mark.unit
+    def test_date_only_end_covers_whole_day(self, export_app):
+        """Test a date-only end_date includes rows later that day."""
+        db.session.add(Payment(client_id=export_app.ids['ana'], amount=15, payment_date=datetime(2024, 12, 31, 15)))
+        db.session.commit()
+
+        rows = export_app.test_client().get(
+            '/api/exports/payments?format=ndjson&start_date=2024-12-31&end_date=2024-12-31', headers=ADMIN
+        ).get_data(as_text=True).splitlines()
+        assert [json.loads(row)['payment_date'] for row in rows] == ['2024-12-31T15:00:00']
+        # A datetime end_date still cuts off at that time
+        assert list(data_export.export_query('payments', start=datetime(2024, 12, 31),
+                                             end=datetime(2024, 12, 31, 12))) == []
+
+    @pytest.mark.unit
+    def test_email_deliveries_by_client(self, export_app):
+        """Test email deliveries filter by recipient and carry the campaign name."""
+        rows = export_app.test_client().get(
+            f"/api/exports/email_logs?format=ndjson&client_id={export_app.ids['ana']}", headers=ADMIN
+        ).get_data(as_text=True).splitlines()
+        assert [json.loads(row)['campaign_name'] for row in rows] == ['Spring']
+
+    @pytest.mark.unit
+    def test_rendered_in_batches(self, export_app, monkeypatch):
+        """Test rows are rendered a batch at a time."""
+        monkeypatch.setattr(data_export, 'STREAM_BATCH_SIZE', 2)
+        rows = data_export.export_query('sessions')
+        chunks = list(data_export.render_ndjson(rows, data_export.export_columns('sessions')))
+        assert [chunk.count('\n') for chunk in chunks] == [2, 2]
+
+    @pytest.mark.unit
+    def test_validation_and_access(self, export_app):
+        """Test exports need an admin and reject unknown datasets, formats and dates."""
+        client = export_app.test_client()
+        user = {'Authorization': f"Bearer {generate_token(2, 'user@example.com', 'trainer')}"}
+        assert client.get('/api/exports/payments').status_code == 401
+        assert client.get('/api/exports/payments', headers=user).status_code == 403
+        assert client.get('/api/exports/clients', headers=ADMIN).status_code == 404
+        assert client.get('/api/exports/payments?format=xml', headers=ADMIN).status_code == 400
+        assert client.get('/api/exports/payments?start_date=soon', headers=ADMIN).status_code == 400
+        assert len(client.get('/api/exports', headers=ADMIN).get_json()['datasets']) == 6
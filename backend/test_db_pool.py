@@ -0,0 +1,196 @@
+"""
+Unit tests for connection pool configuration and monitoring.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from config.settings import get_engine_options, ProductionConfig
+from utils.db_pool import PoolMonitor, InstrumentedQueuePool, pool_monitor
+
+
+class TestEngineOptions:
+    """Test SQLALCHEMY_ENGINE_OPTIONS generation."""
+
+    @pytest.mark.unit
+    def test_postgres_options_include_pool_settings(self):
+        """Test pool size, overflow and timeout are passed for Postgres."""
+        options = get_engine_options({
+            'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/fitnesscrm',
+            'DB_POOL_SIZE': 7,
+            'DB_MAX_OVERFLOW': 3,
+            'DB_POOL_TIMEOUT': 5,
+            'DB_POOL_RECYCLE': 600,
+            'DB_POOL_PRE_PING': True,
+        })
+
+        assert options['pool_size'] == 7
+        assert options['max_overflow'] == 3
+        assert options['pool_timeout'] == 5
+        assert options['pool_recycle'] == 600
+        assert options['pool_pre_ping'] is True
+        assert options['poolclass'] is InstrumentedQueuePool
+
+    @pytest.mark.unit
+    def test_sqlite_options_skip_pool_sizing(self):
+        """Test SQLite only receives pre-ping and recycle."""
+        options = get_engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+
+        assert 'pool_size' not in options
+        assert 'max_overflow' not in options
+        assert options['pool_pre_ping'] is True
+
+    @pytest.mark.unit
+    def test_profile_defaults(self):
+        """Test production profile uses a larger pool than the base config."""
+        options = get_engine_options({
+            'SQLALCHEMY_DATABASE_URI': 'postgresql://localhost/fitnesscrm',
+            'DB_POOL_SIZE': ProductionConfig.DB_POOL_SIZE,
+            'DB_MAX_OVERFLOW': ProductionConfig.DB_MAX_OVERFLOW,
+        })
+
+        assert options['pool_size'] == ProductionConfig.DB_POOL_SIZE
+        assert options['max_overflow'] == ProductionConfig.DB_MAX_OVERFLOW
+
+
+class TestPoolMonitor:
+    """Test pool statistics collection."""
+
+    @pytest.mark.unit
+    def test_checkout_and_checkin_counted(self):
+        """Test checkouts, idle connections and waits are reported."""
+        engine = create_engine('sqlite://', poolclass=InstrumentedQueuePool, pool_size=2, max_overflow=1)
+        monitor = PoolMonitor()
+        monitor.attach(engine)
+        pool_monitor.reset()
+
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            stats = monitor.get_stats(engine)
+            assert stats['checked_out'] == 1
+
+        stats = monitor.get_stats(engine)
+        assert stats['checked_out'] == 0
+        assert stats['idle'] == 1
+        assert stats['total_checkouts'] == 1
+        assert stats['total_checkins'] == 1
+        assert pool_monitor.get_stats(engine)['wait']['count'] == 1
+
+    @pytest.mark.unit
+    def test_record_wait_tracks_max_and_timeouts(self):
+        """Test wait statistics aggregation."""
+        monitor = PoolMonitor()
+        monitor.record_wait(0.010)
+        monitor.record_wait(0.030, timed_out=True)
+
+        assert monitor.wait_count == 2
+        assert monitor.timeouts == 1
+        assert monitor.wait_max == pytest.approx(0.030)
+        assert monitor.wait_last == pytest.approx(0.030)
+
+
+class TestConfigProfile:
+    """Test the profile the app factory loads."""
+
+    @pytest.mark.unit
+    def test_debug_off_without_flask_env(self, monkeypatch):
+        """Test an app started without FLASK_ENV runs the production profile."""
+        from app_factory import create_app
+        monkeypatch.delenv('FLASK_ENV', raising=False)
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'})
+        assert not app.config['DEBUG']
+        assert app.config['DB_POOL_SIZE'] == ProductionConfig.DB_POOL_SIZE
+
+        monkeypatch.setenv('FLASK_ENV', 'development')
+        assert create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}).config['DEBUG']
+
+
+class FakeConnection:
+    """Stand-in psycopg2 connection tracking rollbacks."""
+
+    closed = 0
+
+    def __init__(self):
+        self.rollbacks = 0
+        self.in_transaction = False
+
+    def get_transaction_status(self):
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+        return TRANSACTION_STATUS_INTRANS if self.in_transaction else TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+
+class FakePool:
+    """Stand-in ThreadedConnectionPool recording check-ins."""
+
+    def __init__(self):
+        self.returned = []
+
+    def getconn(self):
+        return FakeConnection()
+
+    def putconn(self, conn, close=False):
+        self.returned.append((conn, close))
+
+
+class TestRequestConnection:
+    """Test the legacy app's per-request connection checkout."""
+
+    @pytest.fixture
+    def legacy(self, monkeypatch):
+        """Legacy app module on a fake one-connection pool."""
+        import os
+        import threading
+        import app as legacy
+        monkeypatch.setattr(legacy, '_db_pool', FakePool())
+        monkeypatch.setattr(legacy, '_db_pool_pid', os.getpid())
+        monkeypatch.setattr(legacy, '_db_pool_slots', threading.BoundedSemaphore(1))
+        monkeypatch.setattr(legacy, '_schema_checked', True)
+        monkeypatch.setenv('PG_POOL_TIMEOUT', '0.05')
+        return legacy
+
+    @pytest.mark.unit
+    def test_connection_returned_on_teardown(self, legacy):
+        """Test a request reuses one connection and teardown rolls back and returns it."""
+        with legacy.app.test_request_context():
+            conn = legacy.get_db_connection()
+            assert legacy.get_db_connection() is conn
+            conn.in_transaction = True
+
+        assert legacy._db_pool.returned == [(conn, False)]
+        assert conn.rollbacks == 1
+
+    @pytest.mark.unit
+    def test_exhausted_pool_returns_503(self, legacy):
+        """Test a request waits for a free connection, then gets a 503."""
+        import jwt
+        token = jwt.encode({'user_id': 1}, legacy.app.config['SECRET_KEY'], algorithm='HS256')
+        held = legacy.checkout_connection()
+
+        response = legacy.app.test_client().get('/api/clients', headers={'Authorization': f'Bearer {token}'})
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '1'
+
+        legacy.checkin_connection(held)
+        with legacy.app.test_request_context():
+            assert legacy.get_db_connection() is not None
+
+    @pytest.mark.unit
+    def test_failed_init_db_returns_connection(self, legacy):
+        """Test init_db rolls back and returns its connection when the DDL fails."""
+        class FailingCursor:
+            def execute(self, statement):
+                raise RuntimeError('DDL failed')
+
+        conn = FakeConnection()
+        conn.in_transaction = True
+        conn.cursor = FailingCursor
+        legacy._db_pool.getconn = lambda: conn
+
+        with pytest.raises(RuntimeError):
+            legacy.init_db()
+        assert legacy._db_pool.returned == [(conn, False)]
+        assert conn.rollbacks == 1
+        assert legacy._db_pool_slots.acquire(timeout=0)
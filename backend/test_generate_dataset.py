@@ -0,0 +1,58 @@
+"""
+Unit tests for the synthetic dataset generator.
+"""
+
+import pytest
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from models.database import db
+from generate_dataset import DatasetGenerator
+
+
+def _generate(seed=7):
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    with engine.connect() as conn:
+        generator = DatasetGenerator(
+            conn, trainers=5, clients=60, sessions=2000, seed=seed,
+            months=6, end_date=datetime(2026, 1, 1), batch_size=500, verbose=False,
+        )
+        counts = generator.generate()
+        conn.commit()
+    return engine, counts
+
+
+class TestDatasetGenerator:
+    """Test generated data volume, integrity and determinism."""
+
+    @pytest.mark.unit
+    def test_volumes(self):
+        """Test requested volumes are generated."""
+        _, counts = _generate()
+        assert counts['trainers'] == 5
+        assert counts['clients'] == 60
+        assert abs(counts['sessions'] - 2000) < 100
+        assert counts['payments'] > 0
+        assert counts['campaign_recipients'] > 0
+
+    @pytest.mark.unit
+    def test_foreign_keys_resolve(self):
+        """Test sessions reference existing trainers and clients."""
+        engine, _ = _generate()
+        with engine.connect() as conn:
+            orphans = conn.execute(text(
+                "SELECT count(*) FROM sessions s "
+                "LEFT JOIN trainers t ON t.id = s.trainer_id "
+                "LEFT JOIN clients c ON c.id = s.client_id "
+                "WHERE t.id IS NULL OR c.id IS NULL"
+            )).scalar()
+        assert orphans == 0
+
+    @pytest.mark.unit
+    def test_same_seed_same_data(self):
+        """Test the same seed produces identical rows."""
+        query = text("SELECT trainer_id, client_id, session_date, status FROM sessions ORDER BY id")
+        first, _ = _generate(seed=3)
+        second, _ = _generate(seed=3)
+        with first.connect() as a, second.connect() as b:
+            assert a.execute(query).fetchall() == b.execute(query).fetchall()
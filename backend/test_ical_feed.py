@@ -0,0 +1,102 @@
+"""
+Unit tests for the streaming iCal feeds.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from models.database import db, Client, Trainer, Session
+from api.session_routes import session_bp
+from utils.ical_feed import escape_text, fold_line
+from utils.query_instrumentation import capture_queries
+
+
+@pytest.fixture
+def feed_app(sqlite_app):
+    """Flask app on a SQLite file with the session routes and two sessions."""
+    app = sqlite_app(session_bp)
+    trainer = Trainer(name='Sam', email='sam@example.com')
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add_all([trainer, client])
+    db.session.flush()
+    soon = datetime.utcnow().replace(microsecond=0) + timedelta(days=1)
+    db.session.add_all([
+        Session(trainer_id=trainer.id, client_id=client.id, session_date=soon, duration=45,
+                session_type='Strength', location='Studio 1, upstairs'),
+        Session(trainer_id=trainer.id, client_id=client.id, session_date=soon + timedelta(days=2), duration=60),
+    ])
+    db.session.commit()
+    app.trainer_id = trainer.id
+    return app
+
+
+class TestRendering:
+    """Test iCal text handling."""
+
+    @pytest.mark.unit
+    def test_escape_text(self):
+        """Test separators and newlines are escaped."""
+        assert escape_text('a,b;c\\d\ne') == 'a\\,b\\;c\\\\d\\ne'
+
+    @pytest.mark.unit
+    def test_fold_line(self):
+        """Test long lines fold at 75 octets without splitting characters."""
+        folded = fold_line('DESCRIPTION:' + 'é' * 80)
+        parts = folded.split('\r\n')
+        assert len(parts) == 3
+        assert all(len(part.encode('utf-8')) <= 75 for part in parts)
+        assert ''.join(part[1:] if i else part for i, part in enumerate(parts)) == 'DESCRIPTION:' + 'é' * 80
+
+
+class TestCalendarFeeds:
+    """Test subscribable feeds and revalidation."""
+
+    @pytest.mark.unit
+    def test_trainer_feed(self, feed_app):
+        """Test the feed lists the trainer's sessions with joined names."""
+        response = feed_app.test_client().get(f'/api/trainers/{feed_app.trainer_id}/calendar.ics')
+        body = response.get_data(as_text=True)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'text/calendar'
+        assert body.count('BEGIN:VEVENT') == 2
+        assert 'SUMMARY:Strength: Sam - Ana' in body
+        assert 'LOCATION:Studio 1\\, upstairs' in body
+        assert response.headers['ETag'] and response.headers['Last-Modified']
+
+    @pytest.mark.unit
+    def test_unchanged_feed_not_modified(self, feed_app):
+        """Test If-None-Match returns 304 from the version query alone."""
+        client = feed_app.test_client()
+        url = f'/api/trainers/{feed_app.trainer_id}/calendar.ics'
+        etag = client.get(url).headers['ETag']
+
+        with capture_queries() as stats:
+            response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        session_shapes = [shape for shape in stats.fingerprints if 'FROM sessions' in shape]
+        assert len(session_shapes) == 1 and 'max(sessions.updated_at)' in session_shapes[0]
+
+    @pytest.mark.unit
+    def test_changes_produce_new_etag(self, feed_app):
+        """Test updates and deletions change the feed version."""
+        client = feed_app.test_client()
+        url = f'/api/trainers/{feed_app.trainer_id}/calendar.ics'
+        etags = [client.get(url).headers['ETag']]
+
+        session = Session.query.order_by(Session.id).first()
+        session.status = 'cancelled'
+        session.updated_at = session.updated_at + timedelta(seconds=1)
+        db.session.commit()
+        response = client.get(url, headers={'If-None-Match': etags[0]})
+        assert response.status_code == 200
+        assert 'STATUS:CANCELLED' in response.get_data(as_text=True)
+        etags.append(response.headers['ETag'])
+
+        db.session.delete(Session.query.order_by(Session.id.desc()).first())
+        db.session.commit()
+        assert client.get(url, headers={'If-None-Match': etags[1]}).status_code == 200
+
+    @pytest.mark.unit
+    def test_unknown_client_404(self, feed_app):
+        """Test feeds for unknown clients are not found."""
+        assert feed_app.test_client().get('/api/clients/999/calendar.ics').status_code == 404
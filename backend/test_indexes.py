@@ -0,0 +1,45 @@
+"""
+Unit tests for the composite indexes declared on the models.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from models.database import db, Session, Payment, MessageThread
+
+
+def _index_columns(model):
+    return {index.name: [column.name for column in index.columns] for index in model.__table__.indexes}
+
+
+class TestDeclaredIndexes:
+    """Test hot query shapes are covered by indexes."""
+
+    @pytest.mark.unit
+    def test_session_indexes_declared(self):
+        """Test session indexes lead with the equality column."""
+        indexes = _index_columns(Session)
+        assert indexes['ix_sessions_trainer_date'] == ['trainer_id', 'session_date']
+        assert indexes['ix_sessions_client_date'] == ['client_id', 'session_date']
+        assert indexes['ix_sessions_status_date'] == ['status', 'session_date']
+
+    @pytest.mark.unit
+    def test_payment_and_inbox_indexes_declared(self):
+        """Test payment and inbox indexes are declared."""
+        assert _index_columns(Payment)['ix_payments_status_date'] == ['status', 'payment_date']
+        assert _index_columns(MessageThread)['ix_message_threads_trainer_inbox'] == [
+            'trainer_id', 'archived_by_trainer', 'last_message_at'
+        ]
+
+    @pytest.mark.unit
+    def test_conflict_check_uses_index(self):
+        """Test the planner picks the trainer/date index for conflict checks."""
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+
+        with engine.connect() as conn:
+            plan = conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM sessions "
+                "WHERE trainer_id = 1 AND status != 'cancelled' AND session_date < '2026-01-02'"
+            )).fetchall()
+
+        assert any('ix_sessions_trainer_date' in str(row[-1]) for row in plan)
@@ -0,0 +1,76 @@
+"""
+Unit tests for Prometheus request metrics.
+"""
+
+import pytest
+from flask import Flask, Blueprint, jsonify
+from utils.metrics import RequestMetrics, request_metrics
+
+
+@pytest.fixture
+def metrics_app():
+    """Minimal app with one blueprint and metrics enabled."""
+    app = Flask(__name__)
+    bp = Blueprint('widgets', __name__, url_prefix='/api/widgets')
+
+    @bp.route('', methods=['GET'])
+    def list_widgets():
+        return jsonify([]), 200
+
+    @bp.route('/broken', methods=['GET'])
+    def broken_widget():
+        return jsonify({'error': 'broken'}), 500
+
+    app.register_blueprint(bp)
+    request_metrics.init_app(app)
+    return app
+
+
+class TestRequestMetrics:
+    """Test /metrics exposition."""
+
+    @pytest.mark.unit
+    def test_metrics_disabled_without_prometheus(self, monkeypatch):
+        """Test the app still works when prometheus_client is missing."""
+        monkeypatch.setattr('utils.metrics.CollectorRegistry', None)
+        metrics = RequestMetrics()
+        app = Flask(__name__)
+        metrics.init_app(app)
+
+        assert metrics.enabled is False
+        assert app.test_client().get('/metrics').status_code == 404
+
+    @pytest.mark.unit
+    def test_latency_and_status_recorded_per_endpoint(self, metrics_app):
+        """Test latency histogram and status counter use blueprint/endpoint labels."""
+        client = metrics_app.test_client()
+        client.get('/api/widgets')
+        client.get('/api/widgets/broken')
+
+        body = client.get('/metrics').get_data(as_text=True)
+
+        assert ('fitnesscrm_http_request_duration_seconds_count'
+                '{blueprint="widgets",endpoint="widgets.list_widgets",method="GET"}') in body
+        assert ('fitnesscrm_http_responses_total'
+                '{blueprint="widgets",endpoint="widgets.broken_widget",method="GET",status="500"}') in body
+
+    @pytest.mark.unit
+    def test_in_progress_gauge_returns_to_zero(self, metrics_app):
+        """Test the in-flight gauge is decremented after the request."""
+        client = metrics_app.test_client()
+        client.get('/api/widgets')
+
+        body = client.get('/metrics').get_data(as_text=True)
+
+        assert ('fitnesscrm_http_requests_in_progress'
+                '{blueprint="widgets",endpoint="widgets.list_widgets"} 0.0') in body
+
+    @pytest.mark.unit
+    def test_metrics_token_required_when_configured(self, metrics_app, monkeypatch):
+        """Test METRICS_AUTH_TOKEN protects the scrape endpoint."""
+        monkeypatch.setenv('METRICS_AUTH_TOKEN', 'scrape-secret')
+        client = metrics_app.test_client()
+
+        assert client.get('/metrics').status_code == 401
+        response = client.get('/metrics', headers={'Authorization': 'Bearer scrape-secret'})
+        assert response.status_code == 200
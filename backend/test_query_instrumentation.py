@@ -0,0 +1,92 @@
+"""
+Unit tests for SQL query instrumentation and N+1 detection.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+from utils.query_instrumentation import (
+    QueryInstrumentation,
+    QueryStats,
+    capture_queries,
+    fingerprint_statement,
+)
+
+
+class TestFingerprint:
+    """Test statement normalization."""
+
+    @pytest.mark.unit
+    def test_parameters_and_literals_normalized(self):
+        """Test the same query for different rows has one fingerprint."""
+        a = fingerprint_statement("SELECT * FROM trainers WHERE trainers.id = %(pk_1)s")
+        b = fingerprint_statement("SELECT *   FROM trainers\nWHERE trainers.id = 42")
+        c = fingerprint_statement("SELECT * FROM trainers WHERE trainers.id = ?")
+
+        assert a == b == c
+
+    @pytest.mark.unit
+    def test_in_lists_collapse(self):
+        """Test IN lists of any length share a fingerprint."""
+        a = fingerprint_statement("SELECT * FROM clients WHERE id IN (?, ?)")
+        b = fingerprint_statement("SELECT * FROM clients WHERE id IN (1, 2, 3, 4)")
+
+        assert a == b
+
+    @pytest.mark.unit
+    def test_string_literals_normalized(self):
+        """Test quoted literals are replaced."""
+        shape = fingerprint_statement("SELECT * FROM sessions WHERE status = 'completed'")
+        assert 'completed' not in shape
+
+
+class TestQueryStats:
+    """Test per-request statistics."""
+
+    @pytest.mark.unit
+    def test_repeated_shapes_above_threshold(self):
+        """Test repeated() only returns shapes over the threshold."""
+        stats = QueryStats()
+        for i in range(12):
+            stats.record(f"SELECT * FROM clients WHERE id = {i}", 0.001)
+        stats.record("SELECT count(*) FROM sessions", 0.002)
+
+        assert stats.count == 13
+        assert stats.max_repeat == 12
+        assert len(stats.repeated(10)) == 1
+        assert stats.repeated(12) == []
+        assert stats.total_time_ms == pytest.approx(14.0)
+
+
+class TestCaptureQueries:
+    """Test capturing statements from an instrumented engine."""
+
+    @pytest.mark.unit
+    def test_capture_counts_statements(self):
+        """Test capture_queries records statements run inside the block."""
+        engine = create_engine('sqlite://')
+        instrumentation = QueryInstrumentation()
+        instrumentation.attach_engine(engine)
+
+        with engine.connect() as conn:
+            with capture_queries() as stats:
+                for i in range(3):
+                    conn.execute(text('SELECT :value'), {'value': i})
+            conn.execute(text('SELECT 1'))
+
+        assert stats.count == 3
+        assert stats.max_repeat == 3
+
+    @pytest.mark.unit
+    def test_listener_receives_duration(self):
+        """Test registered listeners are called for each statement."""
+        engine = create_engine('sqlite://')
+        instrumentation = QueryInstrumentation()
+        instrumentation.attach_engine(engine)
+        seen = []
+        instrumentation.add_listener(lambda conn, statement, parameters, duration: seen.append(duration))
+
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+        assert len(seen) == 1
+        assert seen[0] >= 0
@@ -0,0 +1,157 @@
+"""
+Unit tests for recurring session expansion.
+"""
+
+import pytest
+from datetime import date, datetime, time, timedelta
+from models.database import db, Client, Trainer, Session, RecurringSession
+from utils.query_instrumentation import capture_queries
+from utils.recurrence import (
+    occurrence_dates, plan_occurrences, session_rows, insert_sessions, materialize, materialize_pending,
+    remove_future_sessions
+)
+
+
+@pytest.fixture
+def recurrence_app(sqlite_app):
+    """Flask app on a SQLite file with a trainer, a client and one booking."""
+    app = sqlite_app()
+    trainer = Trainer(name='Sam', email='sam@example.com')
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add_all([trainer, client])
+    db.session.flush()
+    # Wednesday 7 January 2026, 07:30-08:30
+    app.booked = Session(trainer_id=trainer.id, client_id=client.id, session_date=datetime(2026, 1, 7, 7, 30),
+                         end_time=datetime(2026, 1, 7, 8, 30), duration=60, status='scheduled')
+    db.session.add(app.booked)
+    db.session.commit()
+    app.template = RecurringSession(
+        trainer_id=trainer.id, client_id=client.id, start_date=datetime(2026, 1, 5),
+        start_time=time(7, 0), duration=60, recurrence_pattern='weekly', recurrence_days=[0, 2, 4]
+    )
+    return app
+
+
+class TestOccurrenceDates:
+    """Test pattern expansion."""
+
+    @pytest.mark.unit
+    def test_weekly_days(self):
+        """Test weekly patterns occur on each listed weekday."""
+        dates = occurrence_dates('weekly', datetime(2026, 1, 5), datetime(2026, 1, 18), [0, 2, 4])
+        assert dates == [date(2026, 1, d) for d in (5, 7, 9, 12, 14, 16)]
+
+    @pytest.mark.unit
+    def test_biweekly_counts_weeks_from_start(self):
+        """Test biweekly patterns skip every other week from the start date."""
+        dates = occurrence_dates('biweekly', datetime(2026, 1, 7), datetime(2026, 2, 10), [0, 2])
+        assert dates == [date(2026, 1, 7), date(2026, 1, 12), date(2026, 1, 21), date(2026, 1, 26), date(2026, 2, 4), date(2026, 2, 9)]
+
+    @pytest.mark.unit
+    def test_monthly_skips_short_months(self):
+        """Test monthly patterns skip months without the start day."""
+        dates = occurrence_dates('monthly', datetime(2026, 1, 31), datetime(2026, 5, 31))
+        assert dates == [date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31)]
+
+    @pytest.mark.unit
+    def test_end_date_inclusive_by_time(self):
+        """Test the last day counts only once start_date + n days reaches it."""
+        assert occurrence_dates('daily', datetime(2026, 1, 1, 18), datetime(2026, 1, 3, 12)) == [
+            date(2026, 1, 1), date(2026, 1, 2)
+        ]
+        assert occurrence_dates('yearly', datetime(2026, 1, 1), datetime(2027, 1, 1)) == []
+
+    @pytest.mark.unit
+    def test_after_skips_expanded_days(self):
+        """Test a high-water mark resumes the series without shifting it."""
+        start, end = datetime(2026, 1, 7), datetime(2026, 3, 31)
+        for pattern in ('daily', 'weekly', 'biweekly', 'monthly'):
+            dates = occurrence_dates(pattern, start, end, [0, 2])
+            resumed = occurrence_dates(pattern, start, end, [0, 2], after=datetime(2026, 2, 4, 12))
+            assert resumed == [d for d in dates if d > date(2026, 2, 4)]
+
+
+class TestPlanOccurrences:
+    """Test conflict planning and bulk insertion."""
+
+    @pytest.mark.unit
+    def test_conflicting_occurrence_skipped(self, recurrence_app):
+        """Test occurrences clashing with a booking are reported, not created."""
+        slots, conflicts = plan_occurrences(recurrence_app.template, datetime(2026, 1, 5), datetime(2026, 1, 11))
+
+        assert [start for start, _ in slots] == [datetime(2026, 1, 5, 7), datetime(2026, 1, 9, 7)]
+        assert conflicts == [{
+            'session_date': '2026-01-07T07:00:00',
+            'end_time': '2026-01-07T08:00:00',
+            'conflicts': [recurrence_app.booked.id],
+            'reason': 'booked',
+        }]
+
+    @pytest.mark.unit
+    def test_year_series_in_few_queries(self, recurrence_app):
+        """Test a weekly 3x series for a year is planned and inserted in two statements."""
+        template = recurrence_app.template
+
+        with capture_queries() as stats:
+            slots, conflicts = plan_occurrences(template, datetime(2026, 1, 5), datetime(2026, 12, 31))
+            created = insert_sessions(session_rows(template, slots))
+
+        # Rollup maintenance may add statements of its own; count those on sessions
+        session_statements = sum(count for shape, count in stats.fingerprints.items()
+                                 if 'FROM sessions' in shape or 'INTO sessions' in shape)
+        assert created == 154 and len(conflicts) == 1
+        assert session_statements == 2
+        assert Session.query.filter(Session.status == 'scheduled').count() == 155
+
+
+class TestMaterialize:
+    """Test rolling-horizon materialisation."""
+
+    @pytest.mark.unit
+    def test_extends_from_high_water_mark(self, recurrence_app):
+        """Test each run only creates the occurrences past the mark."""
+        template = recurrence_app.template
+        db.session.add(template)
+        db.session.flush()
+
+        assert materialize(template, datetime(2026, 1, 11, 23, 59))[0] == 2
+        assert template.materialized_until == datetime(2026, 1, 11, 23, 59)
+        assert materialize(template, datetime(2026, 1, 18, 23, 59))[0] == 3
+
+        with capture_queries() as stats:
+            assert materialize(template, datetime(2026, 1, 18, 23, 59)) == (0, [])
+        assert stats.count == 0
+        assert Session.query.filter_by(recurring_session_id=template.id).count() == 5
+
+    @pytest.mark.unit
+    def test_pending_skips_finished_templates(self, recurrence_app):
+        """Test the nightly run leaves templates already at the horizon or end date alone."""
+        template = recurrence_app.template
+        template.end_date = datetime(2026, 1, 31)
+        db.session.add(template)
+        db.session.commit()
+
+        until = datetime(2026, 3, 1, 23, 59)
+        stats = materialize_pending(until, now=datetime(2026, 1, 1))
+        assert stats == {'templates': 1, 'sessions_created': 11, 'conflicts': 1, 'failed': 0}
+        assert template.materialized_until == datetime(2026, 1, 31)
+        assert materialize_pending(until, now=datetime(2026, 1, 1))['templates'] == 0
+
+    @pytest.mark.unit
+    def test_edit_replaces_future_sessions_only(self, recurrence_app):
+        """Test a time change keeps past sessions and rebuilds the future ones."""
+        template = recurrence_app.template
+        db.session.add(template)
+        db.session.flush()
+        materialize(template, datetime(2026, 1, 18, 23, 59))
+        now = datetime(2026, 1, 12, 12)
+
+        assert remove_future_sessions(template, now) == 2
+        template.start_time = time(18, 0)
+        created, _ = materialize(template, datetime(2026, 1, 18, 23, 59), not_before=now)
+
+        starts = [s.session_date for s in Session.query.filter_by(recurring_session_id=template.id)
+                  .order_by(Session.session_date)]
+        assert created == 3
+        assert starts == [datetime(2026, 1, 5, 7), datetime(2026, 1, 9, 7), datetime(2026, 1, 12, 7),
+                          datetime(2026, 1, 12, 18), datetime(2026, 1, 14, 18), datetime(2026, 1, 16, 18)]
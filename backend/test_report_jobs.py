@@ -0,0 +1,152 @@
+"""
+Unit tests for background report jobs.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from models.database import db, Client, Payment, ReportJob
+from api.report_routes import report_bp
+from utils.report_jobs import report_jobs, make_spec
+from utils.query_instrumentation import capture_queries
+
+SPEC = {
+    'name': 'Revenue', 'metrics': ['total_revenue', 'payment_count'],
+    'start_date': '2026-03-01T00:00:00', 'end_date': '2026-03-31T23:59:59', 'source': 'raw'
+}
+
+
+def _report_app(sqlite_app, workers):
+    app = sqlite_app(report_bp, REPORT_JOB_WORKERS=workers)
+    report_jobs.init_app(app)
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add(client)
+    db.session.flush()
+    db.session.add(Payment(client_id=client.id, amount=120, status='completed',
+                           payment_date=datetime(2026, 3, 12)))
+    db.session.commit()
+    return app
+
+
+@pytest.fixture
+def inline_app(sqlite_app):
+    """Flask app running report jobs inside the submitting request."""
+    return _report_app(sqlite_app, workers=0)
+
+
+@pytest.fixture
+def pooled_app(sqlite_app):
+    """Flask app running report jobs on the thread pool."""
+    yield _report_app(sqlite_app, workers=2)
+    if report_jobs._executor:
+        report_jobs._executor.shutdown(wait=True)
+        report_jobs._executor = None
+
+
+class TestReportJobs:
+    """Test job submission, result reuse and expiry."""
+
+    @pytest.mark.unit
+    def test_identical_spec_reuses_result(self, inline_app):
+        """Test a second identical report is served from the stored result."""
+        client = inline_app.test_client()
+        first = client.post('/api/reports/jobs', json=SPEC)
+        assert first.status_code == 200
+        job = first.get_json()
+        assert job['status'] == 'completed' and not job['reused']
+        assert job['result']['metrics'] == {'total_revenue': 120.0, 'payment_count': 1}
+
+        with capture_queries() as stats:
+            second = client.post('/api/reports/jobs', json=SPEC).get_json()
+        assert second['job_id'] == job['job_id'] and second['reused']
+        assert not [shape for shape in stats.fingerprints if 'FROM payments' in shape]
+
+    @pytest.mark.unit
+    def test_expired_result_recomputed(self, inline_app):
+        """Test a result past its TTL is neither served nor reused."""
+        job, _ = report_jobs.submit(make_spec(**SPEC))
+        job_id = job.id
+        job.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        assert report_jobs.get(job_id) is None
+        again, reused = report_jobs.submit(make_spec(**SPEC))
+        assert not reused and again.id != job_id
+        assert db.session.get(ReportJob, job_id) is None
+
+    @pytest.mark.unit
+    def test_validation_and_pending_export(self, inline_app):
+        """Test bad specs are rejected and unfinished jobs can't be exported."""
+        client = inline_app.test_client()
+        assert client.post('/api/reports/jobs', json={'metrics': []}).status_code == 400
+        assert client.post('/api/reports/jobs', json={**SPEC, 'end_date': 'March'}).status_code == 400
+        assert client.post('/api/reports/jobs', json={'template_id': 'nope'}).status_code == 404
+        assert client.get('/api/reports/jobs/missing').status_code == 404
+
+        db.session.add(ReportJob(id='queued', spec_hash='x', spec=SPEC, status='queued'))
+        db.session.commit()
+        assert client.get('/api/reports/jobs/queued').status_code == 202
+        assert client.get('/api/reports/jobs/queued/export').status_code == 409
+
+    @pytest.mark.unit
+    def test_abandoned_job_reported_failed(self, inline_app):
+        """Test a job left running past the timeout by a dead worker is failed, not pending forever."""
+        started = datetime.utcnow() - timedelta(seconds=report_jobs.job_timeout + 1)
+        db.session.add(ReportJob(id='orphan', spec_hash='x', spec=SPEC, status='running', created_at=started,
+                                 started_at=started))
+        db.session.commit()
+
+        response = inline_app.test_client().get('/api/reports/jobs/orphan?wait=5')
+        assert response.status_code == 200
+        assert response.get_json()['status'] == 'failed'
+        assert db.session.get(ReportJob, 'orphan').error
+
+    @pytest.mark.unit
+    def test_timeout_runs_from_start_after_queueing(self, inline_app):
+        """Test a job that waited in the queue gets the full timeout once it starts running."""
+        queued = datetime.utcnow() - timedelta(seconds=report_jobs.job_timeout + 1)
+        db.session.add(ReportJob(id='late', spec_hash='x', spec=SPEC, status='running', created_at=queued,
+                                 started_at=datetime.utcnow()))
+        db.session.commit()
+
+        assert inline_app.test_client().get('/api/reports/jobs/late').status_code == 202
+        assert db.session.get(ReportJob, 'late').status == 'running'
+
+    @pytest.mark.unit
+    def test_abandoned_job_not_completed_later(self, inline_app, monkeypatch):
+        """Test a job failed as abandoned stays failed when its worker finishes after all."""
+        from utils import report_jobs as jobs_module
+        run_spec = jobs_module.run_spec
+
+        def run_past_timeout(spec):
+            result = run_spec(spec)
+            stale = datetime.utcnow() - timedelta(seconds=report_jobs.job_timeout + 1)
+            ReportJob.query.update({'started_at': stale})
+            db.session.commit()
+            assert report_jobs.get(ReportJob.query.one().id).status == 'failed'
+            return result
+
+        monkeypatch.setattr(jobs_module, 'run_spec', run_past_timeout)
+        job, _ = report_jobs.submit(make_spec(**SPEC))
+        assert job.status == 'failed' and job.result is None
+
+
+class TestPooledJobs:
+    """Test jobs run on the worker pool."""
+
+    @pytest.mark.unit
+    def test_long_poll_and_export(self, pooled_app):
+        """Test a template job completes in the background and exports from its result."""
+        client = pooled_app.test_client()
+        submitted = client.post('/api/reports/templates/monthly_revenue?async=true', json={
+            'start_date': SPEC['start_date'], 'end_date': SPEC['end_date'], 'source': 'raw'
+        })
+        assert submitted.status_code in (200, 202)
+        job_id = submitted.get_json()['job_id']
+
+        polled = client.get(f'/api/reports/jobs/{job_id}?wait=10')
+        assert polled.status_code == 200
+        assert polled.get_json()['result']['metrics']['total_revenue'] == 120.0
+
+        export = client.get(f'/api/reports/jobs/{job_id}/export')
+        assert export.mimetype == 'text/csv'
+        assert 'Monthly Revenue Report' in export.get_data(as_text=True)
@@ -0,0 +1,129 @@
+"""
+Unit tests for the custom report planner.
+"""
+
+import pytest
+from datetime import datetime
+from models.database import db, Client, Trainer, Session, Payment, Assignment
+from api.report_routes import report_bp
+from utils.analytics_rollup import analytics_rollup
+from utils.report_planner import ReportPlan, compute_metrics
+from utils.query_instrumentation import capture_queries
+
+START = datetime(2026, 3, 1)
+END = datetime(2026, 3, 31, 23, 59, 59)
+
+ALL_METRICS = [
+    'total_revenue', 'payment_count', 'revenue_by_type', 'client_count', 'active_clients', 'new_clients',
+    'total_sessions', 'completed_sessions', 'attendance_rate', 'sessions_by_type', 'active_trainers',
+    'trainer_performance'
+]
+
+EXPECTED = {
+    'total_revenue': 250.0,
+    'payment_count': 3,
+    'revenue_by_type': {'membership': 200.0, 'Not specified': 50.0},
+    'client_count': 2,
+    'active_clients': 1,
+    'new_clients': 1,
+    'total_sessions': 4,
+    'completed_sessions': 3,
+    'attendance_rate': 75.0,
+    'sessions_by_type': {'personal': 2, 'Not specified': 1},
+    'active_trainers': 2,
+    'trainer_performance': [
+        {'trainer_name': 'Sam', 'sessions': 2, 'revenue': 250.0},
+        {'trainer_name': 'Kim', 'sessions': 1, 'revenue': 0.0},
+    ],
+}
+
+
+@pytest.fixture
+def report_app(sqlite_app):
+    """Flask app on a SQLite file with a month of sessions and payments."""
+    app = sqlite_app(report_bp, ANALYTICS_ROLLUPS=True)
+    analytics_rollup.init_app(app)
+    analytics_rollup._ready = False
+    analytics_rollup._ready_checked_at = 0.0
+    sam = Trainer(name='Sam', email='sam@example.com')
+    kim = Trainer(name='Kim', email='kim@example.com')
+    retired = Trainer(name='Max', email='max@example.com', active=False)
+    old = Client(name='Ana', email='ana@example.com', created_at=datetime(2026, 1, 5))
+    new = Client(name='Bo', email='bo@example.com', created_at=datetime(2026, 3, 5), status='inactive')
+    later = Client(name='Cy', email='cy@example.com', created_at=datetime(2026, 4, 5))
+    db.session.add_all([sam, kim, retired, old, new, later])
+    db.session.flush()
+    db.session.add(Assignment(trainer_id=sam.id, client_id=old.id))
+    for trainer, session_type, status in [(sam, 'personal', 'completed'), (sam, None, 'completed'),
+                                          (kim, 'personal', 'completed'), (kim, 'group', 'cancelled')]:
+        db.session.add(Session(trainer_id=trainer.id, client_id=old.id, session_date=datetime(2026, 3, 10),
+                               session_type=session_type, status=status))
+    db.session.add(Session(trainer_id=sam.id, client_id=old.id, session_date=datetime(2026, 4, 2),
+                           status='completed'))
+    for amount, payment_type, status in [(150, 'membership', 'completed'), (50, 'membership', 'completed'),
+                                         (50, None, 'completed'), (999, 'membership', 'pending')]:
+        db.session.add(Payment(client_id=old.id, amount=amount, payment_type=payment_type, status=status,
+                               payment_date=datetime(2026, 3, 12)))
+    db.session.commit()
+    return app
+
+
+class TestReportPlan:
+    """Test metric grouping and execution."""
+
+    @pytest.mark.unit
+    def test_one_query_per_table(self, report_app):
+        """Test every metric is answered by one query per source table."""
+        plan = ReportPlan([(metric, START, END) for metric in ALL_METRICS])
+        assert {key[0] for key in plan.groups} == {'payments', 'clients', 'sessions', 'trainers', 'trainer_revenue'}
+
+        with capture_queries() as stats:
+            metrics = compute_metrics(ALL_METRICS, START, END, workers=1)
+        assert stats.count == 5
+        assert metrics == EXPECTED
+        assert list(metrics) == ALL_METRICS
+
+    @pytest.mark.unit
+    def test_concurrent_matches_sequential(self, report_app):
+        """Test concurrent groups return the same values on their own connections."""
+        assert compute_metrics(ALL_METRICS, START, END, workers=4) == EXPECTED
+
+    @pytest.mark.unit
+    def test_date_ranges_grouped(self, report_app):
+        """Test requests over two ranges share undated sources only."""
+        april = (datetime(2026, 4, 1), datetime(2026, 4, 30))
+        plan = ReportPlan([('completed_sessions', START, END), ('completed_sessions', *april),
+                           ('active_trainers', START, END), ('active_trainers', *april)])
+        assert len(plan.groups) == 3
+        values = plan.execute(workers=1)
+        assert values[('completed_sessions', *april)] == 1
+        assert values[('active_trainers', *april)] == 2
+
+    @pytest.mark.unit
+    def test_rollups_match_raw(self, report_app):
+        """Test rollup-backed metrics come from one rollup query and match the raw tables."""
+        analytics_rollup.rebuild()
+        with capture_queries() as stats:
+            metrics = compute_metrics(ALL_METRICS, START, END, use_rollups=True, workers=1)
+        assert len([shape for shape in stats.fingerprints if 'analytics_daily_rollups' in shape]) == 1
+        assert metrics == EXPECTED
+
+
+class TestReportRoutes:
+    """Test the report endpoints use the planner."""
+
+    @pytest.mark.unit
+    def test_custom_and_template(self, report_app):
+        """Test custom and template reports return planned metrics."""
+        client = report_app.test_client()
+        response = client.post('/api/reports/custom', json={
+            'metrics': ['attendance_rate', 'unknown'], 'start_date': START.isoformat(),
+            'end_date': END.isoformat(), 'source': 'raw'
+        })
+        assert response.status_code == 200
+        assert response.get_json()['metrics'] == {'attendance_rate': 75.0}
+
+        response = client.post('/api/reports/templates/comprehensive', json={
+            'start_date': START.isoformat(), 'end_date': END.isoformat()
+        })
+        assert response.get_json()['metrics']['total_revenue'] == 250.0
@@ -0,0 +1,146 @@
+"""
+Unit tests for revenue forecasting.
+"""
+
+import math
+import pytest
+from datetime import date, datetime
+from models.database import db, Client, Payment, RevenueForecastModel
+from api.advanced_analytics_routes import advanced_analytics_bp
+from utils import revenue_forecast
+from utils.revenue_forecast import get_model, project, refresh_models, fit_parameters, last_closed_period
+from utils.query_instrumentation import capture_queries
+
+TODAY = date(2026, 1, 10)
+
+
+def _revenue(month_index):
+    """Trend plus a yearly cycle"""
+    return 1000 + 20 * month_index + 200 * math.sin(2 * math.pi * (month_index % 12) / 12)
+
+
+def _month(month_index):
+    """Start of a month in the series; the 36th (index 35) is the last closed one"""
+    start = last_closed_period('month')
+    months = start.year * 12 + start.month - 1 + month_index - 35
+    return date(months // 12, months % 12 + 1, 1)
+
+
+@pytest.fixture
+def forecast_app(sqlite_app):
+    """Flask app on a SQLite file with three years of monthly payments."""
+    app = sqlite_app(advanced_analytics_bp)
+    monthly = Client(name='Ana', email='ana@example.com', membership_type='monthly')
+    annual = Client(name='Bo', email='bo@example.com', membership_type='annual')
+    db.session.add_all([monthly, annual])
+    db.session.flush()
+    for i in range(36):
+        paid = datetime.combine(_month(i), datetime.min.time()).replace(day=15)
+        db.session.add_all([
+            Payment(client_id=monthly.id, amount=_revenue(i), payment_date=paid, payment_type='membership'),
+            Payment(client_id=annual.id, amount=300, payment_date=paid, payment_type='session'),
+        ])
+    db.session.commit()
+    return app
+
+
+class TestFitting:
+    """Test model fitting and projection."""
+
+    @pytest.mark.unit
+    def test_seasonal_series_recovered(self):
+        """Test Holt-Winters reproduces a noiseless trend plus season."""
+        fitted = fit_parameters([_revenue(i) for i in range(36)], 12)
+        assert fitted['method'] == 'holt_winters'
+        assert fitted['sse'] == pytest.approx(0, abs=1e-6)
+
+    @pytest.mark.unit
+    def test_short_history_falls_back(self):
+        """Test short series use non-seasonal smoothing."""
+        assert fit_parameters([100, 120, 140, 160], 12)['method'] == 'holt'
+        assert fit_parameters([100], 12)['method'] == 'mean'
+
+    @pytest.mark.unit
+    def test_last_closed_period(self):
+        """Test the current, open period is never trained on."""
+        assert last_closed_period('month', TODAY) == date(2025, 12, 1)
+        assert last_closed_period('week', TODAY) == date(2025, 12, 29)
+
+
+class TestModels:
+    """Test stored models and incremental updates."""
+
+    @pytest.mark.unit
+    def test_forecast_from_stored_model(self, forecast_app):
+        """Test forecasts follow the series and later calls skip the series query."""
+        model = get_model('all', 'month')
+        forecast = project(model, 3)
+        assert [item['period'] for item in forecast] == [_month(i).strftime('%Y-%m') for i in (36, 37, 38)]
+        for i, item in enumerate(forecast):
+            assert item['projected_revenue'] == pytest.approx(_revenue(36 + i) + 300, abs=0.01)
+            assert item['lower'] <= item['projected_revenue'] <= item['upper']
+
+        with capture_queries() as stats:
+            get_model('all', 'month')
+        assert not [shape for shape in stats.fingerprints if 'FROM payments' in shape]
+
+    @pytest.mark.unit
+    def test_concurrent_first_fit_reads_stored_model(self, forecast_app, monkeypatch):
+        """Test losing the race to store a segment's first model returns the winner's row."""
+        fit = revenue_forecast._fit_model
+
+        def fit_while_another_worker_stores(model, *args):
+            fit(model, *args)
+            table = RevenueForecastModel.__table__
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(
+                    {column.name: getattr(model, column.name) for column in table.columns if column.name != 'id'}
+                ))
+
+        monkeypatch.setattr(revenue_forecast, '_fit_model', fit_while_another_worker_stores)
+        model = get_model('all', 'month')
+        assert model.id is not None
+        assert RevenueForecastModel.query.count() == 1
+
+    @pytest.mark.unit
+    def test_new_periods_roll_forward(self, forecast_app):
+        """Test closed periods update the state without refitting."""
+        fitted_at = get_model('all', 'month').fitted_at
+        db.session.add(Payment(client_id=1, amount=5000,
+                               payment_date=datetime.combine(_month(36), datetime.min.time())))
+        db.session.commit()
+
+        model = get_model('all', 'month', today=_month(37))
+        assert model.trained_through == _month(36)
+        assert model.observations == 37
+        assert model.fitted_at == fitted_at
+
+    @pytest.mark.unit
+    def test_refresh_refits_changed_history(self, forecast_app):
+        """Test the nightly refresh fits every segment and refits on late changes."""
+        assert refresh_models() == {'fitted': 10, 'rolled_forward': 0, 'current': 0}
+        assert RevenueForecastModel.query.filter_by(segment='membership_type', period='month').count() == 2
+
+        # A late payment changes the overall, monthly-membership and membership-payment history
+        db.session.add(Payment(client_id=1, amount=50, payment_type='membership',
+                               payment_date=datetime.combine(_month(20), datetime.min.time())))
+        db.session.commit()
+        stats = refresh_models(periods=('month',))
+        assert stats['fitted'] == 3 and stats['current'] == 2
+
+
+class TestForecastRoute:
+    """Test the forecast endpoint."""
+
+    @pytest.mark.unit
+    def test_segmented_scenario(self, forecast_app):
+        """Test segment, interval and scenario parameters."""
+        client = forecast_app.test_client()
+        url = '/api/analytics/advanced/revenue-forecast?months=2&segment=membership_type&segment_key=annual'
+        base = client.get(url).get_json()
+        scenario = client.get(url + '&growth=10&confidence=0.8').get_json()
+
+        assert base['monthly_forecast'][0]['projected_revenue'] == pytest.approx(300)
+        assert scenario['monthly_forecast'][1]['projected_revenue'] == pytest.approx(300 * 1.1 ** 2)
+        assert client.get(url.replace('annual', 'weekly')).status_code == 404
+        assert client.get(url + '&confidence=0.5').status_code == 400
@@ -0,0 +1,83 @@
+"""
+Unit tests for the paginated session list.
+"""
+
+import pytest
+from datetime import datetime, timedelta
+from models.database import db, Client, Trainer, Session
+from api.session_routes import session_bp
+from utils.session_listing import encode_cursor, decode_cursor
+from utils.query_instrumentation import capture_queries
+
+DAY = datetime(2026, 10, 20, 9, 0)
+
+
+@pytest.fixture
+def listing_app(sqlite_app):
+    """Flask app on a SQLite file with the session routes and seven sessions."""
+    app = sqlite_app(session_bp)
+    trainers = [Trainer(name='Sam', email='sam@example.com'), Trainer(name='Kim', email='kim@example.com')]
+    client = Client(name='Ana', email='ana@example.com')
+    db.session.add_all(trainers + [client])
+    db.session.flush()
+    # Two sessions share each start time, so pages must break ties on id
+    for hour in range(7):
+        db.session.add(Session(trainer_id=trainers[hour % 2].id, client_id=client.id,
+                               session_date=DAY + timedelta(hours=hour // 2), duration=45))
+    db.session.commit()
+    app.trainer_id = trainers[0].id
+    return app
+
+
+class TestCursor:
+    """Test cursor encoding."""
+
+    @pytest.mark.unit
+    def test_round_trip(self):
+        """Test a cursor decodes to its position and garbage is rejected."""
+        assert decode_cursor(encode_cursor(DAY, 42)) == (DAY, 42)
+        with pytest.raises(ValueError):
+            decode_cursor('not a cursor')
+
+
+class TestSessionList:
+    """Test the session list endpoint."""
+
+    @pytest.mark.unit
+    def test_legacy_list(self, listing_app):
+        """Test the unpaginated list keeps its shape with names from one query."""
+        client = listing_app.test_client()
+        with capture_queries() as stats:
+            response = client.get(f'/api/sessions?trainer_id={listing_app.trainer_id}')
+        sessions = response.get_json()
+
+        assert response.status_code == 200
+        assert isinstance(sessions, list) and len(sessions) == 4
+        assert sessions[0]['trainer_name'] == 'Sam' and sessions[0]['client_name'] == 'Ana'
+        assert sessions[0]['end_time'] == (DAY + timedelta(minutes=45)).isoformat()
+        assert len([shape for shape in stats.fingerprints if 'FROM sessions' in shape]) == 1
+        assert not any('FROM trainers WHERE' in shape for shape in stats.fingerprints)
+
+    @pytest.mark.unit
+    def test_pages_cover_every_row_once(self, listing_app):
+        """Test following next_cursor visits each session once in order."""
+        client = listing_app.test_client()
+        seen = []
+        url = '/api/sessions?limit=3&fields=id,session_date'
+        while url:
+            page = client.get(url).get_json()
+            assert len(page['sessions']) <= 3
+            seen += [(item['session_date'], item['id']) for item in page['sessions']]
+            url = f"/api/sessions?limit=3&fields=id,session_date&cursor={page['next_cursor']}" \
+                if page['has_more'] else None
+
+        assert len(seen) == 7
+        assert seen == sorted(seen)
+        assert set(page['sessions'][0]) == {'id', 'session_date'}
+
+    @pytest.mark.unit
+    def test_bad_parameters(self, listing_app):
+        """Test unknown fields and malformed cursors are rejected."""
+        client = listing_app.test_client()
+        assert client.get('/api/sessions?fields=id,password').status_code == 400
+        assert client.get('/api/sessions?cursor=abc').status_code == 400
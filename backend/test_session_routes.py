@@ -192,3 +192,42 @@ class TestSessionRoutes:
         data = response.get_json()
         
         assert all(s['status'] == 'completed' for s in data)
+    
+    @pytest.mark.api
+    def test_create_conflicting_session(self, client, db_session, sample_trainer, sample_client, sample_session):
+        """Test POST /api/sessions rejects an overlapping booking."""
+        trainer = Trainer(**sample_trainer)
+        client_obj = Client(**sample_client)
+        db_session.add_all([trainer, client_obj])
+        db_session.commit()
+        
+        session_data = {**sample_session, 'trainer_id': trainer.id, 'client_id': client_obj.id}
+        assert client.post('/api/sessions', json=session_data).status_code == 201
+        
+        response = client.post('/api/sessions', json=session_data)
+        assert response.status_code == 409
+        assert 'conflict' in response.get_json()
+    
+    @pytest.mark.api
+    def test_check_session_conflicts_batch(self, client, db_session, sample_trainer, sample_client, sample_session):
+        """Test POST /api/sessions/conflicts validates many slots at once."""
+        trainer = Trainer(**sample_trainer)
+        client_obj = Client(**sample_client)
+        db_session.add_all([trainer, client_obj])
+        db_session.commit()
+        
+        client.post('/api/sessions', json={**sample_session, 'trainer_id': trainer.id, 'client_id': client_obj.id})
+        booked = datetime.fromisoformat(sample_session['session_date'])
+        
+        response = client.post('/api/sessions/conflicts', json={
+            'trainer_id': trainer.id,
+            'slots': [
+                {'session_date': booked.isoformat(), 'duration': 30},
+                {'session_date': (booked + timedelta(days=1)).isoformat(), 'duration': 60},
+            ]
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        
+        assert [slot['available'] for slot in data['slots']] == [False, True]
+        assert data['available'] == 1
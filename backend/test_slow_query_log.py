@@ -0,0 +1,111 @@
+"""
+Unit tests for the slow query log.
+"""
+
+import logging
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from utils.slow_query_log import SlowQueryLog, SharedRotatingFileHandler, redact_parameters
+
+
+class TestRedaction:
+    """Test parameter redaction."""
+
+    @pytest.mark.unit
+    def test_strings_reduced_to_length(self):
+        """Test string values are replaced and numbers kept."""
+        redacted = redact_parameters(('jane@example.com', 42, None))
+        assert redacted == ['<str:16>', 42, None]
+
+    @pytest.mark.unit
+    def test_sensitive_names_hidden(self):
+        """Test values of sensitive parameter names are always hidden."""
+        redacted = redact_parameters({'email_1': 'jane@example.com', 'id_1': 7, 'client_phone': 5551234})
+        assert redacted == {'email_1': '<redacted>', 'id_1': 7, 'client_phone': '<redacted>'}
+
+    @pytest.mark.unit
+    def test_executemany_summarized(self):
+        """Test batches only keep the number of parameter sets."""
+        assert redact_parameters([(1, 'a'), (2, 'b')]) == '<2 parameter sets>'
+
+
+class TestSlowQueryRecording:
+    """Test recording slow statements with their plans."""
+
+    @pytest.mark.unit
+    def test_records_statement_with_plan(self, tmp_path):
+        """Test statements over the threshold are written with an EXPLAIN plan."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'crm.db'}")
+        with engine.begin() as conn:
+            conn.execute(text('CREATE TABLE clients (id INTEGER PRIMARY KEY, email TEXT)'))
+
+        app = Flask(__name__)
+        app.config.update(
+            SLOW_QUERY_LOG=True,
+            SLOW_QUERY_THRESHOLD_MS=0,
+            SLOW_QUERY_LOG_PATH=str(tmp_path / 'slow.jsonl'),
+        )
+        slow_log = SlowQueryLog()
+        slow_log.init_app(app, engine)
+
+        with engine.connect() as conn:
+            conn.execute(text('SELECT * FROM clients WHERE email = :email'), {'email': 'jane@example.com'})
+        slow_log.flush()
+
+        entries = slow_log.get_entries()
+        select = [e for e in entries if e['statement'].startswith('SELECT')][0]
+        assert select['parameters'] == ['<str:16>']
+        assert select['plan'] and 'clients' in select['plan'][0]
+        assert 'jane@example.com' not in (tmp_path / 'slow.jsonl').read_text()
+
+    @pytest.mark.unit
+    def test_reopens_after_external_rotation(self, tmp_path):
+        """Test entries go to a fresh file once the log is rotated and both are read back."""
+        engine = create_engine('sqlite://')
+        app = Flask(__name__)
+        app.config.update(
+            SLOW_QUERY_LOG=True,
+            SLOW_QUERY_THRESHOLD_MS=0,
+            SLOW_QUERY_EXPLAIN=False,
+            SLOW_QUERY_LOG_PATH=str(tmp_path / 'slow.jsonl'),
+        )
+        slow_log = SlowQueryLog()
+        slow_log.init_app(app, engine)
+
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+            slow_log.flush()
+            (tmp_path / 'slow.jsonl').rename(tmp_path / 'slow.jsonl.1')
+            conn.execute(text('SELECT 2'))
+            slow_log.flush()
+
+        assert 'SELECT 2' in (tmp_path / 'slow.jsonl').read_text()
+        assert 'SELECT 2' not in (tmp_path / 'slow.jsonl.1').read_text()
+        statements = [e['statement'] for e in slow_log.get_entries()]
+        assert statements.index('SELECT 2') < statements.index('SELECT 1')
+
+    @pytest.mark.unit
+    def test_workers_share_rotation(self, tmp_path):
+        """Test handlers in several workers rotate the shared file without losing entries."""
+        path = str(tmp_path / 'slow.jsonl')
+        workers = [SharedRotatingFileHandler(path, max_bytes=100, backups=20) for _ in range(2)]
+        for i in range(30):
+            workers[i % 2].emit(logging.makeLogRecord({'msg': f'{i:03d}' + 'x' * 16}))
+        for handler in workers:
+            handler.close()
+
+        files = [path] + [f'{path}.{i}' for i in range(1, 21)]
+        lines = [line[:3] for f in files if (tmp_path / f).exists() for line in open(f)]
+        assert sorted(lines) == [f'{i:03d}' for i in range(30)]
+        assert all((tmp_path / f).stat().st_size <= 100 for f in files if (tmp_path / f).exists())
+
+    @pytest.mark.unit
+    def test_disabled_by_default(self, tmp_path):
+        """Test nothing is recorded unless SLOW_QUERY_LOG is set."""
+        app = Flask(__name__)
+        slow_log = SlowQueryLog()
+        slow_log.init_app(app, create_engine('sqlite://'))
+
+        assert slow_log.enabled is False
+        assert slow_log.get_entries() == []
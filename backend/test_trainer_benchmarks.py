@@ -0,0 +1,88 @@
+"""
+Unit tests for trainer benchmark populations.
+"""
+
+import pytest
+import numpy as np
+from datetime import datetime, timedelta
+from models.database import db, Client, Trainer, Session
+from api.advanced_analytics_routes import advanced_analytics_bp
+from utils.trainer_benchmarks import trainer_benchmarks, percentile_ranks
+from utils.query_instrumentation import capture_queries
+
+
+@pytest.fixture
+def benchmark_app(sqlite_app):
+    """Flask app on a SQLite file with three active trainers and one inactive."""
+    app = sqlite_app(advanced_analytics_bp)
+    trainer_benchmarks.init_app(app)
+    busy = Trainer(name='Sam', email='sam@example.com')
+    steady = Trainer(name='Kim', email='kim@example.com')
+    new = Trainer(name='Lee', email='lee@example.com')
+    retired = Trainer(name='Max', email='max@example.com', active=False)
+    clients = [Client(name=f'Client {i}', email=f'c{i}@example.com') for i in range(3)]
+    db.session.add_all([busy, steady, new, retired] + clients)
+    db.session.flush()
+    last_week = datetime.utcnow() - timedelta(days=7)
+    for i in range(6):
+        db.session.add(Session(trainer_id=busy.id, client_id=clients[i % 3].id, session_date=last_week,
+                               status='completed'))
+    for i in range(4):
+        db.session.add(Session(trainer_id=steady.id, client_id=clients[0].id, session_date=last_week,
+                               status='completed' if i % 2 else 'cancelled'))
+    db.session.add(Session(trainer_id=retired.id, client_id=clients[0].id,
+                           session_date=last_week - timedelta(days=60), status='completed'))
+    db.session.commit()
+    app.ids = {'busy': busy.id, 'steady': steady.id, 'new': new.id, 'retired': retired.id}
+    return app
+
+
+class TestPercentileRanks:
+    """Test the rank calculation."""
+
+    @pytest.mark.unit
+    def test_ties_count_half(self):
+        """Test ranks count ties as half below."""
+        ranks = percentile_ranks(np.array([1, 2, 2, 4]), np.array([1, 2, 4, 5]))
+        assert ranks.tolist() == [12.5, 50.0, 87.5, 100.0]
+
+
+class TestPopulation:
+    """Test population caching and benchmarks."""
+
+    @pytest.mark.unit
+    def test_all_benchmarks_one_query(self, benchmark_app):
+        """Test every trainer is ranked from a single cached query."""
+        ids = benchmark_app.ids
+        with capture_queries() as stats:
+            benchmarks, population = trainer_benchmarks.all_benchmarks()
+            trainer_benchmarks.benchmark(ids['steady'])
+        assert stats.count == 1
+
+        assert [b['trainer_id'] for b in benchmarks] == [ids['busy'], ids['steady'], ids['new']]
+        assert [b['rank'] for b in benchmarks] == [1, 2, 3]
+        assert benchmarks[0]['metrics'] == {'total_sessions': 6, 'completed_sessions': 6,
+                                            'completion_rate': 100.0, 'unique_clients': 3}
+        assert benchmarks[0]['benchmarks']['avg_completion_rate'] == 80.0
+        assert population.summary()['percentiles']['total_sessions']['p50'] == 4.0
+        assert trainer_benchmarks.all_benchmarks()[0] == benchmarks
+
+    @pytest.mark.unit
+    def test_inactive_trainer_and_window(self, benchmark_app):
+        """Test inactive trainers rank against the population and windows filter sessions."""
+        ids = benchmark_app.ids
+        retired = trainer_benchmarks.benchmark(ids['retired'])
+        assert retired['rank'] is None and retired['metrics']['total_sessions'] == 1
+        assert trainer_benchmarks.benchmark(ids['retired'], days=30)['metrics']['total_sessions'] == 0
+        assert trainer_benchmarks.benchmark(999) is None
+
+    @pytest.mark.unit
+    def test_routes(self, benchmark_app):
+        """Test the single and all-trainer endpoints read the population."""
+        client = benchmark_app.test_client()
+        data = client.get('/api/analytics/advanced/trainer-benchmark/all').get_json()
+        assert data['total'] == 3 and data['population']['trainers'] == 3
+
+        single = client.get(f"/api/analytics/advanced/trainer-benchmark/{benchmark_app.ids['busy']}").get_json()
+        assert single['performance_score'] == data['benchmarks'][0]['performance_score']
+        assert client.get('/api/analytics/advanced/trainer-benchmark/999').status_code == 404
@@ -0,0 +1,224 @@
+"""
+Analytics response cache
+Caches successful analytics GET responses per worker process, keyed by
+endpoint and normalised query arguments, for ANALYTICS_CACHE_TTL seconds.
+
+Entries are dropped as soon as a commit touches the tables the analytics
+read (clients, trainers, sessions, payments, assignments, workout logs).
+Concurrent identical requests are coalesced: one computes the response
+and the others wait for it instead of running the same aggregates.
+
+Other workers only see a commit once their entries expire, so the TTL
+bounds how stale a response can be across workers.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from flask import request, make_response
+from sqlalchemy import event
+from models.database import (
+    db, Client, Trainer, Session, Payment, Assignment, WorkoutLog, ClientChurnScore, RevenueForecastModel
+)
+
+# Models whose changes invalidate cached analytics
+INVALIDATING_MODELS = (
+    Client, Trainer, Session, Payment, Assignment, WorkoutLog, ClientChurnScore, RevenueForecastModel
+)
+
+_SESSION_FLAG = 'analytics_cache_dirty'
+
+
+class _Entry:
+    """A cached response body"""
+
+    __slots__ = ('body', 'status', 'mimetype', 'expires_at')
+
+    def __init__(self, body, status, mimetype, expires_at):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.expires_at = expires_at
+
+
+class _Flight:
+    """A response being computed for waiting duplicate requests"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry = None
+
+
+class AnalyticsCache:
+    """In-process TTL cache with commit-driven invalidation and request coalescing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._generation = 0
+        self.enabled = False
+        self.ttl = 60
+        self.max_entries = 256
+        self.wait_timeout = 30
+        self.reset_stats()
+
+    def init_app(self, app):
+        """Configure from app settings and listen for commits"""
+        self.enabled = app.config.get('ANALYTICS_CACHE', True)
+        self.ttl = app.config.get('ANALYTICS_CACHE_TTL', 60)
+        self.max_entries = app.config.get('ANALYTICS_CACHE_MAX_ENTRIES', 256)
+        self.wait_timeout = app.config.get('ANALYTICS_CACHE_WAIT_TIMEOUT', 30)
+        self.clear()
+
+        if getattr(db.session, '_fitnesscrm_analytics_cache', False):
+            return
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._on_orm_execute)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        db.session._fitnesscrm_analytics_cache = True
+
+    def reset_stats(self):
+        """Clear hit/miss counters"""
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    def get_stats(self):
+        """Get cache statistics for this worker"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ttl_seconds': self.ttl,
+                'entries': len(self._entries),
+                'in_flight': len(self._in_flight),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'invalidations': self.invalidations,
+            }
+
+    def clear(self):
+        """Drop every cached response"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def invalidate(self):
+        """Drop cached responses after the underlying data changed"""
+        self.clear()
+        with self._lock:
+            self.invalidations += 1
+
+    # Invalidation hooks
+
+    def _after_flush(self, session, flush_context):
+        if session.info.get(_SESSION_FLAG):
+            return
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            if isinstance(obj, INVALIDATING_MODELS):
+                session.info[_SESSION_FLAG] = True
+                return
+
+    def _on_orm_execute(self, orm_execute_state):
+        # Bulk INSERT/UPDATE/DELETE statements don't go through the flush
+        if orm_execute_state.is_select:
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, INVALIDATING_MODELS):
+            orm_execute_state.session.info[_SESSION_FLAG] = True
+
+    def _after_commit(self, session):
+        if session.info.pop(_SESSION_FLAG, False):
+            self.invalidate()
+
+    # Request handling
+
+    def make_key(self):
+        """Cache key for the current request: endpoint and sorted query args"""
+        args = tuple(sorted(
+            (name, value.strip()) for name, value in request.args.items(multi=True)
+            if value.strip()
+        ))
+        return (request.endpoint, tuple(sorted((request.view_args or {}).items())), args)
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, entry, generation):
+        with self._lock:
+            # Data changed while this response was computed; don't keep it
+            if generation != self._generation:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _respond(self, entry, state):
+        response = make_response(entry.body, entry.status)
+        response.mimetype = entry.mimetype
+        response.headers['X-Cache'] = state
+        return response
+
+    def cached(self, view):
+        """Decorator caching a view's successful GET responses"""
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = self.make_key()
+            entry = self._get(key)
+            if entry is not None:
+                return self._respond(entry, 'HIT')
+
+            with self._lock:
+                flight = self._in_flight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._in_flight[key] = _Flight()
+                    generation = self._generation
+                else:
+                    self.coalesced += 1
+
+            if not leader:
+                # Identical request already running: reuse its response
+                flight.done.wait(self.wait_timeout)
+                if flight.entry is not None:
+                    return self._respond(flight.entry, 'COALESCED')
+                return view(*args, **kwargs)
+
+            try:
+                with self._lock:
+                    self.misses += 1
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.direct_passthrough:
+                    entry = _Entry(response.get_data(), response.status_code, response.mimetype,
+                                   time.monotonic() + self.ttl)
+                    flight.entry = entry
+                    self._store(key, entry, generation)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+                flight.done.set()
+
+        return wrapper
+
+
+# Global cache instance
+analytics_cache = AnalyticsCache()
@@ -0,0 +1,552 @@
+"""
+Daily analytics rollups
+Keeps analytics_daily_rollups in step with sessions, payments and clients
+written through the ORM, rebuilds it from raw tables in bulk, and answers
+range queries for the analytics endpoints from the rollup rows.
+
+ORM bulk inserts and bulk deletes are tracked too. Writes bypassing the ORM
+(raw SQL, bulk UPDATE queries, the legacy psycopg2 app, data imports) are
+not; run rebuild_analytics_rollups.py afterwards.
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import String, and_, case, cast, event, func, inspect, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.database import db, AnalyticsDailyRollup, Session, Payment, Client
+from utils.logger import logger
+
+SESSION_STATUS_COLUMNS = {
+    'scheduled': 'sessions_scheduled',
+    'completed': 'sessions_completed',
+    'cancelled': 'sessions_cancelled',
+    'no-show': 'sessions_no_show',
+}
+PAYMENT_STATUSES = ('completed', 'pending', 'refunded', 'failed')
+
+METRIC_COLUMNS = (
+    'sessions_total', 'sessions_scheduled', 'sessions_completed', 'sessions_cancelled',
+    'sessions_no_show', 'completed_minutes',
+    'payments_completed', 'payments_pending', 'payments_refunded', 'payments_failed',
+    'revenue_completed', 'revenue_pending', 'revenue_refunded', 'revenue_failed',
+    'new_clients', 'churned_clients',
+)
+
+# Attributes whose changes move a row between rollup buckets
+TRACKED_ATTRIBUTES = {
+    Session: ('session_date', 'status', 'duration', 'trainer_id', 'client_id', 'session_type'),
+    Payment: ('payment_date', 'status', 'amount', 'client_id', 'payment_type'),
+    Client: ('created_at', 'status'),
+}
+
+# Marker row written by rebuild(); rollups are only read once it exists
+READY_SCOPE = 'meta'
+READY_KEY = 'rebuilt'
+READY_RECHECK_SECONDS = 60
+
+
+def session_contributions(values):
+    """Rollup deltas contributed by one session: [(day, scope, key, metrics)]"""
+    if not values.get('session_date'):
+        return []
+    status = values.get('status')
+    metrics = {'sessions_total': 1}
+    if status in SESSION_STATUS_COLUMNS:
+        metrics[SESSION_STATUS_COLUMNS[status]] = 1
+    if status == 'completed':
+        metrics['completed_minutes'] = values.get('duration') or 0
+
+    day = values['session_date'].date()
+    return [
+        (day, 'all', '', metrics),
+        (day, 'trainer', str(values.get('trainer_id')), metrics),
+        (day, 'client', str(values.get('client_id')), metrics),
+        (day, 'session_type', values.get('session_type') or '', metrics),
+    ]
+
+
+def payment_contributions(values):
+    """Rollup deltas contributed by one payment"""
+    status = values.get('status')
+    if not values.get('payment_date') or status not in PAYMENT_STATUSES:
+        return []
+    metrics = {f'payments_{status}': 1, f'revenue_{status}': values.get('amount') or 0}
+
+    day = values['payment_date'].date()
+    return [
+        (day, 'all', '', metrics),
+        (day, 'client', str(values.get('client_id')), metrics),
+        (day, 'payment_type', values.get('payment_type') or '', metrics),
+    ]
+
+
+def client_contributions(values):
+    """Rollup deltas contributed by one client (sign-up day)"""
+    if not values.get('created_at'):
+        return []
+    return [(values['created_at'].date(), 'all', '', {'new_clients': 1})]
+
+
+CONTRIBUTIONS = {
+    Session: session_contributions,
+    Payment: payment_contributions,
+    Client: client_contributions,
+}
+
+
+def _current_values(obj, attributes):
+    return {attr: getattr(obj, attr) for attr in attributes}
+
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+
+def _column_defaults(model, attributes):
+    """Client-side column defaults, for rows inserted without every attribute"""
+    defaults = {}
+    for attr in attributes:
+        default = model.__table__.c[attr].default
+        if default is None:
+            continue
+        defaults[attr] = default.arg(None) if default.is_callable else default.arg
+    return defaults
+
+
+def _previous_values(obj, attributes):
+    """Attribute values as they were before the pending changes"""
+    state = inspect(obj)
+    values = {}
+    for attr in attributes:
+        history = state.attrs[attr].history
+        if history.deleted:
+            values[attr] = history.deleted[0]
+        elif history.unchanged:
+            values[attr] = history.unchanged[0]
+        else:
+            values[attr] = None
+    return values
+
+
+class AnalyticsRollup:
+    """Incremental maintenance and querying of the daily analytics rollups"""
+
+    def __init__(self):
+        self.enabled = False
+        self._ready = False
+        self._ready_checked_at = 0.0
+        self._table_exists = False
+
+    def init_app(self, app):
+        """Track ORM writes to sessions, payments and clients (if ANALYTICS_ROLLUPS is set)"""
+        self.enabled = app.config.get('ANALYTICS_ROLLUPS', True)
+        if not self.enabled or getattr(db.session, '_fitnesscrm_rollups', False):
+            return
+        # Keep the old value of tracked attributes even when set while expired
+        for model, attributes in TRACKED_ATTRIBUTES.items():
+            for attr in attributes:
+                event.listen(getattr(model, attr), 'set', _keep_history, active_history=True)
+        event.listen(db.session, 'before_flush', self._before_flush)
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._on_orm_execute)
+        db.session._fitnesscrm_rollups = True
+
+    # Incremental maintenance
+
+    def _before_flush(self, session, flush_context, instances):
+        # Deleted rows can't be reloaded after the flush, so load them now
+        for obj in session.deleted:
+            for attr in TRACKED_ATTRIBUTES.get(type(obj), ()):
+                getattr(obj, attr)
+
+    def _after_flush(self, session, flush_context):
+        changes = []
+
+        for obj in session.new:
+            model = type(obj)
+            if model in CONTRIBUTIONS:
+                changes.append((CONTRIBUTIONS[model](_current_values(obj, TRACKED_ATTRIBUTES[model])), 1))
+
+        for obj in session.deleted:
+            model = type(obj)
+            if model in CONTRIBUTIONS:
+                changes.append((CONTRIBUTIONS[model](_previous_values(obj, TRACKED_ATTRIBUTES[model])), -1))
+
+        for obj in session.dirty:
+            model = type(obj)
+            if model not in CONTRIBUTIONS or not session.is_modified(obj):
+                continue
+            attributes = TRACKED_ATTRIBUTES[model]
+            before = _previous_values(obj, attributes)
+            after = _current_values(obj, attributes)
+            if before == after:
+                continue
+            changes.append((CONTRIBUTIONS[model](before), -1))
+            changes.append((CONTRIBUTIONS[model](after), 1))
+            # Churn is an event: counted on the day a client becomes inactive
+            if model is Client and after['status'] == 'inactive' and before['status'] != 'inactive':
+                changes.append(([(datetime.utcnow().date(), 'all', '', {'churned_clients': 1})], 1))
+
+        self._apply_changes(session, changes)
+
+    def _on_orm_execute(self, orm_execute_state):
+        """Track ORM bulk INSERT (session.execute(insert(Model), rows)) and bulk DELETE"""
+        if not (orm_execute_state.is_insert or orm_execute_state.is_delete):
+            return
+        mapper = orm_execute_state.bind_mapper
+        model = mapper.class_ if mapper is not None else None
+        if model not in CONTRIBUTIONS:
+            return
+        attributes = TRACKED_ATTRIBUTES[model]
+        session = orm_execute_state.session
+
+        if orm_execute_state.is_insert:
+            parameters = orm_execute_state.parameters
+            if not parameters:
+                return
+            rows = parameters if isinstance(parameters, list) else [parameters]
+            defaults = _column_defaults(model, attributes)
+            changes = [
+                (CONTRIBUTIONS[model]({attr: row.get(attr, defaults.get(attr)) for attr in attributes}), 1)
+                for row in rows
+            ]
+        else:
+            # Read the rows about to be deleted with the same criteria
+            where = orm_execute_state.statement.whereclause
+            query = select(*[getattr(model, attr) for attr in attributes])
+            if where is not None:
+                query = query.where(where)
+            changes = [
+                (CONTRIBUTIONS[model](dict(row)), -1)
+                for row in session.execute(query, orm_execute_state.parameters or {}).mappings()
+            ]
+
+        self._apply_changes(session, changes)
+
+    def _apply_changes(self, session, changes):
+        """Sum (contributions, sign) pairs per rollup row and write them"""
+        deltas = defaultdict(lambda: defaultdict(float))
+        for contributions, sign in changes:
+            for day, scope, key, metrics in contributions:
+                bucket = deltas[(day, scope, key)]
+                for metric, value in metrics.items():
+                    bucket[metric] += sign * value
+
+        rows = [
+            (day, scope, key, metrics) for (day, scope, key), metrics in deltas.items()
+            if any(metrics.values())
+        ]
+        if not rows:
+            return
+        # Applied even before the first rebuild, whose delete and INSERT ...
+        # SELECT overwrite them, so no write is lost while a worker's cached
+        # readiness still says the rollups are unbuilt
+        conn = session.connection()
+        if self._has_table(conn):
+            self._apply_deltas(conn, rows)
+
+    def _has_table(self, conn):
+        """True once analytics_daily_rollups exists (init_db.py or the first rebuild create it)"""
+        if not self._table_exists:
+            self._table_exists = inspect(conn).has_table(AnalyticsDailyRollup.__tablename__)
+        return self._table_exists
+
+    def _apply_deltas(self, conn, rows):
+        """Add metric deltas to rollup rows, creating them as needed"""
+        table = AnalyticsDailyRollup.__table__
+        now = datetime.utcnow()
+        params = []
+        for day, scope, key, metrics in rows:
+            row = {'day': day, 'scope': scope, 'scope_key': key, 'updated_at': now}
+            for column in METRIC_COLUMNS:
+                row[column] = metrics.get(column, 0)
+            params.append(row)
+
+        upsert = self._upsert_statement(conn, table.insert())
+        if upsert is not None:
+            conn.execute(upsert, params)
+            return
+
+        # Other databases: update, then insert rows that didn't exist yet
+        for row in params:
+            match = and_(table.c.day == row['day'], table.c.scope == row['scope'],
+                         table.c.scope_key == row['scope_key'])
+            values = {column: table.c[column] + row[column] for column in METRIC_COLUMNS}
+            values['updated_at'] = now
+            if conn.execute(table.update().where(match).values(**values)).rowcount == 0:
+                conn.execute(table.insert().values(**row))
+
+    def _upsert_statement(self, conn, insert):
+        """Turn an INSERT into an additive upsert on (day, scope, scope_key), if supported"""
+        table = AnalyticsDailyRollup.__table__
+        dialect = conn.dialect.name
+        if dialect == 'postgresql':
+            stmt = postgresql.insert(table)
+        elif dialect == 'sqlite':
+            stmt = sqlite.insert(table)
+        else:
+            return None
+        if insert is not None and insert.select is not None:
+            stmt = stmt.from_select(insert._select_names, insert.select)
+        return stmt.on_conflict_do_update(
+            index_elements=['day', 'scope', 'scope_key'],
+            set_={
+                **{column: table.c[column] + stmt.excluded[column] for column in METRIC_COLUMNS},
+                'updated_at': stmt.excluded.updated_at,
+            },
+        )
+
+    # Bulk rebuild
+
+    def rebuild(self, start_date=None, end_date=None):
+        """
+        Recompute rollups from the raw tables (all days, or a date range)
+
+        Runs as set-based INSERT ... SELECT ... GROUP BY statements. Churn for
+        rebuilt days is approximated by the last update of inactive clients.
+
+        Args:
+            start_date: First day to rebuild (date or datetime), None for all history
+            end_date: Last day to rebuild, None for all history
+
+        Returns:
+            Number of rollup rows after the rebuild
+        """
+        table = AnalyticsDailyRollup.__table__
+        table.create(db.engine, checkfirst=True)
+        start_day = start_date.date() if isinstance(start_date, datetime) else start_date
+        end_day = end_date.date() if isinstance(end_date, datetime) else end_date
+
+        with db.engine.begin() as conn:
+            delete = table.delete().where(table.c.scope != READY_SCOPE)
+            if start_day:
+                delete = delete.where(table.c.day >= start_day)
+            if end_day:
+                delete = delete.where(table.c.day <= end_day)
+            conn.execute(delete)
+
+            for statement in self._rebuild_selects(start_day, end_day):
+                self._insert_from_select(conn, statement)
+
+            self._mark_ready(conn)
+            total = conn.execute(select(func.count()).select_from(table)).scalar()
+
+        self._ready = True
+        self._table_exists = True
+        return total
+
+    def _day_filter(self, column, start_day, end_day):
+        day = func.date(column)
+        conditions = [column.isnot(None)]
+        if start_day:
+            conditions.append(day >= start_day.isoformat())
+        if end_day:
+            conditions.append(day <= end_day.isoformat())
+        return and_(*conditions)
+
+    def _rebuild_selects(self, start_day, end_day):
+        """SELECT statements producing rollup rows for every source and scope"""
+        now = literal(datetime.utcnow())
+
+        def zeros(present):
+            return [literal(0).label(column) for column in METRIC_COLUMNS if column not in present]
+
+        session_day = func.date(Session.session_date)
+        session_metrics = [func.count(Session.id).label('sessions_total')]
+        for status, column in SESSION_STATUS_COLUMNS.items():
+            session_metrics.append(func.sum(case((Session.status == status, 1), else_=0)).label(column))
+        session_metrics.append(func.coalesce(func.sum(
+            case((Session.status == 'completed', func.coalesce(Session.duration, 0)), else_=0)
+        ), 0).label('completed_minutes'))
+        session_present = {'sessions_total', 'completed_minutes', *SESSION_STATUS_COLUMNS.values()}
+
+        session_scopes = [
+            ('all', literal('')),
+            ('trainer', cast(Session.trainer_id, String)),
+            ('client', cast(Session.client_id, String)),
+            ('session_type', func.coalesce(Session.session_type, '')),
+        ]
+        for scope, key in session_scopes:
+            yield select(
+                session_day.label('day'), literal(scope).label('scope'), key.label('scope_key'),
+                *session_metrics, *zeros(session_present), now.label('updated_at')
+            ).where(self._day_filter(Session.session_date, start_day, end_day)).group_by(session_day, key)
+
+        payment_day = func.date(Payment.payment_date)
+        payment_metrics = []
+        for status in PAYMENT_STATUSES:
+            payment_metrics.append(func.sum(case((Payment.status == status, 1), else_=0)).label(f'payments_{status}'))
+            payment_metrics.append(func.coalesce(func.sum(
+                case((Payment.status == status, Payment.amount), else_=0)
+            ), 0).label(f'revenue_{status}'))
+        payment_present = {f'payments_{s}' for s in PAYMENT_STATUSES} | {f'revenue_{s}' for s in PAYMENT_STATUSES}
+
+        payment_scopes = [
+            ('all', literal('')),
+            ('client', cast(Payment.client_id, String)),
+            ('payment_type', func.coalesce(Payment.payment_type, '')),
+        ]
+        for scope, key in payment_scopes:
+            yield select(
+                payment_day.label('day'), literal(scope).label('scope'), key.label('scope_key'),
+                *payment_metrics, *zeros(payment_present), now.label('updated_at')
+            ).where(
+                self._day_filter(Payment.payment_date, start_day, end_day),
+                Payment.status.in_(PAYMENT_STATUSES)
+            ).group_by(payment_day, key)
+
+        client_day = func.date(Client.created_at)
+        yield select(
+            client_day.label('day'), literal('all').label('scope'), literal('').label('scope_key'),
+            func.count(Client.id).label('new_clients'), *zeros({'new_clients'}), now.label('updated_at')
+        ).where(self._day_filter(Client.created_at, start_day, end_day)).group_by(client_day)
+
+        churn_day = func.date(Client.updated_at)
+        yield select(
+            churn_day.label('day'), literal('all').label('scope'), literal('').label('scope_key'),
+            func.count(Client.id).label('churned_clients'), *zeros({'churned_clients'}), now.label('updated_at')
+        ).where(
+            self._day_filter(Client.updated_at, start_day, end_day),
+            Client.status == 'inactive'
+        ).group_by(churn_day)
+
+    def _insert_from_select(self, conn, statement):
+        table = AnalyticsDailyRollup.__table__
+        names = ['day', 'scope', 'scope_key', *METRIC_COLUMNS, 'updated_at']
+        # Column order must match the insert column list; the WHERE keeps
+        # SQLite from reading ON CONFLICT as part of the SELECT
+        subquery = statement.subquery()
+        ordered = select(*[subquery.c[name] for name in names]).where(subquery.c.day.isnot(None))
+
+        upsert = self._upsert_statement(conn, table.insert().from_select(names, ordered))
+        if upsert is not None:
+            conn.execute(upsert)
+            return
+
+        # Other databases: aggregate in Python and apply as deltas
+        rows = conn.execute(ordered).mappings().all()
+        self._apply_deltas(conn, [
+            (row['day'], row['scope'], row['scope_key'], {c: row[c] for c in METRIC_COLUMNS})
+            for row in rows
+        ])
+
+    def _mark_ready(self, conn):
+        table = AnalyticsDailyRollup.__table__
+        conn.execute(table.delete().where(table.c.scope == READY_SCOPE))
+        row = {'day': datetime.utcnow().date(), 'scope': READY_SCOPE, 'scope_key': READY_KEY,
+               'updated_at': datetime.utcnow()}
+        row.update({column: 0 for column in METRIC_COLUMNS})
+        conn.execute(table.insert().values(**row))
+
+    # Reads
+
+    def is_ready(self, recheck_seconds=READY_RECHECK_SECONDS):
+        """
+        True once rollups have been built for this database
+
+        A negative answer is cached for recheck_seconds, so requests before
+        the first rebuild don't each query for the marker row.
+        """
+        if self._ready:
+            return True
+        if time.monotonic() - self._ready_checked_at < recheck_seconds:
+            return False
+        self._ready_checked_at = time.monotonic()
+        return self._check_ready()
+
+    def _check_ready(self):
+        table = AnalyticsDailyRollup.__table__
+        try:
+            with db.engine.connect() as conn:
+                self._ready = conn.execute(
+                    select(table.c.id).where(table.c.scope == READY_SCOPE).limit(1)
+                ).first() is not None
+        except Exception as e:
+            logger.warning(f"Analytics rollups unavailable, using raw tables: {str(e)}")
+            self._ready = False
+        return self._ready
+
+    def use_rollups(self, source=None):
+        """
+        Whether a request should be answered from rollups
+
+        Args:
+            source: 'raw' to force raw tables, anything else for the default
+        """
+        if source == 'raw' or not self.enabled:
+            return False
+        return self.is_ready()
+
+    def _range_query(self, columns, scope, start_date, end_date, scope_key=None):
+        table = AnalyticsDailyRollup.__table__
+        query = select(*columns).where(table.c.scope == scope)
+        if scope_key is not None:
+            query = query.where(table.c.scope_key == scope_key)
+        if start_date:
+            query = query.where(table.c.day >= _as_day(start_date))
+        if end_date:
+            query = query.where(table.c.day <= _as_day(end_date))
+        return query
+
+    def totals(self, start_date=None, end_date=None, scope='all', scope_key=''):
+        """
+        Sum every metric over a day range for one scope
+
+        Returns:
+            Dict of metric name to total
+        """
+        table = AnalyticsDailyRollup.__table__
+        columns = [func.coalesce(func.sum(table.c[m]), 0).label(m) for m in METRIC_COLUMNS]
+        row = db.session.execute(
+            self._range_query(columns, scope, start_date, end_date, scope_key)
+        ).mappings().one()
+        return dict(row)
+
+    def grouped(self, scope, metrics, start_date=None, end_date=None):
+        """
+        Sum metrics over a day range, per scope key
+
+        Returns:
+            Dict of scope_key to {metric: total}
+        """
+        table = AnalyticsDailyRollup.__table__
+        columns = [table.c.scope_key] + [func.sum(table.c[m]).label(m) for m in metrics]
+        query = self._range_query(columns, scope, start_date, end_date).group_by(table.c.scope_key)
+        return {row.scope_key: {m: row._mapping[m] for m in metrics} for row in db.session.execute(query)}
+
+    def scoped(self, scopes, metrics, start_date=None, end_date=None):
+        """
+        Sum metrics over a day range, per scope and scope key, in one query
+
+        Returns:
+            Dict of scope to {scope_key: {metric: total}} (every scope present)
+        """
+        table = AnalyticsDailyRollup.__table__
+        columns = [table.c.scope, table.c.scope_key] + [func.sum(table.c[m]).label(m) for m in metrics]
+        query = select(*columns).where(table.c.scope.in_(scopes))
+        if start_date:
+            query = query.where(table.c.day >= _as_day(start_date))
+        if end_date:
+            query = query.where(table.c.day <= _as_day(end_date))
+        query = query.group_by(table.c.scope, table.c.scope_key)
+
+        result = {scope: {} for scope in scopes}
+        for row in db.session.execute(query):
+            result[row.scope][row.scope_key] = {m: row._mapping[m] for m in metrics}
+        return result
+
+    def daily(self, metrics, start_date=None, end_date=None, scope='all', scope_key=''):
+        """Per-day metric rows for one scope, oldest first"""
+        table = AnalyticsDailyRollup.__table__
+        columns = [table.c.day] + [table.c[m] for m in metrics]
+        query = self._range_query(columns, scope, start_date, end_date, scope_key).order_by(table.c.day)
+        return [dict(row) for row in db.session.execute(query).mappings()]
+
+
+def _as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+# Global rollup instance
+analytics_rollup = AnalyticsRollup()
@@ -0,0 +1,424 @@
+"""
+Trainer availability engine
+Finds open slots across many trainers from a compact bitmap per trainer and
+day: bit i is set when slot i (AVAILABILITY_SLOT_MINUTES long, counted from
+midnight UTC) lies inside the trainer's working hours and isn't booked.
+
+Bitmaps are cached per worker for each trainer-day. A commit that books,
+moves or cancels a session drops the entries for that trainer and day;
+working-hours changes drop the trainer's entries. A search loads only the
+missing trainer-days, with one query for working hours and one for
+sessions, then finds runs of free slots with shifts and ANDs.
+
+Other workers only see a booking once their entries expire, so a slot can
+look free for up to AVAILABILITY_CACHE_TTL seconds; booking still goes
+through the conflict check.
+"""
+
+import math
+import threading
+import time as clock
+from collections import OrderedDict, defaultdict
+from datetime import datetime, time, timedelta
+from sqlalchemy import event, func, inspect, or_
+from models.database import db, Session, Trainer, TrainerWorkingHours
+from utils.booking_conflicts import MAX_SESSION_MINUTES
+
+MAX_SEARCH_DAYS = 31
+
+_SESSION_KEYS = 'availability_dirty_keys'
+_SESSION_TRAINERS = 'availability_dirty_trainers'
+_SESSION_ALL = 'availability_dirty_all'
+
+# Session attributes that move a booking in or out of a trainer-day
+_BOOKING_ATTRIBUTES = ('trainer_id', 'session_date', 'end_time', 'duration', 'status')
+
+
+def parse_hours(value):
+    """Parse 'HH:MM-HH:MM' into (start, end) times"""
+    start, end = value.split('-')
+    return time.fromisoformat(start.strip()), time.fromisoformat(end.strip())
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min)
+
+
+def session_days(session_date, end_time, duration):
+    """Dates a booking touches"""
+    if session_date is None:
+        return []
+    end = end_time or session_date + timedelta(minutes=duration or 60)
+    last = (end - timedelta(microseconds=1)).date() if end > session_date else session_date.date()
+    days = []
+    day = session_date.date()
+    while day <= last:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def _booking_keys(values):
+    """(trainer_id, day) keys a booking occupies, from its column values"""
+    return [
+        (values.get('trainer_id'), day)
+        for day in session_days(values.get('session_date'), values.get('end_time'), values.get('duration'))
+    ]
+
+
+class AvailabilityIndex:
+    """Per-worker cache of trainer-day availability bitmaps"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.slot_minutes = 15
+        self.default_hours = (time(6, 0), time(21, 0))
+        self.ttl = 300
+        self.max_entries = 50000
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure from app settings and listen for bookings"""
+        slot_minutes = app.config.get('AVAILABILITY_SLOT_MINUTES', 15)
+        if slot_minutes <= 0 or (24 * 60) % slot_minutes:
+            raise ValueError('AVAILABILITY_SLOT_MINUTES must divide a day')
+        self.slot_minutes = slot_minutes
+        self.default_hours = parse_hours(app.config.get('AVAILABILITY_DEFAULT_HOURS', '06:00-21:00'))
+        self.ttl = app.config.get('AVAILABILITY_CACHE_TTL', 300)
+        self.max_entries = app.config.get('AVAILABILITY_CACHE_MAX_ENTRIES', 50000)
+        self.clear()
+
+        if getattr(db.session, '_fitnesscrm_availability', False):
+            return
+        event.listen(db.session, 'before_flush', self._before_flush)
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._on_orm_execute)
+        event.listen(db.session, 'after_commit', self._after_commit)
+        db.session._fitnesscrm_availability = True
+
+    @property
+    def slots_per_day(self):
+        return 24 * 60 // self.slot_minutes
+
+    def get_stats(self):
+        """Get cache statistics for this worker"""
+        with self._lock:
+            return {
+                'slot_minutes': self.slot_minutes,
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def clear(self):
+        """Drop every cached bitmap"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def invalidate(self, keys=(), trainer_ids=()):
+        """Drop bitmaps for (trainer_id, day) keys and for whole trainers"""
+        trainer_ids = set(trainer_ids)
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+            if trainer_ids:
+                for key in [key for key in self._entries if key[0] in trainer_ids]:
+                    del self._entries[key]
+            self._generation += 1
+
+    # Invalidation hooks
+
+    def _before_flush(self, session, flush_context, instances):
+        # Changed and deleted rows, while their old values can still be read
+        keys = session.info.setdefault(_SESSION_KEYS, set())
+        trainers = session.info.setdefault(_SESSION_TRAINERS, set())
+
+        for obj in (*session.dirty, *session.deleted):
+            if isinstance(obj, TrainerWorkingHours):
+                trainers.add(obj.trainer_id)
+                trainers.update(inspect(obj).attrs.trainer_id.history.deleted)
+            elif isinstance(obj, Session):
+                state = inspect(obj)
+                histories = {attr: state.attrs[attr].history for attr in _BOOKING_ATTRIBUTES}
+                if obj not in session.deleted and not any(h.has_changes() for h in histories.values()):
+                    continue
+                current = {attr: getattr(obj, attr) for attr in _BOOKING_ATTRIBUTES}
+                keys.update(_booking_keys(current))
+
+                old = {}
+                for attr, history in histories.items():
+                    if history.deleted:
+                        old[attr] = history.deleted[0]
+                    elif history.added and attr in ('trainer_id', 'session_date'):
+                        # Set while expired, so the old placement is unknown
+                        if attr == 'trainer_id':
+                            session.info[_SESSION_ALL] = True
+                        trainers.add(current['trainer_id'])
+                if old:
+                    keys.update(_booking_keys({**current, **old}))
+
+    def _after_flush(self, session, flush_context):
+        # New rows have their foreign keys set once flushed
+        keys = session.info.setdefault(_SESSION_KEYS, set())
+        trainers = session.info.setdefault(_SESSION_TRAINERS, set())
+        for obj in session.new:
+            if isinstance(obj, TrainerWorkingHours):
+                trainers.add(obj.trainer_id)
+            elif isinstance(obj, Session):
+                keys.update(_booking_keys({attr: getattr(obj, attr) for attr in _BOOKING_ATTRIBUTES}))
+
+    def _on_orm_execute(self, orm_execute_state):
+        # Bulk statements don't go through the flush
+        if orm_execute_state.is_select:
+            return
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None or mapper.class_ not in (Session, TrainerWorkingHours):
+            return
+        info = orm_execute_state.session.info
+        parameters = orm_execute_state.parameters
+        if mapper.class_ is Session and orm_execute_state.is_insert and parameters:
+            rows = parameters if isinstance(parameters, list) else [parameters]
+            keys = info.setdefault(_SESSION_KEYS, set())
+            for row in rows:
+                keys.update(_booking_keys(row))
+        else:
+            info[_SESSION_ALL] = True
+
+    def _after_commit(self, session):
+        keys = session.info.pop(_SESSION_KEYS, set())
+        trainers = session.info.pop(_SESSION_TRAINERS, set())
+        if session.info.pop(_SESSION_ALL, False):
+            self.clear()
+        elif keys or trainers:
+            self.invalidate(keys, trainers)
+
+    # Bitmaps
+
+    def _span_mask(self, start_minute, end_minute, inner):
+        """Bits for the slots inside [start, end) (inner) or touching it"""
+        size = self.slot_minutes
+        if inner:
+            first, last = -(-start_minute // size), end_minute // size
+        else:
+            first, last = start_minute // size, -(-end_minute // size)
+        first, last = max(first, 0), min(last, self.slots_per_day)
+        return ((1 << (last - first)) - 1) << first if last > first else 0
+
+    def _working_masks(self, hours, day):
+        """(location, mask) pairs of a trainer's working hours on a day"""
+        if hours is None:
+            start, end = self.default_hours
+            return ((None, self._span_mask(_minutes(start), _minutes(end), inner=True)),)
+        by_location = defaultdict(int)
+        for weekday, start, end, location in hours:
+            if weekday == day.weekday():
+                # An end at midnight means the end of the day
+                end_minute = _minutes(end) or 24 * 60
+                by_location[location] |= self._span_mask(_minutes(start), end_minute, inner=True)
+        return tuple(by_location.items())
+
+    def _build(self, trainer_ids, days):
+        """Compute (free, locations) for every trainer-day, with two queries"""
+        first_day, last_day = min(days), max(days)
+        window_start = _day_start(first_day)
+        window_end = _day_start(last_day + timedelta(days=1))
+
+        hours = defaultdict(list)
+        rows = db.session.query(
+            TrainerWorkingHours.trainer_id, TrainerWorkingHours.weekday, TrainerWorkingHours.start_time,
+            TrainerWorkingHours.end_time, TrainerWorkingHours.location
+        ).filter(TrainerWorkingHours.trainer_id.in_(trainer_ids))
+        for trainer_id, weekday, start, end, location in rows:
+            hours[trainer_id].append((weekday, start, end, location))
+
+        busy = defaultdict(int)
+        bookings = db.session.query(
+            Session.trainer_id, Session.session_date, Session.end_time, Session.duration
+        ).filter(
+            Session.trainer_id.in_(trainer_ids),
+            Session.status != 'cancelled',
+            Session.session_date < window_end,
+            Session.session_date >= window_start - timedelta(minutes=MAX_SESSION_MINUTES),
+            or_(Session.end_time.is_(None), Session.end_time > window_start),
+        )
+        for trainer_id, start, end, duration in bookings:
+            end = end or start + timedelta(minutes=duration or 60)
+            for day in session_days(start, end, duration):
+                day_start = _day_start(day)
+                start_minute = max(math.floor((start - day_start).total_seconds() / 60), 0)
+                end_minute = min(math.ceil((end - day_start).total_seconds() / 60), 24 * 60)
+                busy[(trainer_id, day)] |= self._span_mask(start_minute, end_minute, inner=False)
+
+        built = {}
+        for trainer_id in trainer_ids:
+            for day in days:
+                locations = self._working_masks(hours.get(trainer_id), day)
+                working = 0
+                for _, mask in locations:
+                    working |= mask
+                built[(trainer_id, day)] = (working & ~busy[(trainer_id, day)], locations)
+        return built
+
+    def day_maps(self, trainer_ids, days):
+        """(free, locations) per (trainer_id, day), from the cache where possible"""
+        now = clock.monotonic()
+        found, missing_trainers, missing_days = {}, set(), set()
+        with self._lock:
+            generation = self._generation
+            for trainer_id in trainer_ids:
+                for day in days:
+                    entry = self._entries.get((trainer_id, day))
+                    if entry is not None and entry[1] > now:
+                        self._entries.move_to_end((trainer_id, day))
+                        found[(trainer_id, day)] = entry[0]
+                    else:
+                        missing_trainers.add(trainer_id)
+                        missing_days.add(day)
+            self.hits += len(found)
+            self.misses += len(trainer_ids) * len(days) - len(found)
+
+        if missing_trainers:
+            built = self._build(sorted(missing_trainers), sorted(missing_days))
+            with self._lock:
+                # Don't store bitmaps that a commit may have made stale meanwhile
+                if generation == self._generation:
+                    expires_at = clock.monotonic() + self.ttl
+                    for key, value in built.items():
+                        self._entries[key] = (value, expires_at)
+                        self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            for key, value in built.items():
+                found.setdefault(key, value)
+        return found
+
+    # Search
+
+    def search(self, trainers, start, end, duration, step=None, location=None, limit=None):
+        """
+        Open slots of at least `duration` minutes between start and end
+
+        Args:
+            trainers: (id, name, specialization) rows to check
+            start: Earliest slot start
+            end: Latest slot end
+            duration: Minutes needed
+            step: Minutes between offered start times (a multiple of the slot size)
+            location: Only working hours at this location count
+            limit: Maximum slots per trainer
+
+        Returns:
+            One dict per trainer with open slots, in input order
+        """
+        size = self.slot_minutes
+        need = max(-(-int(duration) // size), 1)
+        step_slots = max((step or size) // size, 1)
+        days = []
+        day = start.date()
+        while _day_start(day) < end:
+            days.append(day)
+            day += timedelta(days=1)
+        if not trainers or not days:
+            return []
+
+        maps = self.day_maps([trainer[0] for trainer in trainers], days)
+        wanted = location.strip().lower() if location else None
+        need_mask = (1 << need) - 1
+        step_mask = 0
+        for index in range(0, self.slots_per_day, step_slots):
+            step_mask |= 1 << index
+
+        # Allowed start slots per day: inside [start, end - duration] and on the step grid
+        windows = {}
+        for day in days:
+            day_start = _day_start(day)
+            first = max(-(-int((start - day_start).total_seconds()) // (size * 60)), 0)
+            last = min(int((end - day_start).total_seconds()) // (size * 60), self.slots_per_day) - need
+            windows[day] = (((1 << (last - first + 1)) - 1) << first) & step_mask if last >= first else 0
+
+        # Most trainers share start times, so format each one once
+        formatted = {}
+
+        def labels(day, index):
+            key = (day, index)
+            if key not in formatted:
+                slot_start = _day_start(day) + timedelta(minutes=index * size)
+                formatted[key] = (slot_start.isoformat(), (slot_start + timedelta(minutes=duration)).isoformat())
+            return formatted[key]
+
+        results = []
+        for trainer_id, name, specialization in trainers:
+            slots = []
+            for day in days:
+                if not windows[day]:
+                    continue
+                free, locations = maps[(trainer_id, day)]
+                if wanted is not None:
+                    free &= self._location_mask(locations, wanted)
+                runs = free
+                for shift in range(1, need):
+                    runs &= free >> shift
+                starts = runs & windows[day]
+                while starts and (limit is None or len(slots) < limit):
+                    low = starts & -starts
+                    index = low.bit_length() - 1
+                    starts ^= low
+                    slot_start, slot_end = labels(day, index)
+                    slots.append({
+                        'start': slot_start,
+                        'end': slot_end,
+                        'location': self._slot_location(locations, index, need_mask),
+                    })
+            if slots:
+                results.append({
+                    'trainer_id': trainer_id,
+                    'name': name,
+                    'specialization': specialization,
+                    'slots': slots,
+                })
+        return results
+
+    @staticmethod
+    def _location_mask(locations, wanted):
+        mask = 0
+        for location, location_mask in locations:
+            if location and location.strip().lower() == wanted:
+                mask |= location_mask
+        return mask
+
+    @staticmethod
+    def _slot_location(locations, index, need_mask):
+        for location, mask in locations:
+            if (mask >> index) & need_mask == need_mask:
+                return location
+        return None
+
+
+def trainer_candidates(specialization=None, location=None, trainer_ids=None):
+    """Active trainers matching the search filters, as (id, name, specialization)"""
+    query = db.session.query(Trainer.id, Trainer.name, Trainer.specialization).filter(
+        Trainer.active.is_(True), Trainer.deleted_at.is_(None)
+    )
+    if trainer_ids:
+        query = query.filter(Trainer.id.in_(trainer_ids))
+    if specialization:
+        query = query.filter(Trainer.specialization.ilike(f'%{specialization}%'))
+    if location:
+        query = query.filter(Trainer.id.in_(
+            db.session.query(TrainerWorkingHours.trainer_id).filter(
+                func.lower(TrainerWorkingHours.location) == location.strip().lower()
+            )
+        ))
+    return query.order_by(Trainer.id).all()
+
+
+# Global instance
+availability_index = AvailabilityIndex()
@@ -0,0 +1,205 @@
+"""
+Booking conflict engine
+Finds sessions overlapping a candidate time slot for a trainer by querying
+only the overlapping window (stored end_time against the slot start), and
+validates many candidate slots against one fetch of the trainer's calendar.
+
+Cancelled sessions never conflict. Two slots overlap when each one starts
+before the other ends, so back-to-back sessions are allowed.
+"""
+
+import bisect
+from datetime import datetime, timedelta
+from models.database import db, Session, Trainer
+
+# No session is assumed to run longer than this; it bounds both branches of
+# the conflict query (sessions written before end_time was stored are found
+# by start date)
+MAX_SESSION_MINUTES = 24 * 60
+
+# Optional PostgreSQL exclusion constraint (see migrate_booking_conflicts.py)
+OVERLAP_CONSTRAINT = 'sessions_trainer_no_overlap'
+
+MAX_BATCH_SLOTS = 500
+
+
+def overlap_query(trainer_id, start, end, exclude_session_id=None):
+    """
+    Query a trainer's non-cancelled sessions that may overlap [start, end)
+
+    Sessions with a stored end_time are found through ix_sessions_trainer_end
+    (trainer_id, end_time), so the scan covers only sessions ending after
+    start rather than the trainer's whole history. The range is closed at
+    end + MAX_SESSION_MINUTES so SQLite prefers it to the start-date index
+    even without statistics. Rows stored without an end_time come from a
+    second branch bounded the same way and still need checking with
+    session_end().
+    """
+    def base():
+        query = Session.query.filter(
+            Session.trainer_id == trainer_id,
+            Session.status != 'cancelled',
+            Session.session_date < end,
+        )
+        if exclude_session_id is not None:
+            query = query.filter(Session.id != exclude_session_id)
+        return query
+
+    longest = timedelta(minutes=MAX_SESSION_MINUTES)
+    stored = base().filter(Session.end_time > start, Session.end_time < end + longest)
+    legacy = base().filter(
+        Session.end_time.is_(None),
+        Session.session_date >= start - longest,
+    )
+    return stored.union_all(legacy)
+
+
+def session_end(session):
+    """End of a session, derived from its duration when end_time isn't stored"""
+    return session.get_end_time()
+
+
+def find_conflicts(trainer_id, start, end, exclude_session_id=None):
+    """
+    Get a trainer's non-cancelled sessions overlapping [start, end)
+
+    Args:
+        trainer_id: Trainer to check
+        start: Slot start
+        end: Slot end
+        exclude_session_id: Session being rescheduled (never conflicts with itself)
+
+    Returns:
+        List of conflicting Session objects, earliest first
+    """
+    conflicts = []
+    for session in overlap_query(trainer_id, start, end, exclude_session_id).all():
+        session_end_time = session_end(session)
+        if session_end_time and session_end_time > start:
+            conflicts.append(session)
+    # Sorted here: ORDER BY session_date would steer the planner to the start-date index
+    conflicts.sort(key=lambda session: (session.session_date, session.id))
+    return conflicts
+
+
+class BusyCalendar:
+    """A trainer's booked intervals in a window, sorted for bisect lookups"""
+
+    def __init__(self, sessions):
+        intervals = []
+        for session in sessions:
+            end = session_end(session)
+            if end and end > session.session_date:
+                intervals.append((session.session_date, end, session.id))
+        intervals.sort()
+        self.intervals = intervals
+        self.starts = [interval[0] for interval in intervals]
+        # Running maximum of end times, so a lookup can stop early
+        self.max_ends = []
+        running = None
+        for _, end, _ in intervals:
+            running = end if running is None or end > running else running
+            self.max_ends.append(running)
+
+    @classmethod
+    def load(cls, trainer_id, window_start, window_end, exclude_session_id=None):
+        """Fetch every session overlapping the window with one query"""
+        return cls(overlap_query(trainer_id, window_start, window_end, exclude_session_id).all())
+
+    def overlapping(self, start, end):
+        """Ids of booked sessions overlapping [start, end)"""
+        # Candidates start before the slot ends; walk back while one could still reach it
+        index = bisect.bisect_left(self.starts, end) - 1
+        found = []
+        while index >= 0 and self.max_ends[index] > start:
+            interval_start, interval_end, session_id = self.intervals[index]
+            if interval_end > start:
+                found.append(session_id)
+            index -= 1
+        found.reverse()
+        return found
+
+
+def parse_slot(slot):
+    """
+    Parse a candidate slot: {"session_date", "duration"} or {"start", "end"}
+
+    Returns:
+        (start, end) datetimes
+
+    Raises:
+        ValueError: If the slot is malformed or ends before it starts
+    """
+    start_value = slot.get('session_date') or slot.get('start')
+    if not start_value:
+        raise ValueError('Slot needs session_date (or start)')
+    start = datetime.fromisoformat(start_value)
+    if slot.get('end'):
+        end = datetime.fromisoformat(slot['end'])
+    else:
+        end = start + timedelta(minutes=int(slot.get('duration', 60)))
+    if end <= start:
+        raise ValueError('Slot must end after it starts')
+    return start, end
+
+
+def check_slots(trainer_id, slots, exclude_session_id=None):
+    """
+    Validate many candidate (start, end) slots for one trainer
+
+    Loads the trainer's sessions for the span of all slots once, then checks
+    each slot with a bisect over the sorted intervals. Slots are also checked
+    against each other, so a batch can't double book itself.
+
+    Returns:
+        One dict per slot, in input order: start, end, available,
+        conflicts (session ids) and overlapping_slots (indexes in the batch)
+    """
+    if not slots:
+        return []
+
+    calendar = BusyCalendar.load(
+        trainer_id,
+        min(start for start, _ in slots),
+        max(end for _, end in slots),
+        exclude_session_id=exclude_session_id,
+    )
+
+    # Sweep the batch in start order to find slots overlapping each other
+    overlapping_slots = [[] for _ in slots]
+    order = sorted(range(len(slots)), key=lambda i: slots[i])
+    active = []
+    for i in order:
+        start, end = slots[i]
+        active = [j for j in active if slots[j][1] > start]
+        for j in active:
+            overlapping_slots[i].append(j)
+            overlapping_slots[j].append(i)
+        active.append(i)
+
+    results = []
+    for i, (start, end) in enumerate(slots):
+        conflicts = calendar.overlapping(start, end)
+        results.append({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'available': not conflicts and not overlapping_slots[i],
+            'conflicts': conflicts,
+            'overlapping_slots': sorted(overlapping_slots[i]),
+        })
+    return results
+
+
+def lock_trainer_schedule(trainer_id):
+    """
+    Serialise bookings for a trainer until the transaction ends
+
+    Takes a row lock on the trainer (SELECT ... FOR UPDATE) so two requests
+    can't both see a free slot and book it. A no-op on SQLite.
+    """
+    return db.session.query(Trainer.id).filter(Trainer.id == trainer_id).with_for_update().first()
+
+
+def is_overlap_violation(error):
+    """True if a database error comes from the exclusion constraint"""
+    return OVERLAP_CONSTRAINT in str(getattr(error, 'orig', error))
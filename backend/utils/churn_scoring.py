@@ -0,0 +1,216 @@
+"""
+Churn scoring
+Scores every active client at once. Session and payment counts over the
+lookback window come from two grouped queries, the scores are computed as
+NumPy arrays, and a full run replaces the client_churn_scores snapshot
+that the churn APIs read.
+
+Scoring is deterministic: the same activity always gives the same score.
+"""
+
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, insert
+from models.database import db, Client, Session, Payment, ClientChurnScore
+
+DEFAULT_LOOKBACK_DAYS = 90
+
+# Snapshot rows written per INSERT
+WRITE_BATCH_SIZE = 5000
+
+_PREDICTION_COLUMNS = (
+    'client_id', 'churn_probability', 'risk_level', 'session_frequency', 'payment_frequency', 'scored_at'
+)
+
+# Frequency thresholds: (below, added probability), checked in order
+SESSION_STEPS = ((0.5, 0.4), (1.0, 0.2))  # sessions per week
+PAYMENT_STEPS = ((0.5, 0.3), (1.0, 0.15))  # payments per month
+
+
+def _step_scores(values, steps):
+    """Probability contribution of each value, from the first threshold it is below"""
+    conditions = [values < below for below, _ in steps]
+    return np.select(conditions, [weight for _, weight in steps], default=0.0)
+
+
+def risk_levels(probabilities):
+    """Risk level per probability: low under 0.3, medium under 0.6, high otherwise"""
+    return np.where(probabilities < 0.3, 'low', np.where(probabilities < 0.6, 'medium', 'high'))
+
+
+def churn_factors(session_frequency, payment_frequency):
+    """Human readable reasons for one client's score"""
+    factors = []
+    if session_frequency < 0.5:
+        factors.append('Low session attendance')
+    if payment_frequency < 0.5:
+        factors.append('Irregular payments')
+    return factors or ['Normal activity patterns']
+
+
+def collect_features(days_lookback=DEFAULT_LOOKBACK_DAYS, now=None, client_ids=None):
+    """
+    Session and payment counts per client over the lookback window
+
+    Sessions count unless cancelled; payments count when completed. Both
+    are dated within [now - days_lookback, now).
+
+    Args:
+        client_ids: Score these clients whatever their status (default:
+            every active client)
+
+    Returns:
+        (client_ids, session_counts, payment_counts) as aligned arrays
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=days_lookback)
+
+    clients = Client.query.with_entities(Client.id).filter(Client.deleted_at.is_(None))
+    if client_ids is not None:
+        clients = clients.filter(Client.id.in_(client_ids))
+    else:
+        clients = clients.filter(Client.status == 'active')
+    client_filter = clients.subquery()
+
+    session_rows = db.session.query(
+        client_filter.c.id, func.count(Session.id)
+    ).outerjoin(Session, db.and_(
+        Session.client_id == client_filter.c.id,
+        Session.session_date >= cutoff,
+        Session.session_date < now,
+        Session.status != 'cancelled'
+    )).group_by(client_filter.c.id).order_by(client_filter.c.id).all()
+
+    payment_rows = db.session.query(
+        Payment.client_id, func.count(Payment.id)
+    ).join(client_filter, client_filter.c.id == Payment.client_id).filter(
+        Payment.status == 'completed',
+        Payment.payment_date >= cutoff,
+        Payment.payment_date < now
+    ).group_by(Payment.client_id).all()
+
+    if session_rows:
+        ids, session_counts = (np.array(column, dtype=np.int64) for column in zip(*session_rows))
+    else:
+        ids = session_counts = np.zeros(0, dtype=np.int64)
+
+    payment_counts = np.zeros(len(ids), dtype=np.int64)
+    if payment_rows:
+        paying_ids, counts = (np.array(column, dtype=np.int64) for column in zip(*payment_rows))
+        payment_counts[np.searchsorted(ids, paying_ids)] = counts
+
+    return ids, session_counts, payment_counts
+
+
+def score(session_counts, payment_counts, days_lookback=DEFAULT_LOOKBACK_DAYS):
+    """
+    Churn probabilities for aligned count arrays
+
+    Returns:
+        Dict of arrays: session_frequency, payment_frequency,
+        churn_probability and risk_level
+    """
+    session_frequency = np.asarray(session_counts, dtype=np.float64) / (days_lookback / 7)
+    payment_frequency = np.asarray(payment_counts, dtype=np.float64) / (days_lookback / 30)
+
+    probabilities = _step_scores(session_frequency, SESSION_STEPS) + _step_scores(payment_frequency, PAYMENT_STEPS)
+    probabilities = np.round(np.clip(probabilities, 0.0, 1.0), 2)
+
+    return {
+        'session_frequency': np.round(session_frequency, 2),
+        'payment_frequency': np.round(payment_frequency, 2),
+        'churn_probability': probabilities,
+        'risk_level': risk_levels(probabilities),
+    }
+
+
+def score_clients(days_lookback=DEFAULT_LOOKBACK_DAYS, now=None, client_ids=None):
+    """
+    Score clients without touching the snapshot
+
+    Returns:
+        List of snapshot row dicts, one per client scored
+    """
+    now = now or datetime.utcnow()
+    ids, session_counts, payment_counts = collect_features(days_lookback, now, client_ids)
+    scores = score(session_counts, payment_counts, days_lookback)
+
+    columns = {
+        'client_id': ids.tolist(),
+        'session_count': session_counts.tolist(),
+        'payment_count': payment_counts.tolist(),
+        **{name: values.tolist() for name, values in scores.items()},
+    }
+    return [
+        dict(zip(columns, values), scored_at=now, days_lookback=days_lookback)
+        for values in zip(*columns.values())
+    ]
+
+
+def refresh_snapshot(days_lookback=DEFAULT_LOOKBACK_DAYS, now=None):
+    """
+    Score every active client and replace the snapshot in one transaction
+
+    Returns:
+        Stats dict with clients scored and counts per risk level
+    """
+    rows = score_clients(days_lookback, now)
+    try:
+        db.session.query(ClientChurnScore).delete(synchronize_session=False)
+        for offset in range(0, len(rows), WRITE_BATCH_SIZE):
+            db.session.execute(insert(ClientChurnScore), rows[offset:offset + WRITE_BATCH_SIZE])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    levels = [row['risk_level'] for row in rows]
+    return {
+        'clients': len(rows),
+        'high': levels.count('high'),
+        'medium': levels.count('medium'),
+        'low': levels.count('low'),
+    }
+
+
+def to_prediction(row, source='snapshot'):
+    """API prediction dict from a ClientChurnScore or a score_clients() row"""
+    if isinstance(row, ClientChurnScore):
+        row = {name: getattr(row, name) for name in _PREDICTION_COLUMNS}
+    return {
+        'client_id': row['client_id'],
+        'churn_probability': row['churn_probability'],
+        'risk_level': row['risk_level'],
+        'factors': churn_factors(row['session_frequency'], row['payment_frequency']),
+        'session_frequency': row['session_frequency'],
+        'payment_frequency': row['payment_frequency'],
+        'prediction_date': row['scored_at'].isoformat(),
+        'source': source,
+    }
+
+
+def get_predictions(client_ids, days_lookback=DEFAULT_LOOKBACK_DAYS):
+    """
+    Predictions for clients, from the snapshot where it matches the lookback
+
+    Clients missing from the snapshot (new, or scored with another
+    lookback) are scored live with the same grouped queries.
+
+    Returns:
+        Dict of client_id -> prediction; unknown clients are left out
+    """
+    client_ids = list(dict.fromkeys(client_ids))
+    predictions = {}
+    for offset in range(0, len(client_ids), WRITE_BATCH_SIZE):
+        chunk = client_ids[offset:offset + WRITE_BATCH_SIZE]
+        for row in ClientChurnScore.query.filter(
+            ClientChurnScore.client_id.in_(chunk),
+            ClientChurnScore.days_lookback == days_lookback
+        ):
+            predictions[row.client_id] = to_prediction(row)
+
+        missing = [client_id for client_id in chunk if client_id not in predictions]
+        if missing:
+            for row in score_clients(days_lookback, client_ids=missing):
+                predictions[row['client_id']] = to_prediction(row, source='live')
+    return predictions
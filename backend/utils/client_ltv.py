@@ -0,0 +1,147 @@
+"""
+Client lifetime value
+Computes LTV metrics in the database from one per-client grouped subquery
+(completed payments per client, carrying name, status, membership type and
+signup date): the summary and percentiles in one aggregate over it, the
+percentile bands and per-membership averages as grouped queries, and the
+top clients with ORDER BY ... LIMIT. Only aggregate rows reach Python, so
+memory stays flat as the client count grows.
+"""
+
+from datetime import datetime
+from sqlalchemy import DateTime, case, extract, func, literal
+from models.database import db, Client, Payment
+
+PERCENTILES = (25, 50, 75, 90)
+DEFAULT_TOP = 10
+MAX_TOP = 100
+DEFAULT_BANDS = 4
+MAX_BANDS = 10
+
+
+def _client_values():
+    """One row per client: id, name, status, membership type, signup date and LTV"""
+    return db.session.query(
+        Client.id.label('client_id'),
+        Client.name.label('client_name'),
+        Client.status.label('status'),
+        Client.membership_type.label('membership_type'),
+        Client.created_at.label('created_at'),
+        func.coalesce(func.sum(Payment.amount), 0).label('ltv')
+    ).outerjoin(
+        Payment, (Payment.client_id == Client.id) & (Payment.status == 'completed')
+    ).group_by(
+        Client.id, Client.name, Client.status, Client.membership_type, Client.created_at
+    ).subquery()
+
+
+def _days_since(column, now):
+    """SQL expression for the days from column to now"""
+    if db.session.get_bind().dialect.name == 'sqlite':
+        return func.julianday(now) - func.julianday(column)
+    return extract('epoch', literal(now, DateTime) - column) / 86400
+
+
+def summary(values, now):
+    """Client count, revenue, average LTV, active lifespan and LTV percentiles"""
+    ranked = db.session.query(
+        values,
+        func.cume_dist().over(order_by=values.c.ltv).label('cume_dist')
+    ).subquery()
+    lifespan = case(
+        ((ranked.c.status == 'active') & ranked.c.created_at.isnot(None), _days_since(ranked.c.created_at, now))
+    )
+    row = db.session.query(
+        func.count(),
+        func.coalesce(func.sum(ranked.c.ltv), 0),
+        func.avg(lifespan),
+        # Nearest-rank percentiles: the smallest LTV at or above each rank
+        *(func.min(case((ranked.c.cume_dist >= p / 100, ranked.c.ltv))) for p in PERCENTILES)
+    ).one()
+
+    total_clients, total_revenue, lifespan_days = row[0], float(row[1]), row[2]
+    return {
+        'total_clients': total_clients,
+        'total_revenue': total_revenue,
+        'average_ltv': total_revenue / total_clients if total_clients else 0.0,
+        'avg_lifespan_days': round(float(lifespan_days or 0), 0),
+        'ltv_percentiles': {
+            f'p{p}': float(value) if value is not None else 0.0 for p, value in zip(PERCENTILES, row[3:])
+        },
+    }
+
+
+def bands(values, count=DEFAULT_BANDS):
+    """Clients split into count equal-sized LTV bands, lowest first"""
+    banded = db.session.query(
+        values.c.ltv,
+        func.ntile(count).over(order_by=values.c.ltv).label('band')
+    ).subquery()
+    rows = db.session.query(
+        banded.c.band,
+        func.count(),
+        func.min(banded.c.ltv),
+        func.max(banded.c.ltv),
+        func.avg(banded.c.ltv),
+        func.sum(banded.c.ltv)
+    ).group_by(banded.c.band).order_by(banded.c.band).all()
+
+    return [
+        {
+            'band': band,
+            'client_count': clients,
+            'min_ltv': float(low),
+            'max_ltv': float(high),
+            'average_ltv': float(average),
+            'revenue': float(revenue)
+        }
+        for band, clients, low, high, average, revenue in rows
+    ]
+
+
+def by_membership(values):
+    """Client count and average LTV per membership type"""
+    membership = func.coalesce(values.c.membership_type, 'None')
+    rows = db.session.query(
+        membership, func.count(), func.avg(values.c.ltv)
+    ).group_by(membership).order_by(membership).all()
+    return [
+        {'membership_type': membership_type, 'client_count': clients, 'average_ltv': float(average or 0)}
+        for membership_type, clients, average in rows
+    ]
+
+
+def top_clients(values, limit=DEFAULT_TOP):
+    """The limit clients with the highest LTV"""
+    rows = db.session.query(values).order_by(values.c.ltv.desc(), values.c.client_id).limit(limit).all()
+    return [
+        {
+            'client_id': row.client_id,
+            'client_name': row.client_name,
+            'lifetime_value': float(row.ltv),
+            'status': row.status,
+            'member_since': row.created_at.isoformat() if row.created_at else None
+        }
+        for row in rows
+    ]
+
+
+def lifetime_value(top=DEFAULT_TOP, band_count=DEFAULT_BANDS, now=None):
+    """
+    Client lifetime value metrics
+
+    Args:
+        top: Number of top clients to return
+        band_count: Number of LTV bands (4 = quartiles)
+
+    Returns:
+        Dict with the summary, percentiles, bands, top clients and
+        per-membership averages
+    """
+    now = now or datetime.utcnow()
+    values = _client_values()
+    result = summary(values, now)
+    result['top_clients'] = top_clients(values, top)
+    result['ltv_by_membership'] = by_membership(values)
+    result['ltv_bands'] = bands(values, band_count)
+    return result
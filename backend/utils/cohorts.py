@@ -0,0 +1,173 @@
+"""
+Cohort retention
+Builds a signup-month cohort x months-since-signup retention matrix. One
+grouped query returns the distinct (client, activity month) pairs with the
+client's signup month, a second the cohort sizes; the matrix is a NumPy
+pivot of the pairs, so a 36-month matrix costs the same two queries as a
+3-month one.
+
+Only closed months are counted, so a matrix is cached per worker until the
+next month closes (or CACHE_MAX_AGE passes, to pick up back-dated writes).
+Each cohort's active count and retention rate follow the clients' current
+status, so a cached matrix is served with them re-read by one grouped query.
+"""
+
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import case, extract, func
+from models.database import db, Client, Session, Payment
+
+ACTIVITY_SOURCES = ('sessions', 'payments')
+MAX_COHORT_MONTHS = 60
+
+# Seconds a matrix is kept even if no month has closed
+CACHE_MAX_AGE = 24 * 3600
+
+_cache_lock = threading.Lock()
+_cache = {}
+
+
+def _month_number(year, month):
+    return int(year) * 12 + int(month) - 1
+
+
+def _month_label(number):
+    return f'{number // 12}-{number % 12 + 1:02d}'
+
+
+def _period(months, now):
+    """First and last closed month numbers and the [start, end) they span"""
+    close = _month_number(now.year, now.month) - 1
+    first = close - months + 1
+    return first, close, datetime(first // 12, first % 12 + 1, 1), datetime(now.year, now.month, 1)
+
+
+def _activity_query(activity, start, end):
+    """Distinct (client, signup month, activity month) for activity in [start, end)"""
+    if activity == 'payments':
+        client_id, when = Payment.client_id, Payment.payment_date
+        condition = Payment.status == 'completed'
+    else:
+        client_id, when = Session.client_id, Session.session_date
+        condition = Session.status != 'cancelled'
+
+    columns = (
+        client_id,
+        extract('year', Client.created_at), extract('month', Client.created_at),
+        extract('year', when), extract('month', when),
+    )
+    return db.session.query(*columns).join(Client, Client.id == client_id).filter(
+        condition,
+        Client.created_at >= start,
+        Client.created_at < end,
+        when >= start,
+        when < end
+    ).group_by(*columns)
+
+
+def build_matrix(months=12, activity='sessions', now=None):
+    """
+    Retention matrix for the cohorts of the last months closed months
+
+    Returns:
+        Dict with the cohorts (size, current active count, active clients
+        and retention per month since signup) and the closed month covered
+    """
+    now = now or datetime.utcnow()
+    first, close, start, end = _period(months, now)
+
+    sizes = db.session.query(
+        extract('year', Client.created_at), extract('month', Client.created_at),
+        func.count(Client.id), func.sum(case((Client.status == 'active', 1), else_=0))
+    ).filter(Client.created_at >= start, Client.created_at < end).group_by(
+        extract('year', Client.created_at), extract('month', Client.created_at)
+    ).all()
+
+    cohort_size = np.zeros(months, dtype=np.int64)
+    active_now = np.zeros(months, dtype=np.int64)
+    for year, month, size, active in sizes:
+        cohort_size[_month_number(year, month) - first] = size
+        active_now[_month_number(year, month) - first] = active or 0
+
+    rows = np.array(_activity_query(activity, start, end).all(), dtype=np.int64).reshape(-1, 5)
+    signup = rows[:, 1] * 12 + rows[:, 2] - 1
+    active_month = rows[:, 3] * 12 + rows[:, 4] - 1
+    offset = active_month - signup
+    keep = offset >= 0
+
+    counts = np.zeros((months, months), dtype=np.int64)
+    np.add.at(counts, (signup[keep] - first, offset[keep]), 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        retention = np.where(cohort_size[:, None] > 0, counts / cohort_size[:, None] * 100, 0.0)
+
+    cohorts = []
+    for i in range(months):
+        if not cohort_size[i]:
+            continue
+        # Months since signup that have closed for this cohort
+        observed = months - i
+        cohorts.append({
+            'cohort': _month_label(first + i),
+            'initial_size': int(cohort_size[i]),
+            'active_count': int(active_now[i]),
+            'retention_rate': round(float(active_now[i] / cohort_size[i] * 100), 2),
+            'active_by_month': counts[i, :observed].tolist(),
+            'retention_by_month': np.round(retention[i, :observed], 2).tolist(),
+        })
+
+    return {
+        'cohorts': cohorts,
+        'analysis_period_months': months,
+        'activity': activity,
+        'through_month': _month_label(close),
+    }
+
+
+def _with_current_status(matrix, months, now):
+    """A cached matrix with each cohort's active count and retention rate re-read"""
+    _, _, start, end = _period(months, now)
+    active = {
+        _month_label(_month_number(year, month)): count
+        for year, month, count in db.session.query(
+            extract('year', Client.created_at), extract('month', Client.created_at), func.count(Client.id)
+        ).filter(
+            Client.status == 'active', Client.created_at >= start, Client.created_at < end
+        ).group_by(
+            extract('year', Client.created_at), extract('month', Client.created_at)
+        )
+    }
+    cohorts = []
+    for cohort in matrix['cohorts']:
+        count = active.get(cohort['cohort'], 0)
+        cohorts.append({
+            **cohort,
+            'active_count': count,
+            'retention_rate': round(count / cohort['initial_size'] * 100, 2),
+        })
+    return {**matrix, 'cohorts': cohorts}
+
+
+def cohort_matrix(months=12, activity='sessions', now=None):
+    """build_matrix(), cached until the next month closes (current status excepted)"""
+    now = now or datetime.utcnow()
+    key = (months, activity, _month_number(now.year, now.month))
+    with _cache_lock:
+        cached = _cache.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return _with_current_status(cached[1], months, now)
+
+    matrix = build_matrix(months, activity, now)
+    with _cache_lock:
+        # Matrices for earlier month-closes are never asked for again
+        for stale in [k for k in _cache if k[2] != key[2]]:
+            del _cache[stale]
+        _cache[key] = (time.monotonic() + CACHE_MAX_AGE, matrix)
+    return matrix
+
+
+def clear_cache():
+    """Drop every cached matrix"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,238 @@
+"""
+Bulk data export
+Streams raw operational rows (sessions, payments, measurements, workout
+logs, SMS logs and email campaign deliveries) as CSV or NDJSON. Each export
+is a single column query ordered by (date, id) and fetched in batches with
+yield_per, which uses a server-side cursor on PostgreSQL; rows are rendered
+as they arrive and no ORM objects are built, so memory stays flat however
+many years are exported.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from sqlalchemy import select
+from models.database import (
+    db, Assignment, CampaignRecipient, Client, EmailCampaign, Measurement, Payment, Session, SMSLog, Trainer,
+    WorkoutLog
+)
+
+# Rows fetched per round trip, and rendered per chunk
+STREAM_BATCH_SIZE = 1000
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def _assigned_clients(column):
+    """Filter for rows belonging to a trainer's assigned clients"""
+    return lambda trainer_id: column.in_(
+        select(Assignment.client_id).where(Assignment.trainer_id == trainer_id)
+    )
+
+
+def _recipient(kind):
+    """Filter for campaign deliveries to one client or trainer"""
+    return lambda recipient_id: (
+        (CampaignRecipient.recipient_type == kind) & (CampaignRecipient.recipient_id == recipient_id)
+    )
+
+
+EXPORTS = {
+    'sessions': {
+        'columns': [
+            Session.id, Session.session_date, Session.end_time, Session.duration, Session.session_type,
+            Session.status, Session.location, Session.trainer_id, Trainer.name.label('trainer_name'),
+            Session.client_id, Client.name.label('client_name'), Session.recurring_session_id, Session.notes,
+            Session.created_at, Session.updated_at,
+        ],
+        'joins': [(Trainer, Trainer.id == Session.trainer_id), (Client, Client.id == Session.client_id)],
+        'date': Session.session_date,
+        'id': Session.id,
+        'client': lambda client_id: Session.client_id == client_id,
+        'trainer': lambda trainer_id: Session.trainer_id == trainer_id,
+    },
+    'payments': {
+        'columns': [
+            Payment.id, Payment.payment_date, Payment.amount, Payment.status, Payment.payment_method,
+            Payment.payment_type, Payment.client_id, Client.name.label('client_name'), Payment.transaction_id,
+            Payment.stripe_payment_intent_id, Payment.stripe_charge_id, Payment.notes, Payment.created_at,
+        ],
+        'joins': [(Client, Client.id == Payment.client_id)],
+        'date': Payment.payment_date,
+        'id': Payment.id,
+        'client': lambda client_id: Payment.client_id == client_id,
+        'trainer': _assigned_clients(Payment.client_id),
+    },
+    'measurements': {
+        'columns': [
+            Measurement.id, Measurement.measurement_date, Measurement.client_id, Client.name.label('client_name'),
+            Measurement.weight, Measurement.weight_unit, Measurement.body_fat_percentage, Measurement.muscle_mass,
+            Measurement.bmi, Measurement.chest, Measurement.waist, Measurement.hips, Measurement.thigh_left,
+            Measurement.thigh_right, Measurement.arm_left, Measurement.arm_right, Measurement.calf_left,
+            Measurement.calf_right, Measurement.measurement_unit, Measurement.resting_heart_rate,
+            Measurement.blood_pressure_systolic, Measurement.blood_pressure_diastolic, Measurement.notes,
+            Measurement.recorded_by, Measurement.created_at,
+        ],
+        'joins': [(Client, Client.id == Measurement.client_id)],
+        'date': Measurement.measurement_date,
+        'id': Measurement.id,
+        'client': lambda client_id: Measurement.client_id == client_id,
+        'trainer': _assigned_clients(Measurement.client_id),
+    },
+    'workout_logs': {
+        'columns': [
+            WorkoutLog.id, WorkoutLog.completed_date, WorkoutLog.client_id, Client.name.label('client_name'),
+            WorkoutLog.client_workout_id, WorkoutLog.workout_template_id, WorkoutLog.duration_minutes,
+            WorkoutLog.difficulty_rating, WorkoutLog.notes,
+        ],
+        'joins': [(Client, Client.id == WorkoutLog.client_id)],
+        'date': WorkoutLog.completed_date,
+        'id': WorkoutLog.id,
+        'client': lambda client_id: WorkoutLog.client_id == client_id,
+        'trainer': _assigned_clients(WorkoutLog.client_id),
+    },
+    'sms_logs': {
+        'columns': [
+            SMSLog.id, SMSLog.created_at, SMSLog.to_number, SMSLog.from_number, SMSLog.status,
+            SMSLog.twilio_status, SMSLog.error_message, SMSLog.price, SMSLog.price_unit, SMSLog.client_id,
+            SMSLog.trainer_id, SMSLog.session_id, SMSLog.template_id, SMSLog.message_sid, SMSLog.message,
+            SMSLog.delivered_at,
+        ],
+        'joins': [],
+        'date': SMSLog.created_at,
+        'id': SMSLog.id,
+        'client': lambda client_id: SMSLog.client_id == client_id,
+        'trainer': lambda trainer_id: SMSLog.trainer_id == trainer_id,
+    },
+    # Email is sent through campaigns; each recipient row is one delivery
+    'email_logs': {
+        'columns': [
+            CampaignRecipient.id, CampaignRecipient.created_at, CampaignRecipient.campaign_id,
+            EmailCampaign.name.label('campaign_name'), CampaignRecipient.email, CampaignRecipient.recipient_type,
+            CampaignRecipient.recipient_id, CampaignRecipient.ab_variant, CampaignRecipient.status,
+            CampaignRecipient.sent_at, CampaignRecipient.delivered_at, CampaignRecipient.opened_at,
+            CampaignRecipient.clicked_at, CampaignRecipient.bounced_at, CampaignRecipient.failed_at,
+            CampaignRecipient.error_message, CampaignRecipient.open_count, CampaignRecipient.click_count,
+        ],
+        'joins': [(EmailCampaign, EmailCampaign.id == CampaignRecipient.campaign_id)],
+        'date': CampaignRecipient.created_at,
+        'id': CampaignRecipient.id,
+        'client': _recipient('client'),
+        'trainer': _recipient('trainer'),
+    },
+}
+
+
+def export_columns(dataset):
+    """Column names of a dataset, in export order"""
+    return [column.key for column in EXPORTS[dataset]['columns']]
+
+
+def parse_bound(value):
+    """
+    Parse an ISO date or datetime range bound
+
+    A bare date (2024-12-31) is kept as a date so an end bound can cover
+    the whole day rather than stopping at midnight.
+
+    Raises:
+        ValueError: Not ISO 8601
+    """
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        return datetime.fromisoformat(value)
+
+
+def export_query(dataset, start=None, end=None, trainer_id=None, client_id=None):
+    """
+    Query the rows of a dataset, oldest first
+
+    Args:
+        dataset: A key of EXPORTS
+        start, end: Rows dated in [start, end] (default: all). Dates
+            without a time cover the whole day.
+        trainer_id, client_id: Rows of this trainer (or their assigned
+            clients) and client
+
+    Returns:
+        Query of rows, streamed in batches
+    """
+    spec = EXPORTS[dataset]
+    query = db.session.query(*spec['columns'])
+    for model, on in spec['joins']:
+        query = query.outerjoin(model, on)
+
+    if trainer_id:
+        query = query.filter(spec['trainer'](trainer_id))
+    if client_id:
+        query = query.filter(spec['client'](client_id))
+    if start:
+        if not isinstance(start, datetime):
+            start = datetime.combine(start, time.min)
+        query = query.filter(spec['date'] >= start)
+    if isinstance(end, datetime):
+        query = query.filter(spec['date'] <= end)
+    elif end:
+        query = query.filter(spec['date'] < datetime.combine(end + timedelta(days=1), time.min))
+    return query.order_by(spec['date'], spec['id']).yield_per(STREAM_BATCH_SIZE)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def render_csv(rows, columns):
+    """
+    Stream rows as CSV with a header line
+
+    Yields:
+        Chunks of up to STREAM_BATCH_SIZE lines
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_text(value) for value in row])
+        if count % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def render_ndjson(rows, columns):
+    """
+    Stream rows as newline-delimited JSON objects
+
+    Yields:
+        Chunks of up to STREAM_BATCH_SIZE lines
+    """
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(columns, row)), default=_json_default))
+        if len(lines) == STREAM_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
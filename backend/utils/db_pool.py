@@ -0,0 +1,134 @@
+"""
+Database connection pool monitoring
+Tracks checkouts, idle connections, overflow and checkout wait times
+for the SQLAlchemy engine of the current worker process.
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMonitor:
+    """Per-process connection pool statistics (one instance per gunicorn worker)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clear all recorded statistics"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_count = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.wait_last = 0.0
+
+    def record_wait(self, seconds, timed_out=False):
+        """Record how long a caller waited to check out a connection"""
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_last = seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+            if timed_out:
+                self.timeouts += 1
+
+    def attach(self, engine):
+        """Register pool event listeners on an engine"""
+        pool = engine.pool
+        if getattr(pool, '_fitnesscrm_monitored', False):
+            return
+        pool._fitnesscrm_monitored = True
+
+        @event.listens_for(pool, 'connect')
+        def _on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+
+        @event.listens_for(pool, 'checkout')
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                self.checkouts += 1
+
+        @event.listens_for(pool, 'checkin')
+        def _on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(pool, 'invalidate')
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def get_stats(self, engine):
+        """
+        Get a snapshot of the pool state for an engine
+
+        Args:
+            engine: SQLAlchemy engine
+
+        Returns:
+            Dictionary of pool gauges and counters
+        """
+        pool = engine.pool
+        stats = {
+            'pid': os.getpid(),
+            'pool_class': type(pool).__name__,
+            'status': pool.status(),
+        }
+
+        # Gauges are only available on queue-based pools
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'idle': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+            })
+
+        with self._lock:
+            stats.update({
+                'total_checkouts': self.checkouts,
+                'total_checkins': self.checkins,
+                'total_connects': self.connects,
+                'total_invalidations': self.invalidations,
+                'wait': {
+                    'count': self.wait_count,
+                    'timeouts': self.timeouts,
+                    'avg_ms': round(self.wait_total / self.wait_count * 1000, 3) if self.wait_count else 0,
+                    'max_ms': round(self.wait_max * 1000, 3),
+                    'last_ms': round(self.wait_last * 1000, 3),
+                },
+            })
+
+        return stats
+
+
+# Global pool monitor instance (per worker process)
+pool_monitor = PoolMonitor()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_monitor.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_monitor.record_wait(time.perf_counter() - start)
+        return connection
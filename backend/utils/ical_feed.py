@@ -0,0 +1,171 @@
+"""
+iCal feeds
+Streams sessions as an iCalendar (RFC 5545) document. Trainer and client
+names are joined in the same query and events are rendered one at a time,
+so a feed never holds the whole calendar in memory.
+
+Subscribed feeds are versioned by the newest updated_at and the number of
+sessions in the trainer's or client's calendar; both come from one
+aggregate over the (trainer_id|client_id, updated_at) indexes, so a
+calendar app polling an unchanged feed gets a 304 without any session
+rows being read.
+"""
+
+import hashlib
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models.database import db, Session, Trainer, Client
+
+# Subscribed feeds start this many days back
+FEED_PAST_DAYS = 90
+
+# Rows fetched per round trip while streaming
+STREAM_BATCH_SIZE = 500
+
+# RFC 5545 lines are folded at 75 octets
+LINE_LIMIT = 75
+
+
+def escape_text(value):
+    """Escape a TEXT property value"""
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Fold a content line into 75-octet chunks, continuing with a space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= LINE_LIMIT:
+        return line
+
+    parts = []
+    limit = LINE_LIMIT
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = LINE_LIMIT - 1  # room for the leading space
+    return '\r\n '.join(parts)
+
+
+def format_timestamp(value):
+    """UTC date-time in iCal form (YYYYMMDDTHHMMSSZ)"""
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def feed_query(trainer_id=None, client_id=None, start=None, end=None):
+    """
+    Query the columns an event needs, with trainer and client names joined
+
+    Returns:
+        Query of rows ordered by session_date, streamed in batches
+    """
+    query = db.session.query(
+        Session.id, Session.session_date, Session.end_time, Session.duration, Session.session_type,
+        Session.location, Session.notes, Session.status, Session.updated_at,
+        Trainer.name.label('trainer_name'), Client.name.label('client_name'),
+    ).outerjoin(Trainer, Trainer.id == Session.trainer_id).outerjoin(Client, Client.id == Session.client_id)
+
+    if trainer_id:
+        query = query.filter(Session.trainer_id == trainer_id)
+    if client_id:
+        query = query.filter(Session.client_id == client_id)
+    if start:
+        query = query.filter(Session.session_date >= start)
+    if end:
+        query = query.filter(Session.session_date <= end)
+    return query.order_by(Session.session_date, Session.id).yield_per(STREAM_BATCH_SIZE)
+
+
+def feed_version(trainer_id=None, client_id=None):
+    """
+    Newest updated_at and session count for a trainer's or client's calendar
+
+    Covers every session of the owner, not only the feed window, so the
+    aggregate can be answered from the index alone.
+
+    Returns:
+        (last_modified, count)
+    """
+    query = db.session.query(func.max(Session.updated_at), func.count(Session.id))
+    if trainer_id:
+        query = query.filter(Session.trainer_id == trainer_id)
+    if client_id:
+        query = query.filter(Session.client_id == client_id)
+    last_modified, count = query.one()
+    return last_modified, count
+
+
+def feed_etag(scope, last_modified, count, start=None, end=None):
+    """Entity tag for a feed version and window"""
+    key = '|'.join(str(part) for part in (scope, last_modified, count, start, end))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def render_event(row):
+    """Lines of one VEVENT"""
+    end_time = row.end_time or row.session_date + timedelta(minutes=row.duration or 60)
+    summary = f"{row.session_type or 'Training'}: {row.trainer_name or 'Trainer'} - {row.client_name or 'Client'}"
+
+    description_parts = []
+    if row.notes:
+        description_parts.append(f'Notes: {row.notes}')
+    description_parts.append(f'Duration: {row.duration} minutes')
+    description_parts.append(f'Status: {row.status}')
+
+    return [
+        'BEGIN:VEVENT',
+        f'UID:session-{row.id}@fitnesscrm.com',
+        # Stable per version, so unchanged events render identically
+        f'DTSTAMP:{format_timestamp(row.updated_at or row.session_date)}',
+        f'DTSTART:{format_timestamp(row.session_date)}',
+        f'DTEND:{format_timestamp(end_time)}',
+        f'SUMMARY:{escape_text(summary)}',
+        f"DESCRIPTION:{escape_text(chr(10).join(description_parts))}",
+        f"LOCATION:{escape_text(row.location or 'TBD')}",
+        f"STATUS:{'CANCELLED' if row.status == 'cancelled' else 'CONFIRMED'}",
+        'END:VEVENT',
+    ]
+
+
+def render_feed(rows, calendar_name='FitnessCRM Sessions'):
+    """
+    Stream an iCalendar document
+
+    Args:
+        rows: Rows from feed_query()
+        calendar_name: X-WR-CALNAME shown by calendar apps
+
+    Yields:
+        Chunks of the document, one event at a time
+    """
+    header = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//FitnessCRM//Session Calendar//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{escape_text(calendar_name)}',
+        'X-WR-TIMEZONE:UTC',
+    ]
+    yield '\r\n'.join(fold_line(line) for line in header) + '\r\n'
+
+    for row in rows:
+        yield '\r\n'.join(fold_line(line) for line in render_event(row)) + '\r\n'
+
+    yield 'END:VCALENDAR\r\n'
+
+
+def feed_window_start(now=None):
+    """Default start of a subscribed feed: FEED_PAST_DAYS ago, at midnight"""
+    now = now or datetime.utcnow()
+    return datetime.combine(now.date() - timedelta(days=FEED_PAST_DAYS), datetime.min.time())
@@ -0,0 +1,146 @@
+"""
+Prometheus metrics for FitnessCRM
+Request latency histograms, in-flight gauges, status counters and DB time
+per blueprint and endpoint, scrapeable from /metrics.
+
+When PROMETHEUS_MULTIPROC_DIR is set (gunicorn with several workers), every
+worker writes to that directory and /metrics aggregates across all of them.
+"""
+
+import os
+import time
+from flask import Response, g, request, jsonify
+from utils.logger import logger
+
+try:
+    from prometheus_client import (
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        CONTENT_TYPE_LATEST,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # pragma: no cover - optional dependency
+    CollectorRegistry = None
+
+# Latency buckets (seconds) sized for API calls: 5ms .. 30s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Endpoints that are not worth measuring
+EXCLUDED_ENDPOINTS = {'metrics', 'static', 'handle_options'}
+
+
+class RequestMetrics:
+    """Prometheus request metrics (one instance per process)"""
+
+    def __init__(self):
+        self.enabled = CollectorRegistry is not None
+        if not self.enabled:
+            return
+
+        self.request_latency = Histogram(
+            'fitnesscrm_http_request_duration_seconds',
+            'HTTP request latency',
+            ['blueprint', 'endpoint', 'method'],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.requests_in_progress = Gauge(
+            'fitnesscrm_http_requests_in_progress',
+            'HTTP requests currently being served',
+            ['blueprint', 'endpoint'],
+            multiprocess_mode='livesum',
+        )
+        self.responses = Counter(
+            'fitnesscrm_http_responses_total',
+            'HTTP responses by status code',
+            ['blueprint', 'endpoint', 'method', 'status'],
+        )
+        self.db_time = Histogram(
+            'fitnesscrm_db_time_seconds',
+            'Total database time spent per request',
+            ['blueprint', 'endpoint'],
+            buckets=LATENCY_BUCKETS,
+        )
+        self.db_queries = Histogram(
+            'fitnesscrm_db_queries_per_request',
+            'Number of SQL statements executed per request',
+            ['blueprint', 'endpoint'],
+            buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500, 1000),
+        )
+
+    def init_app(self, app):
+        """Register request hooks and the /metrics endpoint"""
+        if not self.enabled:
+            logger.warning("prometheus_client not installed. /metrics endpoint is disabled.")
+            return
+
+        @app.before_request
+        def _start_request_metrics():
+            labels = _request_labels()
+            if labels is None:
+                return
+            g.metrics_labels = labels
+            g.metrics_start = time.perf_counter()
+            self.requests_in_progress.labels(*labels).inc()
+
+        @app.after_request
+        def _record_request_metrics(response):
+            labels = g.get('metrics_labels')
+            if labels is None:
+                return response
+
+            blueprint, endpoint = labels
+            elapsed = time.perf_counter() - g.metrics_start
+            self.request_latency.labels(blueprint, endpoint, request.method).observe(elapsed)
+            self.responses.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+
+            stats = g.get('query_stats')
+            if stats is not None:
+                self.db_time.labels(blueprint, endpoint).observe(stats.total_time)
+                self.db_queries.labels(blueprint, endpoint).observe(stats.count)
+            return response
+
+        @app.teardown_request
+        def _finish_request_metrics(exception=None):
+            labels = g.pop('metrics_labels', None)
+            if labels is not None:
+                self.requests_in_progress.labels(*labels).dec()
+
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view, methods=['GET'])
+
+    def metrics_view(self):
+        """Expose metrics in the Prometheus text format"""
+        token = os.environ.get('METRICS_AUTH_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return jsonify({'error': 'Authentication required'}), 401
+
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            from prometheus_client import REGISTRY as registry
+
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def _request_labels():
+    """(blueprint, endpoint) labels for the current request, or None to skip"""
+    endpoint = request.endpoint
+    if endpoint in EXCLUDED_ENDPOINTS:
+        return None
+    if endpoint is None:
+        # Unmatched URLs share one label so random paths can't explode cardinality
+        return ('none', 'unmatched')
+    return (request.blueprint or 'app', endpoint)
+
+
+def mark_process_dead(pid):
+    """Clean up a dead worker's live gauges (call from gunicorn child_exit)"""
+    if CollectorRegistry is not None and os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
+
+# Global metrics instance
+request_metrics = RequestMetrics()
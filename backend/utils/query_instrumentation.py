@@ -0,0 +1,214 @@
+"""
+SQL query instrumentation
+Records query count, DB time and repeated statement shapes per request,
+and flags endpoints that run the same statement shape too many times (N+1).
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from utils.logger import logger
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Test helpers (capture_queries) register extra collectors here
+_capture_stack = ContextVar('query_capture_stack', default=())
+
+
+def fingerprint_statement(statement):
+    """
+    Normalize a SQL statement to its shape
+
+    Literals and bound parameters become '?', IN lists collapse to a single
+    placeholder and whitespace is squashed, so the same query issued for
+    different rows produces the same fingerprint.
+    """
+    shape = _STRING_LITERAL_RE.sub('?', statement)
+    shape = _PLACEHOLDER_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _IN_LIST_RE.sub('(?)', shape)
+    return _WHITESPACE_RE.sub(' ', shape).strip()
+
+
+class QueryStats:
+    """Query statistics for a single request (or capture block)"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.fingerprints = Counter()
+
+    def record(self, statement, duration):
+        """Record one executed statement"""
+        self.count += 1
+        self.total_time += duration
+        self.fingerprints[fingerprint_statement(statement)] += 1
+
+    @property
+    def total_time_ms(self):
+        return round(self.total_time * 1000, 2)
+
+    @property
+    def max_repeat(self):
+        """Highest number of executions of a single statement shape"""
+        return max(self.fingerprints.values()) if self.fingerprints else 0
+
+    def repeated(self, threshold):
+        """Statement shapes that ran more than threshold times, most frequent first"""
+        return [(shape, count) for shape, count in self.fingerprints.most_common() if count > threshold]
+
+
+class QueryInstrumentation:
+    """Per-request SQL instrumentation with N+1 detection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flagged_endpoints = {}
+        self._listeners = []
+
+    def init_app(self, app, engine):
+        """
+        Attach engine events and request hooks
+
+        Args:
+            app: Flask application
+            engine: SQLAlchemy engine used by the application
+        """
+        if not app.config.get('SQL_INSTRUMENTATION', True):
+            return
+
+        self.attach_engine(engine)
+
+        @app.before_request
+        def _start_query_stats():
+            g.query_stats = QueryStats()
+
+        @app.after_request
+        def _report_query_stats(response):
+            stats = g.get('query_stats')
+            if stats is None:
+                return response
+
+            threshold = app.config.get('SQL_REPEAT_THRESHOLD', 10)
+            response.headers['X-Query-Count'] = str(stats.count)
+            response.headers['X-Query-Time-Ms'] = str(stats.total_time_ms)
+            response.headers['X-Query-Max-Repeat'] = str(stats.max_repeat)
+
+            endpoint = request.endpoint or request.path
+            logger.info(
+                f"SQL endpoint={endpoint} method={request.method} status={response.status_code} "
+                f"queries={stats.count} db_ms={stats.total_time_ms} max_repeat={stats.max_repeat}"
+            )
+
+            repeated = stats.repeated(threshold)
+            if repeated:
+                self._flag_endpoint(endpoint, repeated)
+            return response
+
+    def attach_engine(self, engine):
+        """Register cursor execution listeners on an engine (idempotent)"""
+        if getattr(engine, '_fitnesscrm_instrumented', False):
+            return
+        engine._fitnesscrm_instrumented = True
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            start_times = conn.info.get('query_start_time')
+            if not start_times:
+                return
+            duration = time.perf_counter() - start_times.pop()
+            self._record(conn, statement, parameters, duration)
+
+        @event.listens_for(engine, 'handle_error')
+        def _handle_error(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get('query_start_time'):
+                connection.info['query_start_time'].pop()
+
+    def add_listener(self, callback):
+        """
+        Register a callback run after every statement
+
+        Callback signature: callback(conn, statement, parameters, duration)
+        """
+        self._listeners.append(callback)
+
+    def _record(self, conn, statement, parameters, duration):
+        if has_request_context():
+            stats = g.get('query_stats')
+            if stats is not None:
+                stats.record(statement, duration)
+
+        for stats in _capture_stack.get():
+            stats.record(statement, duration)
+
+        for callback in self._listeners:
+            try:
+                callback(conn, statement, parameters, duration)
+            except Exception as e:
+                logger.error(f"Query listener failed: {str(e)}")
+
+    def _flag_endpoint(self, endpoint, repeated):
+        shape, count = repeated[0]
+        logger.warning(
+            f"Possible N+1: endpoint={endpoint} repeats={count} statement={shape[:200]}"
+        )
+        with self._lock:
+            entry = self.flagged_endpoints.setdefault(endpoint, {
+                'endpoint': endpoint,
+                'occurrences': 0,
+                'max_repeat': 0,
+                'statement': shape,
+            })
+            entry['occurrences'] += 1
+            entry['last_seen'] = datetime.utcnow().isoformat()
+            if count >= entry['max_repeat']:
+                entry['max_repeat'] = count
+                entry['statement'] = shape
+
+    def get_flagged_endpoints(self):
+        """Endpoints flagged for repeated statement shapes, worst first"""
+        with self._lock:
+            flagged = [dict(entry) for entry in self.flagged_endpoints.values()]
+        return sorted(flagged, key=lambda x: x['max_repeat'], reverse=True)
+
+    def reset(self):
+        """Clear flagged endpoints"""
+        with self._lock:
+            self.flagged_endpoints = {}
+
+
+# Global instrumentation instance
+query_instrumentation = QueryInstrumentation()
+
+
+@contextmanager
+def capture_queries():
+    """
+    Capture statements executed inside the block
+
+    Usage:
+        with capture_queries() as stats:
+            client.get('/api/sessions')
+        assert stats.max_repeat <= 2
+    """
+    stats = QueryStats()
+    token = _capture_stack.set(_capture_stack.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _capture_stack.reset(token)
@@ -0,0 +1,266 @@
+"""
+Recurring session expansion
+Computes the occurrences of a RecurringSession template (an rrule-style
+expansion of the daily/weekly/biweekly/monthly patterns), checks them
+against the trainer's calendar with one query and bulk inserts the
+occurrences that are free.
+
+Templates are materialised on a rolling horizon: sessions exist only up to
+RECURRING_HORIZON_DAYS ahead, and each template's materialized_until
+high-water mark lets the nightly run (materialize_recurring_sessions.py)
+expand just the new occurrences.
+"""
+
+import calendar
+from datetime import datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import insert, or_
+from models.database import db, Session, RecurringSession
+from utils.booking_conflicts import BusyCalendar, lock_trainer_schedule
+from utils.logger import logger
+
+RECURRENCE_PATTERNS = ('daily', 'weekly', 'biweekly', 'monthly')
+
+DEFAULT_HORIZON_DAYS = 56
+
+
+def occurrence_dates(pattern, start_date, end_date, recurrence_days=None, after=None):
+    """
+    Dates on which a pattern occurs, in order
+
+    Days are counted from start_date; a day is in range while
+    start_date + n days <= end_date (and > after, when given). Weekly and
+    biweekly patterns use recurrence_days (0 = Monday); biweekly repeats in
+    the even weeks counted from start_date. Monthly repeats on start_date's
+    day of the month and skips months that don't have it.
+
+    Args:
+        pattern: One of RECURRENCE_PATTERNS
+        start_date: First datetime of the series
+        end_date: Last datetime of the series
+        recurrence_days: Weekdays for weekly/biweekly patterns
+        after: High-water mark; only days past it are returned
+
+    Returns:
+        Sorted list of dates
+    """
+    if end_date < start_date:
+        return []
+    first = start_date.date()
+    total_days = (end_date - start_date).days
+    begin = 0 if after is None or after < start_date else (after - start_date).days + 1
+    if begin > total_days:
+        return []
+
+    if pattern == 'daily':
+        return [first + timedelta(days=n) for n in range(begin, total_days + 1)]
+
+    if pattern in ('weekly', 'biweekly'):
+        step = 7 if pattern == 'weekly' else 14
+        dates = []
+        for weekday in {int(day) for day in (recurrence_days or [])}:
+            offset = (weekday - first.weekday()) % 7
+            if begin > offset:
+                offset += -(-(begin - offset) // step) * step
+            dates.extend(first + timedelta(days=n) for n in range(offset, total_days + 1, step))
+        return sorted(dates)
+
+    if pattern == 'monthly':
+        since = first + timedelta(days=begin)
+        last = first + timedelta(days=total_days)
+        dates = []
+        year, month = since.year, since.month
+        while (year, month) <= (last.year, last.month):
+            if first.day <= calendar.monthrange(year, month)[1]:
+                day = first.replace(year=year, month=month)
+                if since <= day <= last:
+                    dates.append(day)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return dates
+
+    return []
+
+
+def occurrence_slots(recurring_session, start_date, end_date, after=None):
+    """(start, end) datetimes of a template's occurrences between two dates"""
+    duration = timedelta(minutes=recurring_session.duration or 60)
+    return [
+        (start, start + duration)
+        for start in (
+            datetime.combine(day, recurring_session.start_time)
+            for day in occurrence_dates(recurring_session.recurrence_pattern, start_date, end_date,
+                                        recurring_session.recurrence_days, after=after)
+        )
+    ]
+
+
+def plan_occurrences(recurring_session, start_date, end_date, after=None, not_before=None):
+    """
+    Split a template's occurrences into free slots and conflicts
+
+    The trainer's sessions in the covered window are loaded with one query;
+    each occurrence is then checked against them (and against the previous
+    accepted occurrence) in time order.
+
+    Args:
+        recurring_session: RecurringSession template (need not be saved)
+        start_date: First datetime of the series
+        end_date: Last datetime to expand
+        after: High-water mark; occurrences up to it are skipped
+        not_before: Skip occurrences starting before this datetime
+
+    Returns:
+        (slots, conflicts): free (start, end) pairs, and one dict per
+        skipped occurrence with the ids of the sessions it clashes with
+    """
+    slots = occurrence_slots(recurring_session, start_date, end_date, after=after)
+    if not_before is not None:
+        slots = [slot for slot in slots if slot[0] >= not_before]
+    if not slots:
+        return [], []
+
+    existing = BusyCalendar.load(recurring_session.trainer_id, slots[0][0], max(end for _, end in slots))
+
+    free, conflicts = [], []
+    previous_end = None
+    for start, end in slots:
+        clashes = existing.overlapping(start, end)
+        overlaps_series = previous_end is not None and start < previous_end
+        if clashes or overlaps_series:
+            conflicts.append({
+                'session_date': start.isoformat(),
+                'end_time': end.isoformat(),
+                'conflicts': clashes,
+                'reason': 'booked' if clashes else 'series_overlap',
+            })
+            continue
+        free.append((start, end))
+        previous_end = end
+    return free, conflicts
+
+
+def session_rows(recurring_session, slots):
+    """Session column values for a template's free slots"""
+    return [
+        {
+            'trainer_id': recurring_session.trainer_id,
+            'client_id': recurring_session.client_id,
+            'session_date': start,
+            'end_time': end,
+            'duration': recurring_session.duration or 60,
+            'session_type': recurring_session.session_type,
+            'location': recurring_session.location,
+            'notes': recurring_session.notes,
+            'status': 'scheduled',
+            'recurring_session_id': recurring_session.id,
+        }
+        for start, end in slots
+    ]
+
+
+def insert_sessions(rows):
+    """Insert session rows with one executemany (ORM bulk insert)"""
+    if rows:
+        db.session.execute(insert(Session), rows)
+    return len(rows)
+
+
+def horizon_end(now=None, days=None):
+    """End of the last day to materialise: RECURRING_HORIZON_DAYS from now"""
+    now = now or datetime.utcnow()
+    if days is None:
+        days = current_app.config.get('RECURRING_HORIZON_DAYS', DEFAULT_HORIZON_DAYS)
+    return datetime.combine(now.date() + timedelta(days=days), time.max)
+
+
+def window_end(recurring_session, until):
+    """Where a template's expansion stops: until, or its end_date if earlier"""
+    if recurring_session.end_date and recurring_session.end_date < until:
+        return recurring_session.end_date
+    return until
+
+
+def materialize(recurring_session, until, not_before=None):
+    """
+    Create a template's sessions from its high-water mark up to until
+
+    Only occurrences past materialized_until are expanded, so a run costs
+    O(new occurrences). The mark then moves to window_end(). The template
+    must have an id (flush it first).
+
+    Args:
+        recurring_session: RecurringSession template
+        until: Horizon end, usually horizon_end()
+        not_before: Skip occurrences starting before this datetime
+
+    Returns:
+        (sessions_created, conflicts)
+    """
+    end = window_end(recurring_session, until)
+    after = recurring_session.materialized_until
+    if after is not None and after >= end:
+        return 0, []
+
+    slots, conflicts = plan_occurrences(recurring_session, recurring_session.start_date, end,
+                                        after=after, not_before=not_before)
+    created = insert_sessions(session_rows(recurring_session, slots))
+    recurring_session.materialized_until = end
+    return created, conflicts
+
+
+def remove_future_sessions(recurring_session, now):
+    """
+    Delete a template's scheduled sessions from now on and rewind its mark
+
+    Past, completed and cancelled sessions are kept. The mark goes back a
+    day so materialize(..., not_before=now) reconsiders today's occurrences.
+
+    Returns:
+        Number of sessions deleted
+    """
+    removed = Session.query.filter(
+        Session.recurring_session_id == recurring_session.id,
+        Session.session_date >= now,
+        Session.status == 'scheduled'
+    ).delete(synchronize_session=False)
+    rewind = now - timedelta(days=1)
+    if recurring_session.materialized_until is None or recurring_session.materialized_until > rewind:
+        recurring_session.materialized_until = rewind
+    return removed
+
+
+def materialize_pending(until, now=None):
+    """
+    Extend every active template whose high-water mark is short of until
+
+    Templates already materialised to the horizon (or to their end_date)
+    are filtered out in SQL. Each template is committed on its own, under
+    the trainer's schedule lock, so one failure doesn't stop the run.
+
+    Returns:
+        Dict with templates, sessions_created, conflicts and failed counts
+    """
+    now = now or datetime.utcnow()
+    pending = db.session.query(RecurringSession.id).filter(
+        RecurringSession.active.is_(True),
+        or_(RecurringSession.materialized_until.is_(None), RecurringSession.materialized_until < until),
+        or_(RecurringSession.end_date.is_(None), RecurringSession.materialized_until.is_(None),
+            RecurringSession.end_date > RecurringSession.materialized_until),
+    ).order_by(RecurringSession.id)
+
+    stats = {'templates': 0, 'sessions_created': 0, 'conflicts': 0, 'failed': 0}
+    for (template_id,) in pending.all():
+        try:
+            template = db.session.get(RecurringSession, template_id)
+            lock_trainer_schedule(template.trainer_id)
+            created, conflicts = materialize(template, until, not_before=now)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error materialising recurring session {template_id}: {str(e)}")
+            stats['failed'] += 1
+            continue
+        stats['templates'] += 1
+        stats['sessions_created'] += created
+        stats['conflicts'] += len(conflicts)
+    return stats
@@ -0,0 +1,243 @@
+"""
+Report jobs
+Runs custom reports outside the request: a report spec is stored as a
+ReportJob row and computed by a per-worker thread pool, and clients poll (or
+long-poll) the job until it completes. Results are stored on the row and
+keyed by a hash of the spec, so an identical spec submitted within
+REPORT_RESULT_TTL seconds is answered from the stored result, and one
+submitted while the first is still running joins that job.
+
+A spec is a dict with name, metrics, start_date and end_date (ISO strings
+or None), default_days (the range used when start_date is None) and source
+('raw' to bypass the rollups). Open-ended ranges are resolved when the job
+runs.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from models.database import db, ReportJob
+from utils.report_planner import build_report
+from utils.logger import logger
+
+PENDING_STATUSES = ('queued', 'running')
+DONE_STATUSES = ('completed', 'failed')
+
+# Seconds between database re-reads while long-polling a job run elsewhere
+POLL_INTERVAL = 0.5
+
+
+def make_spec(name, metrics, start_date=None, end_date=None, default_days=30, source=None):
+    """
+    Validate and normalise a report spec
+
+    Raises:
+        ValueError: No metrics, or a date that isn't ISO 8601
+    """
+    if not metrics:
+        raise ValueError('At least one metric must be selected')
+    for value in (start_date, end_date):
+        if value:
+            datetime.fromisoformat(value)
+    return {
+        'name': name,
+        'metrics': list(metrics),
+        'start_date': start_date or None,
+        'end_date': end_date or None,
+        'default_days': default_days,
+        'source': source,
+    }
+
+
+def spec_hash(spec):
+    """Stable hash of a report spec"""
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def run_spec(spec, now=None):
+    """Build the report a spec describes"""
+    now = now or datetime.utcnow()
+    end_date = datetime.fromisoformat(spec['end_date']) if spec.get('end_date') else now
+    if spec.get('start_date'):
+        start_date = datetime.fromisoformat(spec['start_date'])
+    else:
+        start_date = now - timedelta(days=spec.get('default_days') or 30)
+    return build_report(spec['name'], spec['metrics'], start_date, end_date, spec.get('source'))
+
+
+def _pending_since():
+    """When a pending job's timeout started: when it began running, else when it was queued"""
+    return func.coalesce(ReportJob.started_at, ReportJob.created_at)
+
+
+class ReportJobs:
+    """Submission, execution and polling of report jobs for this worker"""
+
+    def __init__(self):
+        self.app = None
+        self.workers = 2
+        self.result_ttl = 900
+        self.job_timeout = 600
+        self.max_wait = 25
+        self._executor = None
+        self._lock = threading.Lock()
+        self._finished = {}
+
+    def init_app(self, app):
+        """Configure from app settings"""
+        self.app = app
+        self.workers = app.config.get('REPORT_JOB_WORKERS', 2)
+        self.result_ttl = app.config.get('REPORT_RESULT_TTL', 900)
+        self.job_timeout = app.config.get('REPORT_JOB_TIMEOUT', 600)
+        self.max_wait = app.config.get('REPORT_JOB_MAX_WAIT', 25)
+
+    def _pool(self):
+        # Created on first use, so gunicorn workers don't inherit a pool from the master
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='report-job')
+            return self._executor
+
+    def _event(self, job_id):
+        with self._lock:
+            return self._finished.setdefault(job_id, threading.Event())
+
+    def submit(self, spec):
+        """
+        Submit a report spec
+
+        Returns:
+            (job, reused): the job answering the spec, and whether it was
+            an existing completed or in-flight job
+        """
+        key = spec_hash(spec)
+        now = datetime.utcnow()
+
+        job = ReportJob.query.filter(
+            ReportJob.spec_hash == key,
+            ReportJob.status == 'completed',
+            ReportJob.expires_at > now
+        ).order_by(ReportJob.finished_at.desc()).first()
+        if job is None:
+            # Jobs pending for longer than the timeout died with their worker
+            job = ReportJob.query.filter(
+                ReportJob.spec_hash == key,
+                ReportJob.status.in_(PENDING_STATUSES),
+                _pending_since() > now - timedelta(seconds=self.job_timeout)
+            ).order_by(ReportJob.created_at.desc()).first()
+        if job is not None:
+            return job, True
+
+        ReportJob.query.filter(ReportJob.expires_at < now).delete(synchronize_session=False)
+        job = ReportJob(id=uuid.uuid4().hex, spec_hash=key, spec=spec, status='queued', created_at=now)
+        db.session.add(job)
+        db.session.commit()
+
+        if self.workers <= 0:
+            self._execute(job.id)
+            db.session.refresh(job)
+        else:
+            self._pool().submit(self._run, job.id)
+        return job, False
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self._execute(job_id)
+            finally:
+                db.session.remove()
+
+    def _execute(self, job_id):
+        """Compute a queued job and store its result or error"""
+        # Status changes are conditional so a job failed by _abandon() stays failed
+        started = ReportJob.query.filter(
+            ReportJob.id == job_id,
+            ReportJob.status == 'queued'
+        ).update({'status': 'running', 'started_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        if not started:
+            return
+
+        try:
+            result = run_spec(db.session.get(ReportJob, job_id).spec)
+            status, error = 'completed', None
+        except Exception as e:
+            logger.error(f"Error running report job {job_id}: {str(e)}")
+            db.session.rollback()
+            result, status, error = None, 'failed', str(e)
+
+        finished_at = datetime.utcnow()
+        ReportJob.query.filter(
+            ReportJob.id == job_id,
+            ReportJob.status == 'running'
+        ).update({
+            'status': status,
+            'result': result,
+            'error': error,
+            'finished_at': finished_at,
+            'expires_at': finished_at + timedelta(seconds=self.result_ttl),
+        }, synchronize_session=False)
+        db.session.commit()
+
+        event = self._event(job_id)
+        event.set()
+        with self._lock:
+            self._finished.pop(job_id, None)
+
+    def _abandon(self, job_id):
+        """Fail a job left pending past the timeout, as its worker died or was recycled"""
+        now = datetime.utcnow()
+        ReportJob.query.filter(
+            ReportJob.id == job_id,
+            ReportJob.status.in_(PENDING_STATUSES),
+            _pending_since() < now - timedelta(seconds=self.job_timeout)
+        ).update({
+            'status': 'failed',
+            'error': f'Report did not finish within {self.job_timeout} seconds',
+            'finished_at': now,
+            'expires_at': now + timedelta(seconds=self.result_ttl),
+        }, synchronize_session=False)
+        db.session.commit()
+        return db.session.get(ReportJob, job_id)
+
+    def get(self, job_id, wait=0):
+        """
+        Current state of a job, waiting up to wait seconds for it to finish
+
+        Jobs run by this worker wake the waiter as soon as they finish;
+        others are re-read every POLL_INTERVAL seconds. A job still pending
+        REPORT_JOB_TIMEOUT seconds after it was queued, or after it started
+        running, is reported (and stored) as failed.
+
+        Returns:
+            The job, or None if it doesn't exist (or has expired)
+        """
+        deadline = time.monotonic() + min(max(wait, 0), self.max_wait)
+        while True:
+            # End the transaction so each read sees the latest commit
+            db.session.rollback()
+            job = db.session.get(ReportJob, job_id)
+            now = datetime.utcnow()
+            if job is not None and job.expires_at and job.expires_at < now:
+                job = None
+            stale = now - timedelta(seconds=self.job_timeout)
+            if job is not None and job.status in PENDING_STATUSES:
+                if (job.started_at or job.created_at or now) < stale:
+                    job = self._abandon(job_id)
+            if job is None or job.status in DONE_STATUSES:
+                with self._lock:
+                    self._finished.pop(job_id, None)
+                return job
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return job
+            self._event(job_id).wait(min(POLL_INTERVAL, remaining))
+
+
+# Global report job runner
+report_jobs = ReportJobs()
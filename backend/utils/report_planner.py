@@ -0,0 +1,368 @@
+"""
+Report planner
+Compiles the metrics of a custom report into one query per source table and
+date range instead of one (or more) queries per metric. Each metric names
+the sources it reads; the planner merges the metrics that share a source
+into a single conditional-aggregate query (SUM(CASE ...)), grouped only by
+the keys those metrics need, and the metric values are then read off the
+loaded rows.
+
+Independent query groups run concurrently, each on its own app context and
+so its own pooled connection (REPORT_QUERY_WORKERS, 1 = sequential on the
+request's session).
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import case, func
+from flask import current_app
+from models.database import db, Client, Trainer, Session, Payment, Assignment
+from utils.analytics_rollup import analytics_rollup
+
+# Sources read by each metric, from the raw tables
+RAW_SOURCES = {
+    'total_revenue': ('payments',),
+    'payment_count': ('payments',),
+    'revenue_by_type': ('payments',),
+    'client_count': ('clients',),
+    'active_clients': ('clients',),
+    'new_clients': ('clients',),
+    'total_sessions': ('sessions',),
+    'completed_sessions': ('sessions',),
+    'attendance_rate': ('sessions',),
+    'sessions_by_type': ('sessions',),
+    'active_trainers': ('trainers',),
+    'trainer_performance': ('trainers', 'sessions', 'trainer_revenue'),
+}
+
+# Sources read by each metric when the daily rollups answer the report
+ROLLUP_SOURCES = {
+    **RAW_SOURCES,
+    'total_revenue': ('rollups',),
+    'payment_count': ('rollups',),
+    'revenue_by_type': ('rollups',),
+    'new_clients': ('rollups',),
+    'total_sessions': ('rollups',),
+    'completed_sessions': ('rollups',),
+    'attendance_rate': ('rollups',),
+    'sessions_by_type': ('rollups',),
+    'trainer_performance': ('trainers', 'rollups', 'assignments'),
+}
+
+# Sources that don't depend on the report's date range
+UNDATED_SOURCES = ('trainers', 'assignments')
+
+# Rollup scopes and columns read by each rollup-backed metric
+ROLLUP_READS = {
+    'total_revenue': (('all',), ('revenue_completed',)),
+    'payment_count': (('all',), ('payments_completed',)),
+    'revenue_by_type': (('payment_type',), ('payments_completed', 'revenue_completed')),
+    'new_clients': (('all',), ('new_clients',)),
+    'total_sessions': (('all',), ('sessions_total',)),
+    'completed_sessions': (('all',), ('sessions_completed',)),
+    'attendance_rate': (('all',), ('sessions_total', 'sessions_completed')),
+    'sessions_by_type': (('session_type',), ('sessions_completed',)),
+    'trainer_performance': (('trainer', 'client'), ('sessions_completed', 'revenue_completed')),
+}
+
+
+# Loaders: one query per source, covering every metric planned against it
+
+def _load_payments(metrics, start_date, end_date):
+    """Completed payment count and revenue, per payment type if needed"""
+    keys = [Payment.payment_type] if 'revenue_by_type' in metrics else []
+    rows = db.session.query(
+        *keys, func.count(Payment.id), func.coalesce(func.sum(Payment.amount), 0)
+    ).filter(
+        Payment.status == 'completed',
+        Payment.payment_date >= start_date,
+        Payment.payment_date <= end_date
+    ).group_by(*keys).all()
+    return [(row[0] if keys else None, row[-2], float(row[-1])) for row in rows]
+
+
+def _load_sessions(metrics, start_date, end_date):
+    """Total and completed sessions, per session type and trainer if needed"""
+    keys = []
+    if 'sessions_by_type' in metrics:
+        keys.append(Session.session_type)
+    if 'trainer_performance' in metrics:
+        keys.append(Session.trainer_id)
+    rows = db.session.query(
+        *keys,
+        func.count(Session.id),
+        func.coalesce(func.sum(case((Session.status == 'completed', 1), else_=0)), 0)
+    ).filter(
+        Session.session_date >= start_date,
+        Session.session_date <= end_date
+    ).group_by(*keys).all()
+
+    loaded = []
+    for row in rows:
+        values = dict(zip([key.key for key in keys], row))
+        values.update(total=row[-2], completed=row[-1])
+        loaded.append(values)
+    return loaded
+
+
+def _load_clients(metrics, start_date, end_date):
+    """Client counts as of the end of the range, and new clients in it"""
+    row = db.session.query(
+        func.count(Client.id),
+        func.coalesce(func.sum(case((Client.status == 'active', 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Client.created_at >= start_date, 1), else_=0)), 0)
+    ).filter(Client.created_at <= end_date).one()
+    return {'client_count': row[0], 'active_clients': row[1], 'new_clients': row[2]}
+
+
+def _load_trainers(metrics, start_date, end_date):
+    """Active trainers, as (id, name) if per-trainer metrics need them"""
+    if 'trainer_performance' in metrics:
+        return db.session.query(Trainer.id, Trainer.name).filter(Trainer.active == True).order_by(Trainer.id).all()
+    return Trainer.query.filter(Trainer.active == True).count()
+
+
+def _load_trainer_revenue(metrics, start_date, end_date):
+    """Completed revenue of each trainer's assigned clients"""
+    rows = db.session.query(
+        Assignment.trainer_id, func.sum(Payment.amount)
+    ).join(
+        Assignment, Assignment.client_id == Payment.client_id
+    ).filter(
+        Payment.status == 'completed',
+        Payment.payment_date >= start_date,
+        Payment.payment_date <= end_date
+    ).group_by(Assignment.trainer_id).all()
+    return {trainer_id: float(revenue or 0) for trainer_id, revenue in rows}
+
+
+def _load_assignments(metrics, start_date, end_date):
+    """Every (trainer, client) assignment"""
+    return db.session.query(Assignment.trainer_id, Assignment.client_id).all()
+
+
+def _load_rollups(metrics, start_date, end_date):
+    """Every rollup scope and column the metrics read, in one query"""
+    scopes, columns = set(), set()
+    for metric in metrics:
+        metric_scopes, metric_columns = ROLLUP_READS[metric]
+        scopes.update(metric_scopes)
+        columns.update(metric_columns)
+    return analytics_rollup.scoped(sorted(scopes), sorted(columns), start_date, end_date)
+
+
+LOADERS = {
+    'payments': _load_payments,
+    'sessions': _load_sessions,
+    'clients': _load_clients,
+    'trainers': _load_trainers,
+    'trainer_revenue': _load_trainer_revenue,
+    'assignments': _load_assignments,
+    'rollups': _load_rollups,
+}
+
+
+# Metric values from loaded sources
+
+def _rollup_total(loaded, column):
+    return loaded['rollups']['all'].get('', {}).get(column) or 0
+
+
+def _attendance_rate(total, completed):
+    return round((completed / total * 100) if total > 0 else 0, 2)
+
+
+def _raw_metric(metric, loaded):
+    if metric == 'total_revenue':
+        return float(sum(revenue for _, _, revenue in loaded['payments']))
+    if metric == 'payment_count':
+        return sum(count for _, count, _ in loaded['payments'])
+    if metric == 'revenue_by_type':
+        revenue_by_type = {}
+        for payment_type, _, revenue in loaded['payments']:
+            key = payment_type or 'Not specified'
+            revenue_by_type[key] = revenue_by_type.get(key, 0.0) + revenue
+        return revenue_by_type
+    if metric in ('client_count', 'active_clients', 'new_clients'):
+        return loaded['clients'][metric]
+    if metric == 'total_sessions':
+        return sum(row['total'] for row in loaded['sessions'])
+    if metric == 'completed_sessions':
+        return sum(row['completed'] for row in loaded['sessions'])
+    if metric == 'attendance_rate':
+        return _attendance_rate(sum(row['total'] for row in loaded['sessions']),
+                                sum(row['completed'] for row in loaded['sessions']))
+    if metric == 'sessions_by_type':
+        sessions_by_type = {}
+        for row in loaded['sessions']:
+            if row['completed']:
+                key = row['session_type'] or 'Not specified'
+                sessions_by_type[key] = sessions_by_type.get(key, 0) + row['completed']
+        return sessions_by_type
+    if metric == 'active_trainers':
+        trainers = loaded['trainers']
+        return trainers if isinstance(trainers, int) else len(trainers)
+    if metric == 'trainer_performance':
+        sessions_by_trainer = {}
+        for row in loaded['sessions']:
+            sessions_by_trainer[row['trainer_id']] = sessions_by_trainer.get(row['trainer_id'], 0) + row['completed']
+        return [
+            {
+                'trainer_name': name,
+                'sessions': sessions_by_trainer.get(trainer_id, 0),
+                'revenue': loaded['trainer_revenue'].get(trainer_id, 0.0)
+            }
+            for trainer_id, name in loaded['trainers']
+        ]
+    return None
+
+
+def _rollup_metric(metric, loaded):
+    if metric == 'total_revenue':
+        return float(_rollup_total(loaded, 'revenue_completed'))
+    if metric in ('payment_count', 'new_clients', 'completed_sessions'):
+        return int(_rollup_total(loaded, ROLLUP_READS[metric][1][0]))
+    if metric == 'total_sessions':
+        return int(_rollup_total(loaded, 'sessions_total'))
+    if metric == 'attendance_rate':
+        return _attendance_rate(_rollup_total(loaded, 'sessions_total'), _rollup_total(loaded, 'sessions_completed'))
+    if metric == 'revenue_by_type':
+        return {
+            key or 'Not specified': float(item['revenue_completed'])
+            for key, item in loaded['rollups']['payment_type'].items() if item['payments_completed']
+        }
+    if metric == 'sessions_by_type':
+        return {
+            key or 'Not specified': int(item['sessions_completed'])
+            for key, item in loaded['rollups']['session_type'].items() if item['sessions_completed']
+        }
+    if metric == 'trainer_performance':
+        sessions_by_trainer = loaded['rollups']['trainer']
+        revenue_by_client = loaded['rollups']['client']
+        # Client revenue is credited to every trainer assigned to the client
+        revenue_by_trainer = {}
+        for trainer_id, client_id in loaded['assignments']:
+            revenue = revenue_by_client.get(str(client_id), {}).get('revenue_completed') or 0
+            revenue_by_trainer[trainer_id] = revenue_by_trainer.get(trainer_id, 0) + revenue
+        return [
+            {
+                'trainer_name': name,
+                'sessions': int(sessions_by_trainer.get(str(trainer_id), {}).get('sessions_completed') or 0),
+                'revenue': float(revenue_by_trainer.get(trainer_id, 0))
+            }
+            for trainer_id, name in loaded['trainers']
+        ]
+    return _raw_metric(metric, loaded)
+
+
+class ReportPlan:
+    """The query groups answering a set of (metric, start_date, end_date) requests"""
+
+    def __init__(self, requests, use_rollups=False):
+        self.requests = list(requests)
+        self.use_rollups = use_rollups
+        sources = ROLLUP_SOURCES if use_rollups else RAW_SOURCES
+        # (source, start_date, end_date) -> metrics read from it
+        self.groups = {}
+        for metric, start_date, end_date in self.requests:
+            for source in sources.get(metric, ()):
+                key = (source, None, None) if source in UNDATED_SOURCES else (source, start_date, end_date)
+                self.groups.setdefault(key, set()).add(metric)
+
+    def _load(self, key):
+        source, start_date, end_date = key
+        return LOADERS[source](self.groups[key], start_date, end_date)
+
+    def _load_isolated(self, app, key):
+        # A fresh app context gets its own scoped session, and so its own connection
+        with app.app_context():
+            try:
+                return self._load(key)
+            finally:
+                db.session.remove()
+
+    def load(self, workers=None):
+        """
+        Run every query group
+
+        Args:
+            workers: Concurrent groups (default: REPORT_QUERY_WORKERS)
+
+        Returns:
+            Dict of group key to loaded rows
+        """
+        app = current_app._get_current_object()
+        workers = workers or app.config.get('REPORT_QUERY_WORKERS', 4)
+        keys = list(self.groups)
+        if workers <= 1 or len(keys) <= 1:
+            return {key: self._load(key) for key in keys}
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(keys))) as pool:
+            # Copied contexts keep per-request query instrumentation counting
+            futures = {
+                key: pool.submit(contextvars.copy_context().run, self._load_isolated, app, key)
+                for key in keys
+            }
+            return {key: future.result() for key, future in futures.items()}
+
+    def execute(self, workers=None):
+        """
+        Run the plan and compute every metric
+
+        Returns:
+            Dict of (metric, start_date, end_date) to metric value; unknown
+            metrics are left out
+        """
+        loaded = self.load(workers)
+        compute = _rollup_metric if self.use_rollups else _raw_metric
+        values = {}
+        for request in self.requests:
+            metric, start_date, end_date = request
+            if metric not in RAW_SOURCES:
+                continue
+            sources = {
+                source: loaded[(source, None, None) if source in UNDATED_SOURCES else (source, start_date, end_date)]
+                for source in (ROLLUP_SOURCES if self.use_rollups else RAW_SOURCES)[metric]
+            }
+            values[request] = compute(metric, sources)
+        return values
+
+
+def compute_metrics(metrics, start_date, end_date, use_rollups=False, workers=None):
+    """
+    Compute report metrics over one date range
+
+    Returns:
+        Dict of metric name to value, in the requested order
+    """
+    plan = ReportPlan([(metric, start_date, end_date) for metric in metrics], use_rollups)
+    values = plan.execute(workers)
+    return {
+        metric: values[(metric, start_date, end_date)]
+        for metric in metrics if (metric, start_date, end_date) in values
+    }
+
+
+def build_report(name, metrics, start_date, end_date, source=None):
+    """
+    Build a custom report
+    
+    Revenue, payment, new client and session metrics come from the daily
+    rollups (whole days, end day inclusive) unless source is 'raw' or the
+    rollups haven't been built yet.
+    """
+    if isinstance(start_date, str):
+        start_date = datetime.fromisoformat(start_date)
+    if isinstance(end_date, str):
+        end_date = datetime.fromisoformat(end_date)
+    
+    return {
+        'report_name': name,
+        'generated_at': datetime.utcnow().isoformat(),
+        'date_range': {
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat()
+        },
+        'metrics': compute_metrics(metrics, start_date, end_date, analytics_rollup.use_rollups(source))
+    }
@@ -0,0 +1,381 @@
+"""
+Revenue forecasting
+Fits additive Holt-Winters models to monthly and weekly completed revenue,
+overall and per membership type and payment type, and serves forecasts
+with confidence intervals from the fitted models.
+
+Revenue series come from the daily analytics rollups (raw payments until
+they are built). Fitting searches a grid of smoothing parameters with
+NumPy, all combinations at once. Models are stored in
+revenue_forecast_models; when a period closes the stored state is rolled
+forward over the new observations with the fitted parameters instead of
+refitting, and fit_revenue_forecasts.py refits nightly when history
+changes or a model has enough data to become seasonal.
+"""
+
+import math
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+import numpy as np
+from sqlalchemy import String, cast, func, literal, select
+from sqlalchemy.exc import IntegrityError
+from models.database import db, AnalyticsDailyRollup, Client, Payment, RevenueForecastModel
+from utils.analytics_rollup import analytics_rollup
+
+PERIODS = ('month', 'week')
+SEGMENTS = ('all', 'membership_type', 'payment_type')
+SEASON_LENGTHS = {'month': 12, 'week': 52}
+MAX_HORIZON = {'month': 24, 'week': 104}
+
+# Two-sided normal quantiles for the supported interval levels
+Z_SCORES = {0.8: 1.2816, 0.9: 1.6449, 0.95: 1.96, 0.99: 2.5758}
+
+# Smoothing parameter grid searched on a full refit
+ALPHAS = np.linspace(0.05, 0.95, 10)
+BETAS = np.array([0.0, 0.05, 0.1, 0.2, 0.3])
+GAMMAS = np.array([0.0, 0.05, 0.1, 0.2, 0.3, 0.5])
+
+# Observations used to initialise each method; errors are counted after them
+# (holt_winters: one season)
+ERRORS_FROM = {'holt': 2, 'mean': 1}
+
+# Revenue drift (in currency units) tolerated before history counts as changed
+HISTORY_TOLERANCE = 0.005
+
+
+# Periods
+
+def period_start(day, period):
+    """First day of the month, or the Monday of the week, containing day"""
+    if period == 'month':
+        return day.replace(day=1)
+    return day - timedelta(days=day.weekday())
+
+
+def next_period(start, period):
+    """Start of the period after the one starting at start"""
+    if period == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=7)
+
+
+def last_closed_period(period, today=None):
+    """Start of the most recent complete period"""
+    today = today or datetime.utcnow().date()
+    return period_start(period_start(today, period) - timedelta(days=1), period)
+
+
+def period_starts(first, last, period):
+    """Period starts from first through last"""
+    starts = []
+    while first <= last:
+        starts.append(first)
+        first = next_period(first, period)
+    return starts
+
+
+# Series
+
+def _as_date(value):
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _daily_revenue(segment, segment_key=None, start=None, end=None):
+    """Completed revenue per (segment key, day) in [start, end)"""
+    if analytics_rollup.use_rollups():
+        table = AnalyticsDailyRollup.__table__
+        day = table.c.day
+        if segment == 'membership_type':
+            key = func.coalesce(Client.membership_type, '')
+            query = select(key, day, func.sum(table.c.revenue_completed)).select_from(table).join(
+                Client, cast(Client.id, String) == table.c.scope_key
+            ).where(table.c.scope == 'client', table.c.revenue_completed != 0).group_by(key, day)
+        else:
+            key = table.c.scope_key
+            query = select(key, day, table.c.revenue_completed).where(
+                table.c.scope == ('all' if segment == 'all' else 'payment_type')
+            )
+        if start:
+            query = query.where(day >= start)
+        if end:
+            query = query.where(day < end)
+    else:
+        day = func.date(Payment.payment_date)
+        if segment == 'all':
+            key = literal('')
+            query = select(key, day, func.sum(Payment.amount)).group_by(day)
+        else:
+            key = func.coalesce(Payment.payment_type if segment == 'payment_type' else Client.membership_type, '')
+            query = select(key, day, func.sum(Payment.amount)).group_by(key, day)
+            if segment == 'membership_type':
+                query = query.join(Client, Client.id == Payment.client_id)
+        query = query.where(Payment.status == 'completed')
+        if start:
+            query = query.where(Payment.payment_date >= datetime.combine(start, time.min))
+        if end:
+            query = query.where(Payment.payment_date < datetime.combine(end, time.min))
+
+    if segment_key is not None and segment != 'all':
+        query = query.where(key == segment_key)
+    return db.session.execute(query).all()
+
+
+def period_totals(segment, period, segment_key=None, start=None, end=None):
+    """
+    Completed revenue per segment key and period
+
+    Returns:
+        Dict of segment key -> {period start: revenue}
+    """
+    totals = defaultdict(lambda: defaultdict(float))
+    for key, day, amount in _daily_revenue(segment, segment_key, start, end):
+        totals[key or ''][period_start(_as_date(day), period)] += float(amount or 0)
+    return totals
+
+
+# Fitting
+
+def _smooth(values, alpha, beta, gamma, level, trend, seasonal, offset=0):
+    """
+    Run the additive Holt-Winters recursions over values
+
+    Parameters and state may be arrays (one entry per grid combination,
+    seasonal with the season on the last axis); they broadcast together.
+
+    Returns:
+        (level, trend, seasonal, sse) after the last value
+    """
+    season_length = seasonal.shape[-1]
+    sse = np.zeros(np.broadcast(alpha, beta, gamma, level).shape)
+    for t, value in enumerate(values):
+        index = (offset + t) % season_length
+        offset_value = seasonal[..., index]
+        error = value - (level + trend + offset_value)
+        sse = sse + error ** 2
+        new_level = alpha * (value - offset_value) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        seasonal[..., index] = gamma * (value - new_level) + (1 - gamma) * offset_value
+        level = new_level
+    return level, trend, seasonal, sse
+
+
+def fit_parameters(values, season_length):
+    """
+    Fit smoothing parameters and state to a revenue series
+
+    Uses seasonal Holt-Winters from two full seasons of history, Holt's
+    linear trend from three periods, and level-only smoothing below that.
+
+    Returns:
+        Dict of method, alpha, beta, gamma, level, trend, seasonal, sse
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) >= 2 * season_length:
+        # State at the end of the first season, detrended; smoothing starts after it
+        method = 'holt_winters'
+        first_mean = values[:season_length].mean()
+        trend = (values[season_length:2 * season_length].mean() - first_mean) / season_length
+        centre = (season_length - 1) / 2
+        level = first_mean + trend * centre
+        seasonal = values[:season_length] - (first_mean + trend * (np.arange(season_length) - centre))
+        start = season_length
+        betas, gammas = BETAS, GAMMAS
+    else:
+        method = 'holt' if len(values) >= 3 else 'mean'
+        season_length = 1
+        start = ERRORS_FROM[method]
+        level = values[start - 1]
+        trend = values[1] - values[0] if method == 'holt' else 0.0
+        seasonal = np.zeros(1)
+        betas, gammas = (BETAS if method == 'holt' else np.zeros(1)), np.zeros(1)
+
+    alpha, beta, gamma = (grid.ravel() for grid in np.meshgrid(ALPHAS, betas, gammas, indexing='ij'))
+    levels, trends, seasonals, sse = _smooth(
+        values[start:], alpha, beta, gamma,
+        np.full(alpha.shape, level), np.full(alpha.shape, trend), np.tile(seasonal, (len(alpha), 1)),
+        offset=start
+    )
+    best = int(np.argmin(sse))
+    return {
+        'method': method,
+        'alpha': float(alpha[best]),
+        'beta': float(beta[best]),
+        'gamma': float(gamma[best]),
+        'level': float(levels[best]),
+        'trend': float(trends[best]),
+        'seasonal': seasonals[best].tolist(),
+        'sse': float(sse[best]),
+    }
+
+
+def _fit_model(model, values, first_period, last_closed, now):
+    """Full refit of model on a series ending at last_closed"""
+    season_length = SEASON_LENGTHS[model.period]
+    fitted = fit_parameters(values, season_length)
+    model.method = fitted['method']
+    model.alpha = fitted['alpha']
+    model.beta = fitted['beta']
+    model.gamma = fitted['gamma']
+    model.level = fitted['level']
+    model.trend = fitted['trend']
+    model.seasonal = fitted['seasonal']
+    model.season_length = len(fitted['seasonal'])
+    model.sse = fitted['sse']
+    model.observations = len(values)
+    model.first_period = first_period
+    model.trained_through = last_closed
+    model.history_total = float(np.sum(values))
+    model.fitted_at = now
+    return model
+
+
+def _roll_forward(model, values, last_closed):
+    """Update a model's state over newly closed periods, keeping its parameters"""
+    level, trend, seasonal, sse = _smooth(
+        np.asarray(values, dtype=np.float64), model.alpha, model.beta, model.gamma,
+        model.level, model.trend, np.array(model.seasonal, dtype=np.float64), offset=model.observations
+    )
+    model.level = float(level)
+    model.trend = float(trend)
+    model.seasonal = seasonal.tolist()
+    model.sse += float(sse)
+    model.observations += len(values)
+    model.trained_through = last_closed
+    model.history_total += float(np.sum(values))
+    return model
+
+
+def _needs_refit(model, values, first_period):
+    """Whether history changed under a model, or it now has enough data to be seasonal"""
+    trained = period_starts(first_period, model.trained_through, model.period)
+    if first_period != model.first_period or len(trained) > len(values):
+        return True
+    if abs(float(np.sum(values[:len(trained)])) - model.history_total) > HISTORY_TOLERANCE:
+        return True
+    return model.method != 'holt_winters' and len(values) >= 2 * SEASON_LENGTHS[model.period]
+
+
+def get_model(segment, period, segment_key='', today=None):
+    """
+    The fitted model for a segment, brought up to the last closed period
+
+    Fits and stores a model on first use. An existing model only reads the
+    periods closed since it was last updated.
+
+    Returns:
+        RevenueForecastModel, or None if the segment has no revenue
+    """
+    last_closed = last_closed_period(period, today)
+    model = RevenueForecastModel.query.filter_by(segment=segment, segment_key=segment_key, period=period).first()
+
+    if model is not None and model.trained_through >= last_closed:
+        return model
+
+    if model is None:
+        buckets = period_totals(segment, period, segment_key, end=next_period(last_closed, period)).get(segment_key)
+        if not buckets:
+            return None
+        starts = period_starts(min(buckets), last_closed, period)
+        model = RevenueForecastModel(segment=segment, segment_key=segment_key, period=period)
+        _fit_model(model, [buckets.get(start, 0.0) for start in starts], starts[0], last_closed, datetime.utcnow())
+        db.session.add(model)
+    else:
+        first = next_period(model.trained_through, period)
+        buckets = period_totals(
+            segment, period, segment_key, start=first, end=next_period(last_closed, period)
+        ).get(segment_key, {})
+        _roll_forward(model, [buckets.get(start, 0.0) for start in period_starts(first, last_closed, period)],
+                      last_closed)
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored this segment's first model meanwhile; use theirs
+        db.session.rollback()
+        model = RevenueForecastModel.query.filter_by(segment=segment, segment_key=segment_key, period=period).first()
+    return model
+
+
+def refresh_models(periods=PERIODS, today=None):
+    """
+    Fit or roll forward every segment's models from full history
+
+    Returns:
+        Stats dict: models fitted, rolled forward and already current
+    """
+    stats = {'fitted': 0, 'rolled_forward': 0, 'current': 0}
+    now = datetime.utcnow()
+    for period in periods:
+        last_closed = last_closed_period(period, today)
+        models = {
+            (model.segment, model.segment_key): model
+            for model in RevenueForecastModel.query.filter_by(period=period)
+        }
+        for segment in SEGMENTS:
+            for key, buckets in period_totals(segment, period, end=next_period(last_closed, period)).items():
+                starts = period_starts(min(buckets), last_closed, period)
+                values = np.array([buckets.get(start, 0.0) for start in starts])
+                model = models.get((segment, key))
+
+                if model is None or _needs_refit(model, values, starts[0]):
+                    if model is None:
+                        model = RevenueForecastModel(segment=segment, segment_key=key, period=period)
+                        db.session.add(model)
+                    _fit_model(model, values, starts[0], last_closed, now)
+                    stats['fitted'] += 1
+                elif model.trained_through < last_closed:
+                    _roll_forward(model, values[model.observations:], last_closed)
+                    stats['rolled_forward'] += 1
+                else:
+                    stats['current'] += 1
+        db.session.commit()
+    return stats
+
+
+# Forecasting
+
+def project(model, horizon, confidence=0.95, growth=0.0):
+    """
+    Forecast the periods after a model's last observation
+
+    Intervals use the additive Holt-Winters forecast variance
+    sigma^2 * (1 + sum_j (alpha * (1 + j * beta) + gamma * [j % m == 0])^2).
+
+    Args:
+        growth: Scenario adjustment in percent per period, applied on top
+
+    Returns:
+        List of {period, projected_revenue, lower, upper}
+    """
+    z = Z_SCORES[confidence]
+    season_length = model.season_length
+    steps = np.arange(1, horizon + 1)
+    seasonal = np.array(model.seasonal, dtype=np.float64)[(model.observations + steps - 1) % season_length]
+    point = model.level + steps * model.trend + seasonal
+
+    initial = model.season_length if model.method == 'holt_winters' else ERRORS_FROM[model.method]
+    sigma = math.sqrt(model.sse / max(model.observations - initial, 1))
+    lags = np.arange(1, horizon)
+    weights = model.alpha * (1 + lags * model.beta) + model.gamma * (lags % season_length == 0)
+    spread = z * sigma * np.sqrt(1 + np.concatenate(([0.0], np.cumsum(weights ** 2))))
+
+    scale = (1 + growth / 100) ** steps
+    point = np.maximum(point * scale, 0)
+    lower = np.maximum(point - spread * scale, 0)
+    upper = point + spread * scale
+
+    forecast = []
+    start = model.trained_through
+    for index in range(horizon):
+        start = next_period(start, model.period)
+        forecast.append({
+            'period': start.strftime('%Y-%m') if model.period == 'month' else start.isoformat(),
+            'projected_revenue': round(float(point[index]), 2),
+            'lower': round(float(lower[index]), 2),
+            'upper': round(float(upper[index]), 2),
+        })
+    return forecast
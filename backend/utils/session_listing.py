@@ -0,0 +1,157 @@
+"""
+Session listing
+Keyset (cursor) pagination for the session list. Pages are ordered by
+(session_date, id) and each page continues strictly after the last row of
+the previous one, so a page costs the same however deep it is and rows
+booked or cancelled meanwhile never shift a page boundary.
+
+Trainer and client names are joined in the same query, and a fields
+projection selects only the columns a caller renders.
+"""
+
+import base64
+import binascii
+from datetime import datetime, timedelta
+from sqlalchemy import tuple_
+from models.database import db, Session, Trainer, Client
+
+# Rows per page when a cursor or limit is given
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Selectable fields and the columns they read
+LIST_FIELDS = {
+    'id': Session.id,
+    'trainer_id': Session.trainer_id,
+    'client_id': Session.client_id,
+    'session_date': Session.session_date,
+    'end_time': Session.end_time,
+    'duration': Session.duration,
+    'session_type': Session.session_type,
+    'location': Session.location,
+    'notes': Session.notes,
+    'status': Session.status,
+    'recurring_session_id': Session.recurring_session_id,
+    'created_at': Session.created_at,
+    'updated_at': Session.updated_at,
+    'deleted_at': Session.deleted_at,
+    'trainer_name': Trainer.name,
+    'client_name': Client.name,
+}
+
+_DATETIME_FIELDS = {'session_date', 'end_time', 'created_at', 'updated_at', 'deleted_at'}
+
+
+def parse_fields(value):
+    """
+    Parse a comma separated fields= projection
+
+    Returns:
+        List of field names (all fields when value is empty)
+
+    Raises:
+        ValueError: If a field is unknown
+    """
+    if not value:
+        return list(LIST_FIELDS)
+
+    fields = []
+    for name in (part.strip() for part in value.split(',')):
+        if not name:
+            continue
+        if name not in LIST_FIELDS:
+            raise ValueError(f"Unknown field '{name}'. Valid fields: {', '.join(LIST_FIELDS)}")
+        if name not in fields:
+            fields.append(name)
+    return fields
+
+
+def encode_cursor(session_date, session_id):
+    """Opaque cursor for the position after (session_date, id)"""
+    raw = f'{session_date.isoformat()}|{session_id}'
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor from encode_cursor()
+
+    Returns:
+        (session_date, id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        session_date, session_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(session_date), int(session_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def listing_query(fields, trainer_id=None, client_id=None, status=None, start=None, end=None, after=None):
+    """
+    Query the selected fields in (session_date, id) order
+
+    The sort key is always selected so the next cursor can be built, and
+    the names are outer-joined only when asked for.
+
+    Args:
+        fields: Field names from parse_fields()
+        after: (session_date, id) to continue after, from decode_cursor()
+    """
+    needed = set(fields)
+    if 'end_time' in needed:
+        needed.add('duration')
+    columns = [LIST_FIELDS['session_date'].label('session_date'), LIST_FIELDS['id'].label('id')]
+    columns += [LIST_FIELDS[name].label(name) for name in LIST_FIELDS if name in needed and name not in ('session_date', 'id')]
+
+    query = db.session.query(*columns).select_from(Session)
+    if 'trainer_name' in needed:
+        query = query.outerjoin(Trainer, Trainer.id == Session.trainer_id)
+    if 'client_name' in needed:
+        query = query.outerjoin(Client, Client.id == Session.client_id)
+
+    if trainer_id:
+        query = query.filter(Session.trainer_id == trainer_id)
+    if client_id:
+        query = query.filter(Session.client_id == client_id)
+    if status:
+        query = query.filter(Session.status == status)
+    if start:
+        query = query.filter(Session.session_date >= start)
+    if end:
+        query = query.filter(Session.session_date <= end)
+    if after:
+        query = query.filter(tuple_(Session.session_date, Session.id) > tuple_(*after))
+
+    return query.order_by(Session.session_date, Session.id)
+
+
+def row_to_dict(row, fields):
+    """Serialise a listing row, matching Session.to_dict() for the same fields"""
+    result = {}
+    for name in fields:
+        value = getattr(row, name)
+        if name == 'end_time' and value is None and row.session_date and row.duration:
+            value = row.session_date + timedelta(minutes=row.duration)
+        if name in _DATETIME_FIELDS and value is not None:
+            value = value.isoformat()
+        result[name] = value
+    return result
+
+
+def fetch_page(query, fields, limit):
+    """
+    Fetch one page of at most limit rows
+
+    Returns:
+        (items, next_cursor) where next_cursor is None on the last page
+    """
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].session_date, rows[-1].id)
+    return [row_to_dict(row, fields) for row in rows], next_cursor
@@ -0,0 +1,302 @@
+"""
+Slow query log
+Records statements slower than a threshold together with redacted
+parameters, the originating endpoint and an EXPLAIN plan.
+
+Entries are written as JSON lines to one file shared by every gunicorn
+worker. Once the file reaches SLOW_QUERY_LOG_MAX_BYTES it is rotated to
+path.1, path.2, ...; writes and rotation are serialized across workers with
+an flock on path.lock, and a worker reopens the file whenever another one
+has moved it. The active file and the newest rotated copies can be read back
+through the monitoring API.
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime, time as dt_time
+from logging.handlers import WatchedFileHandler
+from flask import has_request_context, request
+from utils.logger import logger
+from utils.query_instrumentation import fingerprint_statement, query_instrumentation
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is only safe with a single process
+    fcntl = None
+
+# Parameter names whose values are always hidden
+SENSITIVE_PARAM_HINTS = ('email', 'phone', 'password', 'token', 'secret', 'name', 'address', 'key')
+
+EXPLAINABLE_PREFIXES = ('select', 'with')
+
+
+class SharedRotatingFileHandler(WatchedFileHandler):
+    """
+    Size-based rotation for a file appended to by several processes
+
+    RotatingFileHandler keeps writing to its open descriptor after another
+    process renames the file, so each write takes an exclusive flock on a
+    side lock file, reopens the log if it was moved, and rotates it when
+    it has grown past max_bytes.
+    """
+
+    def __init__(self, filename, max_bytes=0, backups=0):
+        super().__init__(filename)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._lock_file = open(f'{self.baseFilename}.lock', 'a')
+
+    def emit(self, record):
+        if fcntl is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self.reopenIfNeeded()
+            if self._should_rotate():
+                self._rotate()
+            logging.FileHandler.emit(self, record)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _should_rotate(self):
+        if not self.max_bytes or not self.backups:
+            return False
+        try:
+            return os.stat(self.baseFilename).st_size >= self.max_bytes
+        except FileNotFoundError:
+            return False
+
+    def _rotate(self):
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        for i in range(self.backups - 1, 0, -1):
+            source = f'{self.baseFilename}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.baseFilename}.{i + 1}')
+        os.replace(self.baseFilename, f'{self.baseFilename}.1')
+        self.stream = self._open()
+        self._statstream()
+
+    def close(self):
+        super().close()
+        self._lock_file.close()
+
+
+def redact_value(value):
+    """Replace a parameter value with a non-identifying placeholder"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f'<str:{len(value)}>'
+    return f'<{type(value).__name__}>'
+
+
+def redact_parameters(parameters):
+    """
+    Redact bound parameters for storage
+
+    Strings are reduced to their length; numbers, dates and booleans are
+    kept because they explain plan choices (ranges, ids, limits). Values of
+    parameters with sensitive names are always hidden.
+    """
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        redacted = {}
+        for key, value in parameters.items():
+            if any(hint in str(key).lower() for hint in SENSITIVE_PARAM_HINTS):
+                redacted[key] = '<redacted>'
+            else:
+                redacted[key] = redact_value(value)
+        return redacted
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany: only keep the batch size
+            return f'<{len(parameters)} parameter sets>'
+        return [redact_value(value) for value in parameters]
+    return redact_value(parameters)
+
+
+class SlowQueryLog:
+    """Opt-in recorder for statements slower than a configurable threshold"""
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 0.2
+        self.explain = True
+        self.path = None
+        self.max_bytes = 5 * 1024 * 1024
+        self.backups = 3
+        self._file_logger = None
+        self._queue = None
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, engine):
+        """
+        Enable the slow query log if SLOW_QUERY_LOG is set
+
+        Args:
+            app: Flask application
+            engine: SQLAlchemy engine to instrument
+        """
+        if not app.config.get('SLOW_QUERY_LOG', False):
+            return
+
+        self.threshold = app.config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000.0
+        self.explain = app.config.get('SLOW_QUERY_EXPLAIN', True)
+        self.path = app.config.get('SLOW_QUERY_LOG_PATH', 'logs/slow_queries.jsonl')
+        self.max_bytes = app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 5 * 1024 * 1024)
+        self.backups = app.config.get('SLOW_QUERY_LOG_BACKUPS', 3)
+
+        if self._file_logger is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            handler = SharedRotatingFileHandler(self.path, self.max_bytes, self.backups)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            # Standalone logger so entries never reach the application log handlers
+            self._file_logger = logging.Logger('FitnessCRM.slow_queries', logging.INFO)
+            self._file_logger.addHandler(handler)
+            query_instrumentation.add_listener(self._on_query)
+
+        query_instrumentation.attach_engine(engine)
+        self.enabled = True
+        logger.info(f"Slow query log enabled (threshold {self.threshold * 1000:.0f}ms, file {self.path})")
+
+    def _on_query(self, conn, statement, parameters, duration):
+        if not self.enabled or duration < self.threshold:
+            return
+
+        entry = {
+            'recorded_at': datetime.utcnow().isoformat(),
+            'duration_ms': round(duration * 1000, 2),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'method': request.method if has_request_context() else None,
+            'fingerprint': fingerprint_statement(statement),
+            'statement': statement,
+            'parameters': redact_parameters(parameters),
+            'pid': os.getpid(),
+        }
+        # EXPLAIN runs on a separate connection in the background so the
+        # slow request is not made slower and engine events are not re-entered
+        self._enqueue(entry, conn.engine, statement, parameters)
+
+    def _enqueue(self, entry, engine, statement, parameters):
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((entry, engine, statement, parameters))
+        except queue.Full:
+            logger.warning("Slow query log queue full, dropping entry")
+
+    def _ensure_worker(self):
+        # Worker threads don't survive gunicorn's fork, so start one per process
+        if self._worker is not None and self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=100)
+            self._worker = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            entry, engine, statement, parameters = self._queue.get()
+            try:
+                if self.explain:
+                    entry['plan'] = self.explain_statement(engine, statement, parameters)
+                self._file_logger.info(json.dumps(entry, default=str))
+            except Exception as e:
+                logger.error(f"Failed to record slow query: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Wait until queued entries have been written (used by tests)"""
+        if self._queue is not None:
+            self._queue.join()
+
+    def explain_statement(self, engine, statement, parameters):
+        """
+        Get the query plan for a statement without executing it
+
+        Returns:
+            List of plan lines, or None if the statement can't be explained
+        """
+        if not statement.lstrip().lower().startswith(EXPLAINABLE_PREFIXES):
+            return None
+        if isinstance(parameters, (list, tuple)) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+            return None
+
+        if engine.dialect.name == 'postgresql':
+            explain_sql = f'EXPLAIN (ANALYZE off) {statement}'
+        elif engine.dialect.name == 'sqlite':
+            explain_sql = f'EXPLAIN QUERY PLAN {statement}'
+        else:
+            explain_sql = f'EXPLAIN {statement}'
+
+        raw_conn = engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            try:
+                if parameters:
+                    cursor.execute(explain_sql, parameters)
+                else:
+                    cursor.execute(explain_sql)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+            raw_conn.rollback()
+        except Exception as e:
+            logger.warning(f"EXPLAIN failed for slow query: {str(e)}")
+            return None
+        finally:
+            raw_conn.close()
+
+        return [' | '.join(str(col) for col in row) if len(row) > 1 else str(row[0]) for row in rows]
+
+    def get_entries(self, limit=100, endpoint=None, min_duration_ms=None):
+        """
+        Read recorded slow queries, newest first
+
+        Args:
+            limit: Maximum number of entries
+            endpoint: Only entries from this Flask endpoint
+            min_duration_ms: Only entries at least this slow
+        """
+        if not self.path:
+            return []
+
+        # Active file first, then rotated backups (.1 is the most recent)
+        files = [self.path] + [f'{self.path}.{i}' for i in range(1, self.backups + 1)]
+
+        entries = []
+        for path in files:
+            if not os.path.exists(path):
+                continue
+            with open(path) as fh:
+                lines = fh.readlines()
+            for line in reversed(lines):
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if endpoint and entry.get('endpoint') != endpoint:
+                    continue
+                if min_duration_ms is not None and entry.get('duration_ms', 0) < min_duration_ms:
+                    continue
+                entries.append(entry)
+                if len(entries) >= limit:
+                    return entries
+        return entries
+
+
+# Global slow query log instance
+slow_query_log = SlowQueryLog()
@@ -0,0 +1,292 @@
+"""
+Trainer benchmarks
+Computes the population of active trainers once per period (all time, or
+the last N days) with a single grouped query over sessions: per-trainer
+session, completion and distinct-client counts, their means and
+percentiles, each trainer's percentile ranks, and a deterministic
+performance score. Single-trainer and all-trainer benchmarks read the same
+population, so benchmarking every trainer costs one query instead of a
+set of platform-wide aggregates per trainer.
+
+Populations are cached per worker for TRAINER_BENCHMARK_TTL seconds and
+are not dropped on commits: a benchmark is a distribution, and a few
+bookings don't move it.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import case, func
+from models.database import db, Session, Trainer
+
+PERCENTILES = (25, 50, 75, 90)
+
+# Weights of each metric's percentile rank in the performance score
+SCORE_WEIGHTS = {'completed_sessions': 0.4, 'completion_rate': 0.3, 'unique_clients': 0.3}
+
+
+def performance_rating(score):
+    """Rating label for a performance score"""
+    return 'excellent' if score >= 90 else 'good' if score >= 75 else 'average'
+
+
+def percentile_ranks(population, values):
+    """
+    Percentile rank of each value within a population
+
+    Ties count half, so a value equal to every member ranks 50.
+    """
+    ordered = np.sort(population)
+    if not len(ordered):
+        return np.zeros(len(values))
+    below = np.searchsorted(ordered, values, side='left')
+    equal = np.searchsorted(ordered, values, side='right') - below
+    return (below + equal / 2) / len(ordered) * 100
+
+
+def trainer_metrics(start=None, end=None, trainer_ids=None):
+    """
+    Session metrics per trainer from one grouped query
+
+    Args:
+        start, end: Count sessions dated in [start, end) (default: all)
+        trainer_ids: These trainers (default: every active trainer)
+
+    Returns:
+        (ids, names, metrics) with metrics a dict of aligned arrays
+    """
+    join_on = Session.trainer_id == Trainer.id
+    if start:
+        join_on &= Session.session_date >= start
+    if end:
+        join_on &= Session.session_date < end
+
+    query = db.session.query(
+        Trainer.id,
+        Trainer.name,
+        func.count(Session.id),
+        func.coalesce(func.sum(case((Session.status == 'completed', 1), else_=0)), 0),
+        func.count(func.distinct(Session.client_id)),
+    ).outerjoin(Session, join_on)
+    if trainer_ids is not None:
+        query = query.filter(Trainer.id.in_(trainer_ids))
+    else:
+        query = query.filter(Trainer.active.is_(True))
+    rows = query.group_by(Trainer.id, Trainer.name).order_by(Trainer.id).all()
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    names = [row[1] for row in rows]
+    total, completed, clients = (np.array([row[i] for row in rows], dtype=np.float64) for i in (2, 3, 4))
+    completion_rate = np.divide(completed * 100, total, out=np.zeros_like(total), where=total > 0)
+    return ids, names, {
+        'total_sessions': total,
+        'completed_sessions': completed,
+        'completion_rate': completion_rate,
+        'unique_clients': clients,
+    }
+
+
+class Population:
+    """Benchmark distribution of the active trainers for one period"""
+
+    def __init__(self, ids, names, metrics, days, computed_at):
+        self.ids = ids
+        self.names = names
+        self.metrics = metrics
+        self.days = days
+        self.computed_at = computed_at
+        self.index = {int(trainer_id): i for i, trainer_id in enumerate(ids)}
+
+        total = metrics['total_sessions'].sum()
+        self.means = {
+            'total_sessions': _mean(metrics['total_sessions']),
+            'completed_sessions': _mean(metrics['completed_sessions']),
+            # Pooled, so trainers with a handful of sessions don't skew it
+            'completion_rate': float(metrics['completed_sessions'].sum() / total * 100) if total else 0.0,
+            'unique_clients': _mean(metrics['unique_clients']),
+        }
+        self.percentiles = {
+            name: dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist())) if len(values) else {}
+            for name, values in metrics.items()
+        }
+        self.ranks = {name: percentile_ranks(values, values) for name, values in metrics.items()}
+        self.scores = self.score(self.ranks)
+        # 1 = best; ties broken by trainer id
+        order = np.lexsort((ids, -self.scores))
+        self.positions = np.empty(len(ids), dtype=np.int64)
+        self.positions[order] = np.arange(1, len(ids) + 1)
+
+    @staticmethod
+    def score(ranks):
+        """Performance score (0-100) from per-metric percentile ranks"""
+        return sum(weight * ranks[name] for name, weight in SCORE_WEIGHTS.items())
+
+    def rank_outsider(self, metrics):
+        """Percentile ranks and score for a trainer outside the population"""
+        ranks = {name: percentile_ranks(self.metrics[name], values) for name, values in metrics.items()}
+        return ranks, self.score(ranks)
+
+    def benchmark(self, trainer_id, name, metrics, ranks, score, position=None):
+        """Benchmark dict for one trainer"""
+        return {
+            'trainer_id': trainer_id,
+            'trainer_name': name,
+            'metrics': {
+                'total_sessions': int(metrics['total_sessions']),
+                'completed_sessions': int(metrics['completed_sessions']),
+                'completion_rate': round(float(metrics['completion_rate']), 1),
+                'unique_clients': int(metrics['unique_clients'])
+            },
+            'benchmarks': {
+                'avg_sessions': round(self.means['total_sessions'], 1),
+                'avg_completed': round(self.means['completed_sessions'], 1),
+                'avg_completion_rate': round(self.means['completion_rate'], 1),
+                'avg_clients': round(self.means['unique_clients'], 1)
+            },
+            'percentile_ranks': {name: round(float(value), 1) for name, value in ranks.items()},
+            'performance_score': round(float(score), 1),
+            'rating': performance_rating(score),
+            'rank': position,
+            'trainers_ranked': len(self.ids),
+            'period_days': self.days,
+            'benchmark_date': self.computed_at.isoformat(),
+            'source': 'population'
+        }
+
+    def member_benchmark(self, i):
+        """Benchmark dict for the i-th trainer of the population"""
+        return self.benchmark(
+            int(self.ids[i]), self.names[i],
+            {name: values[i] for name, values in self.metrics.items()},
+            {name: values[i] for name, values in self.ranks.items()},
+            self.scores[i], int(self.positions[i])
+        )
+
+    def summary(self):
+        """Population means and percentiles"""
+        return {
+            'trainers': len(self.ids),
+            'means': {name: round(value, 1) for name, value in self.means.items()},
+            'percentiles': {
+                name: {f'p{p}': round(value, 1) for p, value in points.items()}
+                for name, points in self.percentiles.items()
+            },
+            'period_days': self.days,
+            'computed_at': self.computed_at.isoformat(),
+        }
+
+
+def _mean(values):
+    return float(values.mean()) if len(values) else 0.0
+
+
+class TrainerBenchmarks:
+    """Per-worker cache of trainer benchmark populations, one per period"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._compute_lock = threading.Lock()
+        self._populations = {}
+        self.ttl = 900
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Configure from app settings"""
+        self.ttl = app.config.get('TRAINER_BENCHMARK_TTL', 900)
+        self.clear()
+
+    def clear(self):
+        """Drop every cached population"""
+        with self._lock:
+            self._populations.clear()
+
+    def get_stats(self):
+        """Get cache statistics for this worker"""
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'populations': len(self._populations),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _cached(self, key):
+        with self._lock:
+            cached = self._populations.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self.hits += 1
+                return cached[1]
+        return None
+
+    def population(self, days=None):
+        """
+        The benchmark population for all time, or the last days days
+
+        Windows end at the start of today, so a population is stable for
+        the day. Concurrent misses compute it once.
+        """
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        key = (days, today) if days else (None, None)
+        population = self._cached(key)
+        if population is not None:
+            return population
+
+        with self._compute_lock:
+            population = self._cached(key)
+            if population is not None:
+                return population
+
+            start, end = (today - timedelta(days=days), today) if days else (None, None)
+            ids, names, metrics = trainer_metrics(start, end)
+            population = Population(ids, names, metrics, days, datetime.utcnow())
+            with self._lock:
+                self.misses += 1
+                # Old windows are never asked for again
+                self._populations = {k: v for k, v in self._populations.items() if k[1] in (None, today)}
+                self._populations[key] = (time.monotonic() + self.ttl, population)
+            return population
+
+    def benchmark(self, trainer_id, days=None):
+        """
+        Benchmark one trainer against the population
+
+        Inactive trainers are ranked against the active population with
+        their own metrics.
+
+        Returns:
+            Benchmark dict, or None if the trainer doesn't exist
+        """
+        population = self.population(days)
+        i = population.index.get(trainer_id)
+        if i is not None:
+            return population.member_benchmark(i)
+
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        start, end = (today - timedelta(days=days), today) if days else (None, None)
+        ids, names, metrics = trainer_metrics(start, end, trainer_ids=[trainer_id])
+        if not len(ids):
+            return None
+        ranks, scores = population.rank_outsider(metrics)
+        return population.benchmark(
+            trainer_id, names[0],
+            {name: values[0] for name, values in metrics.items()},
+            {name: values[0] for name, values in ranks.items()},
+            scores[0]
+        )
+
+    def all_benchmarks(self, days=None):
+        """
+        Benchmarks for every active trainer, best first
+
+        Returns:
+            (benchmarks, population)
+        """
+        population = self.population(days)
+        order = np.argsort(population.positions)
+        return [population.member_benchmark(int(i)) for i in order], population
+
+
+# Global benchmark cache
+trainer_benchmarks = TrainerBenchmarks()
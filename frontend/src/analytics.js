@@ -548,6 +548,25 @@ function displayTopClients(clients) {
   `).join('');
 }
 
+// Give up on a report job after this long (the server fails stale jobs after 10 minutes)
+const REPORT_JOB_DEADLINE_MS = 11 * 60 * 1000;
+
+// Reports run as background jobs: submit, then long-poll until finished
+async function runReportJob(spec) {
+  const deadline = Date.now() + REPORT_JOB_DEADLINE_MS;
+  let job = (await api.post('/reports/jobs', spec)).data;
+  while (job.status === 'queued' || job.status === 'running') {
+    if (Date.now() > deadline) {
+      throw new Error('Report timed out');
+    }
+    job = (await api.get(`/reports/jobs/${job.job_id}`, { params: { wait: 20 } })).data;
+  }
+  if (job.status !== 'completed') {
+    throw new Error(job.error || 'Report failed');
+  }
+  return job;
+}
+
 // Custom report generation
 async function generateCustomReport() {
   const reportName = document.getElementById('custom-report-name').value || 'Custom Report';
@@ -564,19 +583,19 @@ async function generateCustomReport() {
 
   showLoading();
   try {
-    const response = await api.post('/reports/custom', {
+    const job = await runReportJob({
       name: reportName,
       metrics: selectedMetrics,
       start_date: startDate,
       end_date: endDate
     });
 
-    const reportData = response.data;
-    displayCustomReportResults(reportData);
+    displayCustomReportResults(job.result);
     
     // Enable export button
     document.getElementById('export-report-btn').disabled = false;
-    document.getElementById('export-report-btn').dataset.reportData = JSON.stringify(reportData);
+    document.getElementById('export-report-btn').dataset.jobId = job.job_id;
+    document.getElementById('export-report-btn').dataset.reportData = JSON.stringify(job.result);
     
     showNotification('Report generated successfully!', 'success');
   } catch (error) {
@@ -649,20 +668,31 @@ function displayCustomReportResults(data) {
 }
 
 async function exportCustomReport() {
-  const reportDataStr = document.getElementById('export-report-btn').dataset.reportData;
-  if (!reportDataStr) {
+  const { jobId, reportData } = document.getElementById('export-report-btn').dataset;
+  if (!jobId || !reportData) {
     showNotification('No report to export', 'error');
     return;
   }
 
   showLoading();
   try {
-    const reportData = JSON.parse(reportDataStr);
-    const response = await api.post('/reports/custom/export', {
-      report_data: reportData
-    }, {
-      responseType: 'blob'
-    });
+    // Exported from the stored result, no need to send the report back;
+    // once that has expired, send the report the page is still showing
+    let response;
+    try {
+      response = await api.get(`/reports/jobs/${jobId}/export`, {
+        responseType: 'blob'
+      });
+    } catch (error) {
+      if (error.response?.status !== 404) {
+        throw error;
+      }
+      response = await api.post('/reports/custom/export', {
+        report_data: JSON.parse(reportData)
+      }, {
+        responseType: 'blob'
+      });
+    }
 
     // Create download link
     const url = window.URL.createObjectURL(new Blob([response.data]));
@@ -686,14 +716,13 @@ async function exportCustomReport() {
 window.generateFromTemplate = async function(templateId) {
   showLoading();
   try {
-    const response = await api.post(`/reports/templates/${templateId}`);
-    const reportData = response.data;
+    const job = await runReportJob({ template_id: templateId });
     
     // Switch to reports tab if not already there
     document.getElementById('tab-reports').click();
     
     // Display results
-    displayCustomReportResults(reportData);
+    displayCustomReportResults(job.result);
     
     showNotification('Report generated from template!', 'success');
   } catch (error) {
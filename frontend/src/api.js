@@ -171,8 +171,11 @@ export const advancedAnalyticsAPI = {
     api.get(`/api/analytics/advanced/churn-prediction/${clientId}`, { params: { days_lookback: daysLookback } }),
   getBatchChurnPredictions: (clientIds) => 
     api.post('/api/analytics/advanced/churn-prediction/batch', { client_ids: clientIds }),
-  getRevenueForecast: (months = 6) => 
-    api.get('/api/analytics/advanced/revenue-forecast', { params: { months } }),
+  getAtRiskClients: (params = {}) => 
+    api.get('/api/analytics/advanced/churn-prediction/at-risk', { params }),
+  // options: period (month|week), segment, segment_key, confidence, growth
+  getRevenueForecast: (months = 6, options = {}) => 
+    api.get('/api/analytics/advanced/revenue-forecast', { params: { months, ...options } }),
   getTrainerBenchmark: (trainerId) => 
     api.get(`/api/analytics/advanced/trainer-benchmark/${trainerId}`),
   getAllTrainerBenchmarks: () => 
@@ -206,6 +209,18 @@ export const activityAPI = {
 export const sessionAPI = {
   create: (data) => api.post('/api/sessions', data),
   getAll: (params = {}) => api.get('/api/sessions', { params }),
+  // One keyset page: { sessions, next_cursor, has_more, limit }
+  getPage: (params = {}) => api.get('/api/sessions', { params: { limit: 200, ...params } }),
+  getAllPages: async (params = {}) => {
+    const sessions = [];
+    let cursor;
+    do {
+      const response = await sessionAPI.getPage(cursor ? { ...params, cursor } : params);
+      sessions.push(...response.data.sessions);
+      cursor = response.data.next_cursor;
+    } while (cursor);
+    return { data: sessions };
+  },
   getById: (id) => api.get(`/api/sessions/${id}`),
   update: (id, data) => api.put(`/api/sessions/${id}`, data),
   delete: (id) => api.delete(`/api/sessions/${id}`),
@@ -221,16 +236,27 @@ export const sessionAPI = {
     document.body.appendChild(link);
     link.click();
     document.body.removeChild(link);
-  }
+  },
+  // Subscribable feed URLs for calendar apps
+  trainerCalendarUrl: (trainerId) => `${API_BASE_URL}/api/trainers/${trainerId}/calendar.ics`,
+  clientCalendarUrl: (clientId) => `${API_BASE_URL}/api/clients/${clientId}/calendar.ics`,
 };
 
 // Recurring Session API
 export const recurringSessionAPI = {
   create: (data) => api.post('/api/recurring-sessions', data),
   getAll: (params = {}) => api.get('/api/recurring-sessions', { params }),
+  update: (id, data) => api.put(`/api/recurring-sessions/${id}`, data),
   delete: (id, deleteFuture = false) => api.delete(`/api/recurring-sessions/${id}?delete_future=${deleteFuture}`),
 };
 
+// Availability API
+export const availabilityAPI = {
+  search: (params = {}) => api.get('/api/availability', { params }),
+  getWorkingHours: (trainerId) => api.get(`/api/trainers/${trainerId}/working-hours`),
+  setWorkingHours: (trainerId, hours) => api.put(`/api/trainers/${trainerId}/working-hours`, { hours }),
+};
+
 // Measurement API
 export const measurementAPI = {
   create: (data) => api.post('/api/measurements', data),
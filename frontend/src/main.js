@@ -1531,7 +1531,7 @@ async function loadSessions() {
     if (calendarState.filterClient) params.client_id = calendarState.filterClient;
     if (calendarState.filterStatus) params.status = calendarState.filterStatus;
     
-    const response = await sessionAPI.getAll(params);
+    const response = await sessionAPI.getAllPages(params);
     state.sessions = response.data;
     
     // Clear all session displays